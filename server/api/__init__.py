@@ -3,4 +3,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-from . import recordings_routes
+from . import recordings_routes, timeline_routes, audio_routes, search_routes
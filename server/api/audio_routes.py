@@ -0,0 +1,167 @@
+# server/api/audio_routes.py
+import os
+from bson import ObjectId
+from flask import request, jsonify, current_app, Response, stream_with_context
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from . import api_bp
+from ..models import recording_model
+from ..services.audio_sink import get_audio_writer
+from ..services.word_timeline import load_timeline
+from ..utils.range_files import send_range_file, follow_file
+from ..utils.webm_index import load_seek_index, clip_plan, clip_size, iter_clip
+
+AUDIO_MIME_TYPE = 'audio/webm'
+# Raw PCM sessions are stored as WAV
+AUDIO_MIME_TYPES = {'.webm': AUDIO_MIME_TYPE, '.wav': 'audio/wav'}
+
+def _audio_path(recording_id: str, recording_doc: dict) -> str:
+    # audioPath is only stored when the session ends; live files use the default location
+    if recording_doc.get('audioPath'):
+        return recording_doc['audioPath']
+    base = os.path.join(current_app.config['RECORDINGS_DIR'], recording_id)
+    wav_path = f"{base}.wav"
+    return wav_path if not os.path.exists(f"{base}.webm") and os.path.exists(wav_path) else f"{base}.webm"
+
+def _mime_type(path: str) -> str:
+    return AUDIO_MIME_TYPES.get(os.path.splitext(path)[1], AUDIO_MIME_TYPE)
+
+@api_bp.route('/recordings/<string:recording_id>/audio', methods=['GET'])
+def get_recording_audio_route(recording_id):
+    """
+    Serves a recording's audio with HTTP range support for playback and seeking.
+    While the recording is in progress, a request without a Range header follows
+    the file as it is written (disable with follow=0); range requests are served
+    from the bytes written so far.
+    """
+    try:
+        recording_doc = recording_model.get_recording(recording_id, {"status": 1, "audioPath": 1})
+        if not recording_doc:
+            return jsonify({"error": "Recording not found"}), 404
+
+        path = _audio_path(recording_id, recording_doc)
+        sink = get_audio_writer(current_app.config).find_sink(path)
+        if not os.path.exists(path):
+            return jsonify({"error": "Audio not available"}), 404
+
+        live = recording_doc.get('status') == 'in_progress'
+        if live and request.range is None and request.args.get('follow', '1') != '0':
+            return _follow_audio_response(path, sink)
+
+        response = send_range_file(
+            request,
+            path,
+            _mime_type(path),
+            max_age=0 if live else current_app.config['AUDIO_CACHE_MAX_AGE_S']
+        )
+        if live:
+            response.cache_control.no_store = True
+        return response
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
+    except Exception as e:
+        current_app.logger.error(f"Error serving audio for {recording_id}: {e}")
+        return jsonify({"error": "Failed to serve audio"}), 500
+
+def _follow_audio_response(path: str, sink) -> Response:
+    """
+    Streams a file that is still being written by an audio sink. When the sink
+    lives in another worker process, the stream ends after the file stops growing.
+    """
+    def readable_bytes(f):
+        # Preallocation keeps the file size at the bytes written, so the size is safe to follow
+        return sink.bytes_written if sink is not None and not sink.is_closed else os.fstat(f.fileno()).st_size
+
+    def is_live():
+        # Unknown when the session is handled by another process
+        return None if sink is None else not sink.is_closed
+
+    chunks = follow_file(
+        path,
+        readable_bytes,
+        is_live,
+        idle_timeout_s=current_app.config['AUDIO_TAIL_IDLE_TIMEOUT_S'],
+        poll_interval_s=current_app.config['AUDIO_TAIL_POLL_INTERVAL_S']
+    )
+    response = Response(stream_with_context(chunks), mimetype=_mime_type(path))
+    response.cache_control.no_store = True
+    return response
+
+def _parse_word_ref(value: str):
+    """
+    Parses a word reference of the form '<segmentId>:<wordId>' or
+    '<segmentIndex>:<wordId>'; the latter only resolves while the word id is
+    unique among the finals of that segment.
+    """
+    segment, _, word_id = (value or '').partition(':')
+    if word_id and ObjectId.is_valid(segment):
+        return segment, word_id
+    if not word_id or not segment.lstrip('-').isdigit():
+        raise ValueError(f"Invalid word reference '{value}'")
+    return int(segment), word_id
+
+def _clip_bounds(recording_id: str):
+    """
+    Resolves the requested clip to (start, end) seconds, either from 'from'/'to'
+    or from a span of words given as 'fromWord'/'toWord' ('<segmentId>:<wordId>',
+    or '<segmentIndex>:<wordId>' where that is unambiguous).
+    """
+    if 'fromWord' in request.args or 'toWord' in request.args:
+        first_ref = _parse_word_ref(request.args.get('fromWord'))
+        last_ref = _parse_word_ref(request.args.get('toWord', request.args.get('fromWord')))
+        timeline = load_timeline(recording_id, current_app.config)
+        first = timeline.find_word(*first_ref) if timeline else None
+        last = timeline.find_word(*last_ref) if timeline else None
+        if first is None or last is None:
+            raise LookupError("Word not found")
+        return first['start'], last['end']
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    if start is None or end is None:
+        raise ValueError("Missing or invalid 'from'/'to'")
+    return start, end
+
+@api_bp.route('/recordings/<string:recording_id>/audio/clip', methods=['GET'])
+def get_recording_audio_clip_route(recording_id):
+    """
+    Returns a playable WebM clip of a completed recording covering a time range
+    ('from'/'to', seconds) or a span of words ('fromWord'/'toWord').
+    The clip is cut at cluster boundaries, so it may start slightly before the
+    requested time; X-Clip-Start gives the actual start within the recording.
+    """
+    try:
+        recording_doc = recording_model.get_recording(recording_id, {"status": 1, "audioPath": 1})
+        if not recording_doc:
+            return jsonify({"error": "Recording not found"}), 404
+        if recording_doc.get('status') == 'in_progress':
+            return jsonify({"error": "Clips are available once the recording has ended"}), 409
+
+        try:
+            start, end = _clip_bounds(recording_id)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        if end < start:
+            return jsonify({"error": "'to' must not be before 'from'"}), 400
+
+        path = _audio_path(recording_id, recording_doc)
+        if not os.path.exists(path):
+            return jsonify({"error": "Audio not available"}), 404
+        if _mime_type(path) != AUDIO_MIME_TYPE:
+            return jsonify({"error": "Clips are only available for WebM recordings"}), 415
+        index = load_seek_index(path)
+        plan = clip_plan(index, start, end) if not index['error'] else None
+        if not plan:
+            return jsonify({"error": "No audio in the requested range"}), 416
+
+        ms_per_tick = index['timecodeScale'] / 1_000_000
+        response = Response(iter_clip(path, index, plan), mimetype=AUDIO_MIME_TYPE)
+        response.content_length = clip_size(index, plan)
+        response.headers['X-Clip-Start'] = f"{plan[0][2][1] * ms_per_tick / 1000:.3f}"
+        response.headers['Content-Disposition'] = f'inline; filename="{recording_id}-clip.webm"'
+        response.cache_control.private = True
+        response.cache_control.max_age = current_app.config['AUDIO_CACHE_MAX_AGE_S']
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error cutting audio clip for {recording_id}: {e}")
+        return jsonify({"error": "Failed to cut audio clip"}), 500
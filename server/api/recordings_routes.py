@@ -1,7 +1,141 @@
 # server/api/recordings_routes.py
-from flask import request, jsonify, current_app
+import datetime
+import hashlib
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import request, jsonify, current_app, Response, stream_with_context
 from . import api_bp
 from ..models import recording_model
+from ..services.response_cache import get_response_cache
+from ..services.transcript_edits import edit_transcript, EditError, RecordingInProgress, VersionConflict
+from ..services import transcript_export
+from ..utils.time_utils import parse_datetime
+
+DEFAULT_STREAM_BATCH_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_EDIT_OPS = 5000
+DEFAULT_LIST_PAGE_SIZE = 50
+MAX_LIST_PAGE_SIZE = 200
+RECORDING_STATUSES = ('in_progress', 'completed', 'aborted')
+MAX_EXPORT_IDS = 10000
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def _encode_segment_cursor(segment: dict) -> str:
+    return f"{segment['index']}:{segment['_id']}"
+
+def _decode_segment_cursor(cursor: str) -> tuple:
+    index, segment_id = cursor.split(":", 1)
+    return int(index), ObjectId(segment_id)
+
+def _encode_recording_cursor(recording: dict) -> str:
+    # Mongo stores datetimes with millisecond precision, so the cursor is exact
+    created_ms = (recording['createdAt'] - _EPOCH) // datetime.timedelta(milliseconds=1)
+    return f"{created_ms}:{recording['_id']}"
+
+def _decode_recording_cursor(cursor: str) -> tuple:
+    created_ms, recording_id = cursor.split(":", 1)
+    try:
+        created_at = _EPOCH + datetime.timedelta(milliseconds=int(created_ms))
+    except OverflowError:
+        raise ValueError(f"cursor time {created_ms} is out of range")
+    return created_at, ObjectId(recording_id)
+
+def _parse_list_query(args) -> dict:
+    """
+    Parses the filters of GET /recordings. Raises ValueError on bad input.
+    """
+    statuses = [status for status in args.get('status', '').split(',') if status]
+    unknown = set(statuses) - set(RECORDING_STATUSES)
+    if unknown:
+        raise ValueError(f"status must be one of {', '.join(RECORDING_STATUSES)}")
+    limit = args.get('limit', DEFAULT_LIST_PAGE_SIZE, type=int)
+    if not 0 < limit <= MAX_LIST_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_LIST_PAGE_SIZE}")
+    order = args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    fields = args.get('fields', 'summary')
+    if fields not in ('summary', 'text'):
+        raise ValueError("fields must be 'summary' or 'text'")
+    cursor = args.get('cursor')
+    return {
+        "statuses": statuses,
+        "created_from": parse_datetime(args['from']) if 'from' in args else None,
+        "created_to": parse_datetime(args['to']) if 'to' in args else None,
+        "after": _decode_recording_cursor(cursor) if cursor else None,
+        "limit": limit,
+        "descending": order == 'desc',
+        "projection": {"segments": 0} if fields == 'text' else None,
+    }
+
+def _parse_export_selection(args, body) -> dict:
+    """
+    Parses which recordings /recordings/export covers: 'recordingIds' in a
+    JSON body, or a user's recordings with the GET /recordings filters.
+    Raises ValueError on bad input.
+    """
+    if body is not None:
+        ids = body.get('recordingIds') if isinstance(body, dict) else None
+        if not isinstance(ids, list) or not 0 < len(ids) <= MAX_EXPORT_IDS:
+            raise ValueError(f"'recordingIds' must be a list of 1 to {MAX_EXPORT_IDS} ids")
+        return {"recording_ids": [ObjectId(rid) for rid in ids]}
+    user_id = args.get('userId')
+    if not user_id:
+        raise ValueError("'userId' or a JSON body with 'recordingIds' is required")
+    statuses = [status for status in args.get('status', '').split(',') if status]
+    if set(statuses) - set(RECORDING_STATUSES):
+        raise ValueError(f"status must be one of {', '.join(RECORDING_STATUSES)}")
+    return {
+        "user_id": user_id,
+        "statuses": statuses,
+        "created_from": parse_datetime(args['from']) if 'from' in args else None,
+        "created_to": parse_datetime(args['to']) if 'to' in args else None,
+    }
+
+def _parse_segment_query(args) -> dict:
+    """
+    Parses the segment filters of GET /recordings/<id>. Raises ValueError on bad input.
+    """
+    fields = args.get('fields', 'full')
+    if fields not in ('full', 'text'):
+        raise ValueError("fields must be 'full' or 'text'")
+    limit = args.get('limit', type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    cursor = args.get('cursor')
+    return {
+        "start": float(args['from']) if 'from' in args else None,
+        "end": float(args['to']) if 'to' in args else None,
+        "after": _decode_segment_cursor(cursor) if cursor else None,
+        "limit": limit,
+        "include_words": fields == 'full',
+    }
+
+def _query_variant(args) -> str:
+    """A stable key for the representation selected by the query string."""
+    return "&".join(f"{key}={value}" for key, value in sorted(args.items(multi=True)))
+
+def _make_etag(version: datetime.datetime, variant: str) -> str:
+    variant_hash = hashlib.sha1(variant.encode()).hexdigest()[:12]
+    return f"{int(_as_utc(version).timestamp() * 1000)}-{variant_hash}"
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    # Mongo returns naive datetimes that are in UTC
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+def _is_not_modified(etag: str, version: datetime.datetime) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return _as_utc(version).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def _with_validators(response: Response, etag: str, version: datetime.datetime) -> Response:
+    response.set_etag(etag)
+    response.last_modified = _as_utc(version)
+    # Clients may store the response but must revalidate it before reuse
+    response.cache_control.no_cache = True
+    return response
 
 @api_bp.route('/recordings', methods=['POST'])
 def create_recording_route():
@@ -20,26 +154,186 @@ def create_recording_route():
         current_app.logger.error(f"Error creating recording: {e}")
         return jsonify({"error": "Failed to create recording"}), 500
 
+@api_bp.route('/recordings', methods=['GET'])
+def list_recordings_route():
+    """
+    Lists a user's recordings, newest first, a page at a time.
+    Expects 'userId'. Optional query parameters:
+    - status: one or more of in_progress, completed, aborted, comma-separated.
+    - from / to: only recordings created in [from, to) (ISO 8601).
+    - limit / cursor: page size, and the 'nextCursor' of the previous page.
+    - order: 'desc' (default) or 'asc' by creation time.
+    - fields: 'summary' (default) leaves out segment ids and final text; 'text' adds the final text.
+    """
+    user_id = request.args.get('userId')
+    if not user_id:
+        return jsonify({"error": "Missing userId"}), 400
+    try:
+        query = _parse_list_query(request.args)
+    except (ValueError, TypeError, InvalidId) as e:
+        return jsonify({"error": f"Invalid query parameters: {e}"}), 400
+
+    try:
+        limit = query.pop('limit')
+        # One extra document tells whether there is a next page
+        recordings = recording_model.list_recordings(user_id, limit=limit + 1, **query)
+        next_cursor = _encode_recording_cursor(recordings[limit - 1]) if len(recordings) > limit else None
+        return jsonify({
+            "recordings": [recording_model.serialize_document(doc) for doc in recordings[:limit]],
+            "nextCursor": next_cursor
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error listing recordings for user {user_id}: {e}")
+        return jsonify({"error": "Failed to list recordings"}), 500
+
+@api_bp.route('/recordings/export', methods=['GET', 'POST'])
+def export_recordings_route():
+    """
+    Streams the final transcripts of many recordings as one download.
+    Selects a user's recordings with GET ?userId= and the GET /recordings
+    filters (status, from, to), or the recordings listed in a POST body
+    {"recordingIds": [...]}. Query parameters:
+    - format: 'ndjson' (default) streams a recording line and then its
+      segments; 'srt' / 'vtt' stream a tar of one caption file per recording.
+    - gzip: '1' compresses the stream on the fly.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in transcript_export.EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(transcript_export.EXPORT_FORMATS)}"}), 400
+    compress = request.args.get('gzip') in ('1', 'true')
+    try:
+        body = request.get_json(silent=True) if request.method == 'POST' else None
+        if request.method == 'POST' and body is None:
+            raise ValueError("expected a JSON body with 'recordingIds'")
+        selection = _parse_export_selection(request.args, body)
+    except (ValueError, TypeError, InvalidId) as e:
+        return jsonify({"error": f"Invalid export request: {e}"}), 400
+
+    config = current_app.config
+    recordings = transcript_export.iter_selected(selection, config['EXPORT_BATCH_SIZE'])
+    chunks = transcript_export.export_stream(recordings, fmt, compress, config)
+
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # Headers are already sent, so the stream can only be cut short
+            current_app.logger.error(f"Error exporting recordings: {e}")
+
+    response = Response(stream_with_context(generate()),
+                        mimetype=transcript_export.content_type(fmt, compress))
+    filename = f"transcripts.{transcript_export.file_extension(fmt, compress)}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @api_bp.route('/recordings/<string:recording_id>', methods=['GET'])
 def get_recording_route(recording_id):
     """
     Retrieves a recording and its associated segments.
+    Optional query parameters:
+    - from / to: only segments overlapping this time range (seconds).
+    - limit / cursor: page through segments; the response carries 'nextCursor'
+      when more segments are available.
+    - fields: 'full' (default) or 'text' to leave out word arrays.
+    - format: 'ndjson' streams the recording and then one segment per line,
+      read from the database in batches of 'batchSize'.
     """
     try:
-        recording_doc = recording_model.get_recording(recording_id)
-        if not recording_doc:
+        query = _parse_segment_query(request.args)
+    except (ValueError, TypeError, InvalidId) as e:
+        return jsonify({"error": f"Invalid query parameters: {e}"}), 400
+
+    try:
+        # A cheap metadata read decides between a 304, a cached body and a full build
+        meta = recording_model.get_recording(recording_id, {"status": 1, "updatedAt": 1})
+        if not meta:
             return jsonify({"error": "Recording not found"}), 404
-        
-        segments = recording_model.get_segments_for_recording(recording_id)
-        
-        # Serialize documents to make them JSON-friendly
-        serialized_recording = recording_model.serialize_document(recording_doc)
-        serialized_segments = [recording_model.serialize_document(seg) for seg in segments]
-        
-        # Replace segment IDs with full segment documents
-        serialized_recording['segments'] = serialized_segments
-        
-        return jsonify(serialized_recording)
+
+        version = meta.get('updatedAt')
+        variant = _query_variant(request.args)
+        etag = _make_etag(version, variant) if version else None
+        if etag and _is_not_modified(etag, version):
+            return _with_validators(Response(status=304), etag, version)
+
+        # The segment id array is replaced by the segments themselves, so don't load it
+        if request.args.get('format') == 'ndjson':
+            recording_doc = recording_model.get_recording(recording_id, {"segments": 0})
+            batch_size = request.args.get('batchSize', DEFAULT_STREAM_BATCH_SIZE, type=int)
+            response = _stream_recording_ndjson(recording_id, recording_doc, query, batch_size)
+            return _with_validators(response, etag, version) if etag else response
+
+        # Completed recordings are effectively immutable, so their bodies are cached
+        cache = get_response_cache(current_app.config) if etag and meta.get('status') == 'completed' else None
+        body = cache.get((recording_id, variant), version) if cache else None
+        if body is None:
+            recording_doc = recording_model.get_recording(recording_id, {"segments": 0})
+            segments = list(recording_model.iter_segments(recording_id, **query))
+
+            # Serialize documents to make them JSON-friendly
+            serialized_recording = recording_model.serialize_document(recording_doc)
+            serialized_segments = [recording_model.serialize_document(seg) for seg in segments]
+
+            # Replace segment IDs with full segment documents
+            serialized_recording['segments'] = serialized_segments
+            if query['limit'] and len(segments) == query['limit']:
+                serialized_recording['nextCursor'] = _encode_segment_cursor(segments[-1])
+
+            body = jsonify(serialized_recording).get_data()
+            if cache:
+                cache.put((recording_id, variant), version, body)
+
+        response = Response(body, mimetype='application/json')
+        return _with_validators(response, etag, version) if etag else response
     except Exception as e:
         current_app.logger.error(f"Error retrieving recording {recording_id}: {e}")
         return jsonify({"error": "Failed to retrieve recording"}), 500
+
+@api_bp.route('/recordings/<string:recording_id>', methods=['PATCH'])
+def patch_recording_route(recording_id):
+    """
+    Applies a batch of word edits to a completed recording's transcript.
+    Expects {"version": <recording version>, "ops": [...]} (see
+    services/transcript_edits.py) and returns the new version and the edited
+    segments. A stale version gets a 409 carrying the current one.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('version'), int) or 'ops' not in data:
+        return jsonify({"error": "Expected a JSON body with 'version' and 'ops'"}), 400
+    if isinstance(data['ops'], list) and len(data['ops']) > MAX_EDIT_OPS:
+        return jsonify({"error": f"At most {MAX_EDIT_OPS} operations per request"}), 413
+
+    try:
+        result = edit_transcript(recording_id, data['version'], data['ops'])
+        if result is None:
+            return jsonify({"error": "Recording not found"}), 404
+        return jsonify({
+            "version": result['version'],
+            "segments": [recording_model.serialize_document(seg) for seg in result['segments']]
+        })
+    except EditError as e:
+        return jsonify({"error": str(e), "op": e.op_index}), 400
+    except VersionConflict as e:
+        return jsonify({"error": "Recording was edited since this version", "version": e.current_version}), 409
+    except RecordingInProgress:
+        return jsonify({"error": "Recording is still being transcribed"}), 409
+    except Exception as e:
+        current_app.logger.error(f"Error editing recording {recording_id}: {e}")
+        return jsonify({"error": "Failed to edit recording"}), 500
+
+def _stream_recording_ndjson(recording_id: str, recording_doc: dict, query: dict, batch_size: int) -> Response:
+    """
+    Streams a recording as NDJSON: a {"recording": ...} line followed by one
+    {"segment": ...} line per segment, so memory stays flat for any length.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield dumps({"recording": recording_model.serialize_document(recording_doc)}) + "\n"
+        try:
+            for seg in recording_model.iter_segments(recording_id, batch_size=batch_size, **query):
+                yield dumps({"segment": recording_model.serialize_document(seg)}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so the stream can only be cut short
+            current_app.logger.error(f"Error streaming recording {recording_id}: {e}")
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
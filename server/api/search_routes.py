@@ -0,0 +1,44 @@
+# server/api/search_routes.py
+from flask import request, jsonify, current_app
+from . import api_bp
+from ..models import recording_model
+from ..services.search_index import get_search_index
+
+MAX_QUERY_LENGTH = 512
+MAX_RESULTS = 100
+MAX_HITS_PER_RECORDING = 50
+
+@api_bp.route('/search', methods=['GET'])
+def search_route():
+    """
+    Full-text search over final transcripts. 'q' holds words and "quoted
+    phrases"; a recording matches when it contains all of them. Returns ranked
+    recordings with the start/end time (seconds) of each hit, to seek to.
+    Optional: 'userId', 'limit', 'offset', 'hits' (per recording).
+    """
+    if not current_app.config['SEARCH_INDEX_ENABLED']:
+        return jsonify({"error": "Search is disabled"}), 404
+    query = request.args.get('q', '').strip()
+    if not query or len(query) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"'q' must be 1 to {MAX_QUERY_LENGTH} characters"}), 400
+    limit = request.args.get('limit', 20, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    hits = request.args.get('hits', 5, type=int)
+    if not 0 < limit <= MAX_RESULTS or offset < 0 or not 0 <= hits <= MAX_HITS_PER_RECORDING:
+        return jsonify({"error": f"limit must be 1 to {MAX_RESULTS}, offset >= 0, hits 0 to {MAX_HITS_PER_RECORDING}"}), 400
+    user_id = request.args.get('userId')
+
+    try:
+        results = get_search_index(current_app.config).search(
+            query,
+            limit=limit,
+            offset=offset,
+            hits_per_recording=hits,
+            recording_filter=(lambda ids: recording_model.filter_recordings_by_user(ids, user_id)) if user_id else None
+        )
+        return jsonify({"query": query, **results})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error searching for '{query}': {e}")
+        return jsonify({"error": "Search failed"}), 500
@@ -0,0 +1,49 @@
+# server/api/timeline_routes.py
+from flask import request, jsonify, current_app
+from . import api_bp
+from ..services.word_timeline import load_timeline
+
+MAX_RANGE_WORDS = 5000
+
+@api_bp.route('/recordings/<string:recording_id>/words/at', methods=['GET'])
+def get_word_at_time_route(recording_id):
+    """
+    Returns the word being spoken at time 't' (seconds), or null if t falls in a gap.
+    """
+    t = request.args.get('t', type=float)
+    if t is None:
+        return jsonify({"error": "Missing or invalid 't'"}), 400
+
+    try:
+        timeline = load_timeline(recording_id, current_app.config)
+        if timeline is None:
+            return jsonify({"error": "Recording not found"}), 404
+        return jsonify({"word": timeline.word_at(t)})
+    except Exception as e:
+        current_app.logger.error(f"Error looking up word at {t} for {recording_id}: {e}")
+        return jsonify({"error": "Failed to look up word"}), 500
+
+@api_bp.route('/recordings/<string:recording_id>/words', methods=['GET'])
+def get_words_in_range_route(recording_id):
+    """
+    Returns the words overlapping the time range ['from', 'to'] (seconds), at
+    most 'limit' (1 to MAX_RANGE_WORDS, default MAX_RANGE_WORDS) of them.
+    """
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    if start is None or end is None or end < start:
+        return jsonify({"error": "Missing or invalid 'from'/'to'"}), 400
+    limit = request.args.get('limit', MAX_RANGE_WORDS, type=int)
+    if not 0 < limit <= MAX_RANGE_WORDS:
+        return jsonify({"error": f"'limit' must be between 1 and {MAX_RANGE_WORDS}"}), 400
+
+    try:
+        timeline = load_timeline(recording_id, current_app.config)
+        if timeline is None:
+            return jsonify({"error": "Recording not found"}), 404
+        # One word past the limit tells whether the range was cut short
+        words = timeline.words_between(start, end, limit + 1)
+        return jsonify({"words": words[:limit], "truncated": len(words) > limit})
+    except Exception as e:
+        current_app.logger.error(f"Error looking up words in [{start}, {end}] for {recording_id}: {e}")
+        return jsonify({"error": "Failed to look up words"}), 500
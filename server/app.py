@@ -1,16 +1,34 @@
 # server/app.py
 import os
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 from flask_sock import Sock
 
 from .config import Config
-from .db import close_db
+from .db import init_db, close_db
+from .models import recording_model
 from .api import api_bp
+from .services.reconciliation import start_heartbeat_job, start_reconciliation_job
+from .services.word_timeline import invalidate_timeline
+from .services.response_cache import invalidate_recording_responses
+from .services.metrics import render_metrics
+from .services.search_index import get_search_index, index_segments
+from .services.session_runtime import get_runtime
+from .services.session_registry import get_session_registry
+from .stt.connection_pool import get_stt_pool
+from .stt.deepgram_client import build_listen_uri
+from .utils.prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
 from .ws.transcription_ws import init_ws
 
-def create_app(test_config=None):
-    """Create and configure an instance of the Flask application."""
+def create_app(test_config=None, background_services=True):
+    """
+    Create and configure an instance of the Flask application.
+
+    One-off scripts pass background_services=False to get the app, its
+    database and its listeners without what only a serving process needs:
+    the search index and its flush thread, the reconciliation and heartbeat
+    jobs and the pre-warmed STT connections.
+    """
     app = Flask(__name__, instance_relative_config=True)
     
     # Load configuration
@@ -31,6 +49,7 @@ def create_app(test_config=None):
         os.makedirs(recordings_dir)
 
     # Initialize extensions
+    init_db(app)  # One pooled MongoClient shared by the whole process
     CORS(app)  # Enable CORS for all routes
     sock = Sock(app) # Initialize Flask-Sock
 
@@ -41,13 +60,53 @@ def create_app(test_config=None):
     from .ws import transcription_ws
     transcription_ws.init_ws(sock)
 
-    # Register teardown function to close DB connection
+    # Register teardown function to release the per-context DB handle
     app.teardown_appcontext(close_db)
 
+    # Drop cached per-recording data whenever a recording or its segments change
+    recording_model.add_change_listener(invalidate_timeline)
+    recording_model.add_change_listener(invalidate_recording_responses)
+
+    # Index final segments for search as they are persisted; parts are memory-mapped now
+    if app.config['SEARCH_INDEX_ENABLED'] and background_services:
+        get_search_index(app.config)
+        recording_model.add_segment_listener(index_segments)
+
+    if app.config['MONGO_CREATE_INDEXES']:
+        with app.app_context():
+            try:
+                recording_model.create_indexes()
+            except Exception as e:
+                app.logger.warning(f"Could not create MongoDB indexes at startup: {e}")
+
+    # Periodically finalize recordings orphaned by crashed workers
+    if app.config['RECONCILE_INTERVAL_S'] > 0 and background_services:
+        start_reconciliation_job(
+            app,
+            lambda: get_session_registry(app.config).recording_ids()
+        )
+
+    # Keep this worker's live sessions from looking orphaned to every worker's reconciliation
+    if app.config['SESSION_HEARTBEAT_INTERVAL_S'] > 0 and background_services:
+        start_heartbeat_job(
+            app,
+            lambda: get_session_registry(app.config).recording_ids()
+        )
+
+    # Pre-connect STT WebSockets so new sessions skip the handshake
+    stt_pool = get_stt_pool(app.config, build_listen_uri(app.config)) if background_services else None
+    if stt_pool:
+        get_runtime().loop.call_soon_threadsafe(stt_pool.start)
+
     @app.route('/health')
     def health_check():
         return "Server is running"
 
+    @app.route('/metrics')
+    def metrics():
+        services = get_session_registry(app.config).services()
+        return Response(render_metrics(app.config, services), content_type=PROMETHEUS_CONTENT_TYPE)
+
     return app
 
 # To run the app directly (for development)
@@ -0,0 +1,132 @@
+# server/asgi.py
+"""
+The ASGI serving mode.
+
+`/ws/transcription` is served natively on the server's event loop, which
+also becomes the session runtime loop (see services/session_runtime.py), so
+thousands of sessions share one loop and no connection holds a thread. Every
+other request goes to the Flask app through a pool of ASGI_HTTP_THREADS
+threads. Run one worker per core with graceful drain via serve.py, or a
+single worker directly:
+    python -m server.serve
+    uvicorn --factory server.asgi:create_asgi_app --port 5000
+"""
+import asyncio
+import logging
+
+from .app import create_app
+from .services.session_runtime import adopt_runtime_loop
+from .services.session_registry import get_session_registry
+from .utils.wsgi_bridge import WsgiBridge
+from .ws.transcription_asgi import AsgiWebSocket, transcription_session
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_PATH = "/ws/transcription"
+# How often a draining worker checks whether its sessions have ended
+DRAIN_POLL_S = 0.5
+
+class TranscriptionASGI:
+    """
+    An ASGI application wrapping the Flask app, which it creates on lifespan
+    startup once the server's event loop is running.
+    """
+    def __init__(self, test_config=None):
+        self._test_config = test_config
+        self.flask_app = None
+        self._http = None
+        self._draining = False
+        # Handler tasks of the accepted transcription connections
+        self._connections = set()
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif self.flask_app is None:
+            raise RuntimeError("The ASGI app needs lifespan events to start; run the server with lifespan on")
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+
+    async def _websocket(self, scope, receive, send):
+        if scope["path"] != TRANSCRIPTION_PATH:
+            # Closing before accepting rejects the handshake with a 403
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        ws = AsgiWebSocket(receive, send)
+        if not await ws.accept():
+            return
+        if self._draining:
+            await ws.close(1013, "Server is restarting, try again later.")
+            return
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            await transcription_session(ws, self.flask_app, lambda: self._draining)
+        finally:
+            self._connections.discard(task)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.startup()
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Sessions still around (the server did not drain) are finalized now
+                await self.drain(0)
+                self._http.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def startup(self):
+        """
+        Makes the running loop the session runtime and creates the Flask app.
+        """
+        adopt_runtime_loop(asyncio.get_running_loop())
+        self.flask_app = create_app(self._test_config)
+        self._http = WsgiBridge(self.flask_app.wsgi_app, self.flask_app.config['ASGI_HTTP_THREADS'])
+
+    async def drain(self, timeout: float):
+        """
+        Stops taking new sessions and waits up to `timeout` seconds for the
+        live ones to end. Every remaining session is then finished so its
+        recording is finalized; clients still connected receive the last
+        transcripts and 'session_ended', then close code 1001.
+        """
+        self._draining = True
+        if self.flask_app is None:
+            return
+        registry = get_session_registry(self.flask_app.config)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        if registry.recording_ids():
+            logger.info(f"Draining {len(registry.recording_ids())} sessions for up to {timeout:g} s")
+        while registry.recording_ids() and loop.time() < deadline:
+            await asyncio.sleep(DRAIN_POLL_S)
+
+        finishing = []
+        for session in registry.sessions():
+            if session.ws is None:
+                finishing.append(registry.expire_now_async(session))
+            else:
+                # The connection's handler finishes the session within RECEIVE_POLL_S
+                session.ws.request_stop()
+        await asyncio.gather(*finishing, return_exceptions=True)
+        # A session leaves the registry before it is finalized; its handler ends after
+        while registry.recording_ids() or self._connections:
+            await asyncio.sleep(DRAIN_POLL_S)
+
+def create_asgi_app(test_config=None) -> TranscriptionASGI:
+    """Create the ASGI application (for `uvicorn --factory`)."""
+    return TranscriptionASGI(test_config)
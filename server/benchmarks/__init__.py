@@ -0,0 +1,2 @@
+# server/benchmarks/__init__.py
+# This file makes the 'benchmarks' directory a Python package.
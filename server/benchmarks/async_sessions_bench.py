@@ -0,0 +1,162 @@
+# server/benchmarks/async_sessions_bench.py
+"""
+Compares how many concurrent transcription sessions one server process
+sustains in the threaded (Flask + flask-sock) and ASGI serving modes.
+
+For each mode and each step of --sessions, a fresh server process is started
+against the fake STT server and that many sessions stream audio at 250 ms
+pacing (see load_test.py). Reported per step: chunk-to-final latency p95,
+errors, peak resident memory and memory per session, and the server's peak
+thread count. A step is sustained when every session completed with p95 under
+--max-p95-ms; each mode stops at its first failed step.
+
+No MongoDB is needed: sessions use random recording ids, so finalizing each
+one logs an error and sends the client an 'error' message, which is counted
+separately and does not fail a step. Segments are only written when a
+session ends, so failed writes do not tie up the servers' executor threads. Run from the repository root:
+    python -m server.benchmarks.async_sessions_bench --sessions 50,100,200,400
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from .load_test import LoadStats, load_chunks, percentile, read_rss_bytes, run_session
+
+MODES = ("threaded", "asgi")
+
+def read_thread_count(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    return 0
+
+def server_command(mode: str, port: int) -> list:
+    if mode == "threaded":
+        return [sys.executable, "-c", "from server.app import create_app; "
+                f"create_app().run(host='127.0.0.1', port={port}, threaded=True)"]
+    # A single uvicorn process, so the sampled pid is the one serving
+    return [sys.executable, "-m", "uvicorn", "--factory", "server.asgi:create_asgi_app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+def start_server(mode: str, port: int, stt_port: int) -> subprocess.Popen:
+    # Without a database every write fails; fail fast and only when a session
+    # ends, so the executor threads stay free and both modes are measured serving
+    env = dict(os.environ, DEEPGRAM_URI=f"ws://127.0.0.1:{stt_port}/v1/listen", DEEPGRAM_API_KEY="bench",
+               MONGO_CREATE_INDEXES="false", RECONCILE_INTERVAL_S="0", SEARCH_INDEX_ENABLED="false",
+               MONGO_SERVER_SELECTION_TIMEOUT_MS="20", SEGMENT_FLUSH_INTERVAL_S="3600",
+               SEGMENT_BATCH_SIZE="100000", STT_POOL_SIZE="0")
+    server = subprocess.Popen(server_command(mode, port), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError(f"The {mode} server did not start")
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+async def sample(pid: int, peaks: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            peaks["rss"] = max(peaks["rss"], read_rss_bytes(pid))
+            peaks["threads"] = max(peaks["threads"], read_thread_count(pid))
+        except OSError:
+            return
+        await asyncio.sleep(0.5)
+
+async def run_step(options, sessions: int, port: int, pid: int) -> dict:
+    session_options = argparse.Namespace(
+        random_ids=True, http=f"http://127.0.0.1:{port}", ws=f"ws://127.0.0.1:{port}",
+        duration=options.duration, chunk_ms=250, drain_timeout=options.end_timeout,
+    )
+    chunks = load_chunks(None, 4000)
+    stats = LoadStats()
+    baseline_rss = read_rss_bytes(pid)
+    peaks = {"rss": baseline_rss, "threads": read_thread_count(pid)}
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.create_task(sample(pid, peaks, stop_sampling))
+
+    tasks = []
+    for _ in range(sessions):
+        tasks.append(asyncio.create_task(run_session(session_options, chunks, stats)))
+        await asyncio.sleep(options.ramp / sessions)
+    await asyncio.gather(*tasks)
+    stop_sampling.set()
+    await sampler
+
+    errors = {kind: count for kind, count in stats.errors.items() if kind != "server_error"}
+    p95_ms = percentile(sorted(stats.latencies_s), 95) * 1000
+    return {
+        "completed": stats.sessions_completed,
+        "p95_ms": p95_ms,
+        "errors": errors,
+        "server_errors": stats.errors.get("server_error", 0),
+        "peak_rss": peaks["rss"],
+        "per_session": (peaks["rss"] - baseline_rss) / sessions,
+        "threads": peaks["threads"],
+        "sustained": stats.sessions_completed == sessions and not errors and p95_ms <= options.max_p95_ms,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="50,100,200,400", help="comma-separated session counts")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated serving modes")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of audio streamed per session")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds over which sessions are opened")
+    parser.add_argument("--max-p95-ms", type=float, default=2000, help="chunk->final p95 a sustained step stays under")
+    parser.add_argument("--end-timeout", type=float, default=120,
+                        help="seconds a session may take to end after 'stop' (finalizing is slow without a database)")
+    parser.add_argument("--port", type=int, default=5077, help="port for the server under test")
+    parser.add_argument("--stt-port", type=int, default=8779, help="port for the fake STT server")
+    options = parser.parse_args()
+
+    stt = subprocess.Popen([sys.executable, "-m", "server.stt.fake_stt_server", "--port", str(options.stt_port),
+                            "--cadence", "0.5", "--idle-timeout", "600"], stderr=subprocess.DEVNULL)
+    best = {}
+    try:
+        time.sleep(1.0)
+        print(f"{'mode':<10}{'sessions':>9}{'done':>6}{'p95 ms':>8}{'errors':>8}{'finalize errs':>14}"
+              f"{'peak MB':>9}{'KiB/session':>12}{'threads':>9}")
+        for mode in options.modes.split(","):
+            for sessions in (int(s) for s in options.sessions.split(",")):
+                server = start_server(mode, options.port, options.stt_port)
+                try:
+                    result = asyncio.run(run_step(options, sessions, options.port, server.pid))
+                finally:
+                    stop_server(server)
+                print(f"{mode:<10}{sessions:>9}{result['completed']:>6}{result['p95_ms']:8.0f}"
+                      f"{sum(result['errors'].values()):>8}{result['server_errors']:>14}"
+                      f"{result['peak_rss'] / 2**20:9.0f}{result['per_session'] / 1024:12.0f}{result['threads']:>9}")
+                if result["errors"]:
+                    print(f"{'':<10}errors: {result['errors']}")
+                if not result["sustained"]:
+                    break
+                best[mode] = (sessions, result["per_session"])
+    finally:
+        stt.terminate()
+        stt.wait()
+
+    for mode in options.modes.split(","):
+        if mode in best:
+            sessions, per_session = best[mode]
+            print(f"{mode}: sustained {sessions} sessions, ~{per_session / 1024:.0f} KiB per session")
+        else:
+            print(f"{mode}: no step sustained")
+
+if __name__ == "__main__":
+    main()
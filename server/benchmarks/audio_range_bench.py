@@ -0,0 +1,88 @@
+# server/benchmarks/audio_range_bench.py
+"""
+Measures throughput of concurrent HTTP range readers against `send_range_file`.
+
+Serves a synthetic audio file from a local threaded WSGI server and lets N
+reader threads fetch random byte ranges (single or multi-range) from it.
+Run from the repository root:
+    python -m server.benchmarks.audio_range_bench --readers 32 --file-mb 64
+"""
+import argparse
+import http.client
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+from ..utils.range_files import send_range_file
+
+def build_app(path: str) -> Flask:
+    app = Flask(__name__)
+
+    @app.route('/audio')
+    def audio():
+        return send_range_file(request, path, 'audio/webm', max_age=3600)
+
+    return app
+
+def reader(port: int, size: int, range_bytes: int, ranges_per_request: int, deadline: float, totals: list, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    requests_done = bytes_read = 0
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        starts = sorted(rng.randrange(0, size - range_bytes) for _ in range(ranges_per_request))
+        header = ",".join(f"{s}-{s + range_bytes - 1}" for s in starts)
+        conn.request("GET", "/audio", headers={"Range": f"bytes={header}"})
+        response = conn.getresponse()
+        bytes_read += len(response.read())
+        requests_done += 1
+    conn.close()
+    with lock:
+        totals[0] += requests_done
+        totals[1] += bytes_read
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--file-mb", type=int, default=64)
+    parser.add_argument("--range-kb", type=int, default=256, help="bytes per requested range")
+    parser.add_argument("--ranges", type=int, default=1, help="ranges per request (>1 uses multipart/byteranges)")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.webm")
+        with open(path, "wb") as f:
+            for _ in range(args.file_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        server = make_server("127.0.0.1", 0, build_app(path), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            totals, lock = [0, 0], threading.Lock()
+            deadline = time.perf_counter() + args.seconds
+            threads = [
+                threading.Thread(target=reader, args=(server.port, args.file_mb * 1024 * 1024,
+                                                      args.range_kb * 1024, args.ranges, deadline, totals, lock))
+                for _ in range(args.readers)
+            ]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+
+    print(f"{args.readers} readers, {args.ranges} x {args.range_kb} KiB ranges per request, {elapsed:.1f} s")
+    print(f"requests/s: {totals[0] / elapsed:.0f}   throughput: {totals[1] / elapsed / 2**20:.0f} MiB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# server/benchmarks/backpressure_bench.py
+"""
+Stress test for the audio ingest path against a deliberately slow STT provider.
+
+N sessions push audio through the real path (AudioChannel -> TranscriptionService
+-> audio file + STT stream) faster than real time, while the fake STT server
+reads each frame slowly. Resident memory, audio queued in channels and unwritten
+audio are sampled over time; with bounded queues they level off once the
+watermarks are reached, whatever the overload policy. `--unbounded` removes the
+channel bounds for comparison.
+Run from the repository root:
+    python -m server.benchmarks.backpressure_bench --sessions 20 --duration 30 --policy block
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("MONGO_CREATE_INDEXES", "false")
+os.environ.setdefault("RECONCILE_INTERVAL_S", "0")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "200")
+
+from ..app import create_app
+from ..services.audio_sink import get_audio_writer
+from ..services.session_runtime import OVERLOAD_POLICIES, get_runtime
+from ..services.transcription_service import TranscriptionService
+from .load_test import read_rss_bytes
+
+REAL_TIME_CHUNKS_PER_S = 4  # 250 ms chunks
+
+class NullClient:
+    """Stands in for the browser WebSocket; transcript messages are discarded."""
+    def send(self, message):
+        pass
+
+def produce(channel, chunk: bytes, interval_s: float, deadline: float, stats: dict, lock):
+    sent = rejected = 0
+    next_at = time.perf_counter()
+    while time.perf_counter() < deadline:
+        # A fresh copy per chunk, as received from a socket
+        data = bytes(bytearray(chunk))
+        if channel.put((data, time.perf_counter()), size=len(data), timeout=max(0.0, deadline - time.perf_counter())):
+            sent += 1
+        elif channel.closed:
+            break
+        else:
+            rejected += 1
+        next_at += interval_s
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+    with lock:
+        stats["sent"] += sent
+        stats["rejected"] += rejected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--speedup", type=float, default=4, help="upload rate as a multiple of real time")
+    parser.add_argument("--chunk-bytes", type=int, default=4000)
+    parser.add_argument("--recv-delay", type=float, default=0.25, help="seconds the fake STT pauses after each frame")
+    parser.add_argument("--policy", choices=OVERLOAD_POLICIES, default="block")
+    parser.add_argument("--high-watermark", type=int, default=1024 * 1024, help="bytes queued per session")
+    parser.add_argument("--low-watermark", type=int, default=256 * 1024)
+    parser.add_argument("--queue-size", type=int, default=1000, help="chunks in flight per session; large enough that the byte watermarks bind")
+    parser.add_argument("--unbounded", action="store_true", help="no byte watermarks and a practically unlimited queue")
+    parser.add_argument("--sample-every", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8778, help="port for the fake STT server")
+    options = parser.parse_args()
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "server.stt.fake_stt_server", "--port", str(options.port),
+        "--recv-delay", str(options.recv_delay), "--idle-timeout", "600",
+    ], stderr=subprocess.DEVNULL)
+    recordings_dir = tempfile.TemporaryDirectory()
+    try:
+        time.sleep(1.0)
+        app = create_app()
+        app.logger.setLevel(logging.CRITICAL)
+        logging.getLogger("server").setLevel(logging.CRITICAL)
+        app.config.update(
+            DEEPGRAM_URI=f"ws://127.0.0.1:{options.port}/v1/listen",
+            DEEPGRAM_API_KEY="bench",
+            RECORDINGS_DIR=recordings_dir.name,
+        )
+        runtime = get_runtime()
+        writer = get_audio_writer(app.config)
+        high = 0 if options.unbounded else options.high_watermark
+        queue_size = 1_000_000 if options.unbounded else options.queue_size
+
+        channels = []
+        for i in range(options.sessions):
+            with app.app_context():
+                service = TranscriptionService(f"bench-{i}", NullClient())
+            runtime.run(service.start_transcription(), app)
+            channels.append(runtime.open_channel(
+                lambda item, service=service: service.handle_audio_chunk(*item),
+                maxsize=queue_size, app=app, high_watermark_bytes=high,
+                low_watermark_bytes=options.low_watermark, policy=options.policy
+            ))
+
+        stats, lock = {"sent": 0, "rejected": 0}, threading.Lock()
+        deadline = time.perf_counter() + options.duration
+        chunk = os.urandom(options.chunk_bytes)
+        interval_s = 1 / (REAL_TIME_CHUNKS_PER_S * options.speedup)
+        producers = [threading.Thread(target=produce, args=(c, chunk, interval_s, deadline, stats, lock), daemon=True)
+                     for c in channels]
+        started = time.perf_counter()
+        for p in producers:
+            p.start()
+
+        print(f"{'t':>5} {'rss MB':>8} {'queued MB':>10} {'unwritten MB':>13} {'dropped':>8} {'blocked s':>10}")
+        rss = []
+        while time.perf_counter() < deadline:
+            time.sleep(options.sample_every)
+            metrics = runtime.get_metrics()
+            rss.append(read_rss_bytes(os.getpid()))
+            print(f"{time.perf_counter() - started:5.0f} {rss[-1] / 2**20:8.1f} "
+                  f"{metrics['channel_queue_bytes'] / 2**20:10.1f} {writer.get_metrics()['pending_bytes'] / 2**20:13.1f} "
+                  f"{metrics['chunks_dropped']:8d} {metrics['producer_blocked_seconds_total']:10.1f}")
+
+        for p in producers:
+            p.join()
+        half = len(rss) // 2
+        growth = (rss[-1] - rss[half]) / 2**20 if rss else 0.0
+        print(f"policy={options.policy} unbounded={options.unbounded} chunks accepted={stats['sent']} "
+              f"dropped or timed out={stats['rejected']} rss growth over second half={growth:+.1f} MB")
+    finally:
+        server.terminate()
+        server.wait()
+        # Queued audio drains quickly once the STT connections are gone
+        for channel in locals().get("channels", []):
+            channel.close(timeout=30)
+        recordings_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
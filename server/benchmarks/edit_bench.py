@@ -0,0 +1,170 @@
+# server/benchmarks/edit_bench.py
+"""
+Compares applying a batch of word edits with PATCH-style targeted updates
+against replacing the whole transcript.
+
+A synthetic transcript is generated and a batch of random token operations
+(insert, replace, delete, split, merge) is made against it. The patch path
+parses the batch, reads the touched segments, applies it to the touched segments with timestamp
+re-interpolation and encodes one update per edited segment; the replacement
+path parses the whole edited transcript from the request and re-encodes every
+segment. Request bytes, bytes written to the database and CPU time are
+reported. With --mongo-uri both paths also write to a scratch database there.
+Run from the repository root:
+    python -m server.benchmarks.edit_bench --minutes 120 --ops 1000
+"""
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+
+import bson
+
+from ..services.transcript_edits import apply_ops, validate_ops
+
+WORDS_PER_MINUTE = 150
+WORDS_PER_SEGMENT = 20
+VOCABULARY = ["the", "order", "status", "customer", "account", "thanks", "please", "number", "today", "help"]
+
+def synthetic_segments(minutes: float) -> list:
+    random.seed(7)
+    t = 0.0
+    segments = []
+    total = int(minutes * WORDS_PER_MINUTE)
+    for index, first in enumerate(range(0, total, WORDS_PER_SEGMENT)):
+        words = []
+        for i in range(min(WORDS_PER_SEGMENT, total - first)):
+            duration = random.uniform(0.15, 0.6)
+            words.append({"id": f"word_{i}", "text": random.choice(VOCABULARY),
+                          "start": round(t, 3), "end": round(t + duration, 3), "trusted": True})
+            t += duration + random.uniform(0.0, 0.2)
+        segments.append({
+            "_id": bson.ObjectId(), "recordingId": bson.ObjectId(), "index": index,
+            "start": words[0]["start"], "end": words[-1]["end"],
+            "text": " ".join(w["text"] for w in words), "words": words, "isFinal": True,
+        })
+    return segments
+
+def random_ops(segments: list, count: int, seed: int = 11) -> list:
+    """
+    Operations against distinct words, spread over the transcript, that are
+    valid when applied in order.
+    """
+    rng = random.Random(seed)
+    used = set()
+    ops = []
+    while len(ops) < count:
+        seg = rng.choice(segments)
+        i = rng.randrange(len(seg["words"]) - 1)
+        word_id, next_id = seg["words"][i]["id"], seg["words"][i + 1]["id"]
+        if (seg["index"], word_id) in used or (seg["index"], next_id) in used:
+            continue
+        kind = rng.choice(["insert", "replace", "delete", "split", "merge"])
+        op = {"op": kind, "segment": seg["index"]}
+        if kind == "insert":
+            op.update(after=word_id, texts=[rng.choice(VOCABULARY)])
+        elif kind == "replace":
+            op.update(wordId=word_id, text=rng.choice(VOCABULARY))
+        elif kind == "delete":
+            op.update(wordId=word_id)
+        elif kind == "split":
+            op.update(wordId=word_id, texts=["re", "split"])
+        else:
+            op.update(wordIds=[word_id, next_id], text="merged")
+            used.add((seg["index"], next_id))
+        used.add((seg["index"], word_id))
+        ops.append(op)
+    return ops
+
+def patch_path(stored: dict, body: bytes):
+    """
+    Returns (cpu seconds, bytes written, edited segments) for the targeted update
+    path. `stored` maps segment index to its BSON document as read from MongoDB.
+    """
+    started = time.process_time()
+    request = json.loads(body)
+    ops = validate_ops(request["ops"])
+    touched = [bson.decode(stored[i]) for i in sorted({op["segment"] for op in ops})]
+    changed = apply_ops(touched, ops, id_prefix="word_v1_")
+    written = sum(len(bson.encode({"q": {"_id": seg["_id"]}, "u": {"$set": {"text": seg["text"], "words": seg["words"]}}}))
+                  for seg in changed)
+    return time.process_time() - started, written, changed
+
+def replace_path(body: bytes):
+    """
+    Returns (cpu seconds, bytes written, segments) for replacing the whole transcript.
+    """
+    started = time.process_time()
+    segments = json.loads(body)["segments"]
+    documents = [bson.encode(seg) for seg in segments]
+    return time.process_time() - started, sum(len(d) for d in documents), segments
+
+def transcript_body(segments: list) -> bytes:
+    return json.dumps({"segments": segments}, default=str).encode()
+
+def run_mongo(uri: str, segments: list, changed: list, repeat: int):
+    from pymongo import MongoClient, UpdateOne
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    collection = client.get_database("edit_bench").transcript_segments
+    recording_id = segments[0]["recordingId"]
+    docs = [dict(seg, recordingId=recording_id) for seg in segments]
+    patch_s, replace_s = [], []
+    try:
+        for _ in range(repeat):
+            collection.drop()
+            collection.insert_many(copy.deepcopy(docs))
+            started = time.perf_counter()
+            collection.bulk_write([UpdateOne({"_id": seg["_id"]}, {"$set": {"text": seg["text"], "words": seg["words"]}})
+                                   for seg in changed], ordered=False)
+            patch_s.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            collection.delete_many({"recordingId": recording_id})
+            collection.insert_many(copy.deepcopy(docs))
+            replace_s.append(time.perf_counter() - started)
+    finally:
+        client.drop_database("edit_bench")
+    print(f"mongo write   patch {statistics.median(patch_s) * 1000:8.1f} ms   "
+          f"replace {statistics.median(replace_s) * 1000:8.1f} ms   (median of {repeat})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=120, help="transcript length")
+    parser.add_argument("--ops", type=int, default=1000, help="operations per batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo-uri", help="also time the writes against this MongoDB")
+    options = parser.parse_args()
+
+    segments = synthetic_segments(options.minutes)
+    stored = {seg["index"]: bson.encode(seg) for seg in segments}
+    ops = random_ops(segments, options.ops)
+    patch_body = json.dumps({"version": 0, "ops": ops}).encode()
+    words = sum(len(seg["words"]) for seg in segments)
+    print(f"{words} words in {len(segments)} segments, {len(ops)} ops touching "
+          f"{len({op['segment'] for op in ops})} segments")
+
+    patch_cpu, patch_written, changed = [], 0, []
+    for _ in range(options.repeat):
+        cpu, patch_written, changed = patch_path(stored, patch_body)
+        patch_cpu.append(cpu)
+    # The replacement request carries the transcript as edited by the patch
+    edited = {seg["index"]: seg for seg in changed}
+    replace_body = transcript_body([edited.get(seg["index"], seg) for seg in segments])
+    replace_cpu, replace_written = [], 0
+    for _ in range(options.repeat):
+        cpu, replace_written, _ = replace_path(replace_body)
+        replace_cpu.append(cpu)
+
+    print(f"{'path':<10}{'request KB':>12}{'written KB':>12}{'cpu ms':>10}")
+    for name, body, written, cpu in (
+        ("patch", patch_body, patch_written, patch_cpu),
+        ("replace", replace_body, replace_written, replace_cpu),
+    ):
+        print(f"{name:<10}{len(body) / 1024:12.0f}{written / 1024:12.0f}{statistics.median(cpu) * 1000:10.1f}")
+    if options.mongo_uri:
+        run_mongo(options.mongo_uri, segments, changed, options.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# server/benchmarks/export_bench.py
+"""
+Measures bulk export throughput and memory on a synthetic dataset.
+
+A few recordings with realistic segments and word timings are BSON-encoded
+once; the benchmark decodes them over and over (as the driver does for cursor
+batches) and feeds them through the same export pipeline the endpoint uses,
+for each format with and without gzip. Reported: recordings/s, output MB/s
+and the peak traced Python allocation for growing recording counts. A
+streaming export should stay flat, while the baseline, which materializes
+every recording's full JSON body the way one GET /recordings/<id> per
+recording does and keeps them for a combined file, grows with the count.
+Tracing memory is slow, so it is skipped above --memory-recordings. No
+database is needed. Run from the repository root:
+    python -m server.benchmarks.export_bench --recordings 100,1000,10000
+"""
+import argparse
+import datetime
+import json
+import random
+import time
+import tracemalloc
+
+import bson
+from bson import ObjectId
+
+from ..config import Config
+from ..models import recording_model
+from ..services import transcript_export
+
+WORDS_PER_SEGMENT = 20
+VOCABULARY = ["the", "we", "should", "review", "quarterly", "numbers", "before", "friday", "and", "then",
+              "schedule", "a", "follow-up", "with", "marketing", "team", "about", "launch", "budget", "okay"]
+
+def synthetic_templates(count: int, minutes: float, seed: int = 7) -> list:
+    """
+    Returns `count` BSON-encoded (recording, [final segments]) templates.
+    """
+    rng = random.Random(seed)
+    words_per_recording = int(minutes * 150)
+    templates = []
+    for _ in range(count):
+        recording = {"_id": ObjectId(), "userId": "user-bench", "language": "en", "status": "completed",
+                     "createdAt": datetime.datetime(2024, 1, 1), "durationMs": int(minutes * 60000)}
+        segments, clock = [], 0.0
+        for index in range(0, words_per_recording, WORDS_PER_SEGMENT):
+            words = []
+            for i in range(WORDS_PER_SEGMENT):
+                # Occasional pauses split cues
+                clock += rng.uniform(0.15, 0.45) + (1.8 if rng.random() < 0.02 else 0)
+                words.append({"id": f"word_{i}", "text": rng.choice(VOCABULARY), "start": round(clock, 3),
+                              "end": round(clock + 0.12, 3), "trusted": True})
+            segments.append(bson.encode({
+                "_id": ObjectId(), "recordingId": recording["_id"], "index": index // WORDS_PER_SEGMENT,
+                "isFinal": True, "start": words[0]["start"], "end": words[-1]["end"],
+                "text": " ".join(w["text"] for w in words), "words": words,
+            }))
+        templates.append((bson.encode(recording), segments))
+    return templates
+
+def synthetic_recordings(templates: list, count: int):
+    """
+    Yields `count` (recording, segments) pairs decoded from the templates, as
+    iter_selected yields them from cursors.
+    """
+    for r in range(count):
+        recording, segments = templates[r % len(templates)]
+        yield bson.decode(recording), [bson.decode(seg) for seg in segments]
+
+def source_only(recordings):
+    for _ in recordings:
+        pass
+    return 0
+
+def materialized(recordings):
+    """
+    The per-recording approach: each recording's full JSON body, all kept for one file.
+    """
+    bodies = []
+    for recording, segments in recordings:
+        doc = recording_model.serialize_document(recording)
+        doc["segments"] = [recording_model.serialize_document(seg) for seg in segments]
+        bodies.append(json.dumps(doc).encode())
+    return sum(len(body) for body in bodies)
+
+def streamed(recordings, fmt: str, compress: bool, config: dict):
+    return sum(len(chunk) for chunk in transcript_export.export_stream(recordings, fmt, compress, config))
+
+def measure(fn, *args) -> tuple:
+    started = time.perf_counter()
+    out_bytes = fn(*args)
+    return time.perf_counter() - started, out_bytes
+
+def peak_memory(fn, *args) -> int:
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", default="100,1000,10000", help="comma-separated recording counts")
+    parser.add_argument("--minutes", type=float, default=5, help="length of each recording")
+    parser.add_argument("--templates", type=int, default=50, help="distinct recordings to cycle through")
+    parser.add_argument("--memory-recordings", type=int, default=1000,
+                        help="largest count to trace memory for")
+    options = parser.parse_args()
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.startswith("EXPORT_")}
+    templates = synthetic_templates(options.templates, options.minutes)
+    variants = [("source only", source_only, ()), ("materialized json", materialized, ())] + [
+        (f"{fmt}{' gzip' if compress else ''}", streamed, (fmt, compress, config))
+        for fmt in transcript_export.EXPORT_FORMATS for compress in (False, True)
+    ]
+    print(f"{options.minutes:g}-minute recordings, {int(options.minutes * 150)} words each; "
+          f"'source only' is the cost of decoding the input")
+    print(f"{'variant':<19}{'recordings':>11}{'rec/s':>9}{'MB/s':>8}{'output MB':>11}{'peak MB':>9}")
+    for count in (int(c) for c in options.recordings.split(",")):
+        for name, fn, args in variants:
+            elapsed, out_bytes = measure(fn, synthetic_recordings(templates, count), *args)
+            peak = "-"
+            if count <= options.memory_recordings:
+                peak = f"{peak_memory(fn, synthetic_recordings(templates, count), *args) / 2**20:.1f}"
+            print(f"{name:<19}{count:>11}{count / elapsed:9.0f}{out_bytes / elapsed / 2**20:8.1f}"
+                  f"{out_bytes / 2**20:11.1f}{peak:>9}")
+
+if __name__ == "__main__":
+    main()
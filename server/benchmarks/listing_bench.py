@@ -0,0 +1,142 @@
+# server/benchmarks/listing_bench.py
+"""
+Measures recording listing latency at increasing page depths against MongoDB.
+
+A recordings collection is seeded (one million documents by default, spread
+over users with one heavy user holding a large share) with realistic segment
+id arrays and final texts, and the indexes from `create_indexes` are built.
+For the heavy user, pages at increasing depths are fetched with keyset
+pagination (`list_recordings` with cursors) and with skip/limit offsets, with
+and without a status filter. Latency, index keys and documents examined (from
+explain) and bytes per page with and without the default projection are
+reported. Needs a MongoDB server; the database is dropped afterwards unless
+--keep is given. Run from the repository root:
+    python -m server.benchmarks.listing_bench --mongo-uri mongodb://localhost:27017/listing_bench
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import time
+
+import bson
+from bson import ObjectId
+
+HEAVY_USER = "user-heavy"
+STATUSES = ["completed"] * 8 + ["aborted", "in_progress"]
+
+def seed(db, documents: int, users: int, heavy_share: float, segments: int, text_bytes: int, batch: int = 10000):
+    rng = random.Random(7)
+    started = datetime.datetime(2024, 1, 1)
+    text = ("word " * (text_bytes // 5 + 1))[:text_bytes]
+    segment_ids = [ObjectId() for _ in range(segments)]
+    db.recordings.drop()
+    for first in range(0, documents, batch):
+        docs = []
+        for i in range(first, min(first + batch, documents)):
+            user = HEAVY_USER if rng.random() < heavy_share else f"user-{rng.randrange(users)}"
+            created = started + datetime.timedelta(seconds=i * 30, milliseconds=rng.randrange(1000))
+            docs.append({
+                "userId": user, "language": "en", "createdAt": created, "updatedAt": created,
+                "status": rng.choice(STATUSES), "audioPath": f"/recordings/{i}.webm", "durationMs": 300000,
+                "finalText": text, "version": 0, "segments": segment_ids,
+            })
+        db.recordings.insert_many(docs, ordered=False)
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+def examined(db, query: dict, sort: list, skip: int, limit: int, projection: dict) -> tuple:
+    explain = db.command("explain", {
+        "find": "recordings", "filter": query, "sort": dict(sort), "skip": skip, "limit": limit,
+        "projection": projection,
+    }, verbosity="executionStats")["executionStats"]
+    return explain["totalKeysExamined"], explain["totalDocsExamined"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/listing_bench",
+                        help="database to seed; it is dropped afterwards")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.2, help="share of recordings owned by one user")
+    parser.add_argument("--segments", type=int, default=100, help="segment ids per recording")
+    parser.add_argument("--text-bytes", type=int, default=1000, help="final text length per recording")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--depths", default="1,10,100,1000,3000", help="page numbers to measure")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="skip seeding and use the existing collection")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database for --reuse")
+    options = parser.parse_args()
+
+    # The app reads its configuration from the environment at import time
+    os.environ["MONGO_URI"] = options.mongo_uri
+    os.environ.setdefault("RECONCILE_INTERVAL_S", "0")
+    os.environ.setdefault("SEARCH_INDEX_ENABLED", "false")
+    from ..app import create_app
+    from ..db import get_db
+    from ..models import recording_model
+
+    app = create_app()
+    with app.app_context():
+        db = get_db()
+        try:
+            if not options.reuse:
+                started = time.perf_counter()
+                seed(db, options.documents, options.users, options.heavy_share, options.segments, options.text_bytes)
+                print(f"seeded {options.documents} recordings in {time.perf_counter() - started:.0f} s")
+            recording_model.create_indexes()
+            heavy = db.recordings.count_documents({"userId": HEAVY_USER})
+            print(f"{heavy} recordings for {HEAVY_USER}, {options.page_size} per page")
+
+            depths = sorted(int(d) for d in options.depths.split(","))
+            sort = [("createdAt", -1), ("_id", -1)]
+            projection = {"segments": 0, "finalText": 0}
+            for statuses in (None, ["completed"]):
+                label = "all statuses" if statuses is None else f"status={statuses[0]}"
+                query = {"userId": HEAVY_USER}
+                if statuses:
+                    query["status"] = statuses[0]
+                print(f"\n{label}")
+                print(f"{'page':>6}{'keyset ms':>11}{'skip ms':>9}{'keyset keys/docs':>18}{'skip keys/docs':>17}")
+                cursor, page = None, 0
+                for depth in depths:
+                    # Walk the cursors up to this depth, as a client paging through would
+                    while page < depth - 1:
+                        docs = recording_model.list_recordings(HEAVY_USER, statuses, after=cursor, limit=options.page_size)
+                        if not docs:
+                            break
+                        cursor = (docs[-1]["createdAt"], docs[-1]["_id"])
+                        page += 1
+                    if page < depth - 1:
+                        break
+                    keyset_s, docs = timed(lambda: recording_model.list_recordings(
+                        HEAVY_USER, statuses, after=cursor, limit=options.page_size), options.repeat)
+                    skip = (depth - 1) * options.page_size
+                    skip_s, _ = timed(lambda: list(db.recordings.find(query, projection).sort(sort)
+                                                   .skip(skip).limit(options.page_size)), options.repeat)
+                    keyset_query = dict(query)
+                    if cursor:
+                        keyset_query.update({"createdAt": {"$lte": cursor[0]},
+                                             "$or": [{"createdAt": {"$lt": cursor[0]}}, {"_id": {"$lt": cursor[1]}}]})
+                    keyset_keys, keyset_docs = examined(db, keyset_query, sort, 0, options.page_size, projection)
+                    skip_keys, skip_docs = examined(db, query, sort, skip, options.page_size, projection)
+                    print(f"{depth:>6}{keyset_s * 1000:11.2f}{skip_s * 1000:9.2f}"
+                          f"{f'{keyset_keys}/{keyset_docs}':>18}{f'{skip_keys}/{skip_docs}':>17}")
+
+            full = list(db.recordings.find({"userId": HEAVY_USER}).sort(sort).limit(options.page_size))
+            summary = list(db.recordings.find({"userId": HEAVY_USER}, projection).sort(sort).limit(options.page_size))
+            print(f"\nbytes per page: full documents {sum(len(bson.encode(d)) for d in full) / 1024:.0f} KB, "
+                  f"default projection {sum(len(bson.encode(d)) for d in summary) / 1024:.1f} KB")
+        finally:
+            if not options.keep and not options.reuse:
+                app.extensions['mongo_client'].drop_database(db.name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# server/benchmarks/load_test.py
+"""
+Opens N simultaneous `/ws/transcription` sessions and streams audio at real-time pacing.
+
+Pair it with the fake STT server so no Deepgram traffic is generated:
+    python -m server.stt.fake_stt_server --port 8765
+    DEEPGRAM_URI=ws://127.0.0.1:8765/v1/listen python -m server.app
+    python -m server.benchmarks.load_test --sessions 100 --duration 30 --audio sample.webm
+
+Chunk-to-transcript latency is the time between sending the chunk that carried a
+word's audio and receiving the `transcript_update` containing that word, reported
+separately for interim and final updates (start the fake server with e.g. `--interims 5`).
+It relies on the fake server mapping each binary frame to `--chunk-ms` of audio.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.request
+
+import websockets
+from bson import ObjectId
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def read_rss_bytes(pid: int) -> int:
+    """Resident set size of a local process, read from /proc."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def load_chunks(path: str, chunk_bytes: int) -> list:
+    """
+    Splits a recorded webm file into fixed-size chunks, or generates random
+    chunks when no file is given.
+    """
+    if not path:
+        return [os.urandom(chunk_bytes) for _ in range(40)]
+    with open(path, "rb") as f:
+        data = f.read()
+    return [data[i:i + chunk_bytes] for i in range(0, len(data), chunk_bytes)]
+
+def create_recording(http_base: str) -> str:
+    request = urllib.request.Request(
+        f"{http_base}/api/recordings",
+        data=json.dumps({"userId": "load-test", "language": "en"}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())["recordingId"]
+
+class LoadStats:
+    def __init__(self):
+        self.chunks_sent = 0
+        self.bytes_sent = 0
+        self.transcripts_received = 0
+        self.interims_received = 0
+        self.latencies_s = []
+        self.interim_latencies_s = []
+        self.errors = {}
+        self.sessions_completed = 0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+async def run_session(options, chunks: list, stats: LoadStats):
+    try:
+        if options.random_ids:
+            recording_id = str(ObjectId())
+        else:
+            recording_id = await asyncio.to_thread(create_recording, options.http)
+    except Exception:
+        stats.error("create_recording")
+        return
+
+    send_times = []  # send_times[i] = perf_counter when chunk i was sent
+    chunk_s = options.chunk_ms / 1000
+
+    try:
+        async with websockets.connect(f"{options.ws}/ws/transcription", max_size=None) as ws:
+            await ws.send(json.dumps({"recordingId": recording_id}))
+
+            async def receive():
+                async for message in ws:
+                    data = json.loads(message)
+                    if data.get("type") == "transcript_update":
+                        if data.get("is_final"):
+                            stats.transcripts_received += 1
+                            latencies = stats.latencies_s
+                        else:
+                            stats.interims_received += 1
+                            latencies = stats.interim_latencies_s
+                        now = time.perf_counter()
+                        for word in data.get("words", []):
+                            chunk_index = int(max(0.0, word["end"] - 1e-6) // chunk_s)
+                            if chunk_index < len(send_times):
+                                latencies.append(now - send_times[chunk_index])
+                    elif data.get("type") == "error":
+                        stats.error("server_error")
+                    elif data.get("type") == "session_ended":
+                        return
+
+            receiver = asyncio.create_task(receive())
+            started = time.perf_counter()
+            total_chunks = int(options.duration / chunk_s)
+            for i in range(total_chunks):
+                # Pace against the session start so slow sends don't accumulate drift
+                await asyncio.sleep(max(0.0, started + i * chunk_s - time.perf_counter()))
+                chunk = chunks[i % len(chunks)]
+                send_times.append(time.perf_counter())
+                await ws.send(chunk)
+                stats.chunks_sent += 1
+                stats.bytes_sent += len(chunk)
+            await ws.send(json.dumps({"type": "stop"}))
+            try:
+                await asyncio.wait_for(receiver, timeout=options.drain_timeout)
+                stats.sessions_completed += 1
+            except asyncio.TimeoutError:
+                stats.error("session_end_timeout")
+    except Exception as e:
+        stats.error(type(e).__name__)
+
+async def sample_rss(pid: int, peak: list, stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            peak[0] = max(peak[0], read_rss_bytes(pid))
+        except OSError:
+            return
+        await asyncio.sleep(0.5)
+
+async def run(options):
+    chunks = load_chunks(options.audio, options.chunk_bytes)
+    stats = LoadStats()
+    baseline_rss = read_rss_bytes(options.server_pid) if options.server_pid else 0
+    peak_rss = [baseline_rss]
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(options.server_pid, peak_rss, stop_sampling)) if options.server_pid else None
+
+    started = time.perf_counter()
+    sessions = []
+    for _ in range(options.sessions):
+        sessions.append(asyncio.create_task(run_session(options, chunks, stats)))
+        await asyncio.sleep(options.ramp / max(1, options.sessions))
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - started
+    stop_sampling.set()
+    if sampler:
+        await sampler
+
+    latencies = sorted(stats.latencies_s)
+    interim_latencies = sorted(stats.interim_latencies_s)
+    print(f"sessions:            {options.sessions} ({stats.sessions_completed} completed)")
+    print(f"elapsed:             {elapsed:.1f} s")
+    print(f"chunks sent:         {stats.chunks_sent} ({stats.chunks_sent / elapsed:.0f}/s, {stats.bytes_sent / elapsed / 1024:.0f} KiB/s)")
+    print(f"transcripts:         {stats.transcripts_received} final, {stats.interims_received} interim "
+          f"({(stats.transcripts_received + stats.interims_received) / elapsed:.1f}/s)")
+    for label, values in (("chunk->final:", latencies), ("chunk->interim:", interim_latencies)):
+        print(f"{label:<21}" + "  ".join(
+            f"p{p}={percentile(values, p) * 1000:.0f}ms" for p in (50, 90, 95, 99)
+        ) + f"  (n={len(values)})")
+    if options.server_pid:
+        per_session = (peak_rss[0] - baseline_rss) / max(1, options.sessions)
+        print(f"server rss:          baseline {baseline_rss / 2**20:.0f} MiB, peak {peak_rss[0] / 2**20:.0f} MiB, "
+              f"~{per_session / 1024:.0f} KiB/session")
+    print(f"errors:              {stats.errors or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="number of simultaneous sessions")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of audio streamed per session")
+    parser.add_argument("--audio", help="recorded .webm file to stream (random bytes if omitted)")
+    parser.add_argument("--chunk-bytes", type=int, default=4000, help="bytes per binary frame")
+    parser.add_argument("--chunk-ms", type=int, default=250, help="pacing between frames")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which sessions are opened")
+    parser.add_argument("--drain-timeout", type=float, default=15, help="seconds to wait for session_ended")
+    parser.add_argument("--http", default="http://127.0.0.1:5000", help="REST base URL")
+    parser.add_argument("--ws", default="ws://127.0.0.1:5000", help="WebSocket base URL")
+    parser.add_argument("--server-pid", type=int, help="server process id, to sample its memory")
+    parser.add_argument("--random-ids", action="store_true",
+                        help="stream to random recording ids instead of creating recordings (no MongoDB needed, "
+                             "but finalizing each session fails with a server_error)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
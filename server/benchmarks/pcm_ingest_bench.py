@@ -0,0 +1,98 @@
+# server/benchmarks/pcm_ingest_bench.py
+"""
+Measures upstream bytes and CPU per stream for raw PCM ingest.
+
+A synthetic call-center stream is generated: talk spurts of amplitude-modulated
+band-limited noise separated by pauses, over a low line-noise floor, at the
+client's sample rate. It is fed through `PcmPreprocessor` in the chunks a client
+would send, (a) forwarding everything at the input rate, (b) resampling only,
+and (c) resampling plus silence suppression. For each mode the bytes that would
+go upstream and the CPU time per second of audio are reported, along with the
+share of speech that was forwarded. Run from the repository root:
+    python -m server.benchmarks.pcm_ingest_bench --minutes 5 --talk-ratio 0.4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..stt.pcm_ingest import PcmPreprocessor
+
+def call_audio(seconds: float, rate: int, talk_ratio: float, seed: int = 7):
+    """
+    Returns (int16 samples, boolean speech mask) for a synthetic call.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    speech = np.zeros(n, dtype=bool)
+    pos = 0
+    mean_spurt_s = 2.5
+    mean_pause_s = mean_spurt_s * (1 - talk_ratio) / talk_ratio
+    while pos < n:
+        pos += int(rng.exponential(mean_pause_s) * rate)
+        length = int(rng.exponential(mean_spurt_s) * rate)
+        speech[pos:pos + length] = True
+        pos += length
+    t = np.arange(n) / rate
+    # Roughly voice-band noise with a syllable-rate envelope
+    voice = np.convolve(rng.standard_normal(n), np.hanning(rate // 1000 * 2), mode="same")
+    voice *= 0.1 / voice.std() * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    signal = np.where(speech, voice, 0.0) + rng.standard_normal(n) * 10 ** (-65 / 20)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16), speech
+
+def run_mode(pcm: bytes, chunk_bytes: int, input_rate: int, target_rate: int, vad: bool, options):
+    preprocessor = PcmPreprocessor(input_rate, target_rate, options.frame_ms,
+                                   options.threshold_dbfs, options.hangover_ms, vad=vad)
+    forwarded = []
+    started = time.process_time()
+    for i in range(0, len(pcm), chunk_bytes):
+        forwarded.append(preprocessor.process(pcm[i:i + chunk_bytes]))
+    cpu = time.process_time() - started
+    return b"".join(forwarded), cpu, preprocessor
+
+def speech_coverage(preprocessor, forwarded_bytes: int, speech, input_rate: int) -> float:
+    """
+    Share of speech samples that fall inside forwarded audio, using the time map.
+    """
+    entries = preprocessor.time_map.entries()
+    stream_ends = [stream_s for stream_s, _ in entries[1:]] + [forwarded_bytes / 2 / preprocessor.output_rate]
+    covered = np.zeros(len(speech), dtype=bool)
+    for (stream_s, begin), stream_end in zip(entries, stream_ends):
+        end = begin + stream_end - stream_s
+        covered[int(begin * input_rate):int(end * input_rate)] = True
+    return (covered & speech).sum() / max(1, speech.sum())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--sample-rate", type=int, default=48000, help="client sample rate")
+    parser.add_argument("--target-rate", type=int, default=16000)
+    parser.add_argument("--talk-ratio", type=float, default=0.4, help="share of the call with someone speaking")
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    parser.add_argument("--threshold-dbfs", type=float, default=-45)
+    parser.add_argument("--hangover-ms", type=int, default=300)
+    options = parser.parse_args()
+
+    seconds = options.minutes * 60
+    samples, speech = call_audio(seconds, options.sample_rate, options.talk_ratio)
+    pcm = samples.astype("<i2").tobytes()
+    chunk_bytes = options.sample_rate * 2 * options.chunk_ms // 1000
+    print(f"{seconds:.0f}s of {options.sample_rate} Hz audio, {speech.mean():.0%} speech, "
+          f"{len(pcm) / 2**20:.1f} MB as received")
+
+    modes = [
+        ("passthrough", options.sample_rate, False),
+        ("resample", options.target_rate, False),
+        ("resample+vad", options.target_rate, True),
+    ]
+    print(f"{'mode':<14}{'upstream MB':>12}{'kbit/s':>9}{'vs input':>10}{'cpu us/s':>10}{'speech kept':>13}")
+    for name, target_rate, vad in modes:
+        forwarded, cpu, preprocessor = run_mode(pcm, chunk_bytes, options.sample_rate, target_rate, vad, options)
+        coverage = speech_coverage(preprocessor, len(forwarded), speech, options.sample_rate)
+        print(f"{name:<14}{len(forwarded) / 2**20:12.1f}{len(forwarded) * 8 / seconds / 1000:9.0f}"
+              f"{len(forwarded) / len(pcm):10.1%}{cpu / seconds * 1e6:10.0f}{coverage:13.1%}")
+    print("cpu us/s is CPU time per second of audio for one stream; 1e6 / it is roughly streams per core")
+
+if __name__ == "__main__":
+    main()
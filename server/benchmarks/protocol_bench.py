@@ -0,0 +1,121 @@
+# server/benchmarks/protocol_bench.py
+"""
+Compares transcript update wire formats on a replayed session: full JSON updates
+(protocol 1) against word-level deltas (protocol 2) as JSON and MessagePack.
+
+Every result is encoded, as if no interim were coalesced away, and the bytes
+sent and serialization CPU per frame are reported. By default a synthetic
+session is generated with interims that grow word by word and sometimes revise
+their last word; --replay takes a file of Deepgram `Results` messages, one JSON
+object per line. Run from the repository root:
+    python -m server.benchmarks.protocol_bench --minutes 10 --interims 5
+"""
+import argparse
+import json
+import random
+import time
+
+from ..services.transcript_protocol import (
+    PROTOCOL_FULL, PROTOCOL_DELTA, ENCODING_JSON, ENCODING_MSGPACK, create_encoder, msgpack
+)
+from ..stt.deepgram_client import normalize_result
+
+WORDS_PER_MINUTE = 150
+WORDS_PER_FINAL = 8
+FINALS_PER_UTTERANCE = 3
+
+def _results_message(words: list, is_final: bool, speech_final: bool) -> dict:
+    return {
+        "type": "Results",
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "channel": {"alternatives": [{"transcript": " ".join(w["word"] for w in words), "words": words}]},
+    }
+
+def synthetic_results(minutes: int, interims: int, revise_probability: float) -> list:
+    random.seed(7)
+    vocabulary = ["the", "order", "status", "customer", "account", "thanks", "please", "number", "today", "help"]
+    t = 0.0
+    messages = []
+    total = minutes * WORDS_PER_MINUTE
+    finals = 0
+    for _ in range(0, total, WORDS_PER_FINAL):
+        words = []
+        for _ in range(WORDS_PER_FINAL):
+            duration = random.uniform(0.15, 0.6)
+            words.append({"word": random.choice(vocabulary), "start": round(t, 3), "end": round(t + duration, 3)})
+            t += duration + random.uniform(0.0, 0.2)
+        for k in range(1, interims + 1):
+            partial = [dict(w) for w in words[:max(1, len(words) * k // (interims + 1))]]
+            if random.random() < revise_probability:
+                # The recognizer often changes its mind about the word it is still hearing
+                partial[-1]["word"] = random.choice(vocabulary)
+                partial[-1]["end"] = round(partial[-1]["end"] - 0.05, 3)
+            messages.append(_results_message(partial, False, False))
+        finals += 1
+        messages.append(_results_message(words, True, finals % FINALS_PER_UTTERANCE == 0))
+    return messages
+
+def load_replay(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def client_payloads(messages: list) -> list:
+    """
+    The payloads TranscriptionService hands to its sender, in order.
+    """
+    payloads = []
+    segment_index = 0
+    for message in messages:
+        payload = normalize_result(message)
+        if payload is None:
+            continue
+        payloads.append({
+            "type": "transcript_update",
+            "recordingId": "000000000000000000000000",
+            "segmentIndex": segment_index,
+            **payload
+        })
+        if payload["speech_final"]:
+            segment_index += 1
+    return payloads
+
+def measure(payloads: list, protocol: int, encoding: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        encoder = create_encoder(protocol, encoding)
+        started = time.process_time()
+        frames = [encoder.encode(p) for p in payloads]
+        best = min(best, time.process_time() - started)
+    frames = [f for f in frames if f is not None]
+    size = sum(len(f.encode() if isinstance(f, str) else f) for f in frames)
+    return len(frames), size, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=10, help="length of the synthetic session")
+    parser.add_argument("--interims", type=int, default=5, help="interim results per final")
+    parser.add_argument("--revise", type=float, default=0.3, help="probability that an interim revises its last word")
+    parser.add_argument("--replay", help="file of Deepgram Results messages (JSON lines) to replay instead")
+    args = parser.parse_args()
+
+    messages = load_replay(args.replay) if args.replay else synthetic_results(args.minutes, args.interims, args.revise)
+    payloads = client_payloads(messages)
+    formats = [("v1 json", PROTOCOL_FULL, ENCODING_JSON), ("v2 json", PROTOCOL_DELTA, ENCODING_JSON)]
+    if msgpack is not None:
+        formats.append(("v2 msgpack", PROTOCOL_DELTA, ENCODING_MSGPACK))
+    else:
+        print("msgpack is not installed; skipping the binary encoding")
+
+    print(f"{len(payloads)} transcript results "
+          f"({sum(1 for p in payloads if not p['is_final'])} interim, {sum(1 for p in payloads if p['is_final'])} final)")
+    print(f"{'format':<12}{'frames':>8}{'KiB':>10}{'B/frame':>9}{'vs v1':>8}{'us/frame':>10}")
+    baseline = None
+    for name, protocol, encoding in formats:
+        frames, size, cpu = measure(payloads, protocol, encoding)
+        baseline = baseline or size
+        print(f"{name:<12}{frames:>8}{size / 1024:>10.1f}{size / max(1, frames):>9.0f}"
+              f"{size / baseline:>8.0%}{cpu / max(1, len(payloads)) * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
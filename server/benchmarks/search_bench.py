@@ -0,0 +1,162 @@
+# server/benchmarks/search_bench.py
+"""
+Measures search query latency on a synthetic corpus.
+
+Recordings of Zipf-distributed words are generated, split into segments and
+written as index parts with the same code the server uses. The benchmark then
+reports the time to open the parts (memory-mapped) against the time to build
+the index in RAM, the on-disk size per word, and p50/p95 latency of term,
+multi-term and phrase queries from common to rare words. Optionally a live
+delta of freshly indexed segments is searched as well, as on a busy worker.
+Run from the repository root:
+    python -m server.benchmarks.search_bench --recordings 10000 --minutes 5
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from ..services.search_index import SearchIndex, assemble_part, merge_parts, write_part
+
+WORDS_PER_MINUTE = 150
+WORDS_PER_SEGMENT = 20
+
+def vocabulary(size: int) -> list:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "po", "da", "fi"]
+    words = []
+    for i in range(size):
+        word, n = "", i
+        while True:
+            word += syllables[n % len(syllables)]
+            n //= len(syllables)
+            if not n:
+                break
+        words.append(word)
+    return words
+
+def synthetic_part(recordings: int, minutes: float, vocab_size: int, zipf: float, rng):
+    """
+    Returns (PartData, term ids per word) for a corpus of `recordings`.
+    """
+    words_per_recording = int(minutes * WORDS_PER_MINUTE)
+    total_words = recordings * words_per_recording
+    ranks = np.arange(1, vocab_size + 1)
+    weights = ranks ** -zipf
+    term_ids = rng.choice(vocab_size, size=total_words, p=weights / weights.sum())
+
+    segments_per_recording = -(-words_per_recording // WORDS_PER_SEGMENT)
+    counts = np.full((recordings, segments_per_recording), WORDS_PER_SEGMENT)
+    counts[:, -1] = words_per_recording - WORDS_PER_SEGMENT * (segments_per_recording - 1)
+    counts = counts.ravel()
+    num_docs = len(counts)
+    doc_words = np.zeros(num_docs + 1, dtype=np.uint64)
+    np.cumsum(counts, out=doc_words[1:])
+    word_docs = np.repeat(np.arange(num_docs), counts)
+    positions = np.arange(total_words) - doc_words[word_docs].astype(np.int64)
+
+    durations = rng.uniform(0.15, 0.5, total_words).astype(np.float32)
+    # Times restart at zero for every recording
+    word_recordings = np.repeat(np.arange(recordings), words_per_recording)
+    clock = np.cumsum(durations)
+    recording_start = clock[::words_per_recording] - durations[::words_per_recording]
+    starts = clock - durations - recording_start[word_recordings]
+
+    docs = {
+        "seg_ids": [ObjectId().binary for _ in range(num_docs)],
+        "stamps": np.full(num_docs, time.time_ns(), dtype=np.uint64),
+        "doc_recordings": np.repeat(np.arange(recordings), segments_per_recording),
+        "doc_indexes": np.tile(np.arange(segments_per_recording), recordings),
+        "doc_words": doc_words,
+        "starts": starts,
+        "ends": starts + durations * 0.9,
+    }
+    recording_ids = [ObjectId().binary for _ in range(recordings)]
+    part = assemble_part(docs, recording_ids, vocabulary(vocab_size), term_ids, word_docs, positions)
+    return part, term_ids
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def time_query(index: SearchIndex, query: str, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = index.search(query, limit=20)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95)], result["total"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", type=int, default=10000)
+    parser.add_argument("--minutes", type=float, default=5, help="length of each recording")
+    parser.add_argument("--vocabulary", type=int, default=30000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of word frequencies")
+    parser.add_argument("--parts", type=int, default=1, help="split the corpus over this many part files")
+    parser.add_argument("--delta-words", type=int, default=0, help="words indexed live into the delta")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--dir", help="index directory (default: a temporary one)")
+    options = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    directory = options.dir or tempfile.mkdtemp(prefix="search_bench_")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        started = time.perf_counter()
+        part, term_ids = synthetic_part(options.recordings, options.minutes, options.vocabulary, options.zipf, rng)
+        build_s = time.perf_counter() - started
+        for chunk in np.array_split(np.arange(part.num_docs), options.parts):
+            live = np.zeros(part.num_docs, dtype=bool)
+            live[chunk] = True
+            write_part(directory, part if options.parts == 1 else merge_parts([part], [live]))
+        words = len(part.starts)
+        del part
+
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        index = SearchIndex(directory, flush_words=10**12, flush_interval_s=float("inf"), max_parts=10**6)
+        open_s = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"{options.recordings} recordings, {words} words, {options.parts} part(s): "
+              f"{size / 2**20:.0f} MB on disk ({size / words:.1f} B/word)")
+        print(f"build in RAM {build_s:.1f} s, open memory-mapped {open_s * 1000:.1f} ms")
+
+        vocab = vocabulary(options.vocabulary)
+        if options.delta_words:
+            recording_id = ObjectId()
+            for first in range(0, options.delta_words, WORDS_PER_SEGMENT):
+                ids = term_ids[first:first + WORDS_PER_SEGMENT].tolist()
+                index.add_segments(recording_id, [{"_id": ObjectId(), "index": first // WORDS_PER_SEGMENT, "words": [
+                    {"text": vocab[t], "start": first + i, "end": first + i + 0.5} for i, t in enumerate(ids)
+                ]}])
+
+        # A trigram that occurs in the corpus, from the first segment of a random recording
+        words_per_recording = words // options.recordings
+        at = int(rng.integers(0, options.recordings)) * words_per_recording + int(rng.integers(0, WORDS_PER_SEGMENT - 2))
+        trigram = " ".join(vocab[t] for t in term_ids[at:at + 3])
+        queries = [
+            ("common term", vocab[0]),
+            ("mid term", vocab[100]),
+            ("rare term", vocab[5000]),
+            ("two terms", f"{vocab[10]} {vocab[1000]}"),
+            ("common phrase", f'"{vocab[0]} {vocab[1]}"'),
+            ("mixed phrase", f'"{vocab[0]} {vocab[100]}"'),
+            ("rare phrase", f'"{trigram}"'),
+            ("phrase + term", f'"{vocab[2]} {vocab[3]}" {vocab[500]}'),
+        ]
+        print(f"{'query':<15}{'matches':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, query in queries:
+            p50, p95, total = time_query(index, query, options.repeat)
+            print(f"{name:<15}{total:>9}{p50 * 1000:9.2f}{p95 * 1000:9.2f}")
+        print(f"peak RSS grew {rss_mb() - rss_before:.0f} MB while opening and querying")
+    finally:
+        if not options.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# server/benchmarks/session_runtime_bench.py
+"""
+Compares the old `asyncio.run()`-per-chunk dispatch with the shared session runtime.
+
+Run from the repository root:
+    python -m server.benchmarks.session_runtime_bench --chunks 2000 --sessions 200
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from ..services.session_runtime import SessionRuntime
+
+CHUNK = b"\x00" * 4000  # ~250 ms of 128 kbps opus
+CHUNKS_PER_SECOND = 4
+
+async def _fake_handle_audio_chunk(chunk: bytes):
+    # Stands in for the file write + STT send: one suspension point
+    await asyncio.sleep(0)
+
+def per_chunk_asyncio_run(chunks: int) -> float:
+    start = time.perf_counter()
+    for _ in range(chunks):
+        asyncio.run(_fake_handle_audio_chunk(CHUNK))
+    return (time.perf_counter() - start) / chunks
+
+def per_chunk_runtime(runtime: SessionRuntime, chunks: int) -> float:
+    channel = runtime.open_channel(_fake_handle_audio_chunk, maxsize=32)
+    start = time.perf_counter()
+    for _ in range(chunks):
+        channel.put(CHUNK)
+    channel.close()
+    return (time.perf_counter() - start) / chunks
+
+def concurrent_sessions(sessions: int, chunks: int, runtime: SessionRuntime = None) -> float:
+    """
+    Runs `sessions` handler threads in parallel, each pushing `chunks` chunks.
+    Returns the wall time in seconds.
+    """
+    def session_asyncio_run():
+        for _ in range(chunks):
+            asyncio.run(_fake_handle_audio_chunk(CHUNK))
+
+    def session_runtime():
+        channel = runtime.open_channel(_fake_handle_audio_chunk, maxsize=32)
+        for _ in range(chunks):
+            channel.put(CHUNK)
+        channel.close()
+
+    target = session_runtime if runtime else session_asyncio_run
+    threads = [threading.Thread(target=target) for _ in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks for the per-chunk measurement")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent sessions to simulate")
+    parser.add_argument("--session-chunks", type=int, default=40, help="chunks pushed by each session")
+    args = parser.parse_args()
+
+    runtime = SessionRuntime(name="bench-runtime")
+    try:
+        results = {
+            "asyncio.run per chunk": (
+                per_chunk_asyncio_run(args.chunks),
+                concurrent_sessions(args.sessions, args.session_chunks),
+            ),
+            "session runtime": (
+                per_chunk_runtime(runtime, args.chunks),
+                concurrent_sessions(args.sessions, args.session_chunks, runtime),
+            ),
+        }
+    finally:
+        runtime.shutdown()
+
+    total_chunks = args.sessions * args.session_chunks
+    print(f"{'mode':<24}{'us/chunk':>12}{'sessions/core*':>16}{'wall (s)':>12}{'chunks/s':>12}")
+    for mode, (per_chunk, wall) in results.items():
+        # Sessions one core could sustain at 4 chunks/s if dispatch were the only cost
+        capacity = 1 / (per_chunk * CHUNKS_PER_SECOND)
+        print(f"{mode:<24}{per_chunk * 1e6:>12.1f}{capacity:>16.0f}{wall:>12.2f}{total_chunks / wall:>12.0f}")
+    print("* estimated from dispatch overhead alone")
+
+if __name__ == "__main__":
+    main()
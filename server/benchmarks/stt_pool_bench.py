@@ -0,0 +1,125 @@
+# server/benchmarks/stt_pool_bench.py
+"""
+Measures time-to-first-transcript with and without the pre-warmed STT connection pool.
+
+A fake STT server is started with an artificial handshake delay standing in for
+DNS, TLS and the WebSocket upgrade to the real provider. Each session starts
+streaming audio immediately, as a browser does, while its STT connection is set
+up; the time from the first chunk to the first transcript result is recorded.
+Run from the repository root:
+    python -m server.benchmarks.stt_pool_bench --sessions 20 --handshake-delay 0.3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("MONGO_CREATE_INDEXES", "false")
+os.environ.setdefault("RECONCILE_INTERVAL_S", "0")
+
+from ..app import create_app
+from ..services.session_runtime import get_runtime
+from ..stt.connection_pool import get_stt_pool
+from ..stt.deepgram_client import DeepgramClient, build_listen_uri
+
+CHUNK_BYTES = 4000
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+async def run_session(index: int, chunks: int, chunk_s: float, timeout: float):
+    """
+    Streams `chunks` chunks at real-time pacing and returns the seconds from
+    the first chunk to the first transcript, or None on timeout.
+    """
+    first_result = asyncio.get_running_loop().create_future()
+
+    async def on_transcript(payload):
+        if not first_result.done():
+            first_result.set_result(time.perf_counter())
+
+    client = DeepgramClient(f"bench-{index}", on_transcript)
+    connecting = asyncio.create_task(client.connect())
+    started = time.perf_counter()
+
+    async def feed():
+        for i in range(chunks):
+            await client.send_audio_chunk(os.urandom(CHUNK_BYTES))
+            await asyncio.sleep(max(0.0, started + (i + 1) * chunk_s - time.perf_counter()))
+
+    feeder = asyncio.create_task(feed())
+    await connecting
+    listener = asyncio.create_task(client.listen_loop())
+    try:
+        elapsed = await asyncio.wait_for(first_result, timeout) - started
+    except asyncio.TimeoutError:
+        elapsed = None
+    await feeder
+    await client.close()
+    await listener
+    return elapsed, client.connected_from_pool
+
+async def run_sessions(options) -> list:
+    chunk_s = options.chunk_ms / 1000
+    tasks = []
+    for i in range(options.sessions):
+        tasks.append(asyncio.create_task(run_session(i, options.chunks, chunk_s, options.timeout)))
+        await asyncio.sleep(options.gap)
+    return await asyncio.gather(*tasks)
+
+async def wait_for_pool(pool, size: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while pool.get_metrics()["idle"] < size and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+def report(label: str, results: list):
+    times = sorted(t for t, _ in results if t is not None)
+    pooled = sum(1 for _, from_pool in results if from_pool)
+    print(f"{label:<10}" + "  ".join(f"p{p}={percentile(times, p) * 1000:.0f}ms" for p in (50, 90, 99))
+          + f"  (n={len(times)}, pooled={pooled}, timeouts={len(results) - len(times)})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="sessions per mode")
+    parser.add_argument("--gap", type=float, default=0.5, help="seconds between session starts")
+    parser.add_argument("--chunks", type=int, default=8, help="audio chunks streamed per session")
+    parser.add_argument("--chunk-ms", type=int, default=250, help="pacing between chunks")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--handshake-delay", type=float, default=0.3, help="seconds added to each STT handshake")
+    parser.add_argument("--port", type=int, default=8777, help="port for the fake STT server")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for a first transcript")
+    options = parser.parse_args()
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "server.stt.fake_stt_server", "--port", str(options.port),
+        "--handshake-delay", str(options.handshake_delay), "--cadence", "0.1", "--jitter", "0",
+        "--chunk-ms", str(options.chunk_ms), "--idle-timeout", "60",
+    ], stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(1.0)
+        app = create_app()
+        app.logger.setLevel("WARNING")
+        app.config["DEEPGRAM_URI"] = f"ws://127.0.0.1:{options.port}/v1/listen"
+        app.config["DEEPGRAM_API_KEY"] = "bench"
+        runtime = get_runtime()
+
+        app.config["STT_POOL_SIZE"] = 0
+        report("no pool", runtime.run(run_sessions(options), app))
+
+        app.config["STT_POOL_SIZE"] = options.pool_size
+        pool = get_stt_pool(app.config, build_listen_uri(app.config))
+        runtime.loop.call_soon_threadsafe(pool.start)
+        runtime.run(wait_for_pool(pool, options.pool_size))
+        report("pool", runtime.run(run_sessions(options), app))
+        print(f"pool metrics: {pool.get_metrics()}")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
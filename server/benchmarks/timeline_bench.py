@@ -0,0 +1,63 @@
+# server/benchmarks/timeline_bench.py
+"""
+Measures word timeline lookups on a long synthetic transcript.
+
+Compares bisect lookups in `WordTimeline` against the linear scan the client's
+`WordMap.findWordAtTime` does. Run from the repository root:
+    python -m server.benchmarks.timeline_bench --words 200000
+"""
+import argparse
+import random
+import time
+
+from ..services.word_timeline import WordTimeline
+
+def synthetic_segments(word_count: int, words_per_segment: int = 20) -> list:
+    random.seed(11)
+    t = 0.0
+    segments = []
+    for index, first in enumerate(range(0, word_count, words_per_segment)):
+        words = []
+        for i in range(min(words_per_segment, word_count - first)):
+            duration = random.uniform(0.15, 0.6)
+            words.append({"id": f"word_{i}", "text": "word", "start": t, "end": t + duration, "trusted": True})
+            t += duration + random.uniform(0.0, 0.2)
+        segments.append({"index": index, "words": words})
+    return segments
+
+def linear_word_at(words: list, t: float):
+    for word in words:
+        if word["start"] <= t <= word["end"]:
+            return word
+    return None
+
+def per_call_us(fn, args: list) -> float:
+    started = time.perf_counter()
+    for arg in args:
+        fn(arg)
+    return (time.perf_counter() - started) / len(args) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=200000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--linear-lookups", type=int, default=200, help="fewer, since each is O(n)")
+    args = parser.parse_args()
+
+    segments = synthetic_segments(args.words)
+    started = time.perf_counter()
+    timeline = WordTimeline(segments)
+    build_ms = (time.perf_counter() - started) * 1000
+    total = timeline.ends[-1]
+    flat = [w for seg in segments for w in seg["words"]]
+
+    times = [random.uniform(0, total) for _ in range(args.lookups)]
+    print(f"{len(timeline)} words, {total / 3600:.1f} h, build {build_ms:.0f} ms, ~{timeline.nbytes / 2**20:.1f} MiB")
+    print(f"word_at (bisect):        {per_call_us(timeline.word_at, times):8.2f} us")
+    print(f"words_between (10 s):    {per_call_us(lambda t: timeline.words_between(t, t + 10), times):8.2f} us")
+    print(f"word_at (linear scan):   {per_call_us(lambda t: linear_word_at(flat, t), times[:args.linear_lookups]):8.2f} us")
+    refs = [(random.randrange(len(segments)), f"word_{random.randrange(20)}") for _ in range(args.lookups)]
+    print(f"find_word (indexed):     {per_call_us(lambda ref: timeline.find_word(*ref), refs):8.2f} us")
+
+if __name__ == "__main__":
+    main()
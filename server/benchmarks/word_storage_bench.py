@@ -0,0 +1,73 @@
+# server/benchmarks/word_storage_bench.py
+"""
+Compares the per-word document layout with the compact columnar word storage.
+
+Measures BSON size, decode time (BSON -> words) and JSON serialization time for
+a synthetic recording. Run from the repository root:
+    python -m server.benchmarks.word_storage_bench --minutes 60
+"""
+import argparse
+import json
+import random
+import time
+
+import bson
+
+from ..models.compact_words import encode_words, CompactWords
+
+WORDS_PER_MINUTE = 150
+WORDS_PER_SEGMENT = 20
+
+def synthetic_segments(minutes: int) -> list:
+    random.seed(7)
+    vocabulary = ["the", "order", "status", "customer", "account", "thanks", "please", "number", "today", "help"]
+    t = 0.0
+    segments = []
+    total = minutes * WORDS_PER_MINUTE
+    for start in range(0, total, WORDS_PER_SEGMENT):
+        words = []
+        for i in range(min(WORDS_PER_SEGMENT, total - start)):
+            duration = random.uniform(0.15, 0.6)
+            words.append({"id": f"word_{i}", "text": random.choice(vocabulary),
+                          "start": round(t, 3), "end": round(t + duration, 3), "trusted": True})
+            t += duration + random.uniform(0.0, 0.2)
+        segments.append(words)
+    return segments
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=60, help="length of the synthetic recording")
+    args = parser.parse_args()
+
+    segments = synthetic_segments(args.minutes)
+    documents = [bson.encode({"index": i, "words": words}) for i, words in enumerate(segments)]
+    compact = [bson.encode({"index": i, "wordsCompact": encode_words(words)}) for i, words in enumerate(segments)]
+
+    def read_documents():
+        return [bson.decode(raw)["words"] for raw in documents]
+
+    def read_compact():
+        return [CompactWords(bson.decode(raw)["wordsCompact"]) for raw in compact]
+
+    layouts = {
+        "documents": (documents, read_documents, lambda: json.dumps(read_documents())),
+        "compact": (compact, read_compact, lambda: json.dumps([w.to_list() for w in read_compact()])),
+    }
+    word_count = sum(len(words) for words in segments)
+    print(f"{word_count} words in {len(segments)} segments ({args.minutes} min)")
+    print(f"{'layout':<12}{'BSON KiB':>10}{'B/word':>8}{'decode ms':>11}{'decode+JSON ms':>16}")
+    for name, (raws, read, serialize) in layouts.items():
+        size = sum(len(raw) for raw in raws)
+        print(f"{name:<12}{size / 1024:>10.0f}{size / word_count:>8.1f}"
+              f"{timed(read) * 1000:>11.1f}{timed(serialize) * 1000:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -8,5 +8,112 @@ class Config:
     """Base config."""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key')
     MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/transcription_db')
+    # Shared MongoClient pool settings
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+    MONGO_CREATE_INDEXES = os.environ.get('MONGO_CREATE_INDEXES', 'true').lower() == 'true'
     DEEPGRAM_API_KEY = os.environ.get('DEEPGRAM_API_KEY')
+    # Point this at a local stand-in (see stt/fake_stt_server.py) for offline load testing
+    DEEPGRAM_URI = os.environ.get('DEEPGRAM_URI', 'wss://api.deepgram.com/v1/listen')
+    # Pre-connected STT WebSockets per worker process (0 disables the pool)
+    STT_POOL_SIZE = int(os.environ.get('STT_POOL_SIZE', 0))
+    STT_POOL_IDLE_TTL_S = float(os.environ.get('STT_POOL_IDLE_TTL_S', 300))
+    STT_POOL_REFILL_PER_S = float(os.environ.get('STT_POOL_REFILL_PER_S', 2))
+    # Audio format of the default (WebM/Opus) ingest path, sent to the provider
+    STT_ENCODING = os.environ.get('STT_ENCODING', 'opus')
+    STT_SAMPLE_RATE = int(os.environ.get('STT_SAMPLE_RATE', 48000))
+    # Raw PCM ingest (see stt/pcm_ingest.py): the upstream copy is resampled to
+    # PCM_TARGET_SAMPLE_RATE and only frames within VAD_HANGOVER_MS of speech are forwarded
+    PCM_TARGET_SAMPLE_RATE = int(os.environ.get('PCM_TARGET_SAMPLE_RATE', 16000))
+    PCM_VAD_ENABLED = os.environ.get('PCM_VAD_ENABLED', 'true').lower() == 'true'
+    VAD_FRAME_MS = int(os.environ.get('VAD_FRAME_MS', 20))
+    VAD_THRESHOLD_DBFS = float(os.environ.get('VAD_THRESHOLD_DBFS', -45))
+    VAD_HANGOVER_MS = int(os.environ.get('VAD_HANGOVER_MS', 300))
+    STT_KEEPALIVE_INTERVAL_S = float(os.environ.get('STT_KEEPALIVE_INTERVAL_S', 5))
+    # Seconds of recent audio kept per session and replayed to a new STT connection,
+    # both while the first connection is being set up and after a reconnect
+    STT_RING_BUFFER_S = float(os.environ.get('STT_RING_BUFFER_S', 30))
+    STT_RECONNECT_ATTEMPTS = int(os.environ.get('STT_RECONNECT_ATTEMPTS', 5))
+    STT_RECONNECT_BACKOFF_S = float(os.environ.get('STT_RECONNECT_BACKOFF_S', 0.5))
+    # Duration of each client audio chunk (the MediaRecorder timeslice); only used to
+    # position replayed audio that is not WebM
+    AUDIO_CHUNK_MS = int(os.environ.get('AUDIO_CHUNK_MS', 500))
     RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), 'recordings')
+    # Max audio chunks queued per session between the WebSocket handler and the session runtime
+    SESSION_AUDIO_QUEUE_SIZE = int(os.environ.get('SESSION_AUDIO_QUEUE_SIZE', 32))
+    # Bytes of queued audio per session at which the overload policy kicks in, and below
+    # which it is lifted again. Policy: block (TCP backpressure) | drop (linear16 sessions only;
+    # WebM sessions block) | signal (ask the client to pause)
+    SESSION_AUDIO_HIGH_WATERMARK_BYTES = int(os.environ.get('SESSION_AUDIO_HIGH_WATERMARK_BYTES', 1024 * 1024))
+    SESSION_AUDIO_LOW_WATERMARK_BYTES = int(os.environ.get('SESSION_AUDIO_LOW_WATERMARK_BYTES', 256 * 1024))
+    SESSION_OVERLOAD_POLICY = os.environ.get('SESSION_OVERLOAD_POLICY', 'block')
+    # New sessions are refused while queued plus unwritten audio across the worker exceeds this
+    WORKER_MAX_BUFFERED_BYTES = int(os.environ.get('WORKER_MAX_BUFFERED_BYTES', 256 * 1024 * 1024))
+    # How long a resumable session survives a dropped client connection
+    SESSION_RESUME_GRACE_S = float(os.environ.get('SESSION_RESUME_GRACE_S', 30))
+    # Audio chunks between acks sent to resumable clients
+    SESSION_ACK_EVERY = int(os.environ.get('SESSION_ACK_EVERY', 4))
+    # ASGI serving mode (see asgi.py and serve.py): worker processes (0 = one per core), threads serving
+    # plain HTTP through Flask, how long a worker told to stop waits for live sessions to end before
+    # finalizing them, and how long it then allows for finalization
+    ASGI_WORKERS = int(os.environ.get('ASGI_WORKERS', 0))
+    ASGI_HTTP_THREADS = int(os.environ.get('ASGI_HTTP_THREADS', 32))
+    ASGI_DRAIN_TIMEOUT_S = float(os.environ.get('ASGI_DRAIN_TIMEOUT_S', 30))
+    ASGI_SHUTDOWN_TIMEOUT_S = float(os.environ.get('ASGI_SHUTDOWN_TIMEOUT_S', 30))
+    # Background audio persistence (see services/audio_sink.py)
+    AUDIO_WRITER_THREADS = int(os.environ.get('AUDIO_WRITER_THREADS', 1))
+    AUDIO_COALESCE_BYTES = int(os.environ.get('AUDIO_COALESCE_BYTES', 64 * 1024))
+    AUDIO_FLUSH_INTERVAL_S = float(os.environ.get('AUDIO_FLUSH_INTERVAL_S', 1.0))
+    AUDIO_FSYNC_POLICY = os.environ.get('AUDIO_FSYNC_POLICY', 'on_stop')  # none | interval | on_stop
+    AUDIO_FSYNC_INTERVAL_S = float(os.environ.get('AUDIO_FSYNC_INTERVAL_S', 5.0))
+    AUDIO_PREALLOCATE_BYTES = int(os.environ.get('AUDIO_PREALLOCATE_BYTES', 0))
+    # Unwritten bytes per audio file before a session waits for the writer (disk backpressure)
+    AUDIO_SINK_MAX_PENDING_BYTES = int(os.environ.get('AUDIO_SINK_MAX_PENDING_BYTES', 8 * 1024 * 1024))
+    AUDIO_SEEK_INDEX = os.environ.get('AUDIO_SEEK_INDEX', 'true').lower() == 'true'
+    # How segment words are stored: 'documents' (one sub-document per word) or 'compact' (packed columns)
+    WORD_STORAGE_FORMAT = os.environ.get('WORD_STORAGE_FORMAT', 'documents')
+    # Interim transcript delivery: latest-wins, at most one interim per interval
+    INTERIM_RESULTS = os.environ.get('INTERIM_RESULTS', 'true').lower() == 'true'
+    INTERIM_INTERVAL_S = float(os.environ.get('INTERIM_INTERVAL_S', 0.15))
+    # Latency tracing: fraction of sessions whose trace is written to TRACE_DIR
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))
+    TRACE_MAX_EVENTS = int(os.environ.get('TRACE_MAX_EVENTS', 10000))
+    TRACE_DIR = os.environ.get('TRACE_DIR', os.path.join(os.path.dirname(__file__), 'traces'))
+    # Write-behind batching of final transcript segments
+    SEGMENT_BATCH_SIZE = int(os.environ.get('SEGMENT_BATCH_SIZE', 20))
+    SEGMENT_FLUSH_INTERVAL_S = float(os.environ.get('SEGMENT_FLUSH_INTERVAL_S', 2.0))
+    # Reconciliation of recordings left in_progress by crashed workers (0 disables it)
+    RECONCILE_INTERVAL_S = float(os.environ.get('RECONCILE_INTERVAL_S', 600))
+    RECONCILE_STALE_AFTER_S = float(os.environ.get('RECONCILE_STALE_AFTER_S', 3600))
+    # How often live sessions bump their recording's updatedAt so reconciliation on
+    # any worker sees them as live; keep it well below RECONCILE_STALE_AFTER_S (0 disables it)
+    SESSION_HEARTBEAT_INTERVAL_S = float(os.environ.get('SESSION_HEARTBEAT_INTERVAL_S', 300))
+    # Byte budget of the in-process word timeline LRU cache
+    TIMELINE_CACHE_BYTES = int(os.environ.get('TIMELINE_CACHE_BYTES', 64 * 1024 * 1024))
+    # Byte budget of the in-process cache of completed recording responses
+    RESPONSE_CACHE_BYTES = int(os.environ.get('RESPONSE_CACHE_BYTES', 128 * 1024 * 1024))
+    # Full-text search (see services/search_index.py): memory-mapped part files plus an in-memory
+    # delta that is written out after SEARCH_FLUSH_WORDS words or SEARCH_FLUSH_INTERVAL_S
+    SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+    SEARCH_INDEX_DIR = os.environ.get('SEARCH_INDEX_DIR', os.path.join(os.path.dirname(__file__), 'search_index'))
+    SEARCH_FLUSH_WORDS = int(os.environ.get('SEARCH_FLUSH_WORDS', 50000))
+    SEARCH_FLUSH_INTERVAL_S = float(os.environ.get('SEARCH_FLUSH_INTERVAL_S', 30))
+    SEARCH_MAX_PARTS = int(os.environ.get('SEARCH_MAX_PARTS', 8))
+    # Ranked recordings considered per query, before the userId filter and paging
+    SEARCH_MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', 1000))
+    # Bulk export (see services/transcript_export.py): recordings read per batch, response chunk size,
+    # gzip level and the caption cue limits for SRT/WebVTT
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 100))
+    EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', 64 * 1024))
+    EXPORT_GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', 6))
+    EXPORT_CUE_MAX_LINE_CHARS = int(os.environ.get('EXPORT_CUE_MAX_LINE_CHARS', 42))
+    EXPORT_CUE_MAX_LINES = int(os.environ.get('EXPORT_CUE_MAX_LINES', 2))
+    EXPORT_CUE_MAX_DURATION_S = float(os.environ.get('EXPORT_CUE_MAX_DURATION_S', 6))
+    EXPORT_CUE_MAX_GAP_S = float(os.environ.get('EXPORT_CUE_MAX_GAP_S', 1.5))
+    # Audio serving: browser cache lifetime of completed audio and live tail-follow behaviour
+    AUDIO_CACHE_MAX_AGE_S = int(os.environ.get('AUDIO_CACHE_MAX_AGE_S', 3600))
+    AUDIO_TAIL_IDLE_TIMEOUT_S = float(os.environ.get('AUDIO_TAIL_IDLE_TIMEOUT_S', 10))
+    AUDIO_TAIL_POLL_INTERVAL_S = float(os.environ.get('AUDIO_TAIL_POLL_INTERVAL_S', 0.25))
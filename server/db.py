@@ -1,23 +1,116 @@
 # server/db.py
-from pymongo import MongoClient
+import atexit
+import threading
+import time
+from pymongo import MongoClient, monitoring
 from flask import current_app, g
 
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks connection pool usage: checkout wait time and connections in use.
+    Checkouts happen synchronously in the calling thread, so the wait time is
+    measured with a thread-local start timestamp.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics = {
+            "connections_open": 0,
+            "connections_in_use": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+        }
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return dict(self._metrics)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        wait = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            self._metrics["checkouts"] += 1
+            self._metrics["connections_in_use"] += 1
+            self._metrics["checkout_wait_seconds_total"] += wait
+            self._metrics["checkout_wait_seconds_max"] = max(self._metrics["checkout_wait_seconds_max"], wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._metrics["checkout_failures"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._metrics["connections_in_use"] -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self._metrics["connections_open"] += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._metrics["connections_open"] -= 1
+
+    # Pool lifecycle events are not tracked
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+pool_metrics = PoolMetricsListener()
+
+def init_db(app):
+    """
+    Creates the process-wide MongoClient for the app.
+    The client connects lazily and is shared by every request, WebSocket session
+    and background thread; it is closed when the process exits.
+    """
+    client = MongoClient(
+        app.config['MONGO_URI'],
+        maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+        minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+        connectTimeoutMS=app.config['MONGO_CONNECT_TIMEOUT_MS'],
+        serverSelectionTimeoutMS=app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        waitQueueTimeoutMS=app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        event_listeners=[pool_metrics],
+        connect=False
+    )
+    app.extensions['mongo_client'] = client
+    atexit.register(client.close)
+    return client
+
 def get_db():
     """
-    Connect to the application's configured database.
-    If the connection does not exist, it is created and stored in the application context.
+    Returns the application's configured database from the shared client.
+    The handle is cached in the application context.
     """
     if 'db' not in g:
-        client = MongoClient(current_app.config['MONGO_URI'])
-        g.db = client.get_database()
+        g.db = current_app.extensions['mongo_client'].get_database()
     return g.db
 
 def close_db(e=None):
     """
-    If a connection was created, close it.
+    Drops the application context's database handle.
+    The shared client and its pool stay open for the next request.
     """
-    db = g.pop('db', None)
-    if db is not None:
-        # Pymongo's client object manages connections, so we don't strictly need to close it.
-        # This function is here for symmetry with Flask patterns.
-        pass
+    g.pop('db', None)
+
+def get_pool_metrics() -> dict:
+    """
+    Returns connection pool usage counters for the shared client.
+    """
+    return pool_metrics.get_metrics()
@@ -0,0 +1,143 @@
+# server/models/compact_words.py
+"""
+Compact columnar storage for segment word timings.
+
+Instead of one sub-document per word, a segment stores its words as columns:
+
+    wordsCompact: {
+        "v": 1,
+        "n": <word count>,
+        "text": <all word texts concatenated>,
+        "offsets": Binary(uint32[n + 1]),   # character offsets into "text"
+        "startMs": Binary(int32[n]),
+        "endMs": Binary(int32[n]),
+        "trusted": Binary(bitset),
+        "ids": [...]                        # only when ids aren't word_0..word_{n-1}
+    }
+
+Arrays are packed little-endian. Decoding is lazy: `CompactWords` unpacks the
+columns with single C-level `array` calls and only builds per-word dicts when
+they are accessed.
+"""
+import sys
+from array import array
+from collections.abc import Sequence
+from bson.binary import Binary
+
+FORMAT_VERSION = 1
+_SWAP = sys.byteorder != "little"
+
+def _pack(typecode: str, values) -> Binary:
+    packed = array(typecode, values)
+    if _SWAP:
+        packed.byteswap()
+    return Binary(packed.tobytes())
+
+def _unpack(typecode: str, data: bytes) -> array:
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if _SWAP:
+        unpacked.byteswap()
+    return unpacked
+
+def _default_ids(n: int) -> list:
+    return [f"word_{i}" for i in range(n)]
+
+def encode_words(words: list) -> dict:
+    """
+    Packs a list of word dicts ({id, text, start, end, trusted}) into columns.
+    """
+    n = len(words)
+    texts = [w['text'] for w in words]
+    offsets = [0] * (n + 1)
+    for i, text in enumerate(texts):
+        offsets[i + 1] = offsets[i] + len(text)
+
+    trusted = bytearray((n + 7) // 8)
+    for i, w in enumerate(words):
+        if w.get('trusted', True):
+            trusted[i >> 3] |= 1 << (i & 7)
+
+    encoded = {
+        "v": FORMAT_VERSION,
+        "n": n,
+        "text": "".join(texts),
+        "offsets": _pack('I', offsets),
+        "startMs": _pack('i', [round(w['start'] * 1000) for w in words]),
+        "endMs": _pack('i', [round(w['end'] * 1000) for w in words]),
+        "trusted": Binary(bytes(trusted)),
+    }
+    ids = [w['id'] for w in words]
+    if ids != _default_ids(n):
+        encoded["ids"] = ids
+    return encoded
+
+class CompactWords(Sequence):
+    """
+    A read-only, lazily decoded view of a `wordsCompact` column set.
+    Behaves like the list of word dicts it was encoded from.
+    """
+    def __init__(self, encoded: dict):
+        self._encoded = encoded
+        self._n = encoded["n"]
+        self._columns = None
+
+    def _decode(self):
+        if self._columns is None:
+            enc = self._encoded
+            self._columns = (
+                _unpack('I', enc["offsets"]),
+                _unpack('i', enc["startMs"]),
+                _unpack('i', enc["endMs"]),
+                bytes(enc["trusted"]),
+                enc.get("ids"),
+            )
+        return self._columns
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("word index out of range")
+        offsets, starts, ends, trusted, ids = self._decode()
+        return {
+            "id": ids[i] if ids else f"word_{i}",
+            "text": self._encoded["text"][offsets[i]:offsets[i + 1]],
+            "start": starts[i] / 1000,
+            "end": ends[i] / 1000,
+            "trusted": bool(trusted[i >> 3] >> (i & 7) & 1),
+        }
+
+    def starts(self) -> list:
+        """Word start times in seconds, without materializing the words."""
+        return [ms / 1000 for ms in self._decode()[1]]
+
+    def ends(self) -> list:
+        """Word end times in seconds, without materializing the words."""
+        return [ms / 1000 for ms in self._decode()[2]]
+
+    def to_list(self) -> list:
+        """Materializes all words as dicts, column by column."""
+        offsets, starts, ends, trusted, ids = self._decode()
+        text = self._encoded["text"]
+        ids = ids or _default_ids(self._n)
+        return [{
+            "id": ids[i],
+            "text": text[offsets[i]:offsets[i + 1]],
+            "start": starts[i] / 1000,
+            "end": ends[i] / 1000,
+            "trusted": bool(trusted[i >> 3] >> (i & 7) & 1),
+        } for i in range(self._n)]
+
+def words_from_document(segment_doc: dict):
+    """
+    Returns a segment's words regardless of the storage format it was written in.
+    """
+    if "wordsCompact" in segment_doc:
+        return CompactWords(segment_doc["wordsCompact"])
+    return segment_doc.get("words", [])
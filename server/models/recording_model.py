@@ -1,10 +1,71 @@
 # server/models/recording_model.py
 from bson import ObjectId
 from flask import current_app
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 from pymongo.results import UpdateResult, InsertOneResult
 from ..db import get_db
+from .compact_words import encode_words, words_from_document, CompactWords
 import datetime
 
+def create_indexes():
+    """
+    Creates the indexes the queries in this module rely on.
+    Safe to call repeatedly; existing indexes are left untouched.
+    """
+    db = get_db()
+    # iter_segments: filter by recording, sort and page by (index, _id)
+    db.transcript_segments.create_index([("recordingId", ASCENDING), ("index", ASCENDING), ("_id", ASCENDING)])
+    # find_stale_recordings: in-progress recordings not touched for a while
+    db.recordings.create_index([("status", ASCENDING), ("updatedAt", ASCENDING)])
+    # list_recordings: a user's recordings in creation order, optionally by status, paged by (createdAt, _id)
+    db.recordings.create_index([("userId", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)])
+    db.recordings.create_index([("userId", ASCENDING), ("status", ASCENDING), ("createdAt", ASCENDING), ("_id", ASCENDING)])
+
+_change_listeners = []
+
+def add_change_listener(listener):
+    """
+    Registers `listener(recording_id)`, called after a recording or its segments change.
+    Used to invalidate in-process caches.
+    """
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+def _notify_changed(recording_id: str):
+    for listener in _change_listeners:
+        listener(recording_id)
+
+_segment_listeners = []
+
+def add_segment_listener(listener):
+    """
+    Registers `listener(recording_id, segments)`, called with final segments
+    (dicts with '_id', 'index' and 'words') after they are stored or their
+    words are rewritten. Used to keep the search index current.
+    """
+    if listener not in _segment_listeners:
+        _segment_listeners.append(listener)
+
+def _notify_segments(recording_id: str, segments: list):
+    if segments:
+        for listener in _segment_listeners:
+            listener(recording_id, segments)
+
+def _store_words(segment_data: dict, words: list) -> dict:
+    """
+    Stores a segment's words in the configured format ('documents' or 'compact').
+    """
+    if current_app.config['WORD_STORAGE_FORMAT'] == 'compact':
+        segment_data["wordsCompact"] = encode_words(words)
+    else:
+        segment_data["words"] = words
+    return segment_data
+
+def _other_words_field() -> str:
+    # The field a segment written in the other storage format would hold its words in
+    return "words" if current_app.config['WORD_STORAGE_FORMAT'] == 'compact' else "wordsCompact"
+
 def create_recording(user_id: str, language: str) -> str:
     """
     Creates a new recording document in the database.
@@ -20,6 +81,8 @@ def create_recording(user_id: str, language: str) -> str:
         "audioPath": None,
         "durationMs": None,
         "finalText": None,
+        # Incremented by every transcript edit, for optimistic concurrency
+        "version": 0,
         "segments": []
     }
     result: InsertOneResult = db.recordings.insert_one(recording_data)
@@ -41,10 +104,12 @@ def update_recording_status(recording_id: str, status: str, final_text: str = No
     if audio_path is not None:
         update_fields["audioPath"] = audio_path
         
-    return db.recordings.update_one(
+    result = db.recordings.update_one(
         {"_id": ObjectId(recording_id)},
         {"$set": update_fields}
     )
+    _notify_changed(recording_id)
+    return result
 
 def append_segment(recording_id: str, index: int, text: str, words: list, start: float, end: float, is_final: bool) -> str:
     """
@@ -52,15 +117,14 @@ def append_segment(recording_id: str, index: int, text: str, words: list, start:
     Returns the ID of the newly created segment.
     """
     db = get_db()
-    segment_data = {
+    segment_data = _store_words({
         "recordingId": ObjectId(recording_id),
         "index": index,
         "start": start,
         "end": end,
         "text": text,
-        "words": words,
         "isFinal": is_final
-    }
+    }, words)
     result: InsertOneResult = db.transcript_segments.insert_one(segment_data)
     
     # Add the segment's ID to the recording's segments array
@@ -68,21 +132,313 @@ def append_segment(recording_id: str, index: int, text: str, words: list, start:
         {"_id": ObjectId(recording_id)},
         {"$push": {"segments": result.inserted_id}}
     )
+    _notify_changed(recording_id)
+    if is_final:
+        _notify_segments(recording_id, [{"_id": result.inserted_id, "index": index, "words": words}])
     return str(result.inserted_id)
 
-def get_recording(recording_id: str):
+def append_segments(recording_id: str, segments: list) -> list:
+    """
+    Appends a batch of transcript segments with one insert_many and one update_one.
+    Each segment dict carries a pre-assigned '_id' and the append_segment fields.
+    Retrying a batch is safe: already-inserted documents are skipped and ids
+    already in the recording's segments array are not added twice.
+    Returns the IDs of the segments.
+    """
+    if not segments:
+        return []
+    db = get_db()
+    segment_docs = [_store_words({
+        "_id": seg["_id"],
+        "recordingId": ObjectId(recording_id),
+        "index": seg["index"],
+        "start": seg["start"],
+        "end": seg["end"],
+        "text": seg["text"],
+        "isFinal": seg["is_final"]
+    }, seg["words"]) for seg in segments]
+    try:
+        db.transcript_segments.insert_many(segment_docs, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate keys mean a previous attempt already inserted those segments
+        details = e.details or {}
+        if details.get("writeConcernErrors") or any(err.get("code") != 11000 for err in details.get("writeErrors", [])):
+            raise
+
+    segment_ids = [doc["_id"] for doc in segment_docs]
+    # Bumping updatedAt doubles as a liveness heartbeat for reconciliation
+    db.recordings.update_one(
+        {"_id": ObjectId(recording_id)},
+        {
+            "$addToSet": {"segments": {"$each": segment_ids}},
+            "$set": {"updatedAt": datetime.datetime.utcnow()}
+        }
+    )
+    _notify_changed(recording_id)
+    _notify_segments(recording_id, [seg for seg in segments if seg["is_final"]])
+    return [str(oid) for oid in segment_ids]
+
+def list_recordings(user_id: str, statuses: list = None, created_from: datetime.datetime = None,
+                    created_to: datetime.datetime = None, after: tuple = None, limit: int = 50,
+                    descending: bool = True, projection: dict = None) -> list:
+    """
+    Returns a page of a user's recordings ordered by (createdAt, _id), newest
+    first unless `descending` is False.
+    - statuses: only recordings in one of these statuses.
+    - created_from/created_to: only recordings created in [from, to).
+    - after: a (createdAt, ObjectId) keyset cursor; only recordings past it are returned.
+    - projection: defaults to leaving out the segments array and final text.
+    The range on createdAt bounds the index scan; the tie-break on _id is
+    checked against index keys, so every page costs the same at any depth.
+    """
+    db = get_db()
+    query = {"userId": user_id}
+    if statuses:
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": list(statuses)}
+    created = {}
+    if created_from is not None:
+        created["$gte"] = created_from
+    if created_to is not None:
+        created["$lt"] = created_to
+    if after is not None:
+        after_created, after_id = after
+        if descending:
+            created["$lte"] = after_created
+            query["$or"] = [{"createdAt": {"$lt": after_created}}, {"_id": {"$lt": after_id}}]
+        else:
+            created["$gte"] = max(after_created, created.get("$gte", after_created))
+            query["$or"] = [{"createdAt": {"$gt": after_created}}, {"_id": {"$gt": after_id}}]
+    if created:
+        query["createdAt"] = created
+    if projection is None:
+        projection = {"segments": 0, "finalText": 0}
+
+    direction = DESCENDING if descending else ASCENDING
+    cursor = db.recordings.find(query, projection).sort([("createdAt", direction), ("_id", direction)]).limit(limit)
+    return list(cursor)
+
+def iter_recordings(user_id: str, statuses: list = None, created_from: datetime.datetime = None,
+                    created_to: datetime.datetime = None, batch_size: int = 100, projection: dict = None):
+    """
+    Yields all of a user's recordings matching the filters, oldest first, one
+    `list_recordings` page of `batch_size` at a time.
+    """
+    after = None
+    while True:
+        page = list_recordings(user_id, statuses, created_from, created_to, after=after, limit=batch_size,
+                               descending=False, projection=projection)
+        yield from page
+        if len(page) < batch_size:
+            return
+        after = (page[-1]["createdAt"], page[-1]["_id"])
+
+def find_recordings(recording_ids: list, projection: dict = None) -> list:
+    """
+    Returns the recordings with the given IDs that exist, in no particular order.
+    """
+    db = get_db()
+    if projection is None:
+        projection = {"segments": 0, "finalText": 0}
+    return list(db.recordings.find({"_id": {"$in": [ObjectId(rid) for rid in recording_ids]}}, projection))
+
+def iter_final_segments(recording_ids: list, batch_size: int = 500):
+    """
+    Yields the final segments of several recordings from a single cursor,
+    sorted by (recordingId, index, _id). Compactly stored words are exposed as
+    a lazily decoded 'words' sequence, as in iter_segments.
+    """
+    db = get_db()
+    cursor = db.transcript_segments.find(
+        {"recordingId": {"$in": [ObjectId(rid) for rid in recording_ids]}, "isFinal": True}
+    ).sort([("recordingId", ASCENDING), ("index", ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size)
+    for seg in cursor:
+        if "wordsCompact" in seg:
+            seg["words"] = words_from_document(seg)
+            del seg["wordsCompact"]
+        yield seg
+
+def get_recording(recording_id: str, projection: dict = None):
     """
     Retrieves a recording document by its ID.
     """
     db = get_db()
-    return db.recordings.find_one({"_id": ObjectId(recording_id)})
+    return db.recordings.find_one({"_id": ObjectId(recording_id)}, projection)
+
+def filter_recordings_by_user(recording_ids: list, user_id: str) -> list:
+    """
+    Returns the IDs among `recording_ids` of recordings that belong to `user_id`.
+    """
+    db = get_db()
+    cursor = db.recordings.find(
+        {"_id": {"$in": [ObjectId(rid) for rid in recording_ids]}, "userId": user_id},
+        {"_id": 1}
+    )
+    return [str(doc["_id"]) for doc in cursor]
+
+def iter_segments(recording_id: str, start: float = None, end: float = None, after: tuple = None,
+                  limit: int = None, include_words: bool = True, batch_size: int = None):
+    """
+    Yields transcript segments for a recording, sorted by (index, _id).
+    - start/end: only segments overlapping this time range (seconds).
+    - after: an (index, segment ObjectId) keyset cursor; only later segments are returned.
+    - include_words: when False, word arrays are left out of the projection.
+    Documents are read from the Mongo cursor as they are consumed.
+    Compactly stored words are exposed as a lazily decoded 'words' sequence.
+    """
+    db = get_db()
+    query = {"recordingId": ObjectId(recording_id)}
+    if start is not None:
+        query["end"] = {"$gte": start}
+    if end is not None:
+        query["start"] = {"$lte": end}
+    if after is not None:
+        after_index, after_id = after
+        query["$or"] = [
+            {"index": {"$gt": after_index}},
+            {"index": after_index, "_id": {"$gt": after_id}}
+        ]
+    projection = None if include_words else {"words": 0, "wordsCompact": 0}
+
+    cursor = db.transcript_segments.find(query, projection).sort([("index", ASCENDING), ("_id", ASCENDING)])
+    if limit:
+        cursor = cursor.limit(limit)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    for seg in cursor:
+        if "wordsCompact" in seg:
+            seg["words"] = words_from_document(seg)
+            del seg["wordsCompact"]
+        yield seg
+
+def find_segments_by_index(recording_id: str, indexes) -> list:
+    """
+    Returns the segments of a recording whose index is in `indexes`, sorted by
+    (index, _id), with their words as plain lists.
+    """
+    db = get_db()
+    cursor = db.transcript_segments.find(
+        {"recordingId": ObjectId(recording_id), "index": {"$in": list(indexes)}}
+    ).sort([("index", ASCENDING), ("_id", ASCENDING)])
+    segments = []
+    for seg in cursor:
+        words = words_from_document(seg)
+        seg["words"] = words.to_list() if isinstance(words, CompactWords) else list(words)
+        seg.pop("wordsCompact", None)
+        segments.append(seg)
+    return segments
+
+def claim_version(recording_id: str, expected_version: int):
+    """
+    Atomically increments a recording's version if it still is `expected_version`.
+    Returns the new version, or None if the recording was changed meanwhile.
+    Recordings created before versioning count as version 0.
+    """
+    db = get_db()
+    query = {"_id": ObjectId(recording_id), "version": expected_version}
+    if expected_version == 0:
+        query = {"_id": ObjectId(recording_id), "version": {"$in": [0, None]}}
+    result = db.recordings.update_one(query, {
+        "$inc": {"version": 1},
+        "$set": {"updatedAt": datetime.datetime.utcnow()}
+    })
+    return expected_version + 1 if result.modified_count else None
+
+def update_segment_words(recording_id: str, segments: list, version: int, previous: dict) -> bool:
+    """
+    Rewrites the words and text of edited segments with one bulk write, then
+    refreshes the recording's final text. Only the given segments are written.
+    Each segment dict carries '_id', 'text' and 'words'; `previous` maps each
+    _id to the document the edit was based on.
+
+    Each write only lands if the segment's 'editVersion' is still the one it
+    was read with, and stamps it with `version`, the version just claimed. If
+    another edit rewrote one of the segments meanwhile, the segments this call
+    did write are restored and False is returned.
+    """
+    db = get_db()
+    other_field = _other_words_field()
+    result = db.transcript_segments.bulk_write([
+        UpdateOne(
+            {"_id": seg["_id"], "recordingId": ObjectId(recording_id),
+             "editVersion": previous[seg["_id"]].get("editVersion")},
+            {"$set": _store_words({"text": seg["text"], "editVersion": version}, seg["words"]),
+             "$unset": {other_field: ""}}
+        ) for seg in segments
+    ], ordered=False)
+    if result.matched_count < len(segments):
+        restores = []
+        for seg in segments:
+            before = previous[seg["_id"]]
+            update = {"$set": _store_words({"text": before.get("text", "")}, before["words"]),
+                      "$unset": {other_field: ""}}
+            if before.get("editVersion") is None:
+                update["$unset"]["editVersion"] = ""
+            else:
+                update["$set"]["editVersion"] = before["editVersion"]
+            restores.append(UpdateOne(
+                {"_id": seg["_id"], "recordingId": ObjectId(recording_id), "editVersion": version}, update
+            ))
+        db.transcript_segments.bulk_write(restores, ordered=False)
+        return False
+    final_text, _ = rebuild_final_text(recording_id)
+    db.recordings.update_one(
+        {"_id": ObjectId(recording_id)},
+        {"$set": {"finalText": final_text, "updatedAt": datetime.datetime.utcnow()}}
+    )
+    _notify_changed(recording_id)
+    _notify_segments(recording_id, segments)
+    return True
 
 def get_segments_for_recording(recording_id: str):
     """
     Retrieves all transcript segments for a given recording, sorted by index.
     """
+    return list(iter_segments(recording_id))
+
+def touch_recordings(recording_ids: list) -> int:
+    """
+    Bumps updatedAt on the in-progress recordings among `recording_ids`, marking
+    them live for reconciliation. Returns the number of recordings touched.
+    """
+    if not recording_ids:
+        return 0
+    db = get_db()
+    result = db.recordings.update_many(
+        {"_id": {"$in": [ObjectId(rid) for rid in recording_ids]}, "status": "in_progress"},
+        {"$set": {"updatedAt": datetime.datetime.utcnow()}}
+    )
+    return result.modified_count
+
+def find_stale_recordings(updated_before: datetime.datetime, limit: int = 100) -> list:
+    """
+    Returns the IDs of in-progress recordings that have not been updated since `updated_before`.
+    """
+    db = get_db()
+    cursor = db.recordings.find(
+        {"status": "in_progress", "updatedAt": {"$lt": updated_before}},
+        {"_id": 1}
+    ).limit(limit)
+    return [str(doc["_id"]) for doc in cursor]
+
+def rebuild_final_text(recording_id: str):
+    """
+    Rebuilds a recording's final text from its stored segments.
+    Only segment text and end times are read, never the word arrays.
+    Returns (final_text, last_end_seconds).
+    """
     db = get_db()
-    return list(db.transcript_segments.find({"recordingId": ObjectId(recording_id)}).sort("index", 1))
+    cursor = db.transcript_segments.find(
+        {"recordingId": ObjectId(recording_id), "isFinal": True},
+        {"text": 1, "end": 1}
+    ).sort("index", 1)
+    texts = []
+    last_end = None
+    for seg in cursor:
+        if seg.get("text"):
+            texts.append(seg["text"])
+        if seg.get("end") is not None:
+            last_end = max(last_end or 0.0, seg["end"])
+    return " ".join(texts), last_end
 
 def serialize_document(doc):
     """
@@ -96,6 +452,8 @@ def serialize_document(doc):
         doc['segments'] = [str(oid) for oid in doc['segments']]
     if 'recordingId' in doc:
         doc['recordingId'] = str(doc['recordingId'])
+    if isinstance(doc.get('words'), CompactWords):
+        doc['words'] = doc['words'].to_list()
     if 'createdAt' in doc:
         doc['createdAt'] = doc['createdAt'].isoformat()
     if 'updatedAt' in doc:
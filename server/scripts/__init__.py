@@ -0,0 +1,2 @@
+# server/scripts/__init__.py
+# This file makes the 'scripts' directory a Python package.
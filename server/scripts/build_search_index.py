@@ -0,0 +1,58 @@
+"""
+Indexes stored transcripts for search: recordings transcribed before search
+was enabled, or all of them after the index directory was lost. Segments that
+are already indexed are replaced, so running it twice is harmless.
+
+Run from the repository root:
+    python -m server.scripts.build_search_index
+    python -m server.scripts.build_search_index --recording <id>
+"""
+import argparse
+from bson import ObjectId
+
+from ..app import create_app
+from ..db import get_db
+from ..models.compact_words import words_from_document
+from ..services.search_index import get_search_index
+
+def build(index, recording_id: str = None, batch_size: int = 500) -> int:
+    """
+    Adds every final segment to `index` and flushes it. Returns the number of
+    segments indexed. Must run inside an application context.
+    """
+    db = get_db()
+    query = {"isFinal": True}
+    if recording_id:
+        query["recordingId"] = ObjectId(recording_id)
+    cursor = db.transcript_segments.find(
+        query, {"recordingId": 1, "index": 1, "words": 1, "wordsCompact": 1}
+    ).sort([("recordingId", 1), ("index", 1), ("_id", 1)]).batch_size(batch_size)
+
+    indexed = 0
+    batch, batch_recording = [], None
+    for seg in cursor:
+        if batch and (seg["recordingId"] != batch_recording or len(batch) >= batch_size):
+            index.add_segments(batch_recording, batch)
+            indexed += len(batch)
+            batch = []
+        batch_recording = seg["recordingId"]
+        batch.append({"_id": seg["_id"], "index": seg["index"], "words": words_from_document(seg)})
+    if batch:
+        index.add_segments(batch_recording, batch)
+        indexed += len(batch)
+    index.flush(force=True)
+    return indexed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="only index the segments of this recording")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app(background_services=False)
+    with app.app_context():
+        count = build(get_search_index(app.config), args.recording, args.batch_size)
+    print(f"Indexed {count} segments into {app.config['SEARCH_INDEX_DIR']}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Exports the final transcripts of many recordings to one file, streaming them
+as GET/POST /api/recordings/export does: NDJSON, or a tar of SRT / WebVTT
+caption files, optionally gzipped.
+
+Run from the repository root:
+    python -m server.scripts.export_transcripts --user <userId> --format vtt --gzip -o captions.tar.gz
+    python -m server.scripts.export_transcripts --ids <id>,<id> -o transcripts.ndjson
+"""
+import argparse
+import sys
+from bson import ObjectId
+
+from ..app import create_app
+from ..api.recordings_routes import RECORDING_STATUSES
+from ..services import transcript_export
+from ..utils.time_utils import parse_datetime
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--user", help="export this user's recordings")
+    selection.add_argument("--ids", help="comma-separated recording ids to export")
+    parser.add_argument("--status", help=f"with --user: comma-separated, of {', '.join(RECORDING_STATUSES)}")
+    parser.add_argument("--from", dest="created_from", help="with --user: created at or after (ISO 8601)")
+    parser.add_argument("--to", dest="created_to", help="with --user: created before (ISO 8601)")
+    parser.add_argument("--format", choices=transcript_export.EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="compress the output")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, help="recordings per database batch (default: EXPORT_BATCH_SIZE)")
+    args = parser.parse_args()
+
+    if args.ids:
+        selected = {"recording_ids": [ObjectId(rid) for rid in args.ids.split(",") if rid]}
+    else:
+        statuses = [status for status in (args.status or "").split(",") if status]
+        if set(statuses) - set(RECORDING_STATUSES):
+            parser.error(f"--status must be one of {', '.join(RECORDING_STATUSES)}")
+        selected = {
+            "user_id": args.user,
+            "statuses": statuses,
+            "created_from": parse_datetime(args.created_from) if args.created_from else None,
+            "created_to": parse_datetime(args.created_to) if args.created_to else None,
+        }
+
+    app = create_app(background_services=False)
+    with app.app_context():
+        batch_size = args.batch_size or app.config['EXPORT_BATCH_SIZE']
+        recordings = transcript_export.iter_selected(selected, batch_size)
+        chunks = transcript_export.export_stream(recordings, args.format, args.gzip, app.config)
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+        metrics = transcript_export.get_export_metrics()
+    print(f"Exported {metrics['recordings_exported']} recordings ({metrics['segments_exported']} segments, "
+          f"{metrics['bytes_out']} bytes).", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
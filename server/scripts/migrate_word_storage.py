@@ -0,0 +1,63 @@
+# server/scripts/migrate_word_storage.py
+"""
+Converts stored transcript segments between word storage formats.
+
+Run from the repository root:
+    python -m server.scripts.migrate_word_storage --to compact
+    python -m server.scripts.migrate_word_storage --to documents --recording <id>
+"""
+import argparse
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..app import create_app
+from ..db import get_db
+from ..models.compact_words import encode_words, CompactWords
+
+def migrate(to_format: str, recording_id: str = None, batch_size: int = 500, dry_run: bool = False) -> int:
+    """
+    Rewrites every segment stored in the other format. Returns the number of segments converted.
+    Must run inside an application context.
+    """
+    db = get_db()
+    source_field = "words" if to_format == "compact" else "wordsCompact"
+    query = {source_field: {"$exists": True}}
+    if recording_id:
+        query["recordingId"] = ObjectId(recording_id)
+
+    converted = 0
+    operations = []
+    cursor = db.transcript_segments.find(query, {source_field: 1}).batch_size(batch_size)
+    for seg in cursor:
+        if to_format == "compact":
+            update = {"$set": {"wordsCompact": encode_words(seg["words"])}, "$unset": {"words": ""}}
+        else:
+            update = {"$set": {"words": CompactWords(seg["wordsCompact"]).to_list()}, "$unset": {"wordsCompact": ""}}
+        operations.append(UpdateOne({"_id": seg["_id"]}, update))
+        if len(operations) >= batch_size:
+            converted += _apply(db, operations, dry_run)
+            operations = []
+    if operations:
+        converted += _apply(db, operations, dry_run)
+    return converted
+
+def _apply(db, operations: list, dry_run: bool) -> int:
+    if not dry_run:
+        db.transcript_segments.bulk_write(operations, ordered=False)
+    return len(operations)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=("compact", "documents"), required=True, help="target word storage format")
+    parser.add_argument("--recording", help="only convert the segments of this recording")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="count segments without writing")
+    args = parser.parse_args()
+
+    app = create_app(background_services=False)
+    with app.app_context():
+        count = migrate(args.to, args.recording, args.batch_size, args.dry_run)
+    print(f"{'Would convert' if args.dry_run else 'Converted'} {count} segments to '{args.to}' word storage.")
+
+if __name__ == "__main__":
+    main()
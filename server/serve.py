@@ -0,0 +1,147 @@
+# server/serve.py
+"""
+Runs the ASGI serving mode (see asgi.py) with one worker process per core.
+
+The launcher binds the listening socket once and starts ASGI_WORKERS worker
+processes (0 = one per core) that accept from it, each running its own
+uvicorn server and event loop. Workers that die are restarted.
+
+SIGTERM (or Ctrl-C) drains the workers: new sessions are refused with close
+code 1013, live ones get ASGI_DRAIN_TIMEOUT_S to end, and the rest are
+finalized, their clients getting close code 1001, before the worker exits.
+A second signal skips the wait. Run from the repository root:
+    python -m server.serve --port 5000
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from .asgi import TranscriptionASGI
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# How often the launcher checks on its workers
+SUPERVISE_INTERVAL_S = 0.5
+
+class DrainingServer(uvicorn.Server):
+    """
+    A uvicorn server whose first exit signal drains the transcription
+    sessions before the usual shutdown; a second one shuts down at once.
+    """
+    def __init__(self, config: uvicorn.Config, app: TranscriptionASGI, drain_timeout_s: float):
+        super().__init__(config)
+        self._app = app
+        self._drain_timeout_s = drain_timeout_s
+        self._loop = None
+        self._drain_requested = False
+        self._drain_task = None
+
+    async def startup(self, sockets=None):
+        self._loop = asyncio.get_running_loop()
+        await super().startup(sockets)
+
+    def handle_exit(self, sig, frame):
+        if not self.started or self._drain_requested:
+            super().handle_exit(sig, frame)
+            return
+        # Runs as a signal handler, so only hand over to the loop here
+        self._drain_requested = True
+        self._loop.call_soon_threadsafe(self._start_drain)
+
+    def _start_drain(self):
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        try:
+            await self._app.drain(self._drain_timeout_s)
+        finally:
+            self.should_exit = True
+
+def run_worker(sock: socket.socket, log_level: str):
+    """
+    Serves the ASGI app from an already bound socket until told to stop.
+    """
+    # Stay out of the terminal's process group: Ctrl-C reaches the launcher, which signals us once
+    os.setpgrp()
+    app = TranscriptionASGI()
+    config = uvicorn.Config(app, lifespan="on", log_level=log_level,
+                            timeout_graceful_shutdown=Config.ASGI_SHUTDOWN_TIMEOUT_S)
+    DrainingServer(config, app, Config.ASGI_DRAIN_TIMEOUT_S).run(sockets=[sock])
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def supervise(sock: socket.socket, workers: int, log_level: str):
+    """
+    Keeps `workers` worker processes running until a signal arrives, then
+    drains them and waits for them to exit.
+    """
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker():
+        process = context.Process(target=run_worker, args=(sock, log_level), daemon=False)
+        process.start()
+        return process
+
+    processes = [start_worker() for _ in range(workers)]
+    signals = []
+
+    def on_signal(sig, frame):
+        signals.append(sig)
+        # The first signal starts the drain, a second one cuts it short
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    logger.info(f"Serving on {sock.getsockname()} with {workers} workers")
+
+    while not signals:
+        time.sleep(SUPERVISE_INTERVAL_S)
+        for i, process in enumerate(processes):
+            if not process.is_alive() and not signals:
+                logger.warning(f"Worker {process.pid} exited with code {process.exitcode}; restarting it")
+                processes[i] = start_worker()
+
+    deadline = time.monotonic() + Config.ASGI_DRAIN_TIMEOUT_S + Config.ASGI_SHUTDOWN_TIMEOUT_S + 10
+    logger.info("Draining workers")
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.error(f"Worker {process.pid} did not stop in time; killing it")
+            process.kill()
+            process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=Config.ASGI_WORKERS, help="0 = one per core")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    sock = bind_socket(args.host, args.port)
+    try:
+        supervise(sock, args.workers or os.cpu_count() or 1, args.log_level)
+    finally:
+        sock.close()
+
+if __name__ == "__main__":
+    main()
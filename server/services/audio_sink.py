@@ -0,0 +1,419 @@
+# server/services/audio_sink.py
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import queue
+import sys
+import threading
+import time
+import logging
+from ..utils.webm_index import WebmClusterIndexer, save_seek_index
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+FSYNC_NONE = "none"
+FSYNC_INTERVAL = "interval"
+FSYNC_ON_STOP = "on_stop"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_INTERVAL, FSYNC_ON_STOP)
+
+# fallocate(2) mode that reserves blocks without changing the file size
+FALLOC_FL_KEEP_SIZE = 0x01
+
+def _load_fallocate():
+    """
+    Returns libc's fallocate(2), or None where it is not available. Unlike
+    os.posix_fallocate it can preallocate without growing the file, so
+    readers never see zero bytes past the write offset.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        fallocate = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).fallocate
+    except (OSError, AttributeError):
+        return None
+    fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+    fallocate.restype = ctypes.c_int
+    return fallocate
+
+_fallocate = _load_fallocate()
+
+class AudioSink:
+    """
+    A per-recording audio file written by an `AudioWriter` thread.
+
+    `write()` only appends to an in-memory buffer and never touches the disk,
+    so callers on the hot path (STT forwarding) are never blocked by I/O.
+    The writer thread coalesces buffered chunks into large writes and, if
+    `seek_index` is set, feeds them to a WebM cluster indexer whose result is
+    saved next to the file on close.
+
+    The buffer is bounded by the writer's `max_pending_bytes`: producers await
+    `wait_writable()` while the sink `is_full`, so a stalled disk holds them
+    back instead of growing the buffer. The writer thread wakes them on their
+    own event loop once it has drained the buffer.
+    """
+    def __init__(self, writer: "AudioWriter", worker: "_WriterThread", path: str, seek_index: bool = False):
+        self.path = path
+        self._writer = writer
+        self._worker = worker
+        self._lock = threading.Lock()
+        self._waiters = []  # (loop, asyncio.Event) of producers waiting for room
+        self._pending = bytearray()
+        self._pending_since = None
+        self._scheduled = False
+        self._closing = False
+        self._closed = threading.Event()
+        self._fd = None
+        self._allocated = 0
+        self._last_fsync = time.monotonic()
+        self._indexer = WebmClusterIndexer() if seek_index else None
+        self.bytes_written = 0
+        self.error = None
+        self.seek_index = None
+
+    def write(self, chunk: bytes):
+        """
+        Buffers a chunk for writing. Never blocks on disk I/O; callers wait
+        while the sink `is_full` to keep the buffer bounded.
+        """
+        with self._lock:
+            if self._closing:
+                raise ValueError(f"Audio sink for {self.path} is closed")
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending += chunk
+            schedule = not self._scheduled and len(self._pending) >= self._writer.coalesce_bytes
+            if schedule:
+                self._scheduled = True
+        if schedule:
+            self._worker.schedule(self)
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._pending)
+
+    @property
+    def is_full(self) -> bool:
+        """
+        True while at least `max_pending_bytes` are waiting to be written.
+        """
+        limit = self._writer.max_pending_bytes
+        return bool(limit) and len(self._pending) >= limit and not self._closing
+
+    async def wait_writable(self, timeout: float = None) -> bool:
+        """
+        Waits, without blocking the event loop, while the sink is full.
+        Returns False on timeout.
+        """
+        with self._lock:
+            if not self.is_full:
+                return True
+            waiter = (asyncio.get_running_loop(), asyncio.Event())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _wake_waiters(self):
+        """
+        Wakes every producer waiting for room. Must hold self._lock.
+        """
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop was closed meanwhile
+                pass
+        self._waiters.clear()
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed.is_set()
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Flushes everything still buffered, syncs it to disk according to the fsync
+        policy and closes the file. Blocks until done; returns False on timeout.
+        """
+        with self._lock:
+            self._closing = True
+            # A closing sink is never full
+            self._wake_waiters()
+        self._worker.schedule(self, force=True)
+        return self._closed.wait(timeout)
+
+    # --- The methods below only run on the writer thread ---
+
+    def _is_due(self, now: float) -> bool:
+        return bool(self._pending) and now - self._pending_since >= self._writer.flush_interval_s
+
+    def _flush(self):
+        with self._lock:
+            data = self._pending
+            pending_since = self._pending_since
+            self._pending = bytearray()
+            self._scheduled = False
+            closing = self._closing
+            self._wake_waiters()
+        if data:
+            tracing.observe("audio_buffer_age", time.monotonic() - pending_since)
+        try:
+            if data:
+                self._write_to_disk(data)
+            if self._fd is not None:
+                self._apply_fsync_policy(closing)
+        except OSError as e:
+            self.error = e
+            logger.error(f"Error writing audio to {self.path}: {e}")
+        if closing:
+            self._close_file()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    def _write_to_disk(self, data: bytearray):
+        if self._fd is None:
+            self._open()
+        self._preallocate(self.bytes_written + len(data))
+        started = time.perf_counter()
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self._fd, view, self.bytes_written)
+            self.bytes_written += written
+            view = view[written:]
+        elapsed = time.perf_counter() - started
+        self._writer._record_write(len(data), elapsed)
+        tracing.observe("audio_write", elapsed)
+        if self._indexer is not None:
+            self._indexer.feed(data)
+
+    def _preallocate(self, needed: int):
+        """
+        Reserves file blocks ahead of the write offset to reduce fragmentation.
+        The file size stays at the bytes written, so the file can be served
+        while it grows; the reserved tail is released when it is closed.
+        """
+        step = self._writer.preallocate_bytes
+        if not step or needed <= self._allocated or _fallocate is None:
+            return
+        target = (needed // step + 1) * step
+        try:
+            if _fallocate(self._fd, FALLOC_FL_KEEP_SIZE, self._allocated, target - self._allocated) != 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+            self._allocated = target
+        except OSError:
+            # Not supported by every filesystem; fall back to plain appends
+            self._writer.preallocate_bytes = 0
+
+    def _apply_fsync_policy(self, closing: bool):
+        policy = self._writer.fsync_policy
+        now = time.monotonic()
+        if (closing and policy != FSYNC_NONE) or (
+            policy == FSYNC_INTERVAL and now - self._last_fsync >= self._writer.fsync_interval_s
+        ):
+            started = time.perf_counter()
+            os.fsync(self._fd)
+            self._last_fsync = now
+            self._writer._record_fsync(time.perf_counter() - started)
+
+    def _close_file(self):
+        if self._fd is not None:
+            try:
+                if self._allocated > self.bytes_written:
+                    # Frees the blocks reserved past the end of the file
+                    os.ftruncate(self._fd, self.bytes_written)
+                os.close(self._fd)
+            except OSError as e:
+                self.error = self.error or e
+                logger.error(f"Error closing audio file {self.path}: {e}")
+            self._fd = None
+            self._save_seek_index()
+        self._worker.forget(self)
+        self._closed.set()
+
+    def _save_seek_index(self):
+        if self._indexer is None:
+            return
+        index = self._indexer.to_index(self.bytes_written)
+        if index["error"]:
+            logger.warning(f"Could not index {self.path}: {index['error']}")
+            return
+        try:
+            save_seek_index(self.path, index)
+            self.seek_index = index
+        except OSError as e:
+            logger.error(f"Error saving seek index for {self.path}: {e}")
+
+class _WriterThread:
+    """
+    A writer thread with its own bounded queue of sinks that need flushing.
+    A sink is always served by the same thread, so its writes stay ordered.
+    """
+    def __init__(self, writer: "AudioWriter", name: str, max_queue: int):
+        self._writer = writer
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sinks = set()
+        self._sinks_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def add(self, sink: AudioSink):
+        with self._sinks_lock:
+            self._sinks.add(sink)
+
+    def forget(self, sink: AudioSink):
+        with self._sinks_lock:
+            self._sinks.discard(sink)
+
+    def schedule(self, sink: AudioSink, force: bool = False):
+        """
+        Asks the thread to flush a sink. If the queue is full the request is
+        dropped; the sink is picked up by the next periodic sweep instead,
+        unless `force` is set (used on close), in which case this waits.
+        """
+        if force:
+            self._queue.put(sink)
+            return
+        try:
+            self._queue.put_nowait(sink)
+        except queue.Full:
+            sink._scheduled = False
+            self._writer._record_queue_full()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            try:
+                sink = self._queue.get(timeout=self._writer.flush_interval_s)
+                sink._flush()
+            except queue.Empty:
+                pass
+            self._sweep()
+
+    def _sweep(self):
+        """
+        Flushes sinks whose buffered data has waited longer than the flush interval.
+        """
+        now = time.monotonic()
+        with self._sinks_lock:
+            due = [sink for sink in self._sinks if sink._is_due(now)]
+        for sink in due:
+            sink._flush()
+
+class AudioWriter:
+    """
+    A pool of background writer threads persisting recording audio.
+    """
+    def __init__(self, threads: int = 1, coalesce_bytes: int = 64 * 1024,
+                 flush_interval_s: float = 1.0, fsync_policy: str = FSYNC_ON_STOP,
+                 fsync_interval_s: float = 5.0, preallocate_bytes: int = 0,
+                 max_pending_bytes: int = 0, max_queue: int = 1024):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}', expected one of {FSYNC_POLICIES}")
+        self.coalesce_bytes = coalesce_bytes
+        self.flush_interval_s = flush_interval_s
+        self.fsync_policy = fsync_policy
+        self.fsync_interval_s = fsync_interval_s
+        self.preallocate_bytes = preallocate_bytes
+        # Unwritten bytes per sink before producers wait; 0 = unbounded
+        self.max_pending_bytes = max_pending_bytes
+        self._workers = [_WriterThread(self, f"audio-writer-{i}", max_queue) for i in range(max(1, threads))]
+        self._next_worker = 0
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "writes": 0,
+            "bytes_written": 0,
+            "write_seconds_total": 0.0,
+            "write_seconds_max": 0.0,
+            "fsyncs": 0,
+            "fsync_seconds_total": 0.0,
+            "queue_full": 0,
+        }
+
+    def open_sink(self, path: str, seek_index: bool = False) -> AudioSink:
+        """
+        Creates a sink for `path`. The file itself is opened on the writer thread.
+        With `seek_index`, a WebM cluster index is built as the file is written.
+        """
+        with self._metrics_lock:
+            worker = self._workers[self._next_worker % len(self._workers)]
+            self._next_worker += 1
+        sink = AudioSink(self, worker, path, seek_index)
+        worker.add(sink)
+        return sink
+
+    def find_sink(self, path: str):
+        """
+        Returns the open sink writing `path` in this process, or None.
+        """
+        for worker in self._workers:
+            with worker._sinks_lock:
+                for sink in worker._sinks:
+                    if sink.path == path:
+                        return sink
+        return None
+
+    def _record_write(self, nbytes: int, seconds: float):
+        with self._metrics_lock:
+            self._metrics["writes"] += 1
+            self._metrics["bytes_written"] += nbytes
+            self._metrics["write_seconds_total"] += seconds
+            self._metrics["write_seconds_max"] = max(self._metrics["write_seconds_max"], seconds)
+
+    def _record_fsync(self, seconds: float):
+        with self._metrics_lock:
+            self._metrics["fsyncs"] += 1
+            self._metrics["fsync_seconds_total"] += seconds
+
+    def _record_queue_full(self):
+        with self._metrics_lock:
+            self._metrics["queue_full"] += 1
+
+    def get_metrics(self) -> dict:
+        """
+        Returns a snapshot of queue depth and write latency counters.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        sinks = []
+        for worker in self._workers:
+            with worker._sinks_lock:
+                sinks.extend(worker._sinks)
+        metrics["queue_depth"] = sum(worker.depth for worker in self._workers)
+        metrics["open_sinks"] = len(sinks)
+        metrics["pending_bytes"] = sum(sink.pending_bytes for sink in sinks)
+        return metrics
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_audio_writer(config) -> AudioWriter:
+    """
+    Returns the process-wide audio writer, creating it from the app config on first use.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AudioWriter(
+                threads=config['AUDIO_WRITER_THREADS'],
+                coalesce_bytes=config['AUDIO_COALESCE_BYTES'],
+                flush_interval_s=config['AUDIO_FLUSH_INTERVAL_S'],
+                fsync_policy=config['AUDIO_FSYNC_POLICY'],
+                fsync_interval_s=config['AUDIO_FSYNC_INTERVAL_S'],
+                preallocate_bytes=config['AUDIO_PREALLOCATE_BYTES'],
+                max_pending_bytes=config['AUDIO_SINK_MAX_PENDING_BYTES'],
+            )
+        return _writer
@@ -0,0 +1,68 @@
+# server/services/metrics.py
+from ..db import get_pool_metrics
+from ..utils.prometheus import PrometheusText
+from .audio_sink import get_audio_writer
+from .segment_buffer import get_segment_write_metrics
+from .transcript_sender import get_transcript_delivery_metrics
+from .session_runtime import get_runtime
+from .session_registry import get_session_registry
+from .word_timeline import get_timeline_cache
+from .response_cache import get_response_cache
+from ..stt.connection_pool import get_stt_pool
+from ..stt.deepgram_client import build_listen_uri, get_stt_stream_metrics
+from ..stt.pcm_ingest import get_pcm_ingest_metrics
+from .search_index import get_search_metrics
+from .transcript_export import get_export_metrics
+from . import tracing
+
+METRIC_PREFIX = "transcription_"
+
+# Keys of the component metric dicts that are point-in-time values, not running totals
+_GAUGE_KEYS = {
+    "queue_depth", "open_sinks", "pending_bytes",
+    "connections_open", "connections_in_use",
+    "entries", "bytes", "max_bytes",
+    "channels_open", "channel_queue_depth", "channel_queue_bytes",
+    "idle", "opening",
+    "live", "parked",
+    "parts", "delta_words",
+}
+
+def _add_component(out: PrometheusText, component: str, metrics: dict, description: str):
+    for key, value in metrics.items():
+        help_text = f"{description}: {key.replace('_', ' ')}"
+        if key in _GAUGE_KEYS or key.endswith("_max"):
+            out.gauge(f"{component}_{key}", value, help_text)
+        else:
+            name = key if key.endswith("_total") else f"{key}_total"
+            out.counter(f"{component}_{name}", value, help_text)
+
+def render_metrics(config, services: list) -> str:
+    """
+    Renders process-wide metrics in the Prometheus text format: session gauges,
+    per-stage latency histograms and the counters of each component.
+    `services` are the TranscriptionService instances active in this process.
+    """
+    out = PrometheusText(METRIC_PREFIX)
+    out.gauge("active_sessions", len(services), "Transcription sessions handled by this process")
+    out.gauge("stt_connected_sessions", sum(1 for s in services if s.stt_connected),
+              "Sessions with an open STT provider connection")
+    for stage, histogram in tracing.get_stage_histograms().items():
+        out.histogram("stage_seconds", histogram, "Latency of each hot-path stage", {"stage": stage})
+
+    _add_component(out, "sessions", get_session_registry(config).get_metrics(), "Live and parked sessions")
+    _add_component(out, "runtime", get_runtime().get_metrics(), "Session runtime audio channels")
+    _add_component(out, "audio", get_audio_writer(config).get_metrics(), "Background audio writer")
+    _add_component(out, "segment_buffer", get_segment_write_metrics(), "Write-behind segment buffer")
+    _add_component(out, "delivery", get_transcript_delivery_metrics(), "Transcript delivery to clients")
+    _add_component(out, "mongo_pool", get_pool_metrics(), "MongoDB connection pool")
+    _add_component(out, "timeline_cache", get_timeline_cache(config).get_metrics(), "Word timeline cache")
+    _add_component(out, "response_cache", get_response_cache(config).get_metrics(), "Recording response cache")
+    _add_component(out, "stt_stream", get_stt_stream_metrics(), "Upstream STT streams")
+    _add_component(out, "pcm_ingest", get_pcm_ingest_metrics(), "Raw PCM received and forwarded upstream")
+    _add_component(out, "search", get_search_metrics(), "Transcript search index")
+    _add_component(out, "export", get_export_metrics(), "Bulk transcript export")
+    stt_pool = get_stt_pool(config, build_listen_uri(config))
+    if stt_pool:
+        _add_component(out, "stt_pool", stt_pool.get_metrics(), "Pre-connected STT connection pool")
+    return out.render()
@@ -0,0 +1,82 @@
+# server/services/reconciliation.py
+import datetime
+import threading
+from ..models import recording_model
+
+def reconcile_stale_recordings(stale_after_s: float, active_recording_ids=frozenset()) -> int:
+    """
+    Finalizes recordings left 'in_progress' by a worker that died mid-session.
+    Their final text and duration are rebuilt from the persisted segments and the
+    status is set to 'aborted'. Must run inside an application context.
+    Returns the number of recordings reconciled.
+    """
+    updated_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=stale_after_s)
+    reconciled = 0
+    for recording_id in recording_model.find_stale_recordings(updated_before):
+        if recording_id in active_recording_ids:
+            continue
+        final_text, last_end = recording_model.rebuild_final_text(recording_id)
+        recording_model.update_recording_status(
+            recording_id=recording_id,
+            status="aborted",
+            final_text=final_text,
+            duration_ms=int(round(last_end * 1000)) if last_end is not None else None
+        )
+        reconciled += 1
+    return reconciled
+
+def heartbeat_live_recordings(active_recording_ids) -> int:
+    """
+    Marks the recordings of sessions live in this process as updated, so that
+    reconciliation on other workers does not take a session that is quiet (no
+    final segments for a while) for an orphan. Must run inside an application
+    context. Returns the number of recordings touched.
+    """
+    return recording_model.touch_recordings(sorted(active_recording_ids))
+
+def _run_periodically(app, name: str, interval_s: float, work, what: str):
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval_s):
+            try:
+                with app.app_context():
+                    work()
+            except Exception as e:
+                app.logger.warning(f"{what} failed: {e}")
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return stop_event
+
+def start_reconciliation_job(app, get_active_recording_ids):
+    """
+    Runs `reconcile_stale_recordings` periodically on a daemon thread.
+    `get_active_recording_ids` returns the IDs of sessions live in this process,
+    which are never touched.
+    """
+    stale_after_s = app.config['RECONCILE_STALE_AFTER_S']
+
+    def reconcile():
+        count = reconcile_stale_recordings(stale_after_s, set(get_active_recording_ids()))
+        if count:
+            app.logger.info(f"Reconciled {count} stale in-progress recordings.")
+
+    return _run_periodically(app, "recording-reconciliation", app.config['RECONCILE_INTERVAL_S'], reconcile,
+                             "Recording reconciliation")
+
+def start_heartbeat_job(app, get_active_recording_ids):
+    """
+    Runs `heartbeat_live_recordings` periodically on a daemon thread. The
+    interval must stay well below RECONCILE_STALE_AFTER_S.
+    """
+    interval_s = app.config['SESSION_HEARTBEAT_INTERVAL_S']
+    if interval_s >= app.config['RECONCILE_STALE_AFTER_S']:
+        app.logger.warning(
+            f"SESSION_HEARTBEAT_INTERVAL_S ({interval_s}s) is not below RECONCILE_STALE_AFTER_S; "
+            "reconciliation may abort live sessions."
+        )
+    return _run_periodically(
+        app, "recording-heartbeat", interval_s,
+        lambda: heartbeat_live_recordings(get_active_recording_ids()),
+        "Live session heartbeat"
+    )
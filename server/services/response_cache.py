@@ -0,0 +1,25 @@
+# server/services/response_cache.py
+import threading
+from ..utils.lru_cache import VersionedLRUCache
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache(config) -> VersionedLRUCache:
+    """
+    Returns the process-wide cache of serialized recording responses.
+    Keys are (recording_id, query variant); entries are versioned by updatedAt
+    and sized by their body length.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VersionedLRUCache(config['RESPONSE_CACHE_BYTES'])
+        return _cache
+
+def invalidate_recording_responses(recording_id: str):
+    """
+    Drops every cached response variant of a recording after it changed.
+    """
+    if _cache is not None:
+        _cache.invalidate(recording_id)
@@ -0,0 +1,733 @@
+# server/services/search_index.py
+"""
+Positional full-text index over final transcript segments.
+
+Each final segment is indexed as a document whose positions are its word
+ordinals, so phrase queries are answered by intersecting positional postings
+and every hit maps straight back to the start and end time of its words.
+
+The index is a set of immutable part files plus an in-memory delta:
+- Segments persisted by this process go into the delta and are searchable
+  immediately. The delta is written out as a new part once it holds
+  SEARCH_FLUSH_WORDS words or is SEARCH_FLUSH_INTERVAL_S old.
+- Parts are memory-mapped and queried in place with numpy. Parts written by
+  other worker processes are picked up when the index directory changes.
+- A segment is indexed again when its words are edited. Every indexed copy
+  carries a stamp and only the newest copy of a segment is live.
+- Once there are more than SEARCH_MAX_PARTS parts, the smallest ones are merged
+  into one, dropping copies that are no longer live.
+"""
+import atexit
+import fcntl
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+
+import numpy as np
+from bson import ObjectId
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+PART_PREFIX = "part-"
+PART_SUFFIX = ".idx"
+MAGIC = b"TSIX"
+FORMAT_VERSION = 1
+# magic, format version, then counts: docs, recordings, words, terms, term bytes, postings
+_HEADER = struct.Struct("<4sI6Q")
+# Positions are stored as uint16; words past this in a segment are not indexed
+MAX_POSITION = 0xFFFF
+MAX_QUERY_CLAUSES = 16
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "segments_indexed": 0,
+    "words_indexed": 0,
+    "queries": 0,
+    "query_seconds_total": 0.0,
+    "query_seconds_max": 0.0,
+    "flushes": 0,
+    "merges": 0,
+    "index_failures": 0,
+}
+
+def get_search_metrics() -> dict:
+    """
+    Returns a snapshot of the process-wide search counters, with the index gauges
+    when the index is open.
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    if _index is not None:
+        metrics.update(_index.get_gauges())
+    return metrics
+
+def normalize_term(text: str) -> str:
+    """
+    Maps a word as transcribed or typed to its index term: case-folded, with
+    punctuation removed except apostrophes inside the word.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().replace("’", "'")
+    return re.sub(r"[^\w']+", "", text).strip("'")
+
+def parse_query(query: str) -> list:
+    """
+    Splits a query into clauses, each a list of terms. Quoted text is one phrase
+    clause; every other word is a clause of its own. A recording matches when
+    it contains every clause.
+    """
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', query):
+        terms = [normalize_term(t) for t in (phrase.split() if phrase else [word])]
+        terms = [t for t in terms if t]
+        if terms and terms not in clauses:
+            clauses.append(terms)
+    if len(clauses) > MAX_QUERY_CLAUSES:
+        raise ValueError(f"At most {MAX_QUERY_CLAUSES} query clauses are supported")
+    return clauses
+
+def _oid_bytes(value) -> bytes:
+    return ObjectId(value).binary
+
+def _oid(raw: bytes) -> ObjectId:
+    # numpy 'S' arrays drop trailing NUL bytes
+    return ObjectId(raw.ljust(12, b"\0"))
+
+def _sections(counts: dict) -> list:
+    """
+    The (name, dtype, length) of each array of a part, in file order.
+    """
+    return [
+        ("seg_ids", "S12", counts["docs"]),
+        ("stamps", "<u8", counts["docs"]),
+        ("doc_recordings", "<u4", counts["docs"]),
+        ("doc_indexes", "<i4", counts["docs"]),
+        ("doc_words", "<u8", counts["docs"] + 1),
+        ("recordings", "S12", counts["recordings"]),
+        ("starts", "<f4", counts["words"]),
+        ("ends", "<f4", counts["words"]),
+        ("term_offsets", "<u8", counts["terms"] + 1),
+        ("term_bytes", "u1", counts["term_bytes"]),
+        ("postings", "<u8", counts["terms"] + 1),
+        ("post_docs", "<u4", counts["postings"]),
+        ("post_pos", "<u2", counts["postings"]),
+    ]
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+class PartData:
+    """
+    The arrays of one index part: per-document (segment) columns, per-word
+    times, a sorted lexicon and per-term postings sorted by (doc, position).
+    The arrays are numpy views over a memory-mapped file or in-memory arrays.
+    """
+    def __init__(self, arrays: dict):
+        for name, value in arrays.items():
+            setattr(self, name, value)
+        self.num_docs = len(self.seg_ids)
+        self.num_terms = len(self.term_offsets) - 1
+        self.nbytes = sum(value.nbytes for value in arrays.values())
+        self._seg_order = None
+
+    def term(self, i: int) -> str:
+        return bytes(self.term_bytes[self.term_offsets[i]:self.term_offsets[i + 1]]).decode()
+
+    def terms(self) -> list:
+        data = self.term_bytes.tobytes()
+        offsets = self.term_offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode() for i in range(self.num_terms)]
+
+    def term_id(self, term: str) -> int:
+        """
+        Binary search of the lexicon. Returns -1 for unknown terms.
+        """
+        key = term.encode()
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = bytes(self.term_bytes[self.term_offsets[mid]:self.term_offsets[mid + 1]])
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def posting_keys(self, term_id: int, shift: int):
+        """
+        Sorted (doc << 16 | position - shift) keys of a term's postings at
+        positions >= shift, i.e. the phrase starts it supports as the word at
+        offset `shift` of a phrase.
+        """
+        begin, end = self.postings[term_id], self.postings[term_id + 1]
+        docs, positions = self.post_docs[begin:end], self.post_pos[begin:end]
+        keys = (docs.astype(np.uint64) << np.uint64(16)) | positions
+        if shift:
+            keys = keys[positions >= shift] - np.uint64(shift)
+        return keys
+
+    def find_segments(self, seg_ids):
+        """
+        Returns the doc number of each of `seg_ids` in this part, or -1.
+        """
+        if not self.num_docs:
+            return np.full(len(seg_ids), -1)
+        if self._seg_order is None:
+            self._seg_order = np.argsort(self.seg_ids, kind="stable")
+            self._sorted_seg_ids = self.seg_ids[self._seg_order]
+        at = np.minimum(np.searchsorted(self._sorted_seg_ids, seg_ids), self.num_docs - 1)
+        return np.where(self._sorted_seg_ids[at] == seg_ids, self._seg_order[at], -1)
+
+class PartFile(PartData):
+    """
+    A part read in place from its memory-mapped file.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *counts = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} search index part")
+        counts = dict(zip(("docs", "recordings", "words", "terms", "term_bytes", "postings"), counts))
+        arrays = {}
+        offset = _align(_HEADER.size)
+        for name, dtype, length in _sections(counts):
+            arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=length, offset=offset)
+            offset = _align(offset + arrays[name].nbytes)
+        super().__init__(arrays)
+        self.path = path
+        self.file_size = len(self._mmap)
+
+def write_part(directory: str, data: PartData) -> str:
+    """
+    Writes a part to a new file in `directory`, atomically. Returns its path.
+    """
+    counts = {
+        "docs": data.num_docs, "recordings": len(data.recordings), "words": len(data.starts),
+        "terms": data.num_terms, "term_bytes": len(data.term_bytes), "postings": len(data.post_docs),
+    }
+    name = f"{PART_PREFIX}{time.time_ns():020d}-{os.getpid()}{PART_SUFFIX}"
+    path = os.path.join(directory, name)
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, *counts.values()))
+        for section, dtype, length in _sections(counts):
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            values = np.ascontiguousarray(getattr(data, section), dtype=dtype)
+            assert len(values) == length, section
+            f.write(values.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+def assemble_part(docs: dict, recordings, vocabulary: list, p_terms, p_docs, p_pos) -> PartData:
+    """
+    Builds a part from per-document columns (seg_ids, stamps, doc_recordings
+    indexing `recordings`, doc_indexes, doc_words, starts, ends) and postings
+    given as parallel (term, doc, position) arrays, with term numbers indexing
+    `vocabulary`. The lexicon is sorted, unused terms and recordings are dropped
+    and postings are sorted by (term, doc, position).
+    """
+    # Renumber terms in lexicon order
+    order = sorted(range(len(vocabulary)), key=vocabulary.__getitem__)
+    rank = np.empty(len(vocabulary), dtype=np.int64)
+    rank[order] = np.arange(len(vocabulary))
+    used, p_terms = np.unique(rank[np.asarray(p_terms, dtype=np.int64)], return_inverse=True)
+    encoded = [vocabulary[order[i]].encode() for i in used.tolist()]
+    term_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(t) for t in encoded], out=term_offsets[1:])
+
+    p_docs = np.asarray(p_docs, dtype=np.uint32)
+    p_pos = np.asarray(p_pos, dtype=np.uint16)
+    ordering = np.lexsort((p_pos, p_docs, p_terms))
+    postings = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum(np.bincount(p_terms, minlength=len(encoded)), out=postings[1:])
+
+    recordings = np.asarray(recordings, dtype="S12")
+    used_recordings, doc_recordings = np.unique(recordings[np.asarray(docs["doc_recordings"], dtype=np.int64)],
+                                                return_inverse=True)
+    return PartData({
+        "seg_ids": np.asarray(docs["seg_ids"], dtype="S12"),
+        "stamps": np.asarray(docs["stamps"], dtype=np.uint64),
+        "doc_recordings": doc_recordings.astype(np.uint32),
+        "doc_indexes": np.asarray(docs["doc_indexes"], dtype=np.int32),
+        "doc_words": np.asarray(docs["doc_words"], dtype=np.uint64),
+        "recordings": used_recordings,
+        "starts": np.asarray(docs["starts"], dtype=np.float32),
+        "ends": np.asarray(docs["ends"], dtype=np.float32),
+        "term_offsets": term_offsets,
+        "term_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "postings": postings,
+        "post_docs": p_docs[ordering],
+        "post_pos": p_pos[ordering],
+    })
+
+def merge_parts(parts: list, live_masks: list) -> PartData:
+    """
+    Merges parts into one, keeping only the documents flagged in `live_masks`.
+    """
+    vocabulary = sorted(set().union(*(part.terms() for part in parts)))
+    term_numbers = {term: i for i, term in enumerate(vocabulary)}
+    columns = {name: [] for name in ("seg_ids", "stamps", "doc_recordings", "doc_indexes", "starts", "ends")}
+    word_counts, recordings, p_terms, p_docs, p_pos = [], [], [], [], []
+    doc_base = 0
+    for part, live in zip(parts, live_masks):
+        counts = np.diff(part.doc_words)
+        word_docs = np.repeat(np.arange(part.num_docs), counts.astype(np.int64))
+        keep_words = live[word_docs]
+        columns["starts"].append(part.starts[keep_words])
+        columns["ends"].append(part.ends[keep_words])
+        for name in ("seg_ids", "stamps", "doc_indexes"):
+            columns[name].append(getattr(part, name)[live])
+        columns["doc_recordings"].append(part.doc_recordings[live].astype(np.int64) + len(recordings))
+        recordings.extend(part.recordings.tolist())
+        word_counts.append(counts[live])
+
+        doc_numbers = np.cumsum(live) - 1 + doc_base
+        terms = np.repeat(np.arange(part.num_terms), np.diff(part.postings).astype(np.int64))
+        keep = live[part.post_docs]
+        term_map = np.array([term_numbers[t] for t in part.terms()], dtype=np.int64)
+        p_terms.append(term_map[terms[keep]])
+        p_docs.append(doc_numbers[part.post_docs[keep]])
+        p_pos.append(part.post_pos[keep])
+        doc_base += int(live.sum())
+
+    docs = {name: np.concatenate(values) if values else [] for name, values in columns.items()}
+    doc_words = np.zeros(doc_base + 1, dtype=np.uint64)
+    if word_counts:
+        np.cumsum(np.concatenate(word_counts), out=doc_words[1:])
+    docs["doc_words"] = doc_words
+    return assemble_part(docs, recordings, vocabulary,
+                         np.concatenate(p_terms), np.concatenate(p_docs), np.concatenate(p_pos))
+
+class _Delta:
+    """
+    Segments indexed by this process that are not yet in a part file.
+    A segment added again replaces its earlier copy.
+    """
+    def __init__(self):
+        self.seg_ids = []
+        self.stamps = []
+        self.recordings = []
+        self.doc_indexes = []
+        self.doc_words = [0]
+        self.live = bytearray()
+        self.starts = array("f")
+        self.ends = array("f")
+        self.vocabulary = {}
+        self.p_terms = array("I")
+        self.p_docs = array("I")
+        self.p_pos = array("H")
+        self._docs_by_segment = {}
+        self.created = time.monotonic()
+        self.words = 0
+        self._snapshot = None
+
+    def __len__(self) -> int:
+        return len(self.seg_ids)
+
+    def add(self, recording: bytes, segment: dict, stamp: int):
+        seg_id = _oid_bytes(segment["_id"])
+        doc = len(self.seg_ids)
+        if seg_id in self._docs_by_segment:
+            self.live[self._docs_by_segment[seg_id]] = 0
+        self._docs_by_segment[seg_id] = doc
+        self.seg_ids.append(seg_id)
+        self.stamps.append(stamp)
+        self.recordings.append(recording)
+        self.doc_indexes.append(segment["index"])
+        self.live.append(1)
+        words = list(segment.get("words") or [])[:MAX_POSITION + 1]
+        for position, word in enumerate(words):
+            self.starts.append(word.get("start") or 0.0)
+            self.ends.append(word.get("end") or 0.0)
+            term = normalize_term(word.get("text", ""))
+            if term:
+                self.p_terms.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                self.p_docs.append(doc)
+                self.p_pos.append(position)
+        self.doc_words.append(self.doc_words[-1] + len(words))
+        self.words += len(words)
+        self._snapshot = None
+
+    def snapshot(self):
+        """
+        Returns (PartData, live mask) for the delta as it is now.
+        """
+        if self._snapshot is None:
+            docs = {
+                "seg_ids": self.seg_ids, "stamps": self.stamps,
+                "doc_recordings": np.arange(len(self.seg_ids)), "doc_indexes": self.doc_indexes,
+                "doc_words": self.doc_words, "starts": self.starts, "ends": self.ends,
+            }
+            part = assemble_part(docs, self.recordings, list(self.vocabulary),
+                                 self.p_terms, self.p_docs, self.p_pos)
+            self._snapshot = (part, np.frombuffer(bytes(self.live), dtype=bool))
+        return self._snapshot
+
+class SearchIndex:
+    """
+    The search index of one worker process: the memory-mapped parts in
+    `directory` plus the delta of segments indexed here since the last flush.
+    """
+    def __init__(self, directory: str, flush_words: int, flush_interval_s: float, max_parts: int,
+                 max_candidates: int = 1000):
+        self.directory = directory
+        self._flush_words = flush_words
+        self._flush_interval_s = flush_interval_s
+        self._max_parts = max_parts
+        self._max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._delta = _Delta()
+        # Deltas taken out for writing, searchable until their part is loaded
+        self._pending = []
+        self._parts = {}
+        self._part_live = {}
+        self._dir_mtime = None
+        self._view = None
+        os.makedirs(directory, exist_ok=True)
+        self._refresh()
+
+    def add_segments(self, recording_id, segments: list):
+        """
+        Indexes final segments (dicts with '_id', 'index' and 'words'). A segment
+        indexed before is replaced.
+        """
+        recording = _oid_bytes(recording_id)
+        stamp = time.time_ns()
+        with self._lock:
+            for segment in segments:
+                self._delta.add(recording, segment, stamp)
+            self._view = None
+            words = self._delta.words
+        with _metrics_lock:
+            _metrics["segments_indexed"] += len(segments)
+            _metrics["words_indexed"] += sum(len(seg.get("words") or []) for seg in segments)
+        if words >= self._flush_words:
+            threading.Thread(target=self.flush, name="search-index-flush", daemon=True).start()
+
+    def flush(self, force: bool = False):
+        """
+        Writes the delta out as a part file when it is big or old enough, then
+        merges parts if there are too many. A delta that fails to write stays
+        searchable and is retried by the next flush.
+        """
+        with self._write_lock:
+            with self._lock:
+                delta = self._delta
+                due = delta.words >= self._flush_words or time.monotonic() - delta.created >= self._flush_interval_s
+                if len(delta) and (due or force):
+                    self._delta = _Delta()
+                    self._pending.append(delta)
+                    self._view = None
+                pending = list(self._pending)
+            for delta in pending:
+                part, live = delta.snapshot()
+                if not live.all():
+                    part = merge_parts([part], [live])
+                write_part(self.directory, part)
+                with _metrics_lock:
+                    _metrics["flushes"] += 1
+                with self._lock:
+                    self._pending.remove(delta)
+                    self._view = None
+                    self._refresh()
+            if pending:
+                self._maybe_merge()
+
+    def _maybe_merge(self):
+        with self._lock:
+            parts = sorted(self._parts.values(), key=lambda part: part.file_size)
+            if len(parts) <= self._max_parts:
+                return
+            selected = parts[:len(parts) - self._max_parts // 2]
+            live_masks = [self._part_live[part.path] for part in selected]
+        with open(os.path.join(self.directory, ".merge.lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is merging
+                return
+            if not all(os.path.exists(part.path) for part in selected):
+                return
+            write_part(self.directory, merge_parts(selected, live_masks))
+            for part in selected:
+                os.unlink(part.path)
+        with _metrics_lock:
+            _metrics["merges"] += 1
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """
+        Loads new part files and drops removed ones. Must hold self._lock.
+        """
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self._dir_mtime:
+            return
+        names = {name for name in os.listdir(self.directory)
+                 if name.startswith(PART_PREFIX) and name.endswith(PART_SUFFIX)}
+        paths = {os.path.join(self.directory, name) for name in names}
+        parts = {path: part for path, part in self._parts.items() if path in paths}
+        for path in sorted(paths - parts.keys()):
+            try:
+                parts[path] = PartFile(path)
+            except FileNotFoundError:
+                # Merged away by another worker meanwhile
+                continue
+        self._parts = parts
+        self._part_live = self._live_masks(list(parts.values()))
+        self._dir_mtime = mtime
+        self._view = None
+
+    @staticmethod
+    def _live_masks(parts: list) -> dict:
+        """
+        Flags, per part, the documents that are the newest copy of their segment.
+        """
+        if len(parts) < 2:
+            return {part.path: np.ones(part.num_docs, dtype=bool) for part in parts}
+        seg_ids = np.concatenate([part.seg_ids for part in parts])
+        stamps = np.concatenate([part.stamps for part in parts])
+        order = np.lexsort((stamps, seg_ids))
+        sorted_ids = seg_ids[order]
+        newest = np.ones(len(order), dtype=bool)
+        newest[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+        live = np.zeros(len(order), dtype=bool)
+        live[order[newest]] = True
+        bounds = np.cumsum([0] + [part.num_docs for part in parts])
+        return {part.path: live[bounds[i]:bounds[i + 1]] for i, part in enumerate(parts)}
+
+    def _current_view(self):
+        """
+        Returns the searchable units as (parts with live masks and global
+        recording numbers, recording table, live document count). Delta copies
+        override older copies of the same segment in the parts and vice versa.
+        Must hold self._lock.
+        """
+        self._refresh()
+        if self._view is not None:
+            return self._view
+        units = [(part, self._part_live[part.path]) for part in self._parts.values()]
+        for delta in self._pending + [self._delta]:
+            if len(delta):
+                part, live = delta.snapshot()
+                units.append((part, live.copy()))
+        for i in range(len(self._parts), len(units)):
+            part, live = units[i]
+            for j, (other, other_live) in enumerate(units):
+                found = other.find_segments(part.seg_ids) if j != i else None
+                if found is None or not (found >= 0).any():
+                    continue
+                mine = np.flatnonzero(found >= 0)
+                theirs = found[mine]
+                older = part.stamps[mine] < other.stamps[theirs]
+                live[mine[older]] = False
+                # Deltas settle it from their own side; part masks are shared, so copy before changing
+                if j < len(self._parts):
+                    other_live = other_live.copy()
+                    other_live[theirs[~older]] = False
+                    units[j] = (other, other_live)
+        if units:
+            recordings = np.unique(np.concatenate([part.recordings for part, _ in units]))
+        else:
+            recordings = np.array([], dtype="S12")
+        # A live mask of None means every document of the unit is live
+        view_units = [(part, None if live.all() else live, np.searchsorted(recordings, part.recordings))
+                      for part, live in units]
+        total_docs = sum(int(live.sum()) for _, live in units)
+        self._view = (view_units, recordings, total_docs)
+        return self._view
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, hits_per_recording: int = 5,
+               recording_filter=None) -> dict:
+        """
+        Returns the recordings matching every clause of `query`, best first, each
+        with up to `hits_per_recording` hits in time order. A hit gives the start
+        and end time of the matched words. `recording_filter(ids)` may narrow the
+        ranked candidates to those the caller may see.
+        """
+        started = time.perf_counter()
+        clauses = parse_query(query)
+        with self._lock:
+            units, recordings, total_docs = self._current_view()
+        results = {"total": 0, "results": []}
+        if not clauses or not units:
+            return results
+
+        matches = [self._match_clause(units, terms) for terms in clauses]
+        scores = np.zeros(len(recordings))
+        hit_counts = np.zeros(len(recordings), dtype=np.int64)
+        matched = np.ones(len(recordings), dtype=bool)
+        for occurrences, doc_count in matches:
+            counts = np.zeros(len(recordings), dtype=np.int64)
+            for _, _, _, recs in occurrences:
+                counts += np.bincount(recs, minlength=len(recordings))
+            matched &= counts > 0
+            hit_counts += counts
+            idf = math.log(1 + total_docs / max(doc_count, 1))
+            scores += idf * (1 + np.log(np.maximum(counts, 1)))
+        candidates = np.flatnonzero(matched)
+        # Best score first; ties go to the newer recording
+        candidates = candidates[np.lexsort((-candidates, -scores[candidates]))]
+        if recording_filter is not None:
+            candidates = candidates[:self._max_candidates]
+            allowed = set(recording_filter([str(_oid(raw)) for raw in recordings[candidates].tolist()]))
+            candidates = np.array([rec for rec in candidates.tolist() if str(_oid(recordings[rec])) in allowed],
+                                  dtype=np.int64)
+        results["total"] = len(candidates)
+        page = candidates[offset:offset + limit]
+        hits = self._page_hits(units, clauses, matches, page, len(recordings), hits_per_recording)
+        for rec in page.tolist():
+            results["results"].append({
+                "recordingId": str(_oid(recordings[rec])),
+                "score": round(float(scores[rec]), 4),
+                "hitCount": int(hit_counts[rec]),
+                "hits": hits.get(rec, []),
+            })
+
+        elapsed = time.perf_counter() - started
+        with _metrics_lock:
+            _metrics["queries"] += 1
+            _metrics["query_seconds_total"] += elapsed
+            _metrics["query_seconds_max"] = max(_metrics["query_seconds_max"], elapsed)
+        return results
+
+    @staticmethod
+    def _match_clause(units: list, terms: list):
+        """
+        Finds the live occurrences of a phrase in every unit by intersecting the
+        shifted positional postings of its terms, rarest first.
+        Returns ([(unit, docs, positions, global recording numbers)], matched
+        document count).
+        """
+        occurrences = []
+        doc_count = 0
+        for unit, (part, live, recording_map) in enumerate(units):
+            term_ids = [part.term_id(term) for term in terms]
+            if min(term_ids) < 0:
+                continue
+            key_lists = sorted((part.posting_keys(term_id, shift) for shift, term_id in enumerate(term_ids)), key=len)
+            keys = key_lists[0]
+            for other in key_lists[1:]:
+                if not len(keys) or not len(other):
+                    keys = keys[:0]
+                    break
+                at = np.minimum(np.searchsorted(other, keys), len(other) - 1)
+                keys = keys[other[at] == keys]
+            docs = (keys >> np.uint64(16)).astype(np.int64)
+            positions = keys & np.uint64(MAX_POSITION)
+            if live is not None:
+                keep = live[docs]
+                docs, positions = docs[keep], positions[keep]
+            if not len(docs):
+                continue
+            occurrences.append((unit, docs, positions, recording_map[part.doc_recordings[docs]]))
+            # Keys are sorted by doc, so distinct docs are where it changes
+            doc_count += int(np.count_nonzero(np.diff(docs))) + 1
+        return occurrences, doc_count
+
+    @staticmethod
+    def _page_hits(units: list, clauses: list, matches: list, page, num_recordings: int, per_recording: int) -> dict:
+        """
+        Returns {recording number: hits} with the first `per_recording` hits of
+        each recording on the page, in time order. Word times are only looked
+        up for the page's occurrences.
+        """
+        on_page = np.zeros(num_recordings, dtype=bool)
+        on_page[page] = True
+        columns = {"recs": [], "starts": [], "ends": [], "segments": [], "clauses": []}
+        for clause, (terms, (occurrences, _)) in enumerate(zip(clauses, matches)):
+            for unit, docs, positions, recs in occurrences:
+                selected = on_page[recs]
+                if not selected.any():
+                    continue
+                part = units[unit][0]
+                docs = docs[selected]
+                first_word = part.doc_words[docs].astype(np.int64) + positions[selected].astype(np.int64)
+                columns["recs"].append(recs[selected])
+                columns["starts"].append(part.starts[first_word])
+                columns["ends"].append(part.ends[first_word + len(terms) - 1])
+                columns["segments"].append(part.doc_indexes[docs])
+                columns["clauses"].append(np.full(len(docs), clause))
+        if not columns["recs"] or not per_recording:
+            return {}
+        recs, starts, ends, segments, clause_numbers = (np.concatenate(values) for values in columns.values())
+        order = np.lexsort((starts, recs))
+        sorted_recs = recs[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_recs, sorted_recs)
+        hits = {}
+        labels = [" ".join(terms) for terms in clauses]
+        for i in order[rank < per_recording].tolist():
+            hits.setdefault(int(recs[i]), []).append({
+                "start": round(float(starts[i]), 3),
+                "end": round(float(ends[i]), 3),
+                "segmentIndex": int(segments[i]),
+                "match": labels[clause_numbers[i]],
+            })
+        return hits
+
+    def get_gauges(self) -> dict:
+        with self._lock:
+            return {
+                "parts": len(self._parts),
+                "bytes": sum(part.file_size for part in self._parts.values()),
+                "delta_words": self._delta.words + sum(delta.words for delta in self._pending),
+            }
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index(config) -> SearchIndex:
+    """
+    Returns the process-wide search index, opening it on first use. A daemon
+    thread flushes the delta when it is old enough; it is also flushed at exit.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex(
+                config['SEARCH_INDEX_DIR'],
+                flush_words=config['SEARCH_FLUSH_WORDS'],
+                flush_interval_s=config['SEARCH_FLUSH_INTERVAL_S'],
+                max_parts=config['SEARCH_MAX_PARTS'],
+                max_candidates=config['SEARCH_MAX_CANDIDATES']
+            )
+            index = _index
+
+            def run():
+                while True:
+                    time.sleep(min(index._flush_interval_s, 5))
+                    try:
+                        index.flush()
+                    except Exception as e:
+                        with _metrics_lock:
+                            _metrics["index_failures"] += 1
+                        logger.warning(f"Search index flush failed: {e}")
+
+            threading.Thread(target=run, name="search-index-flush-timer", daemon=True).start()
+            atexit.register(index.flush, True)
+        return _index
+
+def index_segments(recording_id: str, segments: list):
+    """
+    Segment listener: adds persisted final segments to the search index.
+    Indexing failures are logged and never fail the write.
+    """
+    try:
+        get_search_index(current_app.config).add_segments(recording_id, segments)
+    except Exception as e:
+        with _metrics_lock:
+            _metrics["index_failures"] += 1
+        current_app.logger.error(f"Failed to index segments of {recording_id}: {e}")
@@ -0,0 +1,128 @@
+# server/services/segment_buffer.py
+import asyncio
+import threading
+import time
+from bson import ObjectId
+from flask import current_app
+from ..models import recording_model
+from . import tracing
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "segments_buffered": 0,
+    "segments_flushed": 0,
+    "flushes": 0,
+    "flush_failures": 0,
+    "mongo_ops": 0,
+    "mongo_ops_saved": 0,
+    "flush_seconds_total": 0.0,
+    "flush_seconds_max": 0.0,
+}
+
+def get_segment_write_metrics() -> dict:
+    """
+    Returns a snapshot of the process-wide write-behind counters.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+def _record_flush(segment_count: int, seconds: float):
+    with _metrics_lock:
+        _metrics["segments_flushed"] += segment_count
+        _metrics["flushes"] += 1
+        # One insert_many + one update_one, instead of two round trips per segment
+        _metrics["mongo_ops"] += 2
+        _metrics["mongo_ops_saved"] += 2 * segment_count - 2
+        _metrics["flush_seconds_total"] += seconds
+        _metrics["flush_seconds_max"] = max(_metrics["flush_seconds_max"], seconds)
+
+class SegmentWriteBuffer:
+    """
+    Write-behind buffer for a session's final transcript segments.
+
+    Segments are collected in memory and persisted in batches, when the batch
+    reaches `max_batch` segments, when the oldest segment has waited
+    `flush_interval_s`, or when the session closes the buffer. Mongo calls run
+    in a worker thread so they never block the session runtime loop.
+    """
+    def __init__(self, recording_id: str, max_batch: int, flush_interval_s: float, trace=None):
+        self.recording_id = recording_id
+        self._trace = trace
+        self._max_batch = max_batch
+        self._flush_interval_s = flush_interval_s
+        self._pending = []
+        self._flush_lock = asyncio.Lock()
+        self._timer = None
+        self._flush_requested = False
+        self._flush_tasks = set()
+
+    def add(self, index: int, text: str, words: list, start: float, end: float, is_final: bool):
+        """
+        Buffers a segment. Must be called on the event loop that owns the buffer.
+        """
+        # Kept with the time it was buffered, for the persist delay histogram
+        self._pending.append(({
+            "_id": ObjectId(),
+            "index": index,
+            "text": text,
+            "words": words,
+            "start": start,
+            "end": end,
+            "is_final": is_final
+        }, time.perf_counter()))
+        with _metrics_lock:
+            _metrics["segments_buffered"] += 1
+
+        if len(self._pending) >= self._max_batch:
+            if not self._flush_requested:
+                self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval_s, self._schedule_flush)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._flush_requested = True
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> bool:
+        """
+        Persists all buffered segments. On failure they are kept for the next flush.
+        Returns True if nothing is left pending.
+        """
+        async with self._flush_lock:
+            self._flush_requested = False
+            batch, self._pending = self._pending, []
+            if not batch:
+                return True
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(recording_model.append_segments, self.recording_id, [doc for doc, _ in batch])
+            except Exception as e:
+                current_app.logger.error(f"Failed to flush {len(batch)} segments for {self.recording_id}: {e}")
+                with _metrics_lock:
+                    _metrics["flush_failures"] += 1
+                # Keep the order stable for the retry
+                self._pending[:0] = batch
+                return False
+            finished = time.perf_counter()
+            _record_flush(len(batch), finished - started)
+            tracing.observe("segment_flush", finished - started, self._trace)
+            for _, added_at in batch:
+                tracing.observe("segment_persist_delay", finished - added_at, self._trace)
+            return not self._pending
+
+    async def close(self) -> bool:
+        """
+        Flushes everything that is still pending. Returns True if all segments were persisted.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        # A failed background flush leaves its batch pending, so retry once here
+        return await self.flush() or await self.flush()
@@ -0,0 +1,236 @@
+# server/services/session_registry.py
+import asyncio
+import threading
+import time
+import logging
+from flask import current_app
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# How long finishing a session waits for its STT connection attempt to complete
+STT_START_TIMEOUT_S = 15
+
+class LiveSession:
+    """
+    A transcription session together with the audio channel feeding it.
+
+    At most one WebSocket handler owns a session at a time (`ws`). When a
+    resumable client's connection drops, the session is parked: the audio
+    file, STT stream and transcript state stay alive until a new connection
+    resumes it or the grace period runs out.
+    """
+    def __init__(self, service, audio_channel, start_future, runtime, app, resumable: bool):
+        self.service = service
+        self.audio_channel = audio_channel
+        self.start_future = start_future
+        self.resumable = resumable
+        self.recording_id = service.recording_id
+        # Sequence number of the next audio chunk; chunks are numbered from 0 per recording
+        self.next_seq = 0
+        self.ws = None
+        self.parked_at = None
+        self._runtime = runtime
+        self._app = app
+        self._expiry = None
+        # Set while no handler owns the session, so a resuming handler can take over safely
+        self._released = threading.Event()
+
+    def finish(self):
+        """
+        Drains queued audio, stops transcription and finalizes the recording.
+        Blocks; must not be called on the session runtime loop.
+        """
+        self._runtime.run(self.finish_async(), self._app)
+
+    async def finish_async(self):
+        """
+        Like `finish`, awaited on the session runtime loop.
+        """
+        with self._app.app_context():
+            current_app.logger.info(f"Cleaning up resources for recordingId: {self.recording_id}")
+            # Drain queued audio before the STT stream is closed
+            await self.audio_channel.aclose()
+            try:
+                # Shielded: giving up on the wait must not cancel the connection attempt
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self.start_future)), STT_START_TIMEOUT_S)
+            except Exception as e:
+                current_app.logger.error(f"Transcription start for {self.recording_id} did not complete: {e}")
+            await self.service.stop_transcription()
+
+class SessionRegistry:
+    """
+    Live sessions of this process, keyed by recordingId.
+    """
+    def __init__(self, grace_s: float):
+        self._grace_s = grace_s
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._metrics = {
+            "parks": 0,
+            "resumes": 0,
+            "resume_seconds_total": 0.0,
+            "resume_seconds_max": 0.0,
+            "expired": 0,
+            "duplicate_chunks_dropped": 0,
+            "missing_chunks": 0,
+            "refused": 0,
+        }
+
+    def get(self, recording_id: str):
+        with self._lock:
+            return self._sessions.get(recording_id)
+
+    def add(self, session: LiveSession, ws):
+        with self._lock:
+            session.ws = ws
+            self._sessions[session.recording_id] = session
+
+    def sessions(self) -> list:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def services(self) -> list:
+        with self._lock:
+            return [session.service for session in self._sessions.values()]
+
+    def recording_ids(self) -> list:
+        with self._lock:
+            return list(self._sessions)
+
+    def resume(self, recording_id: str, ws, takeover_timeout_s: float = 5.0):
+        """
+        Hands a live session to a new WebSocket handler, or returns None if the
+        recording has no live session here or its client did not open it as
+        resumable. If the previous connection has not noticed it is gone yet,
+        its handler is told to let go and waited for.
+        """
+        with self._lock:
+            session = self._sessions.get(recording_id)
+            # Only a session opened with "resumable" may be taken over by another connection
+            if session is None or not session.resumable:
+                return None
+            session.ws = ws
+            if session._expiry:
+                session._expiry.cancel()
+                session._expiry = None
+            lost_at = session.parked_at or time.perf_counter()
+            session.parked_at = None
+
+        if not session._released.wait(takeover_timeout_s):
+            logger.warning(f"Previous connection for {recording_id} did not release the session in time")
+        session._released.clear()
+        seconds = time.perf_counter() - lost_at
+        tracing.observe("session_resume", seconds, session.service.trace)
+        with self._lock:
+            self._metrics["resumes"] += 1
+            self._metrics["resume_seconds_total"] += seconds
+            self._metrics["resume_seconds_max"] = max(self._metrics["resume_seconds_max"], seconds)
+        return session
+
+    def count_chunks(self, duplicate: int = 0, missing: int = 0):
+        with self._lock:
+            self._metrics["duplicate_chunks_dropped"] += duplicate
+            self._metrics["missing_chunks"] += missing
+
+    def count_refused(self):
+        with self._lock:
+            self._metrics["refused"] += 1
+
+    def park(self, session: LiveSession, ws):
+        """
+        Detaches a dropped client; the session is finished if it is not resumed
+        within the grace period. Does nothing if another handler took it over.
+        """
+        with self._lock:
+            if session.ws is ws:
+                session.ws = None
+                session.parked_at = time.perf_counter()
+                session.service.detach_client()
+                session._expiry = threading.Timer(self._grace_s, self._expire, args=(session,))
+                session._expiry.daemon = True
+                session._expiry.start()
+                self._metrics["parks"] += 1
+            session._released.set()
+
+    def finish(self, session: LiveSession, ws):
+        """
+        Ends the session for good. Does nothing if another handler took it over.
+        """
+        if self._remove_owned(session, ws):
+            session.finish()
+
+    async def finish_async(self, session: LiveSession, ws):
+        """
+        Like `finish`, awaited on the session runtime loop.
+        """
+        if self._remove_owned(session, ws):
+            await session.finish_async()
+
+    def _remove_owned(self, session: LiveSession, ws) -> bool:
+        with self._lock:
+            if session.ws is not ws:
+                session._released.set()
+                return False
+            self._sessions.pop(session.recording_id, None)
+            return True
+
+    def expire_now(self, session: LiveSession) -> bool:
+        """
+        Finishes a parked session immediately. Returns False if it is attached.
+        """
+        if not self._remove_parked(session):
+            return False
+        session.finish()
+        return True
+
+    async def expire_now_async(self, session: LiveSession) -> bool:
+        """
+        Like `expire_now`, awaited on the session runtime loop.
+        """
+        if not self._remove_parked(session):
+            return False
+        await session.finish_async()
+        return True
+
+    def _remove_parked(self, session: LiveSession) -> bool:
+        with self._lock:
+            if session.ws is not None or self._sessions.get(session.recording_id) is not session:
+                return False
+            if session._expiry:
+                session._expiry.cancel()
+                session._expiry = None
+            self._sessions.pop(session.recording_id)
+            return True
+
+    def _expire(self, session: LiveSession):
+        with self._lock:
+            if session.ws is not None or self._sessions.get(session.recording_id) is not session:
+                return
+            self._sessions.pop(session.recording_id)
+            self._metrics["expired"] += 1
+        logger.info(f"Session for {session.recording_id} was not resumed in time; finishing it")
+        try:
+            session.finish()
+        except Exception as e:
+            logger.error(f"Error finishing expired session {session.recording_id}: {e}")
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["live"] = len(self._sessions)
+            metrics["parked"] = sum(1 for s in self._sessions.values() if s.ws is None)
+        return metrics
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_session_registry(config) -> SessionRegistry:
+    """
+    Returns the process-wide session registry.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionRegistry(config['SESSION_RESUME_GRACE_S'])
+        return _registry
@@ -0,0 +1,437 @@
+# server/services/session_runtime.py
+import asyncio
+import threading
+import time
+import weakref
+import logging
+
+logger = logging.getLogger(__name__)
+
+# What a channel does with new audio once its queued bytes reach the high watermark
+OVERLOAD_BLOCK = "block"    # stop reading from the client until below the low watermark (TCP backpressure)
+OVERLOAD_DROP = "drop"      # discard chunks until below the low watermark, counting them
+OVERLOAD_SIGNAL = "signal"  # ask the client to pause, and block only at twice the high watermark
+OVERLOAD_POLICIES = (OVERLOAD_BLOCK, OVERLOAD_DROP, OVERLOAD_SIGNAL)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "overload_events": 0,
+    "chunks_dropped": 0,
+    "bytes_dropped": 0,
+    "producer_blocked_seconds_total": 0.0,
+}
+
+def _count(name: str, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+async def _run_in_app_context(app, coro):
+    """
+    Awaits a coroutine inside a Flask application context.
+    Tasks spawned by the coroutine inherit the context as well.
+    """
+    if app is None:
+        return await coro
+    with app.app_context():
+        return await coro
+
+class SessionRuntime:
+    """
+    A long-lived asyncio event loop running on a dedicated thread.
+
+    All transcription sessions of a worker process share this loop, so the
+    STT socket, its listen loop and outbound client sends stay alive for the
+    whole session instead of being bound to a throwaway `asyncio.run()` loop.
+
+    Given `loop`, the runtime adopts that already running loop instead of
+    starting its own: in the ASGI serving mode the server's loop runs the
+    client connections and the sessions alike.
+    """
+    def __init__(self, name: str = "transcription-runtime", loop: asyncio.AbstractEventLoop = None):
+        self._channels = weakref.WeakSet()
+        if loop is not None:
+            self._loop = loop
+            self._thread = None
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro, app=None):
+        """
+        Schedules a coroutine on the runtime loop from any thread.
+        Returns a concurrent.futures.Future for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(_run_in_app_context(app, coro), self._loop)
+
+    def run(self, coro, app=None, timeout: float = None):
+        """
+        Schedules a coroutine on the runtime loop and blocks until it completes.
+        Must not be called on the runtime loop.
+        """
+        if self.on_loop():
+            coro.close()
+            raise RuntimeError("SessionRuntime.run() would block the runtime loop")
+        return self.submit(coro, app).result(timeout)
+
+    def on_loop(self) -> bool:
+        """
+        True if called from a coroutine running on the runtime loop.
+        """
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def open_channel(self, handler, maxsize: int, app=None, high_watermark_bytes: int = 0,
+                     low_watermark_bytes: int = 0, policy: str = OVERLOAD_BLOCK, on_overload=None) -> "AudioChannel":
+        """
+        Creates a bounded channel whose items are delivered, in order, to `handler`
+        on the runtime loop. See `AudioChannel` for the watermark options.
+        """
+        channel = AudioChannel(self, handler, maxsize, app, high_watermark_bytes,
+                               low_watermark_bytes, policy, on_overload)
+        self._channels.add(channel)
+        return channel
+
+    def open_async_channel(self, handler, maxsize: int, app=None, high_watermark_bytes: int = 0,
+                           low_watermark_bytes: int = 0, policy: str = OVERLOAD_BLOCK,
+                           on_overload=None) -> "LoopAudioChannel":
+        """
+        Like `open_channel`, for producers running on the runtime loop itself.
+        Must be called on the runtime loop.
+        """
+        channel = LoopAudioChannel(self, handler, maxsize, app, high_watermark_bytes,
+                                   low_watermark_bytes, policy, on_overload)
+        self._channels.add(channel)
+        return channel
+
+    def buffered_bytes(self) -> int:
+        """
+        Bytes queued across all open channels.
+        """
+        return sum(c.queued_bytes for c in list(self._channels) if not c.closed)
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the number of open channels, the items and bytes queued across
+        them and the overload counters of this process.
+        """
+        channels = [c for c in list(self._channels) if not c.closed]
+        with _metrics_lock:
+            metrics = dict(_metrics)
+        metrics["channels_open"] = len(channels)
+        metrics["channel_queue_depth"] = sum(c.depth for c in channels)
+        metrics["channel_queue_bytes"] = sum(c.queued_bytes for c in channels)
+        return metrics
+
+    def shutdown(self, timeout: float = 5.0):
+        """
+        Stops the event loop and joins the runtime thread. An adopted loop
+        belongs to its server and is left alone.
+        """
+        if self._thread is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+class AudioChannel:
+    """
+    A thread-safe bounded queue feeding a single consumer task on the runtime loop.
+
+    The producer (the blocking WebSocket handler thread) waits for a free slot
+    when the queue is full; a slot is only released once the consumer has
+    finished processing the item, so at most `maxsize` chunks are in flight.
+
+    With `high_watermark_bytes` set, queued bytes are bounded too. Reaching the
+    high watermark applies the overload `policy` until the consumer has worked
+    the queue down to `low_watermark_bytes`; `on_overload(True/False)` is called
+    (from either thread) when that episode starts and ends.
+    """
+    _CLOSE = object()
+
+    def __init__(self, runtime: SessionRuntime, handler, maxsize: int, app=None, high_watermark_bytes: int = 0,
+                 low_watermark_bytes: int = 0, policy: str = OVERLOAD_BLOCK, on_overload=None):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self._runtime = runtime
+        self._handler = handler
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._queue = asyncio.Queue()
+        self._closed = False
+        self._high = high_watermark_bytes
+        self._low = min(low_watermark_bytes, high_watermark_bytes)
+        self._policy = policy
+        self._on_overload = on_overload
+        self._cond = threading.Condition()
+        self._queued_bytes = 0
+        self._overloaded = False
+        self.dropped_chunks = 0
+        self._consumer = runtime.submit(self._consume(), app)
+
+    def put(self, item, size: int = 0, timeout: float = None) -> bool:
+        """
+        Enqueues an item of `size` bytes, blocking while the channel is full.
+        Returns False if the channel is closed, the timeout expired or the
+        item was dropped by the overload policy.
+        """
+        if self._closed:
+            return False
+        if not self._reserve(size, timeout):
+            return False
+        if not self._slots.acquire(timeout=timeout):
+            self._release(size)
+            return False
+        self._runtime.loop.call_soon_threadsafe(self._queue.put_nowait, (item, size))
+        return True
+
+    def _reserve(self, size: int, timeout: float) -> bool:
+        started_overload = False
+        try:
+            with self._cond:
+                if self._high and not self._overloaded and self._queued_bytes + size > self._high:
+                    self._overloaded = started_overload = True
+                    _count("overload_events")
+                if self._overloaded:
+                    if self._policy == OVERLOAD_DROP:
+                        if started_overload:
+                            logger.warning(f"Audio channel over {self._high} bytes; dropping chunks")
+                        self.dropped_chunks += 1
+                        _count("chunks_dropped")
+                        _count("bytes_dropped", size)
+                        return False
+                    if self._policy == OVERLOAD_BLOCK:
+                        can_proceed = lambda: not self._overloaded or self._closed
+                    else:
+                        can_proceed = lambda: self._queued_bytes + size <= 2 * self._high or self._closed
+                    if not can_proceed():
+                        waited = time.perf_counter()
+                        admitted = self._cond.wait_for(can_proceed, timeout)
+                        _count("producer_blocked_seconds_total", time.perf_counter() - waited)
+                        if not admitted or self._closed:
+                            return False
+                self._queued_bytes += size
+                return True
+        finally:
+            if started_overload and self._on_overload:
+                self._on_overload(True)
+
+    def _release(self, size: int):
+        ended_overload = False
+        with self._cond:
+            self._queued_bytes -= size
+            if self._overloaded and self._queued_bytes <= self._low:
+                self._overloaded = False
+                ended_overload = True
+            self._cond.notify_all()
+        if ended_overload and self._on_overload:
+            self._on_overload(False)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        """Items queued but not yet handled (approximate when read off the loop)."""
+        return self._queue.qsize()
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._queued_bytes
+
+    def close(self, timeout: float = None):
+        """
+        Stops accepting items and waits until every queued item has been handled.
+        """
+        if not self._closed:
+            self._closed = True
+            with self._cond:
+                self._cond.notify_all()
+            self._runtime.loop.call_soon_threadsafe(self._queue.put_nowait, self._CLOSE)
+        self._consumer.result(timeout)
+
+    async def aclose(self):
+        """
+        Like `close`, awaited on the runtime loop.
+        """
+        if not self._closed:
+            self._closed = True
+            with self._cond:
+                self._cond.notify_all()
+            self._queue.put_nowait(self._CLOSE)
+        await asyncio.wrap_future(self._consumer)
+
+    async def _consume(self):
+        while True:
+            entry = await self._queue.get()
+            if entry is self._CLOSE:
+                break
+            item, size = entry
+            try:
+                await self._handler(item)
+            except Exception as e:
+                logger.error(f"Error handling queued item: {e}")
+            finally:
+                self._slots.release()
+                self._release(size)
+
+class LoopAudioChannel:
+    """
+    The AudioChannel counterpart for producers that run on the runtime loop
+    itself, as the ASGI connection handlers do.
+
+    `put` is a coroutine: waiting for a slot or for the queue to drain below
+    the low watermark suspends the producer instead of blocking a thread.
+    Items are handled in order by a single consumer task, with the same slot,
+    watermark and overload policy semantics as AudioChannel. Apart from
+    `close`, every method must be called on the runtime loop.
+    """
+    _CLOSE = object()
+
+    def __init__(self, runtime: SessionRuntime, handler, maxsize: int, app=None, high_watermark_bytes: int = 0,
+                 low_watermark_bytes: int = 0, policy: str = OVERLOAD_BLOCK, on_overload=None):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self._runtime = runtime
+        self._handler = handler
+        self._slots = asyncio.Semaphore(maxsize)
+        self._queue = asyncio.Queue()
+        self._closed = False
+        self._high = high_watermark_bytes
+        self._low = min(low_watermark_bytes, high_watermark_bytes)
+        self._policy = policy
+        self._on_overload = on_overload
+        self._drained = asyncio.Condition()
+        self._queued_bytes = 0
+        self._overloaded = False
+        self.dropped_chunks = 0
+        self._consumer = runtime.submit(self._consume(), app)
+
+    async def put(self, item, size: int = 0) -> bool:
+        """
+        Enqueues an item of `size` bytes, waiting while the channel is full.
+        Returns False if the channel is closed or the item was dropped by the
+        overload policy.
+        """
+        if self._closed:
+            return False
+        if self._high and not self._overloaded and self._queued_bytes + size > self._high:
+            self._overloaded = True
+            _count("overload_events")
+            if self._policy == OVERLOAD_DROP:
+                logger.warning(f"Audio channel over {self._high} bytes; dropping chunks")
+            if self._on_overload:
+                self._on_overload(True)
+        if self._overloaded:
+            if self._policy == OVERLOAD_DROP:
+                self.dropped_chunks += 1
+                _count("chunks_dropped")
+                _count("bytes_dropped", size)
+                return False
+            if self._policy == OVERLOAD_BLOCK:
+                can_proceed = lambda: not self._overloaded or self._closed
+            else:
+                can_proceed = lambda: self._queued_bytes + size <= 2 * self._high or self._closed
+            if not can_proceed():
+                waited = time.perf_counter()
+                async with self._drained:
+                    await self._drained.wait_for(can_proceed)
+                _count("producer_blocked_seconds_total", time.perf_counter() - waited)
+                if self._closed:
+                    return False
+        self._queued_bytes += size
+        await self._slots.acquire()
+        self._queue.put_nowait((item, size))
+        return True
+
+    async def _release(self, size: int):
+        self._queued_bytes -= size
+        ended_overload = self._overloaded and self._queued_bytes <= self._low
+        if ended_overload:
+            self._overloaded = False
+        self._slots.release()
+        async with self._drained:
+            self._drained.notify_all()
+        if ended_overload and self._on_overload:
+            self._on_overload(False)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        """Items queued but not yet handled."""
+        return self._queue.qsize()
+
+    @property
+    def queued_bytes(self) -> int:
+        return self._queued_bytes
+
+    def close(self, timeout: float = None):
+        """
+        Stops accepting items and waits until every queued item has been
+        handled. Blocks; for threads other than the runtime loop's.
+        """
+        asyncio.run_coroutine_threadsafe(self.aclose(), self._runtime.loop).result(timeout)
+
+    async def aclose(self):
+        """
+        Stops accepting items and waits until every queued item has been handled.
+        """
+        if not self._closed:
+            self._closed = True
+            async with self._drained:
+                self._drained.notify_all()
+            self._queue.put_nowait(self._CLOSE)
+        await asyncio.wrap_future(self._consumer)
+
+    async def _consume(self):
+        while True:
+            entry = await self._queue.get()
+            if entry is self._CLOSE:
+                break
+            item, size = entry
+            try:
+                await self._handler(item)
+            except Exception as e:
+                logger.error(f"Error handling queued item: {e}")
+            finally:
+                await self._release(size)
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def get_runtime() -> SessionRuntime:
+    """
+    Returns the process-wide session runtime, starting it on first use.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = SessionRuntime()
+        return _runtime
+
+def adopt_runtime_loop(loop: asyncio.AbstractEventLoop) -> SessionRuntime:
+    """
+    Makes `loop`, the running loop of an asyncio server, the process-wide
+    session runtime. Must be called before anything uses `get_runtime()`.
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None and _runtime.loop is not loop:
+            raise RuntimeError("The session runtime already runs on another loop")
+        if _runtime is None:
+            _runtime = SessionRuntime(loop=loop)
+        return _runtime
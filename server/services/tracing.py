@@ -0,0 +1,103 @@
+# server/services/tracing.py
+"""
+Latency tracing for the transcription hot path.
+
+Each stage a chunk or result goes through is timed into a process-wide
+histogram (exported on /metrics) and into the session's own `SessionTrace`.
+A sampled fraction of sessions also keep a bounded event log that is written
+to TRACE_DIR as JSON when the session ends.
+"""
+import json
+import os
+import random
+import time
+import logging
+from collections import deque
+from ..utils.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+STAGES = {
+    "audio_queue_wait": "Chunk received on the WebSocket until handled on the session loop",
+    "audio_buffer_age": "Oldest buffered audio byte's age when the writer flushed it",
+    "audio_write": "Disk write of one coalesced audio buffer",
+    "audio_sink_wait": "Time a chunk waited for the audio writer to drain a full file buffer",
+    "stt_connect": "Obtaining a session's STT connection (pool checkout or new handshake)",
+    "pcm_preprocess": "Resampling and silence detection of one raw PCM chunk",
+    "stt_send": "Sending one audio chunk to the STT provider",
+    "first_transcript": "First audio chunk received until the first transcript result arrived",
+    "stt_interim_lag": "Audio end of an interim result until it arrived, assuming real-time upload",
+    "stt_final_lag": "Audio end of a final result until it arrived, assuming real-time upload",
+    "segment_flush": "One batched segment write to MongoDB",
+    "segment_persist_delay": "Final result received until its segment was persisted",
+    "client_send": "Sending one message to the client WebSocket",
+    "interim_delivery": "Interim result received until sent to the client",
+    "final_delivery": "Final result received until sent to the client",
+    "session_resume": "Client connection lost until the session was resumed",
+}
+
+_stage_histograms = {stage: Histogram() for stage in STAGES}
+
+def observe(stage: str, seconds: float, trace: "SessionTrace" = None):
+    """
+    Records a stage duration process-wide and, if given, in a session's trace.
+    """
+    _stage_histograms[stage].observe(seconds)
+    if trace is not None:
+        trace.observe(stage, seconds)
+
+def get_stage_histograms() -> dict:
+    return _stage_histograms
+
+class SessionTrace:
+    """
+    Per-session stage histograms, plus an event log when the session is sampled.
+    """
+    def __init__(self, recording_id: str, sampled: bool = False, max_events: int = 10000):
+        self.recording_id = recording_id
+        self.sampled = sampled
+        self._started = time.perf_counter()
+        self._histograms = {}
+        self._events = deque(maxlen=max_events) if sampled else None
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = Histogram()
+        histogram.observe(seconds)
+        if self._events is not None:
+            self._events.append((round(time.perf_counter() - self._started, 6), stage, round(seconds, 6)))
+
+    def summary(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in self._histograms.items()}
+
+    def dump(self, directory: str):
+        """
+        Writes the session's stage summary and event log as JSON, if sampled.
+        """
+        if not self.sampled:
+            return None
+        path = os.path.join(directory, f"{self.recording_id}.trace.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({
+                    "recordingId": self.recording_id,
+                    "durationS": round(time.perf_counter() - self._started, 3),
+                    "stages": self.summary(),
+                    "events": [{"t": t, "stage": stage, "s": s} for t, stage, s in self._events],
+                }, f)
+            return path
+        except OSError as e:
+            logger.error(f"Could not write trace for {self.recording_id}: {e}")
+            return None
+
+def start_session_trace(recording_id: str, config) -> SessionTrace:
+    """
+    Creates a session's trace, sampling it for a dump with TRACE_SAMPLE_RATE.
+    """
+    return SessionTrace(
+        recording_id,
+        sampled=random.random() < config['TRACE_SAMPLE_RATE'],
+        max_events=config['TRACE_MAX_EVENTS']
+    )
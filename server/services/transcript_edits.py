@@ -0,0 +1,370 @@
+# server/services/transcript_edits.py
+"""
+Batched word-level edits to a stored transcript, for PATCH /api/recordings/<id>.
+
+A batch names the recording version it was made against and a list of token
+operations addressing words by segment index and word id:
+
+    {"version": 3, "ops": [
+        {"op": "insert",  "segment": 4, "after": "word_2", "texts": ["new", "words"]},
+        {"op": "replace", "segment": 4, "wordId": "word_5", "text": "fixed"},
+        {"op": "delete",  "segment": 4, "segmentId": "665f...", "wordId": "word_6"},
+        {"op": "split",   "segment": 4, "wordId": "word_7", "texts": ["in", "to"]},
+        {"op": "merge",   "segment": 4, "wordIds": ["word_8", "word_9"], "text": "into"}
+    ]}
+
+A segment index holds one document per final result, and each numbers its
+words from `word_0`, so an op may add `"segmentId"` (the document's `_id`)
+to say which final it means; a word id found in several finals of the
+segment is rejected without it.
+
+`"after": null` inserts at the start of the segment (or of the `segmentId`
+document); inserted and split words may carry client-chosen `"ids"`,
+otherwise ids are assigned. The first id of a split is the split word's
+own, which its first part keeps. Operations apply
+in order, so later ones may refer to words added by earlier ones. Edited words
+are marked untrusted. Split words share the original word's span; inserted
+words are timed in one vectorized pass per segment once all operations are
+applied, from the gap between the timed words around them. Only the
+edited segment documents are written, and the batch is rejected with a
+conflict if the recording's version moved on.
+"""
+import itertools
+import numpy as np
+from ..models import recording_model
+
+OP_INSERT = "insert"
+OP_REPLACE = "replace"
+OP_DELETE = "delete"
+OP_SPLIT = "split"
+OP_MERGE = "merge"
+OPS = (OP_INSERT, OP_REPLACE, OP_DELETE, OP_SPLIT, OP_MERGE)
+
+# Shortest duration a re-timed word gets before its neighbours are trimmed to make room
+MIN_WORD_S = 0.08
+
+class EditError(ValueError):
+    """An operation that is malformed or refers to a word that does not exist."""
+    def __init__(self, op_index: int, message: str):
+        super().__init__(f"op {op_index}: {message}")
+        self.op_index = op_index
+
+class RecordingInProgress(Exception):
+    """The recording is still being transcribed; its transcript cannot be edited yet."""
+
+class VersionConflict(Exception):
+    """The recording was edited since the version the batch was made against."""
+    def __init__(self, current_version: int):
+        super().__init__(f"Recording is at version {current_version}")
+        self.current_version = current_version
+
+def retime_words(starts, ends, weights, seg_start: float, seg_end: float, min_word_s: float = MIN_WORD_S):
+    """
+    Fills in the NaN entries of `starts`/`ends` (float arrays, changed in place).
+
+    Each run of untimed words shares the gap between the timed words around it
+    (or the segment bounds) in proportion to `weights`, their character counts.
+    A gap too short for its run is widened to the midpoints of the neighbouring
+    words, which are trimmed to make room.
+    """
+    n = len(starts)
+    untimed = np.isnan(starts) | np.isnan(ends)
+    if not untimed.any():
+        return starts, ends
+    index = np.arange(n)
+    left = np.maximum.accumulate(np.where(untimed, -1, index))
+    right = np.minimum.accumulate(np.where(untimed, n, index)[::-1])[::-1]
+    run_first = np.flatnonzero(untimed & ~np.concatenate(([False], untimed[:-1])))
+    run_left, run_right = left[run_first], right[run_first]
+    has_left, has_right = run_left >= 0, run_right < n
+    anchor_left, anchor_right = np.maximum(run_left, 0), np.minimum(run_right, n - 1)
+
+    lo = np.where(has_left, ends[anchor_left], seg_start)
+    hi = np.where(has_right, starts[anchor_right], seg_end)
+    run_id = np.searchsorted(run_first, index, side="right") - 1
+    counts = np.bincount(run_id[untimed], minlength=len(run_first))
+    short = hi - lo < min_word_s * counts
+    if short.any():
+        lo = np.where(short & has_left, np.minimum(lo, (starts[anchor_left] + ends[anchor_left]) / 2), lo)
+        hi = np.where(short & has_right, np.maximum(hi, (starts[anchor_right] + ends[anchor_right]) / 2), hi)
+        ends[run_left[short & has_left]] = lo[short & has_left]
+        starts[run_right[short & has_right]] = hi[short & has_right]
+    hi = np.maximum(hi, lo)
+
+    weight = np.where(untimed, np.maximum(weights, 1), 0).astype(np.float64)
+    cumulative = np.cumsum(weight)
+    before = cumulative - weight
+    base = before[run_first]
+    total = cumulative[np.where(has_right, run_right, n) - 1] - base
+    rid = run_id[untimed]
+    span = (hi - lo)[rid]
+    starts[untimed] = np.round(lo[rid] + span * (before[untimed] - base[rid]) / total[rid], 3)
+    ends[untimed] = np.round(lo[rid] + span * (cumulative[untimed] - base[rid]) / total[rid], 3)
+    return starts, ends
+
+class _Node:
+    __slots__ = ("word", "doc", "prev", "next")
+
+    def __init__(self, word: dict, doc: int):
+        self.word = word
+        self.doc = doc
+        self.prev = None
+        self.next = None
+
+class _SegmentEditor:
+    """
+    The words of one segment index as a linked list, so each operation costs
+    O(words it touches). Several documents may share a segment index (one
+    per final result), so a word id maps to every node carrying it.
+    """
+    def __init__(self, docs: list):
+        self.docs = docs
+        self.head = _Node(None, 0)
+        self.by_id = {}
+        self.doc_by_segment_id = {str(doc["_id"]): doc_index for doc_index, doc in enumerate(docs)}
+        tail = self.head
+        for doc_index, doc in enumerate(docs):
+            for word in doc["words"]:
+                node = _Node(dict(word), doc_index)
+                self._link_after(tail, node)
+                self.by_id.setdefault(word["id"], []).append(node)
+                tail = node
+
+    @staticmethod
+    def _link_after(anchor: _Node, node: _Node):
+        node.prev, node.next = anchor, anchor.next
+        if anchor.next:
+            anchor.next.prev = node
+        anchor.next = node
+
+    def unlink(self, node: _Node):
+        node.prev.next = node.next
+        if node.next:
+            node.next.prev = node.prev
+        nodes = self.by_id[node.word["id"]]
+        nodes.remove(node)
+        if not nodes:
+            del self.by_id[node.word["id"]]
+
+    def doc(self, op_index: int, op: dict):
+        """
+        The document an op's `segmentId` names, or None if it names none.
+        """
+        segment_id = op.get("segmentId")
+        if segment_id is None:
+            return None
+        if segment_id not in self.doc_by_segment_id:
+            raise EditError(op_index, f"segment '{segment_id}' is not part of segment {op['segment']}")
+        return self.doc_by_segment_id[segment_id]
+
+    def node(self, op_index: int, word_id, doc: int = None) -> _Node:
+        nodes = self.by_id.get(word_id, [])
+        if doc is not None:
+            nodes = [node for node in nodes if node.doc == doc]
+        if not nodes:
+            raise EditError(op_index, f"word '{word_id}' not found")
+        if len(nodes) > 1:
+            raise EditError(op_index, f"word '{word_id}' occurs in several finals of the segment; give its 'segmentId'")
+        return nodes[0]
+
+    def doc_start(self, doc: int) -> _Node:
+        """
+        The node after which words are inserted to start document `doc`.
+        """
+        anchor = self.head
+        while anchor.next and anchor.next.doc < doc:
+            anchor = anchor.next
+        return anchor
+
+    def new_words(self, op_index: int, texts: list, ids: list, new_id) -> list:
+        if ids is None:
+            ids = [new_id() for _ in texts]
+        elif len(ids) != len(texts) or not all(isinstance(i, str) and i for i in ids):
+            raise EditError(op_index, "'ids' must be one non-empty string per text")
+        if len(set(ids)) != len(ids):
+            raise EditError(op_index, "'ids' must be distinct")
+        for word_id in ids:
+            if word_id in self.by_id:
+                raise EditError(op_index, f"word id '{word_id}' is already used")
+        return [{"id": word_id, "text": text, "start": None, "end": None, "trusted": False}
+                for word_id, text in zip(ids, texts)]
+
+    def insert_after(self, anchor: _Node, words: list, doc: int = None):
+        doc = anchor.doc if doc is None else doc
+        for word in words:
+            node = _Node(word, doc)
+            self._link_after(anchor, node)
+            self.by_id.setdefault(word["id"], []).append(node)
+            anchor = node
+
+    def nodes(self) -> list:
+        node, nodes = self.head.next, []
+        while node:
+            nodes.append(node)
+            node = node.next
+        return nodes
+
+def _texts(op: dict, op_index: int, key: str, min_count: int = 1) -> list:
+    texts = op.get(key)
+    if not isinstance(texts, list) or len(texts) < min_count or not all(isinstance(t, str) and t.strip() for t in texts):
+        raise EditError(op_index, f"'{key}' must be a list of at least {min_count} non-empty strings")
+    return [t.strip() for t in texts]
+
+def _text(op: dict, op_index: int) -> str:
+    text = op.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise EditError(op_index, "'text' must be a non-empty string")
+    return text.strip()
+
+def _apply_op(editor: _SegmentEditor, op: dict, op_index: int, new_id):
+    kind = op["op"]
+    doc = editor.doc(op_index, op)
+    if kind == OP_INSERT:
+        after = op.get("after")
+        texts = _texts(op, op_index, "texts")
+        words = editor.new_words(op_index, texts, op.get("ids"), new_id)
+        if after is not None:
+            editor.insert_after(editor.node(op_index, after, doc), words)
+        elif doc is not None:
+            editor.insert_after(editor.doc_start(doc), words, doc)
+        else:
+            editor.insert_after(editor.head, words)
+    elif kind == OP_REPLACE:
+        word = editor.node(op_index, op.get("wordId"), doc).word
+        word["text"] = _text(op, op_index)
+        word["trusted"] = False
+    elif kind == OP_DELETE:
+        editor.unlink(editor.node(op_index, op.get("wordId"), doc))
+    elif kind == OP_SPLIT:
+        node = editor.node(op_index, op.get("wordId"), doc)
+        texts = _texts(op, op_index, "texts", min_count=2)
+        ids = op.get("ids")
+        # The first part keeps the word's id so references to it stay valid
+        if ids is not None and (not isinstance(ids, list) or not ids or ids[0] != node.word["id"]):
+            raise EditError(op_index, f"'ids' of a split must start with the split word's id '{node.word['id']}'")
+        # Checked while the word is still linked, so its id counts as used
+        parts = editor.new_words(op_index, texts[1:], ids[1:] if ids is not None else None, new_id)
+        editor.unlink(node)
+        first = {"id": node.word["id"], "text": texts[0], "start": None, "end": None, "trusted": False}
+        parts = [first] + parts
+        if node.word["start"] is not None and node.word["end"] is not None:
+            # The parts share the original word's span
+            starts, ends = retime_words(
+                np.full(len(parts), np.nan), np.full(len(parts), np.nan),
+                np.array([len(t) for t in texts], dtype=np.float64),
+                node.word["start"], node.word["end"], min_word_s=0.0
+            )
+            for part, start, end in zip(parts, starts.tolist(), ends.tolist()):
+                part["start"], part["end"] = start, end
+        editor.insert_after(node.prev, parts, node.doc)
+    elif kind == OP_MERGE:
+        word_ids = op.get("wordIds")
+        if not isinstance(word_ids, list) or len(word_ids) < 2:
+            raise EditError(op_index, "'wordIds' must list at least two adjacent words")
+        nodes = [editor.node(op_index, word_id, doc) for word_id in word_ids]
+        if any(a.next is not b for a, b in zip(nodes, nodes[1:])):
+            raise EditError(op_index, "merged words must be adjacent and in order")
+        first, last = nodes[0].word, nodes[-1].word
+        first.update(text=_text(op, op_index), end=last["end"], trusted=False)
+        if first["start"] is None or first["end"] is None:
+            first["start"] = first["end"] = None
+        for node in nodes[1:]:
+            editor.unlink(node)
+
+def validate_ops(ops) -> list:
+    """
+    Checks the shape of every operation. Raises EditError.
+    """
+    if not isinstance(ops, list) or not ops:
+        raise EditError(0, "'ops' must be a non-empty list")
+    for op_index, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get("op") not in OPS:
+            raise EditError(op_index, f"'op' must be one of {', '.join(OPS)}")
+        if not isinstance(op.get("segment"), int) or isinstance(op.get("segment"), bool):
+            raise EditError(op_index, "'segment' must be a segment index")
+        if "segmentId" in op and not isinstance(op["segmentId"], str):
+            raise EditError(op_index, "'segmentId' must be a segment document id")
+    return ops
+
+def apply_ops(segments: list, ops: list, id_prefix: str) -> list:
+    """
+    Applies validated operations to segment documents (with plain word lists,
+    sorted by index and _id), times untimed words and returns the documents
+    whose words changed, with new 'words' and 'text'. New word ids are
+    `<id_prefix><n>`. Raises EditError.
+    """
+    docs_by_index = {}
+    for seg in segments:
+        docs_by_index.setdefault(seg["index"], []).append(seg)
+    editors = {}
+    counter = itertools.count()
+
+    def new_id():
+        return f"{id_prefix}{next(counter)}"
+
+    for op_index, op in enumerate(ops):
+        index = op["segment"]
+        if index not in editors:
+            if index not in docs_by_index:
+                raise EditError(op_index, f"segment {index} not found")
+            editors[index] = _SegmentEditor(docs_by_index[index])
+        _apply_op(editors[index], op, op_index, new_id)
+
+    changed = []
+    for editor in editors.values():
+        nodes = editor.nodes()
+        words = [node.word for node in nodes]
+        if any(w["start"] is None or w["end"] is None for w in words):
+            starts = np.array([np.nan if w["start"] is None else w["start"] for w in words], dtype=np.float64)
+            ends = np.array([np.nan if w["end"] is None else w["end"] for w in words], dtype=np.float64)
+            weights = np.fromiter((len(w["text"]) for w in words), dtype=np.float64, count=len(words))
+            seg_start = min(doc["start"] for doc in editor.docs)
+            seg_end = max(doc["end"] for doc in editor.docs)
+            retime_words(starts, ends, weights, seg_start, seg_end)
+            for word, start, end in zip(words, starts.tolist(), ends.tolist()):
+                word["start"], word["end"] = start, end
+        by_doc = [[] for _ in editor.docs]
+        for node in nodes:
+            by_doc[node.doc].append(node.word)
+        for doc, doc_words in zip(editor.docs, by_doc):
+            if doc_words != doc["words"]:
+                changed.append({**doc, "words": doc_words, "text": " ".join(w["text"] for w in doc_words)})
+    return changed
+
+def edit_transcript(recording_id: str, expected_version: int, ops: list):
+    """
+    Applies a batch of operations to a recording's stored transcript.
+    Returns {"version", "segments"} with the edited segments, or None if the
+    recording does not exist. Raises EditError, VersionConflict or
+    RecordingInProgress.
+    """
+    validate_ops(ops)
+    recording_doc = recording_model.get_recording(recording_id, {"version": 1, "status": 1})
+    if recording_doc is None:
+        return None
+    if recording_doc.get("status") == "in_progress":
+        # Finalizing the session would overwrite the edited final text
+        raise RecordingInProgress()
+    current_version = recording_doc.get("version", 0)
+    if current_version != expected_version:
+        raise VersionConflict(current_version)
+
+    segments = recording_model.find_segments_by_index(recording_id, {op["segment"] for op in ops})
+    changed = apply_ops(segments, ops, id_prefix=f"word_v{expected_version + 1}_")
+
+    # Claiming the version serializes batches; a concurrent batch loses here.
+    # The segment writes are guarded by the version each segment was read at,
+    # so a batch that read segments before an earlier claimant wrote them
+    # cannot overwrite that edit, and a crash after the claim only skips a
+    # version number.
+    version = recording_model.claim_version(recording_id, expected_version)
+    if version is not None and changed:
+        previous = {seg["_id"]: seg for seg in segments}
+        for seg in changed:
+            seg["editVersion"] = version
+        if not recording_model.update_segment_words(recording_id, changed, version, previous):
+            version = None
+    if version is None:
+        latest = recording_model.get_recording(recording_id, {"version": 1}) or {}
+        raise VersionConflict(latest.get("version", 0))
+    return {"version": version, "segments": changed}
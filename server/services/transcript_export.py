@@ -0,0 +1,263 @@
+# server/services/transcript_export.py
+"""
+Streaming bulk export of transcripts.
+
+Recordings are read a batch at a time, with one segment cursor per batch, and
+pushed through a chain of generators: format (NDJSON lines, or SRT/WebVTT
+files packed into a tar archive), coalesce into larger chunks, optionally
+gzip. Nothing holds more than one recording's output at a time, so memory
+stays flat however many recordings are exported.
+
+- ndjson: a {"recording": ...} line followed by one {"segment": ...} line per
+  final segment, as GET /recordings/<id>?format=ndjson.
+- srt / vtt: a tar archive with one <recordingId>.srt / .vtt per recording.
+  Cues are built from word timings: a cue never spans two segments or a pause
+  longer than `max_gap_s`, lasts at most `max_duration_s` and has at most
+  `max_lines` lines of `max_line_chars` characters.
+"""
+import io
+import json
+import tarfile
+import threading
+import time
+import zlib
+
+from ..models import recording_model
+
+EXPORT_FORMATS = ("ndjson", "srt", "vtt")
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "exports": 0,
+    "recordings_exported": 0,
+    "segments_exported": 0,
+    "bytes_out": 0,
+}
+
+def get_export_metrics() -> dict:
+    """
+    Returns a snapshot of the process-wide export counters.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+def content_type(fmt: str, compress: bool) -> str:
+    if compress:
+        return "application/gzip"
+    return "application/x-ndjson" if fmt == "ndjson" else "application/x-tar"
+
+def file_extension(fmt: str, compress: bool) -> str:
+    extension = "ndjson" if fmt == "ndjson" else "tar"
+    return f"{extension}.gz" if compress else extension
+
+def cue_options(config) -> dict:
+    return {
+        "max_line_chars": config['EXPORT_CUE_MAX_LINE_CHARS'],
+        "max_lines": config['EXPORT_CUE_MAX_LINES'],
+        "max_duration_s": config['EXPORT_CUE_MAX_DURATION_S'],
+        "max_gap_s": config['EXPORT_CUE_MAX_GAP_S'],
+    }
+
+def _segment_words(seg: dict):
+    """
+    A segment's words, or its text spread evenly over the segment when it has no word timings.
+    """
+    words = seg.get("words")
+    if words:
+        return words
+    texts = (seg.get("text") or "").split()
+    start, end = seg.get("start") or 0.0, seg.get("end") or 0.0
+    step = (end - start) / max(len(texts), 1)
+    return [{"text": text, "start": start + i * step, "end": start + (i + 1) * step} for i, text in enumerate(texts)]
+
+def build_cues(segments, max_line_chars: int = 42, max_lines: int = 2, max_duration_s: float = 6.0,
+               max_gap_s: float = 1.5):
+    """
+    Yields (start, end, lines) caption cues from segments' word timings.
+    A word longer than a line gets a line of its own.
+    """
+    lines, line, start, end = [], "", None, None
+    for seg in segments:
+        new_segment = True
+        for word in _segment_words(seg):
+            text = (word.get("text") or "").strip()
+            if not text:
+                continue
+            if start is not None and (new_segment or word["start"] - end > max_gap_s
+                                      or word["end"] - start > max_duration_s):
+                yield start, end, lines + [line]
+                lines, line, start = [], "", None
+            if line and len(line) + 1 + len(text) > max_line_chars:
+                if len(lines) + 1 >= max_lines:
+                    yield start, end, lines + [line]
+                    lines, line, start = [], "", None
+                else:
+                    lines.append(line)
+                    line = ""
+            line = f"{line} {text}" if line else text
+            if start is None:
+                start, end = word["start"], word["end"]
+            end = max(end, word["end"])
+            new_segment = False
+    if start is not None:
+        yield start, end, lines + [line]
+
+def format_timestamp(seconds: float, decimal_marker: str) -> str:
+    ms = max(0, int(round(seconds * 1000)))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{ms:03d}"
+
+def srt_document(cues) -> str:
+    parts = []
+    for number, (start, end, lines) in enumerate(cues, 1):
+        parts.append(f"{number}\n{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+                     + "\n".join(lines) + "\n\n")
+    return "".join(parts)
+
+def _vtt_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def vtt_document(cues) -> str:
+    parts = ["WEBVTT\n\n"]
+    for start, end, lines in cues:
+        parts.append(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n"
+                     + "\n".join(_vtt_escape(line) for line in lines) + "\n\n")
+    return "".join(parts)
+
+def _dumps(key: str, doc: dict) -> str:
+    return json.dumps({key: recording_model.serialize_document(doc)}, separators=(",", ":"), default=str) + "\n"
+
+def iter_ndjson(recordings):
+    """
+    Yields NDJSON lines for (recording, segments) pairs.
+    """
+    for recording, segments in recordings:
+        yield _dumps("recording", recording)
+        for seg in segments:
+            yield _dumps("segment", seg)
+
+class _ChunkSink:
+    """
+    A write-only file object that collects what tarfile writes, for draining.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_caption_tar(recordings, fmt: str, options: dict):
+    """
+    Yields a tar archive holding one caption file per (recording, segments) pair.
+    """
+    render = srt_document if fmt == "srt" else vtt_document
+    sink = _ChunkSink()
+    with tarfile.open(fileobj=sink, mode="w|", format=tarfile.PAX_FORMAT) as archive:
+        for recording, segments in recordings:
+            data = render(build_cues(segments, **options)).encode()
+            info = tarfile.TarInfo(f"{recording['_id']}.{fmt}")
+            info.size = len(data)
+            created = recording.get("createdAt")
+            info.mtime = created.timestamp() if created else time.time()
+            archive.addfile(info, io.BytesIO(data))
+            yield sink.drain()
+    yield sink.drain()
+
+def coalesce(chunks, chunk_bytes: int):
+    """
+    Joins small str/bytes chunks into bytes chunks of about `chunk_bytes`.
+    """
+    pending, size = [], 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= chunk_bytes:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+def gzip_stream(chunks, level: int):
+    """
+    Gzips a stream of bytes chunks on the fly.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def _counted(chunks):
+    for chunk in chunks:
+        with _metrics_lock:
+            _metrics["bytes_out"] += len(chunk)
+        yield chunk
+
+def iter_selected(selection: dict, batch_size: int):
+    """
+    Yields (recording, segments) for the recordings in `selection`: either
+    {"recording_ids": [...]} or list_recordings filters with a "user_id".
+    Recordings are read `batch_size` at a time, and each batch's final
+    segments come from one cursor; the segments of a recording are a list.
+    """
+    if "recording_ids" in selection:
+        ids = selection["recording_ids"]
+        batches = (recording_model.find_recordings(ids[i:i + batch_size]) for i in range(0, len(ids), batch_size))
+    else:
+        filters = dict(selection)
+        recordings = recording_model.iter_recordings(filters.pop("user_id"), batch_size=batch_size, **filters)
+        batches = _batched(recordings, batch_size)
+
+    for batch in batches:
+        # Segments arrive sorted by recordingId, so walk the batch in the same order
+        batch.sort(key=lambda doc: doc["_id"])
+        segments = recording_model.iter_final_segments([doc["_id"] for doc in batch])
+        seg = next(segments, None)
+        for recording in batch:
+            recording_segments = []
+            while seg is not None and seg["recordingId"] == recording["_id"]:
+                recording_segments.append(seg)
+                seg = next(segments, None)
+            with _metrics_lock:
+                _metrics["recordings_exported"] += 1
+                _metrics["segments_exported"] += len(recording_segments)
+            yield recording, recording_segments
+
+def _batched(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def export_stream(recordings, fmt: str, compress: bool, config):
+    """
+    Returns a generator of bytes chunks exporting (recording, segments) pairs
+    in `fmt`, gzipped if `compress`.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    with _metrics_lock:
+        _metrics["exports"] += 1
+    if fmt == "ndjson":
+        chunks = iter_ndjson(recordings)
+    else:
+        chunks = iter_caption_tar(recordings, fmt, cue_options(config))
+    chunks = coalesce(chunks, config['EXPORT_CHUNK_BYTES'])
+    if compress:
+        chunks = gzip_stream(chunks, config['EXPORT_GZIP_LEVEL'])
+    return _counted(chunks)
@@ -0,0 +1,126 @@
+# server/services/transcript_protocol.py
+"""
+Wire formats for transcript updates sent over `/ws/transcription`.
+
+The client picks a protocol in its init message:
+
+    {"recordingId": "...", "protocol": 2, "encoding": "msgpack"}
+
+Protocol 1 (the default) sends every result as a full `transcript_update`
+JSON frame. Protocol 2 sends `transcript_delta` frames holding only the
+word-level changes to the current segment since the last frame:
+
+    {"type": "transcript_delta", "s": <segmentIndex>, "ops": [...], "sf": true}
+
+    ["i", pos, words]            insert words at position pos
+    ["r", pos, count, words]     replace `count` words starting at pos
+    ["f", upto]                  words [0, upto) of the segment are final
+
+Words are [text, startMs, endMs] with integer milliseconds; a word's id is its
+position in the segment. "sf" marks the end of the segment (speech_final).
+Protocol 2 frames are JSON text, or binary MessagePack frames when the client
+asks for `"encoding": "msgpack"` and the msgpack package is installed.
+Control messages (errors, session_ended) are always JSON text.
+"""
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, only needed for binary frames
+    msgpack = None
+
+PROTOCOL_FULL = 1
+PROTOCOL_DELTA = 2
+SUPPORTED_PROTOCOLS = (PROTOCOL_FULL, PROTOCOL_DELTA)
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+def negotiate(init_data: dict):
+    """
+    Returns the (protocol, encoding) to use for a client's init message:
+    the highest supported protocol not above the requested one, and MessagePack
+    only if requested and available.
+    """
+    try:
+        requested = int(init_data.get('protocol', PROTOCOL_FULL))
+    except (TypeError, ValueError):
+        requested = PROTOCOL_FULL
+    protocol = max([p for p in SUPPORTED_PROTOCOLS if p <= requested] or [PROTOCOL_FULL])
+    encoding = ENCODING_JSON
+    if protocol >= PROTOCOL_DELTA and init_data.get('encoding') == ENCODING_MSGPACK and msgpack is not None:
+        encoding = ENCODING_MSGPACK
+    return protocol, encoding
+
+def _ms(seconds: float) -> int:
+    return round(seconds * 1000)
+
+class FullUpdateEncoder:
+    """
+    Protocol 1: every update as the complete JSON payload.
+    """
+    def encode(self, payload: dict) -> str:
+        return json.dumps(payload)
+
+class DeltaUpdateEncoder:
+    """
+    Protocol 2: word-level deltas against what the client was last sent.
+
+    A segment's words are the words of its finals so far followed by the tail of
+    the latest result, which each new interim or final replaces. Only the part of
+    the tail that differs from the previous frame is sent. Encoding happens when
+    a frame is actually sent, so interims dropped before delivery never become
+    part of the client's state.
+    """
+    def __init__(self, encoding: str = ENCODING_JSON):
+        if encoding == ENCODING_MSGPACK and msgpack is None:
+            raise ValueError("MessagePack encoding requires the msgpack package")
+        self._encoding = encoding
+        self._segment = None
+        self._words = []
+        self._final_count = 0
+
+    def encode(self, payload: dict):
+        """
+        Returns the frame (str or bytes) for a transcript payload, or None if it
+        changes nothing the client doesn't already have.
+        """
+        segment = payload['segmentIndex']
+        if segment != self._segment:
+            self._segment = segment
+            self._words = []
+            self._final_count = 0
+
+        tail = [(w['text'], _ms(w['start']), _ms(w['end'])) for w in payload['words']]
+        old_tail = self._words[self._final_count:]
+        common = 0
+        for old, new in zip(old_tail, tail):
+            if old != new:
+                break
+            common += 1
+
+        ops = []
+        position = self._final_count + common
+        if common < len(old_tail):
+            ops.append(["r", position, len(old_tail) - common, [list(w) for w in tail[common:]]])
+        elif common < len(tail):
+            ops.append(["i", position, [list(w) for w in tail[common:]]])
+        self._words = self._words[:self._final_count] + tail
+        if payload['is_final']:
+            self._final_count = len(self._words)
+            ops.append(["f", self._final_count])
+
+        speech_final = payload.get('speech_final', False)
+        if not ops and not speech_final:
+            return None
+        frame = {"type": "transcript_delta", "s": segment, "ops": ops}
+        if speech_final:
+            frame["sf"] = True
+        if self._encoding == ENCODING_MSGPACK:
+            return msgpack.packb(frame)
+        return json.dumps(frame, separators=(",", ":"))
+
+def create_encoder(protocol: int, encoding: str = ENCODING_JSON):
+    if protocol == PROTOCOL_DELTA:
+        return DeltaUpdateEncoder(encoding)
+    return FullUpdateEncoder()
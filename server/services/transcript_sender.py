@@ -0,0 +1,147 @@
+# server/services/transcript_sender.py
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "interims_received": 0,
+    "interims_sent": 0,
+    "interims_coalesced": 0,
+    "interims_dropped": 0,
+    "interim_latency_seconds_total": 0.0,
+    "interim_latency_seconds_max": 0.0,
+    "finals_sent": 0,
+    "final_latency_seconds_total": 0.0,
+    "final_latency_seconds_max": 0.0,
+}
+
+def get_transcript_delivery_metrics() -> dict:
+    """
+    Returns a snapshot of the process-wide transcript delivery counters.
+    Latencies run from the STT result arriving to the client send completing.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+def _count(name: str):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+def _record_sent(kind: str, latency: float):
+    with _metrics_lock:
+        _metrics[f"{kind}s_sent"] += 1
+        _metrics[f"{kind}_latency_seconds_total"] += latency
+        _metrics[f"{kind}_latency_seconds_max"] = max(_metrics[f"{kind}_latency_seconds_max"], latency)
+
+class TranscriptSender:
+    """
+    Delivers a session's transcript messages to the client from a single task.
+
+    Ordered messages (finals) are always delivered, in order. Interims are
+    latest-wins: a pending interim is replaced by a newer one, dropped when a
+    final arrives before it was sent, and at most one is sent per
+    `interim_interval_s`.
+
+    Payloads are encoded with `encode` only when they are sent, so superseded
+    interims cost no serialization and delta encoders see exactly what the
+    client received. `encode` may return None to skip a payload.
+    """
+    def __init__(self, send, interim_interval_s: float, encode=json.dumps, trace=None):
+        self._send = send
+        self._trace = trace
+        self._encode = encode
+        self._interim_interval_s = interim_interval_s
+        self._ordered = deque()
+        self._interim = None
+        self._last_interim_sent = float('-inf')
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        """
+        Starts the sender task. Must be called on the event loop that owns the session.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def send(self, payload, received_at: float):
+        """
+        Queues a payload that must be delivered, superseding any pending interim.
+        """
+        if self._interim is not None:
+            self._interim = None
+            _count("interims_dropped")
+        self._ordered.append((payload, received_at))
+        self._wakeup.set()
+
+    def send_interim(self, payload, received_at: float):
+        """
+        Offers an interim payload; only the latest pending one is kept.
+        """
+        _count("interims_received")
+        if self._interim is not None:
+            _count("interims_coalesced")
+        self._interim = (payload, received_at)
+        self._wakeup.set()
+
+    async def close(self, timeout: float = None):
+        """
+        Delivers everything still queued and stops the sender task.
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+
+    async def _run(self):
+        while True:
+            if self._ordered:
+                payload, received_at = self._ordered.popleft()
+                await self._deliver(payload)
+                latency = time.perf_counter() - received_at
+                _record_sent("final", latency)
+                tracing.observe("final_delivery", latency, self._trace)
+                continue
+
+            if self._interim is not None:
+                wait = self._last_interim_sent + self._interim_interval_s - time.monotonic()
+                if wait <= 0 or self._closing:
+                    (payload, received_at), self._interim = self._interim, None
+                    self._last_interim_sent = time.monotonic()
+                    await self._deliver(payload)
+                    latency = time.perf_counter() - received_at
+                    _record_sent("interim", latency)
+                    tracing.observe("interim_delivery", latency, self._trace)
+                    continue
+                # Rate limited: wait for the interval, or for a final to jump the queue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if self._closing:
+                return
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _deliver(self, payload):
+        try:
+            message = self._encode(payload)
+        except Exception as e:
+            logger.error(f"Could not encode transcript update: {e}")
+            return
+        if message is not None:
+            await self._send(message)
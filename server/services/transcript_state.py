@@ -0,0 +1,39 @@
+# server/services/transcript_state.py
+
+class TranscriptState:
+    """
+    Running summary of a session's final transcript.
+    Updated as segments finalize so the recording can be finalized without
+    re-reading its segments from the database.
+    """
+    def __init__(self):
+        self._parts = []
+        self.segment_count = 0
+        self.word_count = 0
+        self.first_word_start = None
+        self.last_word_end = None
+
+    def add_final_segment(self, text: str, words: list):
+        if text:
+            self._parts.append(text)
+        self.segment_count += 1
+        self.word_count += len(words)
+        if words:
+            if self.first_word_start is None:
+                self.first_word_start = words[0]['start']
+            self.last_word_end = max(self.last_word_end or 0.0, words[-1]['end'])
+
+    @property
+    def final_text(self) -> str:
+        # Collapse the parts on read so repeated reads don't re-join everything
+        if len(self._parts) > 1:
+            self._parts = [" ".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def duration_ms(self, audio_end_s: float = None):
+        """
+        Media duration in milliseconds, from the furthest audio position the STT
+        reported or the last word's end time. None if neither is known.
+        """
+        ends = [t for t in (audio_end_s, self.last_word_end) if t]
+        return int(round(max(ends) * 1000)) if ends else None
@@ -1,54 +1,150 @@
 # server/services/transcription_service.py
 import os
 import json
+import time
 import asyncio
 from flask import current_app
 from ..stt.deepgram_client import DeepgramClient
+from ..stt.pcm_ingest import AUDIO_LINEAR16, AUDIO_WEBM, create_preprocessor
 from ..models import recording_model
+from .audio_sink import get_audio_writer
+from .segment_buffer import SegmentWriteBuffer
+from .transcript_state import TranscriptState
+from .transcript_sender import TranscriptSender
+from .transcript_protocol import PROTOCOL_FULL, ENCODING_JSON, create_encoder
+from . import tracing
 from ..utils.time_utils import get_current_timestamp_ms
+from ..utils.wav import wav_header, finalize_wav_header
+
+# How long stop_transcription waits for the STT listen loop to wind down
+LISTEN_LOOP_DRAIN_TIMEOUT_S = 5
+# How long stop_transcription waits for queued transcript messages to reach the client
+SENDER_DRAIN_TIMEOUT_S = 5
 
 class TranscriptionService:
     """
     Manages the transcription process for a single WebSocket connection.
     This includes handling audio data, interacting with the STT provider,
     and saving results to the database.
+
+    Audio is WebM from MediaRecorder by default. With `audio_encoding`
+    linear16 the client sends raw PCM at `sample_rate`: it is stored as WAV
+    and, when numpy is available, resampled and stripped of silence before
+    it goes upstream (see stt/pcm_ingest.py).
     """
-    def __init__(self, recording_id, client_ws):
+    def __init__(self, recording_id, client_ws, protocol=PROTOCOL_FULL, encoding=ENCODING_JSON, resumable=False,
+                 audio_encoding=AUDIO_WEBM, sample_rate=None):
         self.recording_id = recording_id
+        self.protocol = protocol
+        self.encoding = encoding
         self._client_ws = client_ws
-        self._stt_client = DeepgramClient(recording_id, self._on_stt_transcript)
-        self._audio_file = None
+        # Messages a resumable client has not received yet, sent when it reattaches
+        self._resumable = resumable
+        self._held_messages = []
+        self._pcm = None
+        self._pcm_sample_rate = None
+        if audio_encoding == AUDIO_LINEAR16:
+            self._pcm_sample_rate = sample_rate
+            self._pcm = create_preprocessor(current_app.config, sample_rate)
+            if self._pcm is None:
+                current_app.logger.warning(f"numpy is not installed; forwarding PCM for {recording_id} unprocessed")
+            self._stt_client = DeepgramClient(
+                recording_id, self._on_stt_transcript, AUDIO_LINEAR16,
+                self._pcm.output_rate if self._pcm else sample_rate,
+                self._pcm.time_map if self._pcm else None
+            )
+        else:
+            self._stt_client = DeepgramClient(recording_id, self._on_stt_transcript)
+        self._audio_sink = None
         self._audio_file_path = None
         self._segment_index = 0
+        self.trace = tracing.start_session_trace(recording_id, current_app.config)
+        self._segment_buffer = SegmentWriteBuffer(
+            recording_id,
+            max_batch=current_app.config['SEGMENT_BATCH_SIZE'],
+            flush_interval_s=current_app.config['SEGMENT_FLUSH_INTERVAL_S'],
+            trace=self.trace
+        )
+        self._transcript = TranscriptState()
         self._start_time_ms = None
+        self._stream_started = None
+        self._first_audio_at = None
+        self._first_transcript_seen = False
+        self._listen_task = None
+        self._send_lock = asyncio.Lock()
+        self._interim_results = current_app.config['INTERIM_RESULTS']
+        self._sender = TranscriptSender(
+            self.send_to_client,
+            current_app.config['INTERIM_INTERVAL_S'],
+            encode=create_encoder(protocol, encoding).encode,
+            trace=self.trace
+        )
 
-    async def handle_audio_chunk(self, chunk: bytes):
+    @property
+    def stt_connected(self) -> bool:
+        return self._stt_client.is_connected
+
+    async def handle_audio_chunk(self, chunk: bytes, received_at: float = None):
         """
         Processes an incoming audio chunk.
-        - Writes it to a local file.
+        - Buffers it for the background audio writer.
         - Forwards it to the STT provider.
+        `received_at` is the perf_counter() time the WebSocket handler received it.
         """
-        # Lazy open the audio file on first chunk
-        if self._audio_file is None:
+        if received_at is not None:
+            tracing.observe("audio_queue_wait", time.perf_counter() - received_at, self.trace)
+        if self._first_audio_at is None:
+            self._first_audio_at = received_at or time.perf_counter()
+
+        # Lazy open the audio sink on first chunk. The file is opened and
+        # written by a background writer thread, so this never waits on disk.
+        if self._audio_sink is None:
             recordings_dir = current_app.config['RECORDINGS_DIR']
-            if not os.path.exists(recordings_dir):
-                os.makedirs(recordings_dir)
-            self._audio_file_path = os.path.join(recordings_dir, f"{self.recording_id}.webm")
-            self._audio_file = open(self._audio_file_path, "wb")
+            extension = "wav" if self._pcm_sample_rate else "webm"
+            self._audio_file_path = os.path.join(recordings_dir, f"{self.recording_id}.{extension}")
+            self._audio_sink = get_audio_writer(current_app.config).open_sink(
+                self._audio_file_path,
+                seek_index=current_app.config['AUDIO_SEEK_INDEX'] and not self._pcm_sample_rate
+            )
+            if self._pcm_sample_rate:
+                # Sizes are filled in when the recording ends
+                self._audio_sink.write(wav_header(self._pcm_sample_rate))
             self._start_time_ms = get_current_timestamp_ms()
             current_app.logger.info(f"Started writing audio for {self.recording_id} to {self._audio_file_path}")
 
-        self._audio_file.write(chunk)
+        if self._audio_sink.is_full:
+            # The disk is not keeping up; hold this session's queue (and so the
+            # client) back instead of buffering without bound
+            waited = time.perf_counter()
+            while self._audio_sink.is_full:
+                await self._audio_sink.wait_writable()
+            tracing.observe("audio_sink_wait", time.perf_counter() - waited, self.trace)
+        self._audio_sink.write(chunk)
+        started = time.perf_counter()
+        if self._stream_started is None:
+            self._stream_started = started
+        if self._pcm is not None:
+            chunk = self._pcm.process(chunk)
+            tracing.observe("pcm_preprocess", time.perf_counter() - started, self.trace)
+            if not chunk:
+                # Silence; the STT client sends KeepAlives while nothing goes upstream
+                return
+            started = time.perf_counter()
         await self._stt_client.send_audio_chunk(chunk)
+        tracing.observe("stt_send", time.perf_counter() - started, self.trace)
 
     async def start_transcription(self):
         """
         Initiates the connection to the STT provider and starts the listening loop.
         """
         try:
+            self._sender.start()
+            started = time.perf_counter()
             await self._stt_client.connect()
-            # Run the listen loop in the background
-            asyncio.create_task(self._stt_client.listen_loop())
+            tracing.observe("stt_connect", time.perf_counter() - started, self.trace)
+            # Run the listen loop in the background. The task lives on the
+            # session runtime's loop, so it survives for the whole session.
+            self._listen_task = asyncio.create_task(self._stt_client.listen_loop())
             current_app.logger.info(f"Transcription service started for recording {self.recording_id}")
         except Exception as e:
             current_app.logger.error(f"Failed to start STT client for {self.recording_id}: {e}")
@@ -57,15 +153,26 @@ class TranscriptionService:
     async def _on_stt_transcript(self, transcript_payload: dict):
         """
         Callback executed when the STT provider sends a transcript.
-        - Saves the segment to the database.
-        - Forwards the transcript to the client.
+        - Queues final segments for the write-behind buffer.
+        - Queues the transcript for the session's sender task: finals in order,
+          interims coalesced and rate limited.
         """
+        received_at = time.perf_counter()
+        if not self._first_transcript_seen and self._first_audio_at is not None:
+            self._first_transcript_seen = True
+            tracing.observe("first_transcript", received_at - self._first_audio_at, self.trace)
+        if self._stream_started is not None:
+            # How far the result trails the audio it covers, if audio arrives in real time
+            lag = received_at - (self._stream_started + transcript_payload['end'])
+            stage = "stt_final_lag" if transcript_payload['is_final'] else "stt_interim_lag"
+            tracing.observe(stage, max(0.0, lag), self.trace)
+        if not transcript_payload['is_final'] and not self._interim_results:
+            return
         try:
             with current_app.app_context():
-                # Save the final segment to MongoDB
+                # Queue the final segment; it is persisted to MongoDB in batches
                 if transcript_payload['is_final']:
-                    recording_model.append_segment(
-                        recording_id=self.recording_id,
+                    self._segment_buffer.add(
                         index=self._segment_index,
                         text=transcript_payload['transcript'],
                         words=transcript_payload['words'],
@@ -73,6 +180,7 @@ class TranscriptionService:
                         end=transcript_payload['end'],
                         is_final=True
                     )
+                    self._transcript.add_final_segment(transcript_payload['transcript'], transcript_payload['words'])
                     
                 # Prepare payload for the client
                 client_payload = {
@@ -82,7 +190,10 @@ class TranscriptionService:
                     **transcript_payload
                 }
                 
-                await self.send_to_client(json.dumps(client_payload))
+                if transcript_payload['is_final']:
+                    self._sender.send(client_payload, received_at)
+                else:
+                    self._sender.send_interim(client_payload, received_at)
 
                 if transcript_payload.get('speech_final', False):
                      self._segment_index += 1
@@ -97,29 +208,50 @@ class TranscriptionService:
         """
         current_app.logger.info(f"Stopping transcription for {self.recording_id}...")
         
-        # Close connection to STT provider
+        # Close connection to STT provider and let the listen loop finish
+        # dispatching any results it has already received
         await self._stt_client.close()
+        if self._listen_task:
+            try:
+                await asyncio.wait_for(self._listen_task, timeout=LISTEN_LOOP_DRAIN_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                current_app.logger.warning(f"STT listen loop for {self.recording_id} did not finish in time.")
+            self._listen_task = None
+        await self._sender.close(SENDER_DRAIN_TIMEOUT_S)
 
-        # Close the local audio file
-        if self._audio_file:
-            self._audio_file.close()
-            self._audio_file = None
-        
-        # Calculate duration
-        duration_ms = get_current_timestamp_ms() - self._start_time_ms if self._start_time_ms else 0
+        # Flush queued audio durably and close the local file
+        media_duration_ms = None
+        if self._audio_sink:
+            await asyncio.to_thread(self._audio_sink.close)
+            if self._audio_sink.error:
+                current_app.logger.error(f"Audio for {self.recording_id} may be incomplete: {self._audio_sink.error}")
+            if self._audio_sink.seek_index:
+                media_duration_ms = self._audio_sink.seek_index["durationMs"]
+            elif self._pcm_sample_rate and self._audio_sink.bytes_written:
+                data_bytes = await asyncio.to_thread(finalize_wav_header, self._audio_file_path)
+                media_duration_ms = round(data_bytes / (self._pcm_sample_rate * 2) * 1000)
+            self._audio_sink = None
         
+        # Duration comes from the media timeline: the container's own block
+        # timestamps first, then the STT timeline; wall clock is only a fallback
+        duration_ms = media_duration_ms or self._transcript.duration_ms(self._stt_client.audio_end_s)
+        if duration_ms is None:
+            duration_ms = get_current_timestamp_ms() - self._start_time_ms if self._start_time_ms else 0
+
+        # Pending segments must be persisted before the recording is marked completed
+        if not await self._segment_buffer.close():
+            current_app.logger.error(f"Some transcript segments for {self.recording_id} could not be saved.")
+
         try:
             # Finalize the recording in the database
             with current_app.app_context():
-                # For simplicity, we'll just join the text of all final segments.
-                # A more robust solution might rebuild the text considering edits.
-                segments = recording_model.get_segments_for_recording(self.recording_id)
-                final_text = " ".join([seg['text'] for seg in segments if seg['isFinal']])
-
-                recording_model.update_recording_status(
+                # The running transcript state already holds the joined text
+                # of all final segments, so no segments are read back here.
+                await asyncio.to_thread(
+                    recording_model.update_recording_status,
                     recording_id=self.recording_id,
                     status="completed",
-                    final_text=final_text,
+                    final_text=self._transcript.final_text,
                     duration_ms=duration_ms,
                     audio_path=self._audio_file_path
                 )
@@ -135,13 +267,67 @@ class TranscriptionService:
             current_app.logger.error(f"Error finalizing recording {self.recording_id}: {e}")
             await self.send_error_to_client("Error finalizing recording.")
 
-    async def send_to_client(self, message: str):
-        """Sends a text message to the connected client."""
-        if self._client_ws:
-            try:
-                await self._client_ws.send(message)
-            except Exception as e:
-                current_app.logger.warning(f"Could not send message to client for {self.recording_id}: {e}")
+        if self.trace.sampled:
+            await asyncio.to_thread(self.trace.dump, current_app.config['TRACE_DIR'])
+
+    async def send_to_client(self, message):
+        """
+        Sends a text (str) or binary (bytes) message to the connected client.
+        Sends are serialized so messages arrive in the order they were produced.
+        """
+        async with self._send_lock:
+            await self._send_locked(message)
+
+    async def _send_locked(self, message):
+        if self._client_ws is None:
+            if self._resumable:
+                self._held_messages.append(message)
+            return
+        try:
+            started = time.perf_counter()
+            send = self._client_ws.send
+            if asyncio.iscoroutinefunction(send):
+                await send(message)
+            else:
+                # flask_sock sockets are blocking; keep them off the shared loop
+                await asyncio.get_running_loop().run_in_executor(None, send, message)
+            tracing.observe("client_send", time.perf_counter() - started, self.trace)
+        except Exception as e:
+            current_app.logger.warning(f"Could not send message to client for {self.recording_id}: {e}")
+            if self._resumable:
+                # Likely a dropped connection; deliver it if the client resumes
+                self._held_messages.append(message)
+
+    def detach_client(self):
+        """
+        Stops sending to a dropped client; messages are held until it resumes.
+        """
+        self._client_ws = None
+
+    async def attach_client(self, client_ws, greeting: str = None):
+        """
+        Sends to a resumed client from now on: first `greeting`, then every
+        message it missed, in the order they were produced.
+        """
+        async with self._send_lock:
+            self._client_ws = client_ws
+            held, self._held_messages = self._held_messages, []
+            for message in ([greeting] if greeting else []) + held:
+                await self._send_locked(message)
+
+    async def send_flow_control(self, paused: bool):
+        """
+        Asks the client to pause or resume sending audio (the `signal` overload policy).
+        """
+        await self.send_to_client(json.dumps({"type": "flow", "action": "pause" if paused else "resume"}))
+
+    async def send_ack(self, next_seq: int):
+        """
+        Tells a resumable client that every audio chunk before `next_seq` was received.
+        Acks are not held for a detached client; the resume reply carries the seq instead.
+        """
+        if self._client_ws is not None:
+            await self.send_to_client(json.dumps({"type": "ack", "seq": next_seq}))
 
     async def send_error_to_client(self, error_message: str):
         """Sends an error message to the client."""
@@ -0,0 +1,155 @@
+# server/services/word_timeline.py
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from ..models import recording_model
+from ..utils.lru_cache import VersionedLRUCache
+
+# Rough per-word cost of the Python objects held by a timeline (list slots, str headers)
+_PER_WORD_OVERHEAD_BYTES = 120
+# Rough per-word cost of the (document, word id) lookup index (dict slot, key tuple)
+_PER_WORD_INDEX_BYTES = 100
+
+class AmbiguousWordReference(ValueError):
+    """A word id that occurs in several documents of the referenced segment."""
+
+class WordTimeline:
+    """
+    A recording's words flattened into columns sorted by start time,
+    answering "which word is at t" and "words between t1 and t2" with bisect.
+
+    Several segment documents (one per final result) may share a segment
+    index, and word ids are only unique within a document, so words are
+    looked up by (document, word id) through a dict.
+    """
+    def __init__(self, segments):
+        rows = []
+        self._segment_ids = []
+        docs_by_index = {}
+        for doc, seg in enumerate(segments):
+            self._segment_ids.append(str(seg.get('_id', '')))
+            docs_by_index.setdefault(seg['index'], []).append(doc)
+            words = seg.get('words', [])
+            for word in words:
+                rows.append((word['start'], word['end'], seg['index'], word['id'], word['text'], word.get('trusted', True), doc))
+        # Words normally arrive in order; the sort is a cheap guard for edited timings
+        rows.sort(key=lambda row: row[0])
+
+        self.starts = array('d', (row[0] for row in rows))
+        self.ends = array('d', (row[1] for row in rows))
+        self._segment_indexes = array('i', (row[2] for row in rows))
+        self._ids = [row[3] for row in rows]
+        self._texts = [row[4] for row in rows]
+        self._trusted = bytes(bool(row[5]) for row in rows)
+        self._docs = array('i', (row[6] for row in rows))
+        self._docs_by_index = docs_by_index
+        self._doc_by_segment_id = {segment_id: doc for doc, segment_id in enumerate(self._segment_ids)}
+        self._rows_by_word = {(row[6], row[3]): i for i, row in enumerate(rows)}
+
+        # Running max of end times: monotonic even if word intervals overlap,
+        # so it can be bisected to find the first word ending after t
+        self._max_ends = array('d', self.ends)
+        for i in range(1, len(self._max_ends)):
+            if self._max_ends[i] < self._max_ends[i - 1]:
+                self._max_ends[i] = self._max_ends[i - 1]
+
+        self.nbytes = (
+            self.starts.itemsize * len(self.starts) * 3
+            + self._segment_indexes.itemsize * len(self._segment_indexes)
+            + sum(len(text) + len(word_id) for text, word_id in zip(self._texts, self._ids))
+            + (_PER_WORD_OVERHEAD_BYTES + _PER_WORD_INDEX_BYTES) * len(rows)
+            + sum(len(segment_id) for segment_id in self._segment_ids)
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _word(self, i: int) -> dict:
+        return {
+            "id": self._ids[i],
+            "text": self._texts[i],
+            "start": self.starts[i],
+            "end": self.ends[i],
+            "trusted": bool(self._trusted[i]),
+            "segmentIndex": self._segment_indexes[i],
+            "segmentId": self._segment_ids[self._docs[i]],
+        }
+
+    def word_at(self, t: float):
+        """
+        Returns the word being spoken at time t (seconds), or None in a gap.
+        """
+        i = bisect_right(self.starts, t) - 1
+        # Step back over earlier words in case intervals overlap
+        while i >= 0 and self._max_ends[i] >= t:
+            if self.ends[i] >= t:
+                return self._word(i)
+            i -= 1
+        return None
+
+    def find_word(self, segment, word_id: str):
+        """
+        Returns the word with the given id in `segment`, a segment document id
+        (str) or a segment index (int), or None. Raises AmbiguousWordReference
+        if several documents of an indexed segment have a word with that id.
+        """
+        if isinstance(segment, str):
+            docs = [self._doc_by_segment_id[segment]] if segment in self._doc_by_segment_id else []
+        else:
+            docs = self._docs_by_index.get(segment, [])
+        rows = [self._rows_by_word[(doc, word_id)] for doc in docs if (doc, word_id) in self._rows_by_word]
+        if len(rows) > 1:
+            raise AmbiguousWordReference(
+                f"Word '{word_id}' occurs in several finals of segment {segment}; "
+                f"refer to it as '<segmentId>:{word_id}'"
+            )
+        return self._word(rows[0]) if rows else None
+
+    def words_between(self, start: float, end: float, limit: int = None) -> list:
+        """
+        Returns the words overlapping [start, end] (seconds), in time order.
+        """
+        lo = bisect_left(self._max_ends, start)
+        hi = bisect_right(self.starts, end)
+        words = []
+        for i in range(lo, hi):
+            if self.ends[i] >= start:
+                words.append(self._word(i))
+                if limit and len(words) >= limit:
+                    break
+        return words
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_timeline_cache(config) -> VersionedLRUCache:
+    """
+    Returns the process-wide timeline cache, creating it from the app config on first use.
+    Entries are versioned by the recording's updatedAt.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VersionedLRUCache(config['TIMELINE_CACHE_BYTES'], size_of=lambda timeline: timeline.nbytes)
+        return _cache
+
+def load_timeline(recording_id: str, config):
+    """
+    Returns the word timeline for a recording, or None if the recording doesn't exist.
+    The recording's updatedAt is checked on every call so a stale timeline is never served.
+    """
+    recording_doc = recording_model.get_recording(recording_id, {"updatedAt": 1})
+    if not recording_doc:
+        return None
+    return get_timeline_cache(config).get_or_build(
+        recording_id,
+        recording_doc.get('updatedAt'),
+        lambda: WordTimeline(recording_model.iter_segments(recording_id))
+    )
+
+def invalidate_timeline(recording_id: str):
+    """
+    Drops a recording's cached timeline after its segments changed.
+    """
+    if _cache is not None:
+        _cache.invalidate(recording_id)
@@ -0,0 +1,121 @@
+# server/stt/audio_ring_buffer.py
+from bisect import bisect_right
+from collections import deque
+from ..utils.webm_index import WebmClusterIndexer
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+class AudioRingBuffer:
+    """
+    The most recent audio of one session, kept so it can be replayed to a new
+    STT connection.
+
+    A fresh provider stream has to start with something it can decode. For
+    WebM (what MediaRecorder sends) the stream header is kept separately and
+    replay starts at a Cluster boundary, whose timecode is the exact stream
+    position the new connection's timestamps are relative to. Raw PCM
+    (`bytes_per_s` given) is positioned exactly by byte offset; other audio is
+    replayed from a chunk boundary and positioned by counting `chunk_ms` per
+    chunk. Roughly the last `max_seconds` are retained.
+    """
+    def __init__(self, max_seconds: float, chunk_ms: int, bytes_per_s: int = None):
+        self._max_s = max_seconds
+        self._chunk_s = chunk_ms / 1000
+        self._bytes_per_s = bytes_per_s
+        self._chunks = deque()  # (stream offset, start seconds, bytes)
+        self._is_webm = None  # decided by the first chunk
+        self._indexer = None
+        self._header = bytearray()
+        self._cluster_times = []  # start seconds of each indexed Cluster, ascending
+        self._cluster_offsets = []
+        self._clusters_synced = 0
+        self._chunk_count = 0
+        self.end_offset = 0  # total bytes appended
+
+    def append(self, chunk: bytes):
+        offset = self.end_offset
+        if self._is_webm is None:
+            self._is_webm = not self._bytes_per_s and bytes(chunk[:4]) == EBML_MAGIC
+            if self._is_webm:
+                self._indexer = WebmClusterIndexer()
+        if self._is_webm and self._indexer.error is None:
+            self._feed_indexer(chunk, offset)
+        start_s = self._stream_time_s()
+        self._chunks.append((offset, start_s, chunk))
+        self._chunk_count += 1
+        self.end_offset += len(chunk)
+        self._trim(start_s)
+
+    def _feed_indexer(self, chunk: bytes, offset: int):
+        indexer = self._indexer
+        header_known = indexer.header_end is not None
+        indexer.feed(chunk)
+        if not header_known:
+            self._header += chunk
+            if indexer.header_end is not None:
+                del self._header[indexer.header_end:]
+        scale_s = indexer.timecode_scale / 1e9
+        clusters = indexer.clusters
+        while self._clusters_synced < len(clusters) and clusters[self._clusters_synced][1] is not None:
+            cluster_offset, timecode = clusters[self._clusters_synced][:2]
+            self._cluster_times.append(timecode * scale_s)
+            self._cluster_offsets.append(cluster_offset)
+            self._clusters_synced += 1
+
+    def _webm_ready(self) -> bool:
+        return bool(self._is_webm and self._indexer.error is None and self._cluster_offsets)
+
+    def _stream_time_s(self) -> float:
+        if self._webm_ready():
+            return self._cluster_times[-1]
+        if self._bytes_per_s:
+            return self.end_offset / self._bytes_per_s
+        return self._chunk_count * self._chunk_s
+
+    def _trim(self, newest_s: float):
+        horizon = newest_s - self._max_s
+        if horizon <= 0:
+            return
+        if self._webm_ready():
+            i = max(0, bisect_right(self._cluster_times, horizon) - 1)
+            keep_from = self._cluster_offsets[i]
+            del self._cluster_times[:i]
+            del self._cluster_offsets[:i]
+        else:
+            keep_from = next((o for o, s, _ in reversed(self._chunks) if s <= horizon), 0)
+        while self._chunks and self._chunks[0][0] + len(self._chunks[0][2]) <= keep_from:
+            self._chunks.popleft()
+
+    def replay_from(self, position_s: float):
+        """
+        Returns (offset_s, frames): the frames that restart the stream at or
+        before `position_s`, and the stream position they start at.
+        """
+        if not self._chunks:
+            return 0.0, []
+        if self._webm_ready():
+            oldest = self._chunks[0][0]
+            first = bisect_right(self._cluster_offsets, oldest - 1)
+            if first < len(self._cluster_offsets):
+                i = max(first, bisect_right(self._cluster_times, position_s) - 1)
+                frames = self.frames_since(self._cluster_offsets[i])
+                frames[0] = bytes(self._header) + frames[0]
+                return self._cluster_times[i], frames
+        start_offset, start_s = self._chunks[0][0], self._chunks[0][1]
+        for chunk_offset, chunk_start_s, _ in self._chunks:
+            if chunk_start_s > position_s:
+                break
+            start_offset, start_s = chunk_offset, chunk_start_s
+        return start_s, self.frames_since(start_offset)
+
+    def frames_since(self, offset: int) -> list:
+        """
+        Returns the retained bytes from stream `offset` on, one frame per chunk.
+        """
+        frames = []
+        for chunk_offset, _, chunk in self._chunks:
+            end = chunk_offset + len(chunk)
+            if end <= offset:
+                continue
+            frames.append(chunk[offset - chunk_offset:] if chunk_offset < offset else chunk)
+        return frames
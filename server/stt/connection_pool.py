@@ -0,0 +1,184 @@
+# server/stt/connection_pool.py
+import asyncio
+import json
+import threading
+import time
+import logging
+from collections import deque
+from websockets.client import connect
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_MESSAGE = json.dumps({"type": "KeepAlive"})
+CONNECT_TIMEOUT_S = 10
+MAX_BACKOFF_S = 30
+
+async def open_stt_socket(uri: str, api_key: str):
+    """
+    Opens an authenticated streaming WebSocket to the STT provider.
+    Protocol-level pings are disabled: idle streams are kept open with KeepAlive
+    messages, and a ping written while audio sends are waiting on a congested
+    socket would make two writers drain the transport at once.
+    """
+    return await asyncio.wait_for(
+        connect(uri, extra_headers={"Authorization": f"Token {api_key}"}, ping_interval=None),
+        CONNECT_TIMEOUT_S
+    )
+
+def is_open(ws) -> bool:
+    return ws.state.name == "OPEN"
+
+class SttConnectionPool:
+    """
+    Pre-connected STT WebSockets waiting to be handed to new sessions.
+
+    Sessions skip DNS, TLS and the WebSocket handshake by checking out an idle
+    connection. A maintenance task on the session runtime loop keeps idle
+    connections alive with KeepAlive messages, closes those idle for longer
+    than `idle_ttl_s` and opens replacements at most `refill_per_s` per second,
+    backing off while the provider is unreachable.
+    All methods must be called on the runtime loop.
+    """
+    def __init__(self, uri: str, api_key: str, size: int, idle_ttl_s: float,
+                 refill_per_s: float, keepalive_interval_s: float):
+        self.uri = uri
+        self._api_key = api_key
+        self._size = size
+        self._idle_ttl_s = idle_ttl_s
+        self._refill_interval_s = 1 / refill_per_s if refill_per_s > 0 else 0
+        self._keepalive_interval_s = keepalive_interval_s
+        self._idle = deque()  # [ws, connected_at, last_keepalive]
+        self._opening = 0
+        self._next_open_at = 0.0
+        self._failures = 0
+        self._wakeup = None
+        self._task = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "checkouts": 0,
+            "checkout_misses": 0,
+            "connections_opened": 0,
+            "connect_failures": 0,
+            "expired": 0,
+            "dead": 0,
+        }
+
+    def _count(self, name: str):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._maintain())
+
+    async def acquire(self, uri: str):
+        """
+        Returns an open connection for `uri`, or None if none is ready.
+        """
+        if uri == self.uri:
+            while self._idle:
+                ws, _, _ = self._idle.popleft()
+                if is_open(ws):
+                    self._count("checkouts")
+                    self._refill_soon()
+                    return ws
+                self._count("dead")
+        self._count("checkout_misses")
+        self._refill_soon()
+        return None
+
+    def _refill_soon(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            ws, _, _ = self._idle.popleft()
+            await ws.close()
+
+    async def _maintain(self):
+        while True:
+            now = time.monotonic()
+            await self._prune_and_keepalive(now)
+            if len(self._idle) + self._opening < self._size and now >= self._next_open_at:
+                self._next_open_at = now + self._refill_interval_s
+                self._opening += 1
+                asyncio.create_task(self._open_one())
+
+            wait = self._keepalive_interval_s
+            if len(self._idle) + self._opening < self._size:
+                wait = min(wait, max(0.0, self._next_open_at - now))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _prune_and_keepalive(self, now: float):
+        for entry in list(self._idle):
+            ws, connected_at, last_keepalive = entry
+            if not is_open(ws):
+                self._idle.remove(entry)
+                self._count("dead")
+            elif now - connected_at > self._idle_ttl_s:
+                self._idle.remove(entry)
+                self._count("expired")
+                asyncio.create_task(ws.close())
+            elif now - last_keepalive >= self._keepalive_interval_s:
+                try:
+                    await ws.send(KEEPALIVE_MESSAGE)
+                    entry[2] = now
+                except Exception:
+                    if entry in self._idle:
+                        self._idle.remove(entry)
+                    self._count("dead")
+
+    async def _open_one(self):
+        try:
+            ws = await open_stt_socket(self.uri, self._api_key)
+            now = time.monotonic()
+            self._idle.append([ws, now, now])
+            self._failures = 0
+            self._count("connections_opened")
+        except Exception as e:
+            self._failures += 1
+            self._next_open_at = time.monotonic() + min(MAX_BACKOFF_S, 2 ** self._failures)
+            self._count("connect_failures")
+            logger.warning(f"Could not pre-connect to the STT provider: {e}")
+        finally:
+            self._opening -= 1
+            self._wakeup.set()
+
+    def get_metrics(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["idle"] = len(self._idle)
+        metrics["opening"] = self._opening
+        return metrics
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_stt_pool(config, uri: str):
+    """
+    Returns the process-wide pool of connections to `uri`, or None if
+    STT_POOL_SIZE is 0. The pool must still be started on the session runtime loop.
+    """
+    global _pool
+    if config['STT_POOL_SIZE'] <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = SttConnectionPool(
+                uri,
+                config['DEEPGRAM_API_KEY'],
+                size=config['STT_POOL_SIZE'],
+                idle_ttl_s=config['STT_POOL_IDLE_TTL_S'],
+                refill_per_s=config['STT_POOL_REFILL_PER_S'],
+                keepalive_interval_s=config['STT_KEEPALIVE_INTERVAL_S'],
+            )
+        return _pool
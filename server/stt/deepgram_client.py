@@ -1,133 +1,343 @@
 # server/stt/deepgram_client.py
-import asyncio
 import json
-from websockets.client import connect
+import time
+import asyncio
+import threading
 from websockets.exceptions import ConnectionClosed
 from flask import current_app
+from .audio_ring_buffer import AudioRingBuffer
+from .connection_pool import KEEPALIVE_MESSAGE, MAX_BACKOFF_S, get_stt_pool, open_stt_socket
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "reconnects": 0,
+    "reconnect_failures": 0,
+    "replayed_bytes": 0,
+    "keepalives_sent": 0,
+    "duplicate_words_dropped": 0,
+}
+
+def get_stt_stream_metrics() -> dict:
+    """
+    Returns process-wide counters for upstream STT streams.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+def _count(name: str, amount: int = 1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+def build_listen_uri(config, encoding: str = None, sample_rate: int = None) -> str:
+    """
+    The streaming endpoint URI for a session. Encoding and sample rate default
+    to STT_ENCODING and STT_SAMPLE_RATE (what browsers record, WebM/Opus).
+    """
+    return (
+        f"{config['DEEPGRAM_URI']}"
+        f"?encoding={encoding or config['STT_ENCODING']}"
+        f"&sample_rate={sample_rate or config['STT_SAMPLE_RATE']}&channels=1"
+        f"&punctuate=true&interim_results=true&word_timestamps=true"
+    )
+
+def normalize_result(data: dict, offset_s: float = 0.0):
+    """
+    Turns a Deepgram `Results` message into the payload sent to our client and
+    service, or None if it carries no words. `offset_s` is added to every
+    timestamp, mapping the provider's stream time onto the recording's.
+    """
+    alternatives = data.get('channel', {}).get('alternatives', [])
+    if not alternatives:
+        return None
+
+    # For simplicity, we'll always use the first alternative
+    transcript_data = alternatives[0]
+    transcript = transcript_data.get('transcript', '')
+    words = transcript_data.get('words', [])
+
+    if not transcript or not words:
+        return None
+
+    return {
+        'transcript': transcript,
+        'words': [{
+            'id': f"word_{i}", # Client will need a unique ID
+            'text': word['word'],
+            'start': word['start'] + offset_s,
+            'end': word['end'] + offset_s,
+            'trusted': True # From STT, so initially trusted
+        } for i, word in enumerate(words)],
+        'start': words[0]['start'] + offset_s,
+        'end': words[-1]['end'] + offset_s,
+        'is_final': data.get('is_final', False),
+        'speech_final': data.get('speech_final', False)
+    }
+
 
 class DeepgramClient:
     """
     A WebSocket client for interacting with Deepgram's streaming STT service.
+
+    Every chunk also goes into a ring buffer of recent audio. If the provider
+    drops the connection, the listen loop reconnects with backoff, replays the
+    buffered audio from the end of the last final result and shifts the new
+    connection's timestamps by the replay position, so word times stay
+    monotonic and match the recorded file.
+
+    With `encoding='linear16'` the client sends raw PCM at `sample_rate`. If
+    that audio is a condensed version of the recording (silence removed),
+    `time_map` maps the stream's timestamps back onto the recording.
     """
-    def __init__(self, recording_id, on_transcript_callback):
+    def __init__(self, recording_id, on_transcript_callback, encoding: str = None,
+                 sample_rate: int = None, time_map=None):
+        config = current_app.config
         self.recording_id = recording_id
         self._on_transcript_callback = on_transcript_callback
-        self._api_key = current_app.config['DEEPGRAM_API_KEY']
+        self._api_key = config['DEEPGRAM_API_KEY']
+        self._uri = build_listen_uri(config, encoding, sample_rate)
+        # Only sessions using the default format can take pooled connections
+        self._pool = get_stt_pool(config, build_listen_uri(config))
         self._deepgram_ws = None
         self._is_connected = False
+        self._closing = False
+        pcm_bytes_per_s = sample_rate * 2 if encoding == 'linear16' else None
+        self._ring = AudioRingBuffer(config['STT_RING_BUFFER_S'], config['AUDIO_CHUNK_MS'], pcm_bytes_per_s)
+        self._time_map = time_map
+        self._reconnect_attempts = config['STT_RECONNECT_ATTEMPTS']
+        self._reconnect_backoff_s = config['STT_RECONNECT_BACKOFF_S']
+        self._keepalive_interval_s = config['STT_KEEPALIVE_INTERVAL_S']
+        self._keepalive_task = None
+        self._last_send = time.monotonic()
+        # Stream time at which the current connection's audio starts
+        self._stream_offset_s = 0.0
+        # End of the last final result, in stream time (recording time unless
+        # a time map condenses the stream)
+        self._final_end_s = 0.0
+        self.connected_from_pool = False
+        self.reconnects = 0
+        # Furthest audio position (seconds) covered by any result, speech or not
+        self._audio_end_s = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._is_connected
+
+    @property
+    def audio_end_s(self) -> float:
+        """
+        Furthest recording position (seconds) covered by any result, speech or not.
+        """
+        if self._time_map is not None:
+            return self._time_map.to_recording(self._audio_end_s, end=True)
+        return self._audio_end_s
 
     async def connect(self):
         """
-        Connects to the Deepgram streaming endpoint.
+        Connects to the Deepgram streaming endpoint, using a pre-warmed pooled
+        connection when one is available, then replays audio that arrived meanwhile.
         """
         try:
-            # TODO: Make encoding, sample_rate, etc. configurable
-            uri = (
-                f"wss://api.deepgram.com/v1/listen"
-                f"?encoding=opus&sample_rate=48000&channels=1"
-                f"&puncutation=true&interim_results=true&word_timestamps=true"
-            )
-            self._deepgram_ws = await connect(
-                uri,
-                extra_headers={"Authorization": f"Token {self._api_key}"}
-            )
-            self._is_connected = True
-            current_app.logger.info(f"Deepgram connection established for recording {self.recording_id}")
+            await self._open_stream()
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+            source = "pooled" if self.connected_from_pool else "new"
+            current_app.logger.info(f"Deepgram connection ({source}) established for recording {self.recording_id}")
         except Exception as e:
             self._is_connected = False
             current_app.logger.error(f"Failed to connect to Deepgram for {self.recording_id}: {e}")
             raise
 
+    async def _open_stream(self):
+        """
+        Opens a provider connection and replays buffered audio from the end of
+        the last final result before marking the client connected.
+        """
+        ws = await self._pool.acquire(self._uri) if self._pool else None
+        self.connected_from_pool = ws is not None
+        if ws is None:
+            ws = await open_stt_socket(self._uri, self._api_key)
+        self._deepgram_ws = ws
+
+        offset_s, frames = self._ring.replay_from(self._final_end_s)
+        sent_until = self._ring.end_offset
+        replayed = 0
+        while frames:
+            for frame in frames:
+                await ws.send(frame)
+                replayed += len(frame)
+            # Chunks that arrived during the replay are sent too; there is no
+            # await between the last check and the client going live
+            frames = self._ring.frames_since(sent_until)
+            sent_until = self._ring.end_offset
+        self._last_send = time.monotonic()
+        self._stream_offset_s = offset_s
+        self._is_connected = True
+        _count("replayed_bytes", replayed)
+
     async def send_audio_chunk(self, chunk: bytes):
         """
-        Sends an audio chunk to Deepgram if the connection is active.
+        Sends an audio chunk to Deepgram if the connection is active. Every chunk
+        is also kept in the ring buffer, so audio received while (re)connecting
+        is replayed once the connection is up.
         """
-        if self._is_connected and self._deepgram_ws:
-            try:
-                await self._deepgram_ws.send(chunk)
-            except ConnectionClosed as e:
-                current_app.logger.warning(f"Deepgram connection closed while sending audio for {self.recording_id}. Code: {e.code}, Reason: {e.reason}")
-                self._is_connected = False
-            except Exception as e:
-                current_app.logger.error(f"Error sending audio chunk to Deepgram for {self.recording_id}: {e}")
-                self._is_connected = False
-                # Depending on the error, you might want to handle reconnection here.
+        self._ring.append(chunk)
+        if not self._is_connected:
+            return
+        try:
+            await self._deepgram_ws.send(chunk)
+            self._last_send = time.monotonic()
+        except ConnectionClosed as e:
+            # The listen loop sees the same close and reconnects
+            current_app.logger.warning(f"Deepgram connection closed while sending audio for {self.recording_id}. Code: {e.code}, Reason: {e.reason}")
+            self._is_connected = False
+        except Exception as e:
+            current_app.logger.error(f"Error sending audio chunk to Deepgram for {self.recording_id}: {e}")
+            self._is_connected = False
+
+    async def _keepalive_loop(self):
+        # Deepgram closes streams that receive nothing for about 10 seconds,
+        # e.g. while the client is paused or its network stalls
+        while True:
+            idle_s = time.monotonic() - self._last_send
+            if idle_s < self._keepalive_interval_s:
+                await asyncio.sleep(self._keepalive_interval_s - idle_s)
+                continue
+            if self._is_connected:
+                try:
+                    await self._deepgram_ws.send(KEEPALIVE_MESSAGE)
+                    _count("keepalives_sent")
+                except Exception:
+                    pass  # The listen loop handles the closed connection
+            self._last_send = time.monotonic()
+
+    def _stop_keepalive(self):
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
 
     async def listen_loop(self):
         """
-        Listens for messages from Deepgram and processes them.
+        Listens for messages from Deepgram and processes them, reconnecting
+        when the provider drops a connection the session has not closed.
         """
         if not self._is_connected:
             current_app.logger.warning("listen_loop called but not connected to Deepgram.")
             return
 
         try:
-            while self._is_connected:
-                message = await self._deepgram_ws.recv()
-                data = json.loads(message)
-                
-                # Check for errors from Deepgram
-                if data.get('type') == 'Error':
-                    current_app.logger.error(f"Deepgram error for {self.recording_id}: {data.get('description')}")
+            while True:
+                try:
+                    await self._receive_results(self._deepgram_ws)
+                    break
+                except ConnectionClosed as e:
+                    if self._closing:
+                        current_app.logger.info(f"Deepgram connection gracefully closed for {self.recording_id}. Code: {e.code}, Reason: {e.reason}")
+                        break
+                    current_app.logger.warning(f"Deepgram connection lost for {self.recording_id}. Code: {e.code}, Reason: {e.reason}")
+                if not await self._reconnect():
                     break
-
-                if data.get('is_final', False) and 'channel' in data:
-                    self._handle_transcript(data)
-
-        except ConnectionClosed as e:
-            current_app.logger.info(f"Deepgram connection gracefully closed for {self.recording_id}. Code: {e.code}, Reason: {e.reason}")
         except Exception as e:
             current_app.logger.error(f"Exception in Deepgram listen_loop for {self.recording_id}: {e}")
         finally:
             self._is_connected = False
+            self._stop_keepalive()
 
-    def _handle_transcript(self, data: dict):
+    async def _receive_results(self, ws):
         """
-        Normalizes the transcript data and calls the provided callback.
+        Handles messages from one connection until it closes (raising
+        ConnectionClosed) or reports an error.
         """
-        try:
-            alternatives = data.get('channel', {}).get('alternatives', [])
-            if not alternatives:
-                return
+        while True:
+            message = await ws.recv()
+            data = json.loads(message)
 
-            # For simplicity, we'll always use the first alternative
-            transcript_data = alternatives[0]
-            transcript = transcript_data.get('transcript', '')
-            words = transcript_data.get('words', [])
-            
-            if not transcript or not words:
+            # Check for errors from Deepgram
+            if data.get('type') == 'Error':
+                current_app.logger.error(f"Deepgram error for {self.recording_id}: {data.get('description')}")
                 return
 
-            start_time = words[0]['start']
-            end_time = words[-1]['end']
-            
-            # Normalize the payload to be sent to our client and service
-            payload = {
-                'transcript': transcript,
-                'words': [{
-                    'id': f"word_{i}", # Client will need a unique ID
-                    'text': word['word'],
-                    'start': word['start'],
-                    'end': word['end'],
-                    'trusted': True # From STT, so initially trusted
-                } for i, word in enumerate(words)],
-                'start': start_time,
-                'end': end_time,
-                'is_final': data.get('is_final', False),
-                'speech_final': data.get('speech_final', False)
-            }
-            
-            # Use asyncio.create_task to call the async callback
-            # This allows the callback to run without blocking the listen_loop
-            asyncio.create_task(self._on_transcript_callback(payload))
+            if 'start' in data and 'duration' in data:
+                self._audio_end_s = max(self._audio_end_s, self._stream_offset_s + data['start'] + data['duration'])
 
+            # Interim and final results alike; the service decides how to deliver them
+            if 'channel' in data:
+                await self._handle_transcript(data)
+
+    async def _reconnect(self) -> bool:
+        """
+        Opens a new connection with exponential backoff and replays buffered
+        audio. Returns False once STT_RECONNECT_ATTEMPTS have failed.
+        """
+        self._is_connected = False
+        for attempt in range(self._reconnect_attempts):
+            if attempt:
+                if self._closing:
+                    break
+                await asyncio.sleep(min(MAX_BACKOFF_S, self._reconnect_backoff_s * 2 ** (attempt - 1)))
+            try:
+                await self._open_stream()
+            except Exception as e:
+                current_app.logger.warning(f"Deepgram reconnect attempt {attempt + 1} for {self.recording_id} failed: {e}")
+                continue
+            self.reconnects += 1
+            _count("reconnects")
+            current_app.logger.info(f"Deepgram reconnected for {self.recording_id}, replaying audio from {self._stream_offset_s:.2f}s")
+            if self._closing:
+                # The session ended during the outage; have the provider flush the replayed audio
+                await self._deepgram_ws.send(json.dumps({'type': 'CloseStream'}))
+            return True
+        _count("reconnect_failures")
+        current_app.logger.error(f"Giving up reconnecting to Deepgram for {self.recording_id}")
+        return False
+
+    async def _handle_transcript(self, data: dict):
+        """
+        Normalizes the transcript data and calls the provided callback.
+        The callback is awaited in the listen loop, so results are handled in
+        the order Deepgram sent them; it must only queue work, not wait on I/O.
+        """
+        try:
+            payload = normalize_result(data, self._stream_offset_s)
+            if payload is not None:
+                payload = self._drop_transcribed_words(payload)
+            if payload is not None:
+                if payload['is_final']:
+                    self._final_end_s = max(self._final_end_s, payload['end'])
+                if self._time_map is not None:
+                    payload = self._time_map.map_payload(payload)
+                await self._on_transcript_callback(payload)
         except Exception as e:
             current_app.logger.error(f"Error processing transcript for {self.recording_id}: {e}")
 
+    def _drop_transcribed_words(self, payload: dict):
+        """
+        Removes words already delivered in a final result, which a replay after
+        a reconnect transcribes a second time, and clamps a word straddling the
+        last final so times stay monotonic. Returns None if no words are left.
+        """
+        words = [w for w in payload['words'] if (w['start'] + w['end']) / 2 > self._final_end_s]
+        dropped = len(payload['words']) - len(words)
+        if not dropped and (not words or words[0]['start'] >= self._final_end_s):
+            return payload
+        _count("duplicate_words_dropped", dropped)
+        if not words:
+            return None
+        words[0]['start'] = max(words[0]['start'], self._final_end_s)
+        for i, word in enumerate(words):
+            word['id'] = f"word_{i}"
+        payload.update(
+            transcript=" ".join(w['text'] for w in words),
+            words=words,
+            start=words[0]['start'],
+            end=words[-1]['end']
+        )
+        return payload
+
     async def close(self, reason='client requested close'):
         """
         Closes the WebSocket connection to Deepgram.
         """
+        self._closing = True
+        self._stop_keepalive()
         if self._is_connected and self._deepgram_ws:
             try:
                 # Send a close message to Deepgram
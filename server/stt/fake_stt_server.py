@@ -0,0 +1,199 @@
+# server/stt/fake_stt_server.py
+"""
+A local stand-in for Deepgram's streaming `/v1/listen` WebSocket endpoint.
+
+It speaks the subset of the protocol used by `DeepgramClient`: binary frames are
+treated as audio, `{"type": "CloseStream"}` flushes and closes the stream, and
+`Results` messages with `is_final`/`speech_final` flags and word timings are
+emitted at a configurable cadence.
+
+Word timings follow an audio clock that advances by `--chunk-ms` for every binary
+frame received, so a load generator pacing chunks at the same rate can map a
+word's `end` time back to the chunk that carried it. Streams opened with
+`encoding=linear16` advance the clock by the duration of the PCM actually received.
+
+Run from the repository root, then set DEEPGRAM_URI=ws://127.0.0.1:8765/v1/listen:
+    python -m server.stt.fake_stt_server --port 8765 --cadence 0.5 --jitter 0.1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+logger = logging.getLogger(__name__)
+
+SCRIPT = (
+    "thanks for calling how can i help you today i would like to check the status "
+    "of my order sure let me pull that up for you one moment please"
+).split()
+
+class FakeStreamSession:
+    """
+    The state of a single fake STT stream.
+    """
+    def __init__(self, websocket, options):
+        self._ws = websocket
+        self._options = options
+        self._words = itertools.cycle(SCRIPT)
+        self._audio_clock_s = 0.0  # seconds of audio received so far
+        self._emitted_until_s = 0.0  # end time of the last word sent as final
+        self._finals_in_utterance = 0
+        self._frames_received = 0
+        self.bytes_received = 0
+        query = parse_qs(urlsplit(websocket.request.path).query)
+        self._pcm_bytes_per_s = None
+        if query.get('encoding') == ['linear16']:
+            sample_rate = int(query.get('sample_rate', ['16000'])[0])
+            channels = int(query.get('channels', ['1'])[0])
+            self._pcm_bytes_per_s = sample_rate * channels * 2
+
+    async def run(self):
+        emitter = asyncio.create_task(self._emit_loop())
+        try:
+            while True:
+                # Like Deepgram, give up on streams that send neither audio nor KeepAlive
+                try:
+                    message = await asyncio.wait_for(self._ws.recv(), self._options.idle_timeout)
+                except asyncio.TimeoutError:
+                    logger.info("Closing idle stream")
+                    break
+                if isinstance(message, bytes):
+                    self.bytes_received += len(message)
+                    self._frames_received += 1
+                    if self._pcm_bytes_per_s:
+                        self._audio_clock_s += len(message) / self._pcm_bytes_per_s
+                    else:
+                        self._audio_clock_s += self._options.chunk_ms / 1000
+                    if self._frames_received == self._options.drop_after:
+                        # Simulate a provider-side failure: no flush, abnormal close
+                        logger.info("Dropping stream")
+                        emitter.cancel()
+                        await self._ws.close(code=1011, reason="simulated failure")
+                        return
+                    if self._options.recv_delay:
+                        # A slow provider: stop reading so TCP pushes back on the sender
+                        await asyncio.sleep(self._options.recv_delay)
+                    continue
+                data = json.loads(message)
+                if data.get('type') == 'CloseStream':
+                    break
+                # KeepAlive and unknown control messages are ignored
+        except ConnectionClosed:
+            pass
+        finally:
+            emitter.cancel()
+
+        try:
+            # Flush whatever audio has not been transcribed yet, like Deepgram does
+            await self._emit(is_final=True, speech_final=True)
+            await self._ws.send(json.dumps({
+                "type": "Metadata",
+                "duration": self._audio_clock_s,
+                "channels": 1
+            }))
+            await self._ws.close()
+        except ConnectionClosed:
+            pass
+
+    async def _emit_loop(self):
+        while True:
+            delay = self._options.cadence + random.uniform(-self._options.jitter, self._options.jitter)
+            # Interims are spread evenly over the interval leading up to the final
+            step = max(0.0, delay) / (self._options.interims + 1)
+            for _ in range(self._options.interims):
+                await asyncio.sleep(step)
+                await self._emit(is_final=False, speech_final=False)
+            await asyncio.sleep(step)
+            self._finals_in_utterance += 1
+            speech_final = self._finals_in_utterance >= self._options.finals_per_utterance
+            if await self._emit(is_final=True, speech_final=speech_final) and speech_final:
+                self._finals_in_utterance = 0
+
+    def _build_words(self, start_s: float, end_s: float) -> list:
+        words = []
+        cursor = start_s
+        while cursor + self._options.word_s <= end_s + 1e-9:
+            text = next(self._words)
+            words.append({
+                "word": text,
+                "punctuated_word": text,
+                "start": round(cursor, 3),
+                "end": round(cursor + self._options.word_s, 3),
+                "confidence": 0.99
+            })
+            cursor += self._options.word_s
+        return words
+
+    async def _emit(self, is_final: bool, speech_final: bool) -> bool:
+        """
+        Sends a `Results` message covering audio received since the last final.
+        Returns False if there was not enough new audio for a single word.
+        """
+        words = self._build_words(self._emitted_until_s, self._audio_clock_s)
+        if not words:
+            return False
+        if is_final:
+            self._emitted_until_s = words[-1]['end']
+        start = words[0]['start']
+        await self._ws.send(json.dumps({
+            "type": "Results",
+            "channel_index": [0, 1],
+            "start": start,
+            "duration": round(words[-1]['end'] - start, 3),
+            "is_final": is_final,
+            "speech_final": speech_final,
+            "channel": {
+                "alternatives": [{
+                    "transcript": " ".join(w['word'] for w in words),
+                    "confidence": 0.99,
+                    "words": words
+                }]
+            }
+        }))
+        return True
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cadence", type=float, default=0.5, help="seconds between results")
+    parser.add_argument("--jitter", type=float, default=0.1, help="max +/- seconds added to each cadence tick")
+    parser.add_argument("--chunk-ms", type=int, default=250, help="audio duration assumed per binary frame")
+    parser.add_argument("--word-s", type=float, default=0.3, help="duration of each scripted word")
+    parser.add_argument("--finals-per-utterance", type=int, default=3, help="finals before speech_final is set")
+    parser.add_argument("--handshake-delay", type=float, default=0.0,
+                        help="seconds added to each WebSocket handshake, to mimic DNS/TLS/network latency")
+    parser.add_argument("--idle-timeout", type=float, default=10.0,
+                        help="close streams that receive no message for this many seconds")
+    parser.add_argument("--drop-after", type=int, default=0,
+                        help="abort each stream after this many audio frames, to exercise reconnects (0 disables)")
+    parser.add_argument("--recv-delay", type=float, default=0.0,
+                        help="seconds to pause after each audio frame, to simulate a provider that reads slowly")
+    parser.add_argument("--interims", type=int, default=0, help="interim results sent between consecutive finals")
+    return parser
+
+async def serve(options):
+    async def handler(websocket, *args):
+        await FakeStreamSession(websocket, options).run()
+
+    async def delay_handshake(connection, request):
+        await asyncio.sleep(options.handshake_delay)
+
+    process_request = delay_handshake if options.handshake_delay > 0 else None
+    async with websockets.serve(handler, options.host, options.port, max_size=None,
+                                process_request=process_request, ping_interval=None):
+        logger.info(f"Fake STT server listening on ws://{options.host}:{options.port}/v1/listen")
+        await asyncio.Future()
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(build_arg_parser().parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# server/stt/pcm_ingest.py
+"""
+Raw PCM ingest: clients that send 16-bit little-endian mono PCM instead of WebM
+ask for it in their init message,
+
+    {"recordingId": "...", "audio": {"encoding": "linear16", "sampleRate": 48000}}
+
+Their audio is stored as received (a WAV file), while the copy sent upstream is
+resampled to PCM_TARGET_SAMPLE_RATE and stripped of silence by a frame-energy
+voice activity detector. Only voiced frames, padded by VAD_HANGOVER_MS on both
+sides, are forwarded, so the provider's timestamps are positions in a shorter
+stream; a `StreamTimeMap` maps them back onto the recording.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency; without it PCM is forwarded unprocessed
+    np = None
+
+AUDIO_WEBM = "webm"
+AUDIO_LINEAR16 = "linear16"
+MAX_SAMPLE_RATE = 192000
+# Full-scale amplitude of 16-bit samples, the 0 dBFS reference
+FULL_SCALE = 32768.0
+# Low-pass filter length per unit of decimation factor
+TAPS_PER_FACTOR = 16
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "streams": 0,
+    "bytes_in": 0,
+    "bytes_forwarded": 0,
+    "frames": 0,
+    "frames_forwarded": 0,
+    "process_seconds_total": 0.0,
+}
+
+def get_pcm_ingest_metrics() -> dict:
+    """
+    Returns process-wide counters of PCM received and forwarded upstream.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+def _count(**amounts):
+    with _metrics_lock:
+        for name, amount in amounts.items():
+            _metrics[name] += amount
+
+def negotiate_audio_format(init_data: dict):
+    """
+    Returns the (encoding, sample_rate) a client's init message asks for;
+    sample_rate is None for WebM. Raises ValueError for unsupported formats.
+    """
+    audio = init_data.get('audio') or {}
+    encoding = audio.get('encoding', AUDIO_WEBM)
+    if encoding == AUDIO_WEBM:
+        return AUDIO_WEBM, None
+    if encoding != AUDIO_LINEAR16:
+        raise ValueError(f"Unsupported audio encoding '{encoding}'")
+    sample_rate = audio.get('sampleRate')
+    if not isinstance(sample_rate, int) or not 0 < sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError("linear16 audio needs an integer 'sampleRate'")
+    return AUDIO_LINEAR16, sample_rate
+
+def lowpass_taps(factor: int):
+    """
+    A windowed-sinc anti-aliasing filter for decimating by `factor`, cutting
+    off just below the output Nyquist frequency.
+    """
+    n = TAPS_PER_FACTOR * factor + 1
+    cutoff = 0.45 / factor  # cycles per input sample
+    t = np.arange(n) - (n - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.hamming(n)
+    return (taps / taps.sum()).astype(np.float32)
+
+def create_preprocessor(config, sample_rate: int):
+    """
+    A preprocessor for a linear16 stream at `sample_rate` configured from the
+    app config, or None if numpy is not installed.
+    """
+    if np is None:
+        return None
+    return PcmPreprocessor(
+        sample_rate,
+        config['PCM_TARGET_SAMPLE_RATE'],
+        frame_ms=config['VAD_FRAME_MS'],
+        threshold_dbfs=config['VAD_THRESHOLD_DBFS'],
+        hangover_ms=config['VAD_HANGOVER_MS'],
+        vad=config['PCM_VAD_ENABLED']
+    )
+
+class StreamTimeMap:
+    """
+    Maps positions in the audio forwarded to the STT provider onto positions in
+    the recording. Each entry marks where a contiguous run of forwarded audio
+    starts in both timelines.
+    """
+    def __init__(self):
+        self._stream_starts = [0.0]
+        self._recording_starts = [0.0]
+
+    def add(self, stream_s: float, recording_s: float):
+        if stream_s == self._stream_starts[-1]:
+            self._recording_starts[-1] = recording_s
+        else:
+            self._stream_starts.append(stream_s)
+            self._recording_starts.append(recording_s)
+
+    def entries(self) -> list:
+        """
+        The (stream seconds, recording seconds) start of every run, in order.
+        """
+        return list(zip(self._stream_starts, self._recording_starts))
+
+    def to_recording(self, stream_s: float, end: bool = False) -> float:
+        """
+        An `end` time falling exactly on a run boundary belongs to the run before it.
+        """
+        find = bisect_left if end else bisect_right
+        i = max(0, find(self._stream_starts, stream_s) - 1)
+        return self._recording_starts[i] + stream_s - self._stream_starts[i]
+
+    def map_payload(self, payload: dict) -> dict:
+        """
+        Rewrites a normalized result's word and segment times in place.
+        """
+        for word in payload['words']:
+            word['start'] = self.to_recording(word['start'])
+            word['end'] = max(word['start'], self.to_recording(word['end'], end=True))
+        payload['start'] = payload['words'][0]['start']
+        payload['end'] = payload['words'][-1]['end']
+        return payload
+
+class PcmPreprocessor:
+    """
+    Resamples one session's PCM stream and drops silent frames.
+
+    Audio is decimated by an integer factor after a low-pass FIR (rates that
+    are not a multiple of the target rate are left as they are), then cut
+    into `frame_ms` frames. A frame is voiced when its mean power reaches
+    `threshold_dbfs`; voiced frames and `hangover_ms` of audio on either side
+    of them are forwarded. Frames just before the end of a chunk stay pending
+    until the next chunk shows whether speech follows. All per-sample work is
+    vectorized; state carried between chunks is a few hundred samples.
+    """
+    def __init__(self, input_rate: int, target_rate: int, frame_ms: int = 20,
+                 threshold_dbfs: float = -45.0, hangover_ms: int = 300, vad: bool = True):
+        if np is None:
+            raise RuntimeError("PCM preprocessing requires numpy")
+        factor = input_rate // target_rate if target_rate else 1
+        self._factor = factor if factor > 1 and input_rate % target_rate == 0 else 1
+        self.input_rate = input_rate
+        self.output_rate = input_rate // self._factor
+        self._taps = lowpass_taps(self._factor) if self._factor > 1 else None
+        self._history = np.zeros(len(self._taps) - 1 if self._taps is not None else 0, dtype=np.float32)
+        self._input_tail = np.zeros(0, dtype=np.int16)
+        self._odd_byte = b""
+        self._frame_len = max(1, self.output_rate * frame_ms // 1000)
+        self._frame_s = self._frame_len / self.output_rate
+        self._output_tail = np.zeros(0, dtype=np.int16)
+        self._threshold = (FULL_SCALE * 10 ** (threshold_dbfs / 20)) ** 2 if vad else -1.0
+        self._pad_frames = -(-hangover_ms // frame_ms) if vad else 0
+        # Frames not yet forwarded or dropped, and the global index of the first one
+        self._pending = deque()
+        self._pending_start = 0
+        self._last_voiced = None
+        self._next_forward = None  # index the next forwarded frame has if it continues the run
+        self._forwarded_samples = 0
+        self.time_map = StreamTimeMap()
+        _count(streams=1)
+
+    def process(self, chunk: bytes) -> bytes:
+        """
+        Takes a chunk as received and returns the PCM to forward upstream, possibly empty.
+        """
+        started = time.perf_counter()
+        data = self._odd_byte + chunk
+        self._odd_byte = data[len(data) - len(data) % 2:]
+        samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+        forwarded = self._forward(self._vad(self._frames(self._resample(samples))))
+        _count(bytes_in=len(chunk), bytes_forwarded=len(forwarded),
+               process_seconds_total=time.perf_counter() - started)
+        return forwarded
+
+    def _resample(self, samples):
+        if self._factor == 1:
+            return samples
+        samples = np.concatenate((self._input_tail, samples))
+        usable = len(samples) - len(samples) % self._factor
+        self._input_tail = samples[usable:]
+        if not usable:
+            return np.zeros(0, dtype=np.int16)
+        signal = np.concatenate((self._history, samples[:usable].astype(np.float32)))
+        self._history = signal[len(signal) - len(self._history):]
+        # Polyphase decimation: only every `factor`-th filter output is computed
+        windows = np.lib.stride_tricks.sliding_window_view(signal, len(self._taps))[::self._factor]
+        return np.clip(np.rint(windows @ self._taps), -FULL_SCALE, FULL_SCALE - 1).astype(np.int16)
+
+    def _frames(self, samples):
+        samples = np.concatenate((self._output_tail, samples))
+        count = len(samples) // self._frame_len
+        self._output_tail = samples[count * self._frame_len:]
+        return samples[:count * self._frame_len].reshape(count, self._frame_len)
+
+    def _vad(self, frames):
+        """
+        Returns (frames, keep, start): previously pending frames followed by the
+        new ones, which of them to forward, and the index of the first. A silent
+        tail that could still be pre-roll for later speech is left pending.
+        """
+        new = len(frames)
+        _count(frames=new)
+        if self._pending:
+            frames = np.concatenate((np.stack(self._pending), frames))
+        start = self._pending_start
+        total = len(frames)
+        index = np.arange(start, start + total)
+        power = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / self._frame_len
+        voiced = power >= self._threshold
+        voiced[:total - new] = False  # pending frames were already found silent
+
+        never = np.iinfo(np.int64).min // 2
+        last = np.maximum.accumulate(np.where(voiced, index, never))
+        if self._last_voiced is not None:
+            last = np.maximum(last, self._last_voiced)
+        upcoming = np.minimum.accumulate(np.where(voiced, index, -never)[::-1])[::-1]
+        keep = (index - last <= self._pad_frames) | (upcoming - index <= self._pad_frames)
+        if voiced.any():
+            self._last_voiced = int(index[voiced][-1])
+
+        # A silent tail close enough to the end may turn out to be pre-roll
+        undecided = total
+        while undecided > 0 and not keep[undecided - 1] and total - undecided < self._pad_frames:
+            undecided -= 1
+        self._pending = deque(frames[undecided:])
+        self._pending_start = start + undecided
+        return frames[:undecided], keep[:undecided], start
+
+    def _forward(self, decided) -> bytes:
+        frames, keep, start = decided
+        if not keep.any():
+            return b""
+        kept = np.flatnonzero(keep)
+        # Each run of consecutive kept frames starts a new entry in the time map
+        run_starts = kept[np.flatnonzero(np.diff(kept, prepend=-2) != 1)]
+        run_lengths = np.diff(np.append(np.searchsorted(kept, run_starts), len(kept)))
+        stream_s = self._forwarded_samples / self.output_rate
+        for run_start, length in zip(run_starts.tolist(), run_lengths.tolist()):
+            if start + run_start != self._next_forward:
+                self.time_map.add(stream_s, (start + run_start) * self._frame_s)
+            self._next_forward = start + run_start + length
+            stream_s += length * self._frame_s
+        self._forwarded_samples += len(kept) * self._frame_len
+        _count(frames_forwarded=len(kept))
+        return frames[kept].astype("<i2", copy=False).tobytes()
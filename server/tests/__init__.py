@@ -0,0 +1,2 @@
+# server/tests/__init__.py
+# This file makes the 'tests' directory a Python package.
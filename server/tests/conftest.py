@@ -0,0 +1,29 @@
+# server/tests/conftest.py
+import pytest
+
+from ..app import create_app
+from ..config import Config
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """
+    An app that starts without MongoDB: no index creation, search index or
+    reconciliation job. Only requests rejected before any database access can
+    be tested with it.
+    """
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.update(
+        TESTING=True,
+        MONGO_CREATE_INDEXES=False,
+        SEARCH_INDEX_ENABLED=False,
+        RECONCILE_INTERVAL_S=0,
+        SESSION_HEARTBEAT_INTERVAL_S=0,
+        STT_POOL_SIZE=0,
+        MONGO_SERVER_SELECTION_TIMEOUT_MS=200,
+        RECORDINGS_DIR=str(tmp_path_factory.mktemp("recordings")),
+    )
+    return create_app(config)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
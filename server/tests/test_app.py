@@ -0,0 +1,27 @@
+# server/tests/test_app.py
+import threading
+
+from ..app import create_app
+from ..config import Config
+from ..services import search_index
+from ..stt import connection_pool
+
+def test_scripts_get_an_app_without_background_services(tmp_path):
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.update(
+        TESTING=True,
+        MONGO_CREATE_INDEXES=False,
+        SEARCH_INDEX_ENABLED=True,
+        SEARCH_INDEX_DIR=str(tmp_path / "search_index"),
+        RECONCILE_INTERVAL_S=60,
+        SESSION_HEARTBEAT_INTERVAL_S=30,
+        STT_POOL_SIZE=2,
+        RECORDINGS_DIR=str(tmp_path / "recordings"),
+    )
+    app = create_app(config, background_services=False)
+
+    assert "/health" in [rule.rule for rule in app.url_map.iter_rules()]
+    names = {thread.name for thread in threading.enumerate()}
+    assert not names & {"recording-reconciliation", "recording-heartbeat", "search-index-flush-timer"}
+    assert search_index._index is None
+    assert connection_pool._pool is None
@@ -0,0 +1,75 @@
+# server/tests/test_audio_ring_buffer.py
+from ..stt.audio_ring_buffer import AudioRingBuffer
+from ..utils.webm_index import WebmClusterIndexer
+from .webm_samples import cluster, header
+
+BYTES_PER_S = 32000  # 16 kHz, 16-bit mono
+
+def _pcm_chunk(i: int, size: int = 8000) -> bytes:
+    return bytes([i % 256]) * size
+
+def test_pcm_replays_from_the_chunk_at_the_position():
+    buffer = AudioRingBuffer(max_seconds=60, chunk_ms=250, bytes_per_s=BYTES_PER_S)
+    chunks = [_pcm_chunk(i) for i in range(8)]
+    for chunk in chunks:
+        buffer.append(chunk)
+    assert buffer.end_offset == 8 * 8000
+
+    offset_s, frames = buffer.replay_from(0.6)
+    assert offset_s == 0.5
+    assert frames == chunks[2:]
+    assert buffer.replay_from(0.0) == (0.0, chunks)
+
+def test_pcm_keeps_roughly_the_last_max_seconds():
+    buffer = AudioRingBuffer(max_seconds=1.0, chunk_ms=250, bytes_per_s=BYTES_PER_S)
+    chunks = [_pcm_chunk(i) for i in range(20)]
+    for chunk in chunks:
+        buffer.append(chunk)
+    offset_s, frames = buffer.replay_from(0.0)
+    # The chunk that started at 4.75 s minus 1 s is still retained
+    assert offset_s == 3.75
+    assert frames == chunks[15:]
+
+def test_frames_since_splits_a_chunk():
+    buffer = AudioRingBuffer(max_seconds=60, chunk_ms=250, bytes_per_s=BYTES_PER_S)
+    for i in range(3):
+        buffer.append(_pcm_chunk(i, 10))
+    assert buffer.frames_since(15) == [_pcm_chunk(1, 5), _pcm_chunk(2, 10)]
+    assert buffer.frames_since(30) == []
+
+def test_other_audio_is_positioned_by_chunk_count():
+    buffer = AudioRingBuffer(max_seconds=60, chunk_ms=100)
+    for i in range(10):
+        buffer.append(b"opus" + bytes([i]))
+    offset_s, frames = buffer.replay_from(0.45)
+    assert offset_s == 0.4
+    assert frames[0] == b"opus\x04" and len(frames) == 6
+
+def test_webm_replay_restarts_at_a_cluster_with_the_header():
+    head = header()
+    clusters = [cluster(timecode) for timecode in range(0, 10000, 1000)]
+    data = head + b"".join(clusters)
+    buffer = AudioRingBuffer(max_seconds=3.0, chunk_ms=250)
+    for i in range(0, len(data), 50):
+        buffer.append(data[i:i + 50])
+
+    offset_s, frames = buffer.replay_from(8.5)
+    assert offset_s == 8.0
+    replay = b"".join(frames)
+    assert replay == head + b"".join(clusters[8:])
+
+    # The replay is a stream a fresh decoder can index from its first byte
+    indexer = WebmClusterIndexer()
+    indexer.feed(replay)
+    assert indexer.error is None and indexer.header_end == len(head)
+    assert [c[1] for c in indexer.clusters] == [8000, 9000]
+
+def test_webm_replay_never_starts_before_the_retained_audio():
+    head = header()
+    data = head + b"".join(cluster(timecode) for timecode in range(0, 10000, 1000))
+    buffer = AudioRingBuffer(max_seconds=3.0, chunk_ms=250)
+    for i in range(0, len(data), 50):
+        buffer.append(data[i:i + 50])
+    offset_s, frames = buffer.replay_from(0.0)
+    assert 5.0 <= offset_s <= 6.0
+    assert frames[0].startswith(head)
@@ -0,0 +1,83 @@
+# server/tests/test_audio_sink.py
+import asyncio
+import os
+import time
+
+import pytest
+
+from ..services.audio_sink import AudioWriter
+
+def test_sink_writes_chunks_in_order(tmp_path):
+    writer = AudioWriter(coalesce_bytes=16, flush_interval_s=0.05)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    for i in range(10):
+        sink.write(bytes([i]) * 10)
+    assert sink.close(timeout=5)
+    assert sink.error is None
+    with open(sink.path, "rb") as f:
+        assert f.read() == b"".join(bytes([i]) * 10 for i in range(10))
+
+def test_sink_is_full_at_max_pending_bytes(tmp_path):
+    # A long flush interval and a large coalesce size keep everything pending
+    writer = AudioWriter(coalesce_bytes=1 << 20, flush_interval_s=60, max_pending_bytes=100)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    sink.write(b"x" * 60)
+    assert not sink.is_full
+    sink.write(b"x" * 60)
+    assert sink.is_full
+    assert not asyncio.run(sink.wait_writable(timeout=0.1))
+    assert sink.close(timeout=5)
+    assert not sink.is_full
+    assert os.path.getsize(sink.path) == 120
+
+def test_wait_writable_returns_once_the_writer_catches_up(tmp_path):
+    writer = AudioWriter(coalesce_bytes=100, flush_interval_s=60, max_pending_bytes=100)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    # Reaching the coalesce size schedules a flush on the writer thread
+    sink.write(b"x" * 150)
+    assert asyncio.run(sink.wait_writable(timeout=5))
+    assert sink.close(timeout=5)
+
+def test_waiting_does_not_block_the_event_loop(tmp_path):
+    writer = AudioWriter(coalesce_bytes=1 << 20, flush_interval_s=60, max_pending_bytes=100)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    sink.write(b"x" * 150)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        ticker = asyncio.create_task(tick())
+        # The writer thread only drains the sink when it is closed
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, lambda: loop.run_in_executor(None, sink.close, 5))
+        assert await sink.wait_writable(timeout=5)
+        ticker.cancel()
+
+    asyncio.run(main())
+    assert len(ticks) >= 5
+    assert sink.is_closed
+
+def test_unbounded_sink_is_never_full(tmp_path):
+    writer = AudioWriter(coalesce_bytes=1 << 20, flush_interval_s=60)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    sink.write(b"x" * 4096)
+    assert not sink.is_full
+    assert sink.close(timeout=5)
+
+def test_preallocation_keeps_the_file_size_at_the_bytes_written(tmp_path):
+    writer = AudioWriter(coalesce_bytes=16, flush_interval_s=0.05, preallocate_bytes=1 << 20)
+    sink = writer.open_sink(str(tmp_path / "a.webm"))
+    sink.write(b"x" * 100)
+    deadline = time.monotonic() + 5
+    while sink.bytes_written < 100 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if not writer.preallocate_bytes:
+        pytest.skip("The filesystem does not support fallocate")
+    # Range requests on a live file are sized from st_size
+    assert os.path.getsize(sink.path) == 100
+    assert sink.close(timeout=5)
+    assert os.path.getsize(sink.path) == 100
@@ -0,0 +1,43 @@
+# server/tests/test_compact_words.py
+import bson
+import pytest
+
+from ..models.compact_words import CompactWords, encode_words, words_from_document
+
+def _words(ids=None):
+    texts = ["Grüße", "", "naïve", "don't", "日本語"]
+    ids = ids or [f"word_{i}" for i in range(len(texts))]
+    return [{"id": word_id, "text": text, "start": i * 0.25, "end": i * 0.25 + 0.125, "trusted": i % 2 == 0}
+            for i, (word_id, text) in enumerate(zip(ids, texts))]
+
+@pytest.mark.parametrize("ids", [None, ["word_0", "word_1", "word_v2_0", "word_3", "x"]])
+def test_round_trip_through_bson(ids):
+    words = _words(ids)
+    encoded = encode_words(words)
+    # What MongoDB stores and hands back
+    stored = bson.decode(bson.encode({"wordsCompact": encoded}))
+    decoded = words_from_document(stored)
+    assert isinstance(decoded, CompactWords)
+    assert decoded.to_list() == words
+    assert list(decoded) == words
+    assert ("ids" in encoded) == (ids is not None)
+
+def test_times_are_stored_in_whole_milliseconds():
+    [word] = CompactWords(encode_words([{"id": "word_0", "text": "a", "start": 1.2344, "end": 1.2346}])).to_list()
+    assert (word["start"], word["end"], word["trusted"]) == (1.234, 1.235, True)
+
+def test_sequence_access():
+    words = _words()
+    compact = CompactWords(encode_words(words))
+    assert len(compact) == len(words)
+    assert compact[-1] == words[-1]
+    assert compact[1:3] == words[1:3]
+    assert compact.starts() == [w["start"] for w in words]
+    assert compact.ends() == [w["end"] for w in words]
+    with pytest.raises(IndexError):
+        compact[len(words)]
+
+def test_empty_and_document_formats():
+    assert CompactWords(encode_words([])).to_list() == []
+    assert words_from_document({"words": _words()}) == _words()
+    assert words_from_document({}) == []
@@ -0,0 +1,101 @@
+# server/tests/test_connection_pool.py
+import asyncio
+from types import SimpleNamespace
+
+from ..stt import connection_pool
+from ..stt.connection_pool import KEEPALIVE_MESSAGE, SttConnectionPool
+
+URI = "wss://stt.example/listen"
+
+class FakeSocket:
+    def __init__(self):
+        self.state = SimpleNamespace(name="OPEN")
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def close(self):
+        self.state.name = "CLOSED"
+
+def _pool(size=2, idle_ttl_s=60, keepalive_interval_s=60):
+    return SttConnectionPool(URI, "key", size=size, idle_ttl_s=idle_ttl_s,
+                             refill_per_s=0, keepalive_interval_s=keepalive_interval_s)
+
+async def _wait_for(condition, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+def test_pool_fills_and_hands_out_open_connections(monkeypatch):
+    opened = []
+
+    async def open_socket(uri, api_key):
+        opened.append(FakeSocket())
+        return opened[-1]
+
+    monkeypatch.setattr(connection_pool, "open_stt_socket", open_socket)
+
+    async def main():
+        pool = _pool(size=2)
+        pool.start()
+        await _wait_for(lambda: pool.get_metrics()["idle"] == 2)
+        # The first idle connection died while waiting
+        await opened[0].close()
+        assert await pool.acquire(URI) is opened[1]
+        # Sessions for another endpoint always connect themselves
+        assert await pool.acquire("wss://other.example/listen") is None
+        # Checkouts are replaced
+        await _wait_for(lambda: pool.get_metrics()["idle"] == 2)
+        metrics = pool.get_metrics()
+        await pool.close()
+        return metrics
+
+    metrics = asyncio.run(main())
+    assert metrics["checkouts"] == 1
+    assert metrics["dead"] == 1
+    assert metrics["checkout_misses"] == 1
+    assert metrics["connections_opened"] == 4
+    # Closing the pool closes what is idle, not what sessions checked out
+    assert [ws.state.name for ws in opened] == ["CLOSED", "OPEN", "CLOSED", "CLOSED"]
+
+def test_idle_connections_get_keepalives_and_expire(monkeypatch):
+    opened = []
+
+    async def open_socket(uri, api_key):
+        opened.append(FakeSocket())
+        return opened[-1]
+
+    monkeypatch.setattr(connection_pool, "open_stt_socket", open_socket)
+
+    async def main():
+        pool = _pool(size=1, idle_ttl_s=0.3, keepalive_interval_s=0.05)
+        pool.start()
+        await _wait_for(lambda: pool.get_metrics()["expired"] >= 1)
+        await pool.close()
+
+    asyncio.run(main())
+    assert KEEPALIVE_MESSAGE in opened[0].sent
+    assert opened[0].state.name == "CLOSED"
+
+def test_connect_failures_back_off(monkeypatch):
+    attempts = []
+
+    async def open_socket(uri, api_key):
+        attempts.append(1)
+        raise OSError("unreachable")
+
+    monkeypatch.setattr(connection_pool, "open_stt_socket", open_socket)
+
+    async def main():
+        pool = _pool(size=2)
+        pool.start()
+        await _wait_for(lambda: pool.get_metrics()["connect_failures"] >= 1)
+        # The first retry waits two seconds
+        await asyncio.sleep(0.3)
+        assert await pool.acquire(URI) is None
+        await pool.close()
+
+    asyncio.run(main())
+    assert len(attempts) == 1
@@ -0,0 +1,29 @@
+# server/tests/test_db.py
+from ..db import PoolMetricsListener, get_db
+
+def test_pool_metrics_track_connections_and_checkouts():
+    listener = PoolMetricsListener()
+    for _ in range(2):
+        listener.connection_created(None)
+    listener.connection_check_out_started(None)
+    listener.connection_checked_out(None)
+    listener.connection_check_out_started(None)
+    listener.connection_check_out_failed(None)
+    listener.connection_checked_in(None)
+    listener.connection_closed(None)
+
+    metrics = listener.get_metrics()
+    assert metrics["connections_open"] == 1
+    assert metrics["connections_in_use"] == 0
+    assert metrics["checkouts"] == 1
+    assert metrics["checkout_failures"] == 1
+    assert metrics["checkout_wait_seconds_max"] <= metrics["checkout_wait_seconds_total"]
+
+def test_app_contexts_share_one_client(app):
+    with app.app_context():
+        first = get_db()
+        assert get_db() is first
+    with app.app_context():
+        second = get_db()
+    # A fresh handle per context, backed by the same pooled client
+    assert second.client is first.client is app.extensions['mongo_client']
@@ -0,0 +1,41 @@
+# server/tests/test_lru_cache.py
+from ..utils.lru_cache import VersionedLRUCache
+
+def test_lookup_with_another_version_misses():
+    cache = VersionedLRUCache(100)
+    cache.put(("rec", "a"), 1, b"body")
+    assert cache.get(("rec", "a"), 1) == b"body"
+    assert cache.get(("rec", "a"), 2) is None
+
+def test_least_recently_used_entries_are_evicted_to_fit_the_budget():
+    cache = VersionedLRUCache(10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)
+    cache.put("c", 1, b"cccc")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa" and cache.get("c", 1) == b"cccc"
+    metrics = cache.get_metrics()
+    assert metrics["bytes"] == 8 and metrics["evictions"] == 1
+    # Larger than the whole budget: not cached, and nothing is evicted for it
+    cache.put("d", 1, b"d" * 11)
+    assert cache.get("d", 1) is None and cache.get_metrics()["entries"] == 2
+
+def test_invalidate_drops_every_variant_of_a_group():
+    cache = VersionedLRUCache(100)
+    cache.put(("rec", "a"), 1, b"1")
+    cache.put(("rec", "b"), 1, b"2")
+    cache.put(("other", "a"), 1, b"3")
+    cache.invalidate("rec")
+    assert cache.get(("rec", "a"), 1) is None and cache.get(("rec", "b"), 1) is None
+    assert cache.get(("other", "a"), 1) == b"3"
+    assert cache.get_metrics()["bytes"] == 1
+
+def test_get_or_build_builds_once_per_version():
+    cache = VersionedLRUCache(100)
+    builds = []
+    build = lambda: builds.append(1) or b"built"
+    assert cache.get_or_build("k", 1, build) == b"built"
+    assert cache.get_or_build("k", 1, build) == b"built"
+    cache.get_or_build("k", 2, build)
+    assert len(builds) == 2
@@ -0,0 +1,53 @@
+# server/tests/test_metrics_export.py
+from ..utils.histogram import Histogram
+from ..utils.prometheus import PrometheusText
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    cumulative, total, count = histogram.snapshot()
+    # A value equal to a bound falls in that bucket; the last slot is +Inf
+    assert cumulative == [2, 3, 4, 5]
+    assert (round(total, 3), count) == (5.565, 5)
+    assert histogram.quantile(0.4) == 0.01
+    assert histogram.quantile(0.8) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+
+def test_empty_histogram_summary():
+    assert Histogram().summary() == {"count": 0, "mean": None, "p50": None, "p90": None, "p99": None}
+
+def test_prometheus_text_format():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+    text = PrometheusText(prefix="app_")
+    text.counter("requests_total", 3, "Requests served.", {"route": 'say "hi"\n'})
+    text.counter("requests_total", 4, "Requests served.", {"route": "b"})
+    text.gauge("ready", True, "Whether the app is ready.")
+    text.gauge("lag_seconds", None, "Lag.")
+    text.histogram("latency_seconds", histogram, "Latency.", {"step": "stt"})
+    assert text.render().splitlines() == [
+        "# HELP app_requests_total Requests served.",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="say \\"hi\\"\\n"} 3',
+        'app_requests_total{route="b"} 4',
+        "# HELP app_ready Whether the app is ready.",
+        "# TYPE app_ready gauge",
+        "app_ready 1",
+        "# HELP app_lag_seconds Lag.",
+        "# TYPE app_lag_seconds gauge",
+        "app_lag_seconds NaN",
+        "# HELP app_latency_seconds Latency.",
+        "# TYPE app_latency_seconds histogram",
+        'app_latency_seconds_bucket{step="stt",le="0.1"} 0',
+        'app_latency_seconds_bucket{step="stt",le="1.0"} 1',
+        'app_latency_seconds_bucket{step="stt",le="+Inf"} 1',
+        'app_latency_seconds_sum{step="stt"} 0.5',
+        'app_latency_seconds_count{step="stt"} 1',
+    ]
+
+def test_metrics_route_serves_prometheus_text(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE transcription_active_sessions gauge" in response.get_data(as_text=True)
@@ -0,0 +1,76 @@
+# server/tests/test_pcm_ingest.py
+import numpy as np
+import pytest
+
+from ..stt.pcm_ingest import (
+    AUDIO_LINEAR16, AUDIO_WEBM, PcmPreprocessor, StreamTimeMap, negotiate_audio_format
+)
+
+def _tone(seconds, rate, amplitude=8000, hz=440):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * hz * t)).astype("<i2")
+
+def _silence(seconds, rate):
+    return np.zeros(int(seconds * rate), dtype="<i2")
+
+def _feed(preprocessor, pcm: bytes, chunk_bytes: int) -> bytes:
+    return b"".join(preprocessor.process(pcm[i:i + chunk_bytes]) for i in range(0, len(pcm), chunk_bytes))
+
+def test_negotiate_audio_format():
+    assert negotiate_audio_format({}) == (AUDIO_WEBM, None)
+    assert negotiate_audio_format({"audio": {"encoding": "linear16", "sampleRate": 48000}}) == (AUDIO_LINEAR16, 48000)
+    for audio in ({"encoding": "opus"}, {"encoding": "linear16"}, {"encoding": "linear16", "sampleRate": 10**6}):
+        with pytest.raises(ValueError):
+            negotiate_audio_format({"audio": audio})
+
+def test_time_map_maps_runs_back_onto_the_recording():
+    time_map = StreamTimeMap()
+    time_map.add(0.0, 1.0)
+    time_map.add(2.0, 5.0)
+    assert time_map.entries() == [(0.0, 1.0), (2.0, 5.0)]
+    assert time_map.to_recording(0.5) == 1.5
+    assert time_map.to_recording(2.5) == 5.5
+    # A word ending where a run starts ends in the run before it
+    assert time_map.to_recording(2.0) == 5.0
+    assert time_map.to_recording(2.0, end=True) == 3.0
+
+    payload = {"words": [{"start": 1.5, "end": 2.0}, {"start": 2.0, "end": 2.25}]}
+    time_map.map_payload(payload)
+    assert payload["words"] == [{"start": 2.5, "end": 3.0}, {"start": 5.0, "end": 5.25}]
+    assert (payload["start"], payload["end"]) == (2.5, 5.25)
+
+def test_decimates_to_the_target_rate():
+    preprocessor = PcmPreprocessor(48000, 16000, vad=False)
+    assert preprocessor.output_rate == 16000
+    out = np.frombuffer(_feed(preprocessor, _tone(1.0, 48000).tobytes(), 4801), dtype="<i2")
+    # Everything but the last partial frame is forwarded
+    assert 16000 - preprocessor._frame_len < len(out) <= 16000
+    # The tone survives the low-pass filter at its amplitude
+    assert 7000 < np.abs(out[1000:]).max() < 9000
+
+def test_rates_that_are_not_a_multiple_are_left_as_they_are():
+    assert PcmPreprocessor(44100, 16000, vad=False).output_rate == 44100
+    assert PcmPreprocessor(16000, 16000, vad=False).output_rate == 16000
+
+def test_chunk_boundaries_do_not_change_the_output():
+    pcm = np.concatenate((_silence(1.0, 48000), _tone(0.5, 48000), _silence(1.0, 48000))).tobytes()
+    whole = _feed(PcmPreprocessor(48000, 16000), pcm, len(pcm))
+    assert _feed(PcmPreprocessor(48000, 16000), pcm, 333) == whole
+
+def test_silence_is_dropped_and_times_map_back():
+    rate = 16000
+    pcm = np.concatenate((_silence(2.0, rate), _tone(1.0, rate), _silence(3.0, rate), _tone(0.5, rate),
+                          _silence(2.0, rate))).tobytes()
+    preprocessor = PcmPreprocessor(rate, rate, frame_ms=20, hangover_ms=300)
+    out = _feed(preprocessor, pcm, 3200)
+
+    # Each burst of speech plus 300 ms of hangover on either side
+    assert len(out) / 2 / rate == pytest.approx(1.6 + 1.1)
+    assert preprocessor.time_map.entries() == [(0.0, pytest.approx(1.7)), (pytest.approx(1.6), pytest.approx(5.7))]
+    # Speech at 0.3 s into the forwarded stream is where the first tone starts
+    assert preprocessor.time_map.to_recording(0.3) == pytest.approx(2.0)
+    assert preprocessor.time_map.to_recording(1.9) == pytest.approx(6.0)
+
+def test_quiet_audio_is_all_dropped():
+    preprocessor = PcmPreprocessor(16000, 16000, threshold_dbfs=-45.0)
+    assert _feed(preprocessor, _tone(1.0, 16000, amplitude=50).tobytes(), 3200) == b""
@@ -0,0 +1,51 @@
+# server/tests/test_reconciliation.py
+import datetime
+
+import pytest
+
+from ..models import recording_model
+from ..services.reconciliation import heartbeat_live_recordings, reconcile_stale_recordings
+
+@pytest.fixture
+def recordings(monkeypatch):
+    """
+    In-memory stand-in for the recordings collection: id -> updatedAt of
+    in-progress recordings, and id -> status of finalized ones.
+    """
+    updated_at, statuses = {}, {}
+
+    def touch_recordings(recording_ids):
+        now = datetime.datetime.utcnow()
+        touched = [rid for rid in recording_ids if rid in updated_at]
+        for rid in touched:
+            updated_at[rid] = now
+        return len(touched)
+
+    def find_stale_recordings(updated_before, limit=100):
+        return [rid for rid, at in updated_at.items() if at < updated_before][:limit]
+
+    def update_recording_status(recording_id, status, final_text=None, duration_ms=None, audio_path=None):
+        updated_at.pop(recording_id, None)
+        statuses[recording_id] = status
+
+    monkeypatch.setattr(recording_model, "touch_recordings", touch_recordings)
+    monkeypatch.setattr(recording_model, "find_stale_recordings", find_stale_recordings)
+    monkeypatch.setattr(recording_model, "rebuild_final_text", lambda recording_id: ("", None))
+    monkeypatch.setattr(recording_model, "update_recording_status", update_recording_status)
+    return updated_at, statuses
+
+def test_sessions_live_on_another_worker_survive_reconciliation(recordings):
+    updated_at, statuses = recordings
+    long_ago = datetime.datetime.utcnow() - datetime.timedelta(hours=2)
+    # Both sessions have been quiet for two hours; only rec-live still has a worker
+    updated_at.update({"rec-live": long_ago, "rec-orphan": long_ago})
+
+    assert heartbeat_live_recordings({"rec-live"}) == 1
+    # This worker has no live sessions of its own
+    assert reconcile_stale_recordings(stale_after_s=3600) == 1
+    assert statuses == {"rec-orphan": "aborted"}
+    assert "rec-live" in updated_at
+
+def test_heartbeat_skips_recordings_that_are_no_longer_in_progress(recordings):
+    assert heartbeat_live_recordings(set()) == 0
+    assert heartbeat_live_recordings({"rec-finished"}) == 0
@@ -0,0 +1,87 @@
+# server/tests/test_recordings_routes.py
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from ..api import recordings_routes
+
+RECORDING_ID = "0123456789abcdef01234567"
+
+def test_malformed_segment_cursor_is_a_bad_request(client):
+    response = client.get(f"/api/recordings/{RECORDING_ID}?cursor=3:not-an-object-id")
+    assert response.status_code == 400
+    assert "Invalid query parameters" in response.get_json()["error"]
+
+def test_malformed_recording_cursor_is_a_bad_request(client):
+    response = client.get("/api/recordings?userId=user-1&cursor=1700000000000:not-an-object-id")
+    assert response.status_code == 400
+    assert "Invalid query parameters" in response.get_json()["error"]
+
+def test_out_of_range_recording_cursor_is_a_bad_request(client):
+    for created_ms in ("99999999999999999", "-99999999999999"):
+        response = client.get(f"/api/recordings?userId=user-1&cursor={created_ms}:{RECORDING_ID}")
+        assert response.status_code == 400
+        assert "out of range" in response.get_json()["error"]
+
+class _Recordings:
+    """
+    Stands in for recording_model with one recording, counting full reads.
+    """
+    def __init__(self, recording_id, status="completed"):
+        self.doc = {"_id": ObjectId(recording_id), "status": status, "finalText": "hello",
+                    "updatedAt": datetime.datetime(2024, 5, 1, 12, 0, 0, 123000)}
+        self.full_reads = 0
+
+    def get_recording(self, recording_id, projection=None):
+        if projection == {"segments": 0}:
+            self.full_reads += 1
+        return dict(self.doc)
+
+    def iter_segments(self, recording_id, **query):
+        return iter([])
+
+@pytest.fixture
+def recordings(monkeypatch):
+    def install(status="completed"):
+        fake = _Recordings(str(ObjectId()), status)
+        for name in ("get_recording", "iter_segments"):
+            monkeypatch.setattr(recordings_routes.recording_model, name, getattr(fake, name))
+        return fake
+    return install
+
+def test_etag_revalidation_returns_304(client, recordings):
+    fake = recordings()
+    url = f"/api/recordings/{fake.doc['_id']}"
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    revalidated = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+    assert client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+    # Another representation, or a changed recording, has another ETag
+    assert client.get(f"{url}?fields=text").headers["ETag"] != first.headers["ETag"]
+    fake.doc["updatedAt"] += datetime.timedelta(seconds=1)
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+def test_completed_recordings_are_served_from_the_cache(client, recordings):
+    fake = recordings()
+    url = f"/api/recordings/{fake.doc['_id']}"
+    body = client.get(url).get_data()
+    assert client.get(url).get_data() == body
+    assert fake.full_reads == 1
+
+    fake.doc["updatedAt"] += datetime.timedelta(seconds=1)
+    fake.doc["finalText"] = "hello again"
+    assert client.get(url).get_json()["finalText"] == "hello again"
+    assert fake.full_reads == 2
+
+def test_in_progress_recordings_are_not_cached(client, recordings):
+    fake = recordings(status="in_progress")
+    url = f"/api/recordings/{fake.doc['_id']}"
+    client.get(url)
+    client.get(url)
+    assert fake.full_reads == 2
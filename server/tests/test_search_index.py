@@ -0,0 +1,129 @@
+# server/tests/test_search_index.py
+import os
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from ..services.search_index import (
+    MAGIC, PART_PREFIX, PartFile, SearchIndex, merge_parts, normalize_term, parse_query, write_part
+)
+
+RECORDING_A, RECORDING_B = str(ObjectId()), str(ObjectId())
+
+def _segment(index, text, start=0.0, seg_id=None):
+    words = [{"text": word, "start": start + i, "end": start + i + 0.5} for i, word in enumerate(text.split())]
+    return {"_id": seg_id or ObjectId(), "index": index, "words": words}
+
+def _open_index(tmp_path, max_parts=8):
+    return SearchIndex(str(tmp_path), flush_words=10**6, flush_interval_s=3600, max_parts=max_parts)
+
+def _parts(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path) if name.startswith(PART_PREFIX))
+
+def _hits(index, query):
+    return {result["recordingId"]: result["hits"] for result in index.search(query)["results"]}
+
+def test_normalize_and_parse_query():
+    assert normalize_term("Don’t,") == "don't"
+    assert normalize_term("'quoted'") == "quoted"
+    assert parse_query('Hello "the Brown fox" hello') == [["hello"], ["the", "brown", "fox"]]
+    with pytest.raises(ValueError):
+        parse_query(" ".join(f"w{i}" for i in range(17)))
+
+def test_part_file_round_trip(tmp_path):
+    index = _open_index(tmp_path)
+    index.add_segments(RECORDING_A, [_segment(0, "the quick brown fox"), _segment(1, "jumps over", start=5.0)])
+    part, _ = index._delta.snapshot()
+    path = write_part(str(tmp_path), part)
+
+    with open(path, "rb") as f:
+        assert f.read(4) == MAGIC
+    loaded = PartFile(path)
+    assert loaded.num_docs == 2
+    assert loaded.terms() == sorted(["the", "quick", "brown", "fox", "jumps", "over"])
+    for name in ("seg_ids", "stamps", "doc_recordings", "doc_indexes", "doc_words", "recordings",
+                 "starts", "ends", "term_offsets", "term_bytes", "postings", "post_docs", "post_pos"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(part, name), err_msg=name)
+    assert loaded.term_id("fox") >= 0 and loaded.term_id("wolf") == -1
+
+def test_part_file_rejects_other_files(tmp_path):
+    path = tmp_path / f"{PART_PREFIX}bogus.idx"
+    path.write_bytes(b"NOPE" + bytes(60))
+    with pytest.raises(ValueError):
+        PartFile(str(path))
+
+def test_phrase_matches_adjacent_words_in_order(tmp_path):
+    index = _open_index(tmp_path)
+    index.add_segments(RECORDING_A, [_segment(3, "the quick brown fox", start=10.0)])
+    index.add_segments(RECORDING_B, [_segment(0, "brown and quick")])
+
+    assert _hits(index, '"quick brown"') == {
+        RECORDING_A: [{"start": 11.0, "end": 12.5, "segmentIndex": 3, "match": "quick brown"}]
+    }
+    assert _hits(index, '"brown quick"') == {}
+    assert set(_hits(index, "quick brown")) == {RECORDING_A, RECORDING_B}
+    assert set(_hits(index, "quick fox")) == {RECORDING_A}
+
+def test_phrase_does_not_span_segments(tmp_path):
+    index = _open_index(tmp_path)
+    index.add_segments(RECORDING_A, [_segment(0, "the quick"), _segment(1, "brown fox", start=2.0)])
+    index.flush(force=True)
+    assert _hits(index, '"quick brown"') == {}
+
+def test_reindexed_segment_replaces_its_older_copy(tmp_path):
+    index = _open_index(tmp_path)
+    seg_id = ObjectId()
+    index.add_segments(RECORDING_A, [_segment(0, "old words here", seg_id=seg_id)])
+    index.flush(force=True)
+    # The delta's newer copy hides the part's copy
+    index.add_segments(RECORDING_A, [_segment(0, "new words here", seg_id=seg_id)])
+    assert _hits(index, "old") == {}
+    assert set(_hits(index, "new")) == {RECORDING_A}
+
+    # Once both copies are in parts, the stamps decide
+    index.flush(force=True)
+    assert len(_parts(tmp_path)) == 2
+    assert _hits(index, "old") == {}
+    assert set(_hits(index, "new")) == {RECORDING_A}
+    reopened = _open_index(tmp_path)
+    assert _hits(reopened, "old") == {}
+    assert reopened.search("words")["total"] == 1
+
+def test_live_masks_flag_the_newest_copy(tmp_path):
+    index = _open_index(tmp_path)
+    seg_id = ObjectId()
+    for text in ("first copy", "second copy", "third copy"):
+        index.add_segments(RECORDING_A, [_segment(0, text, seg_id=seg_id), _segment(1, f"other {text}")])
+        index.flush(force=True)
+    parts = sorted(index._parts.values(), key=lambda part: part.path)
+    masks = SearchIndex._live_masks(parts)
+    assert [masks[part.path].tolist() for part in parts] == [[False, True], [False, True], [True, True]]
+
+def test_merge_parts_keeps_only_live_documents(tmp_path):
+    index = _open_index(tmp_path)
+    seg_id = ObjectId()
+    index.add_segments(RECORDING_A, [_segment(0, "alpha beta", seg_id=seg_id), _segment(1, "gamma delta")])
+    index.flush(force=True)
+    index.add_segments(RECORDING_B, [_segment(0, "beta epsilon", seg_id=seg_id)])
+    index.flush(force=True)
+    parts = sorted(index._parts.values(), key=lambda part: part.path)
+
+    merged = merge_parts(parts, [index._part_live[part.path] for part in parts])
+    assert merged.num_docs == 2
+    assert merged.terms() == ["beta", "delta", "epsilon", "gamma"]
+    assert np.diff(merged.doc_words).tolist() == [2, 2]
+    epsilon = merged.term_id("epsilon")
+    assert merged.post_pos[merged.postings[epsilon]:merged.postings[epsilon + 1]].tolist() == [1]
+
+def test_too_many_parts_are_merged(tmp_path):
+    index = _open_index(tmp_path, max_parts=2)
+    seg_id = ObjectId()
+    for i in range(4):
+        index.add_segments(RECORDING_A, [_segment(0, f"version{i} shared", seg_id=seg_id),
+                                         _segment(i + 1, f"segment{i} shared")])
+        index.flush(force=True)
+    assert len(_parts(tmp_path)) <= 2
+    assert _hits(index, "version0") == {}
+    assert set(_hits(index, "version3")) == {RECORDING_A}
+    assert index.search("shared")["results"][0]["hitCount"] == 5
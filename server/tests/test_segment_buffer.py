@@ -0,0 +1,87 @@
+# server/tests/test_segment_buffer.py
+import asyncio
+
+import pytest
+
+from ..services import segment_buffer
+from ..services.segment_buffer import SegmentWriteBuffer
+
+class _Store:
+    """
+    Stands in for recording_model.append_segments; the first `failures` calls raise.
+    """
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def append_segments(self, recording_id, docs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append([doc["index"] for doc in docs])
+
+@pytest.fixture
+def store(app, monkeypatch):
+    def install(failures=0):
+        fake = _Store(failures)
+        monkeypatch.setattr(segment_buffer.recording_model, "append_segments", fake.append_segments)
+        return fake
+    with app.app_context():
+        yield install
+
+def _add(buffer, index):
+    buffer.add(index, f"segment {index}", [], index, index + 1, True)
+
+def test_full_batches_are_written_together(store):
+    fake = store()
+
+    async def main():
+        buffer = SegmentWriteBuffer("rec", max_batch=3, flush_interval_s=60)
+        for i in range(7):
+            _add(buffer, i)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        assert fake.batches == [[0, 1, 2], [3, 4, 5]]
+        assert await buffer.close()
+
+    asyncio.run(main())
+    assert fake.batches[-1] == [6]
+
+def test_a_partial_batch_is_written_after_the_interval(store):
+    fake = store()
+
+    async def main():
+        buffer = SegmentWriteBuffer("rec", max_batch=100, flush_interval_s=0.02)
+        _add(buffer, 0)
+        _add(buffer, 1)
+        await asyncio.sleep(0.01)
+        assert fake.batches == []
+        await asyncio.sleep(0.05)
+        assert fake.batches == [[0, 1]]
+        await buffer.close()
+
+    asyncio.run(main())
+
+def test_failed_flushes_keep_segments_in_order_for_the_retry(store):
+    fake = store(failures=1)
+
+    async def main():
+        buffer = SegmentWriteBuffer("rec", max_batch=2, flush_interval_s=60)
+        _add(buffer, 0)
+        _add(buffer, 1)
+        await asyncio.sleep(0.01)
+        _add(buffer, 2)
+        return await buffer.close()
+
+    assert asyncio.run(main())
+    assert fake.batches == [[0, 1, 2]]
+
+def test_close_reports_segments_that_could_not_be_written(store):
+    store(failures=10)
+
+    async def main():
+        buffer = SegmentWriteBuffer("rec", max_batch=10, flush_interval_s=60)
+        _add(buffer, 0)
+        return await buffer.close()
+
+    assert asyncio.run(main()) is False
@@ -0,0 +1,65 @@
+# server/tests/test_session_registry.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ..services.session_registry import LiveSession, SessionRegistry
+from ..ws.transcription_ws import _audio_handler, parse_resume_seq
+
+def _session(recording_id: str, resumable: bool) -> LiveSession:
+    service = SimpleNamespace(recording_id=recording_id, trace=None)
+    return LiveSession(service, audio_channel=None, start_future=None, runtime=None, app=None, resumable=resumable)
+
+def test_resume_refuses_a_session_that_did_not_opt_in():
+    registry = SessionRegistry(grace_s=30)
+    owner = object()
+    session = _session("rec-1", resumable=False)
+    registry.add(session, owner)
+    assert registry.resume("rec-1", object(), takeover_timeout_s=0.1) is None
+    # The original connection keeps the session
+    assert session.ws is owner
+
+def test_resume_hands_a_resumable_session_to_the_new_connection():
+    registry = SessionRegistry(grace_s=30)
+    session = _session("rec-1", resumable=True)
+    registry.add(session, object())
+    newcomer = object()
+    # The previous handler has let go
+    session._released.set()
+    assert registry.resume("rec-1", newcomer, takeover_timeout_s=1) is session
+    assert session.ws is newcomer
+
+def test_resume_of_an_unknown_recording():
+    assert SessionRegistry(grace_s=30).resume("missing", object(), takeover_timeout_s=0.1) is None
+
+def test_resume_seq_defaults_to_where_the_session_left_off():
+    assert parse_resume_seq({"resume": True}) is None
+    assert parse_resume_seq({"resume": True, "seq": 0}) == 0
+    assert parse_resume_seq({"resume": True, "seq": 42}) == 42
+
+@pytest.mark.parametrize("seq", ["12", "abc", 1.5, -1, True, [3]])
+def test_resume_seq_rejects_anything_but_a_non_negative_integer(seq):
+    with pytest.raises(ValueError):
+        parse_resume_seq({"resume": True, "seq": seq})
+
+def test_acks_are_sent_before_the_next_chunk_is_handled():
+    sent = []
+
+    class Service:
+        async def handle_audio_chunk(self, chunk, received_at):
+            sent.append(("chunk", chunk))
+
+        async def send_ack(self, next_seq):
+            await asyncio.sleep(0)
+            sent.append(("ack", next_seq))
+
+    handle = _audio_handler(Service(), ack_every=2)
+
+    async def main():
+        for seq in range(4):
+            await handle((bytes([seq]), 0.0, seq))
+
+    asyncio.run(main())
+    assert sent == [("chunk", b"\x00"), ("chunk", b"\x01"), ("ack", 2),
+                    ("chunk", b"\x02"), ("chunk", b"\x03"), ("ack", 4)]
@@ -0,0 +1,66 @@
+# server/tests/test_session_runtime.py
+import threading
+import time
+
+import pytest
+
+from ..services.session_runtime import OVERLOAD_BLOCK, OVERLOAD_DROP, OVERLOAD_SIGNAL, SessionRuntime
+from ..ws.transcription_ws import overload_policy_for
+
+@pytest.fixture
+def runtime():
+    runtime = SessionRuntime(name="test-runtime")
+    yield runtime
+    runtime.shutdown()
+
+def _gated_channel(runtime, maxsize, **options):
+    """A channel whose handler holds every item until `gate` is set."""
+    gate = threading.Event()
+    handled = []
+
+    async def handler(item):
+        while not gate.is_set():
+            await runtime.loop.run_in_executor(None, gate.wait, 0.05)
+        handled.append(item)
+
+    return runtime.open_channel(handler, maxsize=maxsize, **options), gate, handled
+
+def test_put_without_timeout_blocks_until_a_slot_is_free(runtime):
+    channel, gate, handled = _gated_channel(runtime, maxsize=1)
+    assert channel.put("first")
+    results = []
+    producer = threading.Thread(target=lambda: results.append(channel.put("second")))
+    producer.start()
+    producer.join(0.3)
+    # The full channel must hold the producer back, not drop the chunk
+    assert producer.is_alive()
+    gate.set()
+    producer.join(5)
+    assert results == [True]
+    channel.close(timeout=5)
+    assert handled == ["first", "second"]
+
+def test_put_with_timeout_gives_up_on_a_full_channel(runtime):
+    channel, gate, handled = _gated_channel(runtime, maxsize=1)
+    assert channel.put("first")
+    started = time.perf_counter()
+    assert not channel.put("second", timeout=0.2)
+    assert time.perf_counter() - started >= 0.2
+    gate.set()
+    channel.close(timeout=5)
+    assert handled == ["first"]
+
+def test_drop_policy_discards_above_the_high_watermark(runtime):
+    channel, gate, handled = _gated_channel(runtime, maxsize=100, high_watermark_bytes=10,
+                                            low_watermark_bytes=0, policy=OVERLOAD_DROP)
+    assert channel.put("a", size=8)
+    assert not channel.put("b", size=8)
+    assert channel.dropped_chunks == 1
+    gate.set()
+    channel.close(timeout=5)
+    assert handled == ["a"]
+
+def test_only_linear16_sessions_drop_chunks():
+    assert overload_policy_for(OVERLOAD_DROP, "linear16") == OVERLOAD_DROP
+    assert overload_policy_for(OVERLOAD_DROP, "webm") == OVERLOAD_BLOCK
+    assert overload_policy_for(OVERLOAD_SIGNAL, "webm") == OVERLOAD_SIGNAL
@@ -0,0 +1,31 @@
+# server/tests/test_timeline_routes.py
+import pytest
+
+from ..api import timeline_routes
+from ..services.word_timeline import WordTimeline
+
+RECORDING_ID = "0123456789abcdef01234567"
+
+def _word(word_id, start):
+    return {"id": word_id, "text": word_id, "start": start, "end": start + 0.5, "trusted": True}
+
+@pytest.fixture
+def timeline(monkeypatch):
+    timeline = WordTimeline([{"_id": "a" * 24, "index": 0, "words": [_word(f"word_{i}", i) for i in range(3)]}])
+    monkeypatch.setattr(timeline_routes, "load_timeline", lambda recording_id, config: timeline)
+    return timeline
+
+def _words(client, query):
+    return client.get(f"/api/recordings/{RECORDING_ID}/words?from=0&to=10&{query}")
+
+@pytest.mark.parametrize("limit", ["0", "-1", str(timeline_routes.MAX_RANGE_WORDS + 1)])
+def test_limit_out_of_range_is_a_bad_request(client, limit):
+    assert _words(client, f"limit={limit}").status_code == 400
+
+def test_truncated_only_when_words_were_left_out(client, timeline):
+    exact = _words(client, "limit=3").get_json()
+    assert len(exact["words"]) == 3 and exact["truncated"] is False
+
+    cut = _words(client, "limit=2").get_json()
+    assert [w["id"] for w in cut["words"]] == ["word_0", "word_1"]
+    assert cut["truncated"] is True
@@ -0,0 +1,167 @@
+# server/tests/test_transcript_edits.py
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from ..services import transcript_edits
+from ..services.transcript_edits import EditError, VersionConflict, apply_ops, retime_words, validate_ops
+
+FIRST_ID, SECOND_ID = ObjectId(), ObjectId()
+
+def _word(word_id, text, start, end):
+    return {"id": word_id, "text": text, "start": start, "end": end, "trusted": True}
+
+def _segments():
+    # Two finals of segment 0, each numbering its words from word_0
+    return [
+        {"_id": FIRST_ID, "index": 0, "start": 0.0, "end": 1.0, "text": "one two",
+         "words": [_word("word_0", "one", 0.0, 0.4), _word("word_1", "two", 0.5, 1.0)]},
+        {"_id": SECOND_ID, "index": 0, "start": 1.2, "end": 2.2, "text": "three four",
+         "words": [_word("word_0", "three", 1.2, 1.6), _word("word_1", "four", 1.7, 2.2)]},
+    ]
+
+def _retime(starts, ends, weights, seg_start, seg_end):
+    starts, ends = np.array(starts, dtype=np.float64), np.array(ends, dtype=np.float64)
+    retime_words(starts, ends, np.array(weights, dtype=np.float64), seg_start, seg_end)
+    return starts.tolist(), ends.tolist()
+
+def test_retime_shares_a_gap_by_character_count():
+    nan = np.nan
+    starts, ends = _retime([0.0, nan, nan, 2.0], [0.5, nan, nan, 2.5], [1, 1, 3, 1], 0.0, 3.0)
+    assert starts == [0.0, 0.5, 0.875, 2.0]
+    assert ends == [0.5, 0.875, 2.0, 2.5]
+
+def test_retime_uses_segment_bounds_at_the_edges():
+    nan = np.nan
+    starts, ends = _retime([nan, 1.0, nan], [nan, 1.5, nan], [1, 1, 1], 0.2, 2.0)
+    assert starts == [0.2, 1.0, 1.5]
+    assert ends == [1.0, 1.5, 2.0]
+
+def test_retime_widens_a_gap_too_short_for_its_words():
+    nan = np.nan
+    starts, ends = _retime([0.0, nan, nan, 1.0], [1.0, nan, nan, 2.0], [1, 1, 1, 1], 0.0, 2.0)
+    # The neighbours give up time down to their midpoints
+    assert ends[0] == starts[1] == 0.5
+    assert ends[2] == starts[3] == 1.5
+    assert all(end - start >= 0.08 for start, end in zip(starts, ends))
+    assert starts == sorted(starts)
+
+def test_retime_leaves_timed_words_alone():
+    starts, ends = _retime([0.0, 1.0], [0.5, 1.5], [1, 1], 0.0, 2.0)
+    assert (starts, ends) == ([0.0, 1.0], [0.5, 1.5])
+
+def _apply(ops):
+    return {seg["_id"]: seg for seg in apply_ops(_segments(), validate_ops(ops), id_prefix="new_")}
+
+def test_replace_in_the_second_final_of_a_segment():
+    changed = _apply([{"op": "replace", "segment": 0, "segmentId": str(SECOND_ID), "wordId": "word_1", "text": "for"}])
+    assert list(changed) == [SECOND_ID]
+    assert changed[SECOND_ID]["text"] == "three for"
+    assert changed[SECOND_ID]["words"][1]["trusted"] is False
+
+def test_word_id_repeated_across_finals_needs_a_segment_id():
+    with pytest.raises(EditError, match="segmentId"):
+        _apply([{"op": "replace", "segment": 0, "wordId": "word_1", "text": "for"}])
+
+def test_segment_id_must_belong_to_the_segment():
+    with pytest.raises(EditError, match="not part of segment 0"):
+        _apply([{"op": "delete", "segment": 0, "segmentId": str(ObjectId()), "wordId": "word_0"}])
+
+def test_insert_at_the_start_of_the_second_final():
+    changed = _apply([{"op": "insert", "segment": 0, "segmentId": str(SECOND_ID), "after": None, "texts": ["and"]}])
+    words = changed[SECOND_ID]["words"]
+    assert [w["text"] for w in words] == ["and", "three", "four"]
+    # Timed into the gap between the two finals
+    assert 1.0 <= words[0]["start"] < words[0]["end"] <= 1.2
+
+def test_ops_refer_to_words_added_by_earlier_ops():
+    changed = _apply([
+        {"op": "insert", "segment": 0, "segmentId": str(FIRST_ID), "after": "word_0", "texts": ["and", "a"]},
+        {"op": "delete", "segment": 0, "wordId": "new_1"},
+        {"op": "merge", "segment": 0, "segmentId": str(FIRST_ID), "wordIds": ["word_0", "new_0"], "text": "one-and"},
+    ])
+    assert changed[FIRST_ID]["text"] == "one-and two"
+
+def test_split_shares_the_original_span():
+    changed = _apply([{"op": "split", "segment": 0, "segmentId": str(SECOND_ID), "wordId": "word_0",
+                       "texts": ["thr", "ee"]}])
+    first, second = changed[SECOND_ID]["words"][:2]
+    assert first["id"] == "word_0" and second["id"] == "new_0"
+    assert first["start"] == 1.2 and second["end"] == 1.6
+    assert first["end"] == second["start"]
+
+def test_unknown_word_and_segment():
+    with pytest.raises(EditError, match="op 0: word 'word_9' not found"):
+        _apply([{"op": "delete", "segment": 0, "segmentId": str(FIRST_ID), "wordId": "word_9"}])
+    with pytest.raises(EditError, match="segment 3 not found"):
+        _apply([{"op": "delete", "segment": 3, "wordId": "word_0"}])
+
+def test_validate_ops_rejects_malformed_ops():
+    for ops in ([], [{"op": "rename", "segment": 0}], [{"op": "delete", "segment": "0"}],
+                [{"op": "delete", "segment": 0, "segmentId": 5}]):
+        with pytest.raises(EditError):
+            validate_ops(ops)
+
+class _Recordings:
+    """
+    Stands in for recording_model: one ended recording at `version`, whose
+    segment writes succeed only while `writes_land` is set.
+    """
+    def __init__(self, version, writes_land=True):
+        self.version = version
+        self.writes_land = writes_land
+        self.writes = []
+
+    def get_recording(self, recording_id, projection=None):
+        return {"version": self.version, "status": "completed"}
+
+    def find_segments_by_index(self, recording_id, indexes):
+        return _segments()
+
+    def claim_version(self, recording_id, expected_version):
+        if expected_version != self.version:
+            return None
+        self.version += 1
+        return self.version
+
+    def update_segment_words(self, recording_id, segments, version, previous):
+        self.writes.append((segments, version, previous))
+        return self.writes_land
+
+def _edit(monkeypatch, recordings, version):
+    for name in ("get_recording", "find_segments_by_index", "claim_version", "update_segment_words"):
+        monkeypatch.setattr(transcript_edits.recording_model, name, getattr(recordings, name))
+    ops = [{"op": "delete", "segment": 0, "segmentId": str(FIRST_ID), "wordId": "word_0"}]
+    return transcript_edits.edit_transcript(str(ObjectId()), version, ops)
+
+def test_edit_writes_segments_guarded_by_the_claimed_version(monkeypatch):
+    recordings = _Recordings(version=2)
+    result = _edit(monkeypatch, recordings, 2)
+    assert result["version"] == 3
+    [(segments, version, previous)] = recordings.writes
+    assert version == 3 and segments[0]["editVersion"] == 3
+    assert [w["text"] for w in previous[FIRST_ID]["words"]] == ["one", "two"]
+
+def test_edit_overtaken_by_a_concurrent_write_is_a_conflict(monkeypatch):
+    recordings = _Recordings(version=2, writes_land=False)
+    with pytest.raises(VersionConflict):
+        _edit(monkeypatch, recordings, 2)
+
+def _split(ids):
+    return _apply([{"op": "split", "segment": 0, "segmentId": str(FIRST_ID), "wordId": "word_0",
+                    "texts": ["o", "ne"], "ids": ids}])
+
+def test_split_takes_client_ids_for_the_new_parts():
+    words = _split(["word_0", "one_b"])[FIRST_ID]["words"]
+    assert [w["id"] for w in words] == ["word_0", "one_b", "word_1"]
+
+@pytest.mark.parametrize("ids", [["a", "word_0"], ["other", "b"], ["word_0", "word_0"], ["word_0", "word_1"],
+                                 ["word_0"], "word_0"])
+def test_split_rejects_ids_that_would_repeat_or_drop_an_id(ids):
+    with pytest.raises(EditError):
+        _split(ids)
+
+def test_insert_rejects_repeated_ids():
+    with pytest.raises(EditError, match="distinct"):
+        _apply([{"op": "insert", "segment": 0, "segmentId": str(FIRST_ID), "after": "word_0",
+                 "texts": ["a", "b"], "ids": ["x", "x"]}])
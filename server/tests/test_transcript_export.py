@@ -0,0 +1,62 @@
+# server/tests/test_transcript_export.py
+import gzip
+
+from ..services.transcript_export import (
+    build_cues, coalesce, format_timestamp, gzip_stream, srt_document, vtt_document
+)
+
+def _segment(texts, start, step=0.5, **extra):
+    words = [{"text": text, "start": start + i * step, "end": start + i * step + step * 0.8}
+             for i, text in enumerate(texts)]
+    return {"words": words, **extra}
+
+def test_format_timestamp():
+    assert format_timestamp(0, ",") == "00:00:00,000"
+    assert format_timestamp(3723.4567, ".") == "01:02:03.457"
+    assert format_timestamp(59.9996, ",") == "00:01:00,000"
+    assert format_timestamp(-1.0, ",") == "00:00:00,000"
+
+def test_each_segment_starts_a_cue():
+    cues = list(build_cues([_segment(["hello", "there"], 0.0), _segment(["general", "kenobi"], 1.0)]))
+    assert cues == [(0.0, 0.9, ["hello there"]), (1.0, 1.9, ["general kenobi"])]
+
+def test_long_text_wraps_into_lines_then_cues():
+    words = ["word"] * 12
+    cues = list(build_cues([_segment(words, 0.0, step=0.2)], max_line_chars=14, max_lines=2,
+                           max_duration_s=60))
+    assert [lines for _, _, lines in cues] == [
+        ["word word word", "word word word"], ["word word word", "word word word"]
+    ]
+    assert all(len(line) <= 14 for _, _, lines in cues for line in lines)
+
+def test_long_pauses_and_durations_split_cues():
+    paused = {"words": [{"text": "before", "start": 0.0, "end": 0.5}, {"text": "after", "start": 3.0, "end": 3.5}]}
+    assert [lines for _, _, lines in build_cues([paused], max_gap_s=1.5)] == [["before"], ["after"]]
+    cues = list(build_cues([_segment(["a"] * 10, 0.0, step=1.0)], max_duration_s=3.0))
+    assert all(end - start <= 3.0 for start, end, _ in cues)
+    assert sum(len(lines[0].split()) for _, _, lines in cues) == 10
+
+def test_a_word_longer_than_a_line_gets_its_own_line():
+    cues = list(build_cues([_segment(["a", "supercalifragilistic", "b"], 0.0)], max_line_chars=8, max_lines=3))
+    assert cues[0][2] == ["a", "supercalifragilistic", "b"]
+
+def test_segments_without_words_spread_their_text():
+    cues = list(build_cues([{"text": "one two", "start": 2.0, "end": 3.0}]))
+    assert cues == [(2.0, 3.0, ["one two"])]
+
+def test_srt_and_vtt_documents():
+    cues = [(0.0, 1.5, ["a <b> & c"]), (2.0, 3.25, ["second", "line"])]
+    assert srt_document(cues) == (
+        "1\n00:00:00,000 --> 00:00:01,500\na <b> & c\n\n"
+        "2\n00:00:02,000 --> 00:00:03,250\nsecond\nline\n\n"
+    )
+    assert vtt_document(cues) == (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:01.500\na &lt;b&gt; &amp; c\n\n"
+        "00:00:02.000 --> 00:00:03.250\nsecond\nline\n\n"
+    )
+
+def test_coalesce_and_gzip_stream():
+    chunks = list(coalesce(["ab", b"cd", "ef"], chunk_bytes=3))
+    assert chunks == [b"abcd", b"ef"]
+    assert gzip.decompress(b"".join(gzip_stream(iter(chunks), level=6))) == b"abcdef"
@@ -0,0 +1,105 @@
+# server/tests/test_transcript_protocol.py
+import json
+
+import pytest
+
+from ..services.transcript_protocol import (
+    ENCODING_JSON, ENCODING_MSGPACK, PROTOCOL_DELTA, PROTOCOL_FULL, DeltaUpdateEncoder, negotiate
+)
+
+def _payload(segment, texts, is_final=False, speech_final=False, start=0.0):
+    words = [{"text": text, "start": start + i * 0.5, "end": start + i * 0.5 + 0.4} for i, text in enumerate(texts)]
+    return {"segmentIndex": segment, "words": words, "is_final": is_final, "speech_final": speech_final}
+
+def _encode(encoder, *args, **kwargs):
+    frame = encoder.encode(_payload(*args, **kwargs))
+    return None if frame is None else json.loads(frame)
+
+class _Client:
+    """
+    Rebuilds segments from delta frames the way a protocol 2 client does.
+    """
+    def __init__(self):
+        self.segments = {}
+        self.final = {}
+
+    def apply(self, frame):
+        words = self.segments.setdefault(frame["s"], [])
+        for op in frame["ops"]:
+            if op[0] == "i":
+                words[op[1]:op[1]] = op[2]
+            elif op[0] == "r":
+                words[op[1]:op[1] + op[2]] = op[3]
+            elif op[0] == "f":
+                self.final[frame["s"]] = op[1]
+
+    def texts(self, segment):
+        return [word[0] for word in self.segments[segment]]
+
+def test_negotiate():
+    assert negotiate({}) == (PROTOCOL_FULL, ENCODING_JSON)
+    assert negotiate({"protocol": "x"}) == (PROTOCOL_FULL, ENCODING_JSON)
+    assert negotiate({"protocol": 7}) == (PROTOCOL_DELTA, ENCODING_JSON)
+    # MessagePack is only used with the delta protocol
+    assert negotiate({"protocol": 1, "encoding": "msgpack"}) == (PROTOCOL_FULL, ENCODING_JSON)
+
+def test_interim_replacing_an_interim_sends_the_changed_tail():
+    encoder = DeltaUpdateEncoder()
+    assert _encode(encoder, 0, ["hello", "wor"])["ops"] == [["i", 0, [["hello", 0, 400], ["wor", 500, 900]]]]
+    assert _encode(encoder, 0, ["hello", "world"])["ops"] == [["r", 1, 1, [["world", 500, 900]]]]
+    assert _encode(encoder, 0, ["hello", "world", "again"])["ops"] == [["i", 2, [["again", 1000, 1400]]]]
+    # A shorter interim replaces the dropped words with nothing
+    assert _encode(encoder, 0, ["hello"])["ops"] == [["r", 1, 2, []]]
+
+def test_unchanged_interim_sends_nothing():
+    encoder = DeltaUpdateEncoder()
+    _encode(encoder, 0, ["hello"])
+    assert _encode(encoder, 0, ["hello"]) is None
+
+def test_final_marks_words_final_and_later_results_append():
+    encoder = DeltaUpdateEncoder()
+    _encode(encoder, 0, ["hello", "wor"])
+    assert _encode(encoder, 0, ["hello", "world"], is_final=True)["ops"] == [
+        ["r", 1, 1, [["world", 500, 900]]], ["f", 2]
+    ]
+    # The next result is a tail after the final words
+    assert _encode(encoder, 0, ["how"], start=1.0)["ops"] == [["i", 2, [["how", 1000, 1400]]]]
+    assert _encode(encoder, 0, ["how", "are"], is_final=True, start=1.0)["ops"] == [
+        ["i", 3, [["are", 1500, 1900]]], ["f", 4]
+    ]
+
+def test_a_new_segment_starts_from_empty():
+    encoder = DeltaUpdateEncoder()
+    _encode(encoder, 0, ["hello"], is_final=True)
+    frame = _encode(encoder, 1, ["hello"], start=2.0)
+    assert frame["s"] == 1
+    assert frame["ops"] == [["i", 0, [["hello", 2000, 2400]]]]
+
+def test_speech_final_without_changes_still_sends_a_frame():
+    encoder = DeltaUpdateEncoder()
+    _encode(encoder, 0, ["hello"], is_final=True)
+    frame = _encode(encoder, 0, [], is_final=False, speech_final=True)
+    assert frame == {"type": "transcript_delta", "s": 0, "ops": [], "sf": True}
+    assert "sf" not in _encode(encoder, 0, ["next"])
+
+def test_client_rebuilds_the_transcript():
+    encoder, client = DeltaUpdateEncoder(), _Client()
+    results = [
+        (0, ["the"], False), (0, ["the", "quick"], False), (0, ["the", "quack", "brown"], False),
+        (0, ["the", "quick", "brown"], True), (0, ["fox"], False), (0, ["fox", "jumps"], True),
+        (1, ["over"], False), (1, ["over", "the"], False), (1, ["over"], True),
+    ]
+    for segment, texts, is_final in results:
+        frame = _encode(encoder, segment, texts, is_final=is_final)
+        if frame is not None:
+            client.apply(frame)
+    assert client.texts(0) == ["the", "quick", "brown", "fox", "jumps"]
+    assert client.final == {0: 5, 1: 1}
+    assert client.texts(1) == ["over"]
+
+def test_msgpack_frames_match_json_frames():
+    msgpack = pytest.importorskip("msgpack")
+    packed, plain = DeltaUpdateEncoder(ENCODING_MSGPACK), DeltaUpdateEncoder()
+    for texts, is_final in ((["a"], False), (["a", "b"], True)):
+        payload = _payload(0, texts, is_final=is_final)
+        assert msgpack.unpackb(packed.encode(payload)) == json.loads(plain.encode(payload))
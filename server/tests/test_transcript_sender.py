@@ -0,0 +1,80 @@
+# server/tests/test_transcript_sender.py
+import asyncio
+import time
+
+from ..services.transcript_sender import TranscriptSender
+
+class _Client:
+    """
+    Collects what the sender delivers; each send takes `delay` seconds.
+    """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = []
+
+    async def send(self, message):
+        await asyncio.sleep(self.delay)
+        self.messages.append(message)
+
+def _run(scenario, interval_s=0.05, delay=0.0, encode=str):
+    client = _Client(delay)
+
+    async def main():
+        sender = TranscriptSender(client.send, interval_s, encode=encode)
+        sender.start()
+        await scenario(sender)
+        await sender.close(timeout=1.0)
+
+    asyncio.run(main())
+    return client.messages
+
+def test_pending_interims_coalesce_to_the_latest():
+    async def scenario(sender):
+        for i in range(5):
+            sender.send_interim(f"interim {i}", time.perf_counter())
+        await asyncio.sleep(0.01)
+    assert _run(scenario) == ["interim 4"]
+
+def test_interims_are_rate_limited():
+    async def scenario(sender):
+        sender.send_interim("a", time.perf_counter())
+        await asyncio.sleep(0.01)
+        sender.send_interim("b", time.perf_counter())
+        await asyncio.sleep(0.01)
+        sender.send_interim("c", time.perf_counter())
+        await asyncio.sleep(0.1)
+    # "b" was still waiting out the interval when "c" replaced it
+    assert _run(scenario, interval_s=0.05) == ["a", "c"]
+
+def test_a_final_drops_the_pending_interim_and_keeps_order():
+    async def scenario(sender):
+        sender.send_interim("a", time.perf_counter())
+        await asyncio.sleep(0.01)
+        sender.send_interim("b", time.perf_counter())
+        sender.send("final 1", time.perf_counter())
+        sender.send("final 2", time.perf_counter())
+        sender.send_interim("c", time.perf_counter())
+        await asyncio.sleep(0.01)
+    assert _run(scenario, interval_s=0.05) == ["a", "final 1", "final 2", "c"]
+
+def test_finals_are_never_dropped_by_a_slow_client():
+    async def scenario(sender):
+        for i in range(10):
+            sender.send(f"final {i}", time.perf_counter())
+            sender.send_interim(f"interim {i}", time.perf_counter())
+    messages = _run(scenario, interval_s=0.0, delay=0.005)
+    assert [m for m in messages if m.startswith("final")] == [f"final {i}" for i in range(10)]
+    assert messages[-1] == "interim 9"
+
+def test_close_flushes_a_rate_limited_interim():
+    async def scenario(sender):
+        sender.send_interim("a", time.perf_counter())
+        await asyncio.sleep(0.01)
+        sender.send_interim("b", time.perf_counter())
+    assert _run(scenario, interval_s=10.0) == ["a", "b"]
+
+def test_payloads_encoded_to_none_are_skipped():
+    async def scenario(sender):
+        for payload in ("keep", "skip", "keep too"):
+            sender.send(payload, time.perf_counter())
+    assert _run(scenario, encode=lambda p: None if p == "skip" else p) == ["keep", "keep too"]
@@ -0,0 +1,83 @@
+# server/tests/test_webm_index.py
+import pytest
+
+from ..utils.webm_index import (
+    WebmClusterIndexer, build_seek_index, clip_plan, clip_size, iter_clip, load_seek_index
+)
+from .webm_samples import cluster, header, recording
+
+def _index(data: bytes, step: int = None) -> dict:
+    indexer = WebmClusterIndexer()
+    for i in range(0, len(data), step or len(data)):
+        indexer.feed(data[i:i + step] if step else data)
+    return indexer.to_index(len(data))
+
+def test_indexes_header_and_clusters():
+    head = header()
+    data = recording()
+    index = _index(data)
+    assert index["error"] is None
+    assert index["headerEnd"] == len(head)
+    assert [c[1] for c in index["clusters"]] == [0, 1000, 2000, 3000]
+    assert [c[0] for c in index["clusters"]] == [len(head) + i * len(cluster(0)) for i in range(4)]
+    # The last block is at 3040 ms, one 20 ms frame long
+    assert index["durationMs"] == 3060
+    assert index["clustersEnd"] == len(data)
+    # SeekHead and Duration get blanked out in clips
+    assert len(index["voidRanges"]) == 2
+
+def test_feeding_byte_by_byte_gives_the_same_index():
+    data = recording()
+    assert _index(data, step=1) == _index(data)
+    assert _index(data, step=7) == _index(data)
+
+def test_malformed_input_sets_error():
+    indexer = WebmClusterIndexer()
+    indexer.feed(header() + b"\x00" * 16)
+    assert indexer.error is not None
+
+def test_clip_plan_covers_the_range():
+    index = _index(recording())
+    clusters = index["clusters"]
+
+    plan = clip_plan(index, 1.5, 2.5)
+    assert [entry[2][1] for entry in plan] == [1000, 2000]
+    assert plan[0][1] == clusters[2][0]
+    assert plan[-1][1] == clusters[3][0]
+    assert [entry[2][1] for entry in clip_plan(index, 0.0, 0.5)] == [0]
+    assert [entry[2][1] for entry in clip_plan(index, 2.9, 10.0)] == [2000, 3000]
+    assert clip_plan(index, 3.5, 4.0) is None
+    assert clip_plan(_index(header()), 0.0, 1.0) is None
+
+def test_clip_is_a_playable_stream_starting_at_zero(tmp_path):
+    path = tmp_path / "audio.webm"
+    path.write_bytes(recording())
+    index = build_seek_index(str(path))
+    plan = clip_plan(index, 2.0, 3.5)
+
+    clip = b"".join(iter_clip(str(path), index, plan))
+    assert len(clip) == clip_size(index, plan)
+    clipped = _index(clip)
+    assert clipped["error"] is None
+    assert [c[1] for c in clipped["clusters"]] == [0, 1000]
+    # SeekHead and Duration were replaced by Void elements of the same length
+    assert clipped["voidRanges"] == []
+    assert clipped["headerEnd"] == index["headerEnd"]
+
+def test_seek_index_is_saved_and_reloaded(tmp_path):
+    path = tmp_path / "audio.webm"
+    path.write_bytes(recording())
+    index = load_seek_index(str(path))
+    assert (tmp_path / "audio.webm.idx.json").exists()
+    reloaded = load_seek_index(str(path), build_if_missing=False)
+    assert reloaded["clusters"] == index["clusters"]
+    assert reloaded["headerEnd"] == index["headerEnd"]
+    assert clip_plan(reloaded, 1.0, 2.0) == clip_plan(index, 1.0, 2.0)
+
+@pytest.mark.parametrize("scale", [1_000_000, 500_000])
+def test_timecode_scale_is_respected(scale):
+    index = _index(header(timecode_scale=scale) + cluster(0) + cluster(2000) + cluster(4000))
+    assert index["timecodeScale"] == scale
+    seconds_per_tick = scale / 1e9
+    plan = clip_plan(index, 2000 * seconds_per_tick, 2000 * seconds_per_tick)
+    assert [entry[2][1] for entry in plan] == [2000]
@@ -0,0 +1,43 @@
+# server/tests/test_word_timeline.py
+import pytest
+
+from ..services.word_timeline import AmbiguousWordReference, WordTimeline
+
+def _word(word_id, text, start, end):
+    return {"id": word_id, "text": text, "start": start, "end": end, "trusted": True}
+
+SEGMENTS = [
+    {"_id": "a" * 24, "index": 0, "words": [_word("word_0", "hello", 0.0, 0.4), _word("word_1", "there", 0.5, 0.9)]},
+    # Two finals of one segment, each numbering its words from word_0
+    {"_id": "b" * 24, "index": 1, "words": [_word("word_0", "how", 1.0, 1.2), _word("word_1", "are", 1.3, 1.5)]},
+    {"_id": "c" * 24, "index": 1, "words": [_word("word_0", "you", 1.6, 1.9), _word("word_2", "today", 2.0, 2.4)]},
+]
+
+@pytest.fixture
+def timeline():
+    return WordTimeline(SEGMENTS)
+
+def test_word_at(timeline):
+    assert timeline.word_at(0.2)["text"] == "hello"
+    assert timeline.word_at(0.45) is None
+    assert timeline.word_at(1.7)["segmentId"] == "c" * 24
+
+def test_words_between(timeline):
+    assert [w["text"] for w in timeline.words_between(0.6, 1.35)] == ["there", "how", "are"]
+    assert [w["text"] for w in timeline.words_between(0.0, 10, limit=2)] == ["hello", "there"]
+
+def test_find_word_by_segment_index(timeline):
+    assert timeline.find_word(0, "word_1")["text"] == "there"
+    # Unique within the segment even though it has two finals
+    assert timeline.find_word(1, "word_2")["text"] == "today"
+    assert timeline.find_word(1, "word_9") is None
+    assert timeline.find_word(5, "word_0") is None
+
+def test_find_word_rejects_ids_repeated_across_finals(timeline):
+    with pytest.raises(AmbiguousWordReference):
+        timeline.find_word(1, "word_0")
+
+def test_find_word_by_segment_id(timeline):
+    assert timeline.find_word("b" * 24, "word_0")["text"] == "how"
+    assert timeline.find_word("c" * 24, "word_0")["text"] == "you"
+    assert timeline.find_word("d" * 24, "word_0") is None
@@ -0,0 +1,35 @@
+# server/tests/webm_samples.py
+"""
+Builds small WebM byte streams shaped like MediaRecorder output: an EBML
+header, a Segment of unknown size with SeekHead, Info (TimecodeScale and
+Duration) and Tracks, then unknown-sized Clusters of SimpleBlocks.
+"""
+import struct
+
+def _size(length: int) -> bytes:
+    return (length | (1 << 56)).to_bytes(8, "big")
+
+def element(element_id: int, payload: bytes = b"", unknown_size: bool = False) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else _size(len(payload))) + payload
+
+def header(timecode_scale: int = 1_000_000, duration_ms: float = 0.0) -> bytes:
+    info = element(0x2AD7B1, timecode_scale.to_bytes(4, "big")) + element(0x4489, struct.pack(">d", duration_ms))
+    return (
+        element(0x1A45DFA3, element(0x4282, b"webm"))
+        + element(0x18538067, unknown_size=True)
+        + element(0x114D9B74, element(0x4DBB, bytes(8)))
+        + element(0x1549A966, info)
+        + element(0x1654AE6B, element(0xAE, element(0xD7, b"\x01")))
+    )
+
+def cluster(timecode: int, block_offsets=(0, 20, 40), payload: bytes = b"\x00" * 32) -> bytes:
+    blocks = b"".join(element(0xA3, b"\x81" + struct.pack(">h", offset) + b"\x80" + payload)
+                      for offset in block_offsets)
+    return element(0x1F43B675, element(0xE7, timecode.to_bytes(2, "big")) + blocks, unknown_size=True)
+
+def recording(cluster_timecodes=(0, 1000, 2000, 3000)) -> bytes:
+    """
+    A stream with one cluster per timecode (in ms), each holding blocks 20 ms apart.
+    """
+    return header() + b"".join(cluster(timecode) for timecode in cluster_timecodes)
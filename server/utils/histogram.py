@@ -0,0 +1,67 @@
+# server/utils/histogram.py
+import threading
+from bisect import bisect_left
+
+# Seconds; spans sub-millisecond hot-path steps up to multi-second STT lag
+LATENCY_BUCKETS_S = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class Histogram:
+    """
+    A fixed-bucket histogram cheap enough for per-chunk observations:
+    one bisect and three increments under a lock.
+    """
+    __slots__ = ("buckets", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS_S):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """
+        Returns (cumulative bucket counts including +Inf, sum, count).
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def quantile(self, q: float):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        Returns None if nothing was observed.
+        """
+        cumulative, _, count = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        for bound, running in zip(self.buckets + (float('inf'),), cumulative):
+            if running >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self) -> dict:
+        _, total, count = self.snapshot()
+        return {
+            "count": count,
+            "mean": total / count if count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
@@ -0,0 +1,95 @@
+# server/utils/lru_cache.py
+import threading
+from collections import OrderedDict
+
+class VersionedLRUCache:
+    """
+    A thread-safe LRU cache bounded by an approximate byte budget.
+
+    Every entry is stored with a version (e.g. a document's updatedAt); a lookup
+    with a different version is a miss, so entries built before a change made by
+    another process are never served. Keys may be tuples whose first element is
+    a group (e.g. a recording id) so all variants of a group can be invalidated
+    together.
+    """
+    def __init__(self, max_bytes: int, size_of=len):
+        self.max_bytes = max_bytes
+        self._size_of = size_of
+        self._entries = OrderedDict()  # key -> (version, value, size)
+        self._groups = {}  # group -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _group_of(key):
+        return key[0] if isinstance(key, tuple) else key
+
+    def get(self, key, version):
+        """
+        Returns the cached value for `key` at `version`, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return entry[1]
+            self._metrics["misses"] += 1
+            return None
+
+    def put(self, key, version, value):
+        """
+        Stores a value, evicting least recently used entries to stay within budget.
+        Values larger than the whole budget are not cached.
+        """
+        size = self._size_of(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (version, value, size)
+            self._groups.setdefault(self._group_of(key), set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._metrics["evictions"] += 1
+
+    def get_or_build(self, key, version, build):
+        """
+        Returns the cached value, calling `build()` and caching its result on a miss.
+        The value is built outside the lock; concurrent misses may build it twice.
+        """
+        value = self.get(key, version)
+        if value is None:
+            value = build()
+            self.put(key, version, value)
+        return value
+
+    def invalidate(self, group):
+        """
+        Drops every entry belonging to `group`.
+        """
+        with self._lock:
+            keys = self._groups.pop(group, ())
+            for key in list(keys):
+                self._remove(key)
+            if keys:
+                self._metrics["invalidations"] += 1
+
+    def _remove(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        group = self._group_of(key)
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+        return True
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,64 @@
+# server/utils/prometheus.py
+import math
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+class PrometheusText:
+    """
+    Builds a response in the Prometheus text exposition format.
+    Samples of the same metric must be added consecutively.
+    """
+    def __init__(self, prefix: str = ""):
+        self._prefix = prefix
+        self._lines = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, value, help_text: str, labels: dict = None):
+        name = self._prefix + name
+        self._declare(name, "counter", help_text)
+        self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def gauge(self, name: str, value, help_text: str, labels: dict = None):
+        name = self._prefix + name
+        self._declare(name, "gauge", help_text)
+        self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name: str, histogram, help_text: str, labels: dict = None):
+        """
+        Adds a `utils.histogram.Histogram` as _bucket/_sum/_count samples.
+        """
+        name = self._prefix + name
+        self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        cumulative, total, count = histogram.snapshot()
+        for bound, running in zip(histogram.buckets + (float("inf"),), cumulative):
+            le = "+Inf" if math.isinf(bound) else repr(float(bound))
+            self._lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {running}")
+        self._lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(total))}")
+        self._lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,131 @@
+# server/utils/range_files.py
+import mmap
+import os
+import secrets
+import time
+import datetime
+from flask import Response, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def file_etag(st: os.stat_result) -> str:
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def _if_range_matches(request, etag: str, last_modified: datetime.datetime) -> bool:
+    """
+    True if there is no If-Range header or it still matches the file, i.e. the
+    requested ranges may be served instead of the full representation.
+    """
+    if_range = request.if_range
+    if not if_range or (if_range.etag is None and if_range.date is None):
+        return True
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    return last_modified.replace(microsecond=0) <= if_range.date
+
+def _resolve_ranges(ranges: list, size: int) -> list:
+    """
+    Turns parsed (start, stop) byte ranges into absolute [start, stop) pairs,
+    dropping those that can't be satisfied for a file of `size` bytes.
+    """
+    resolved = []
+    for start, stop in ranges:
+        if start < 0:
+            start, stop = max(0, size + start), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            resolved.append((start, stop))
+    return resolved
+
+def send_range_file(request, path: str, mimetype: str, max_age: int = 0) -> Response:
+    """
+    Serves a file with full HTTP range support: conditional requests, Range,
+    If-Range and multi-range (multipart/byteranges) requests.
+
+    Single-range and full responses go through `send_file`, which hands the
+    open file to the WSGI server's file_wrapper so servers that support it use
+    sendfile(2). Multi-range responses are streamed from an mmap of the file.
+    """
+    st = os.stat(path)
+    etag = file_etag(st)
+    last_modified = datetime.datetime.fromtimestamp(st.st_mtime, datetime.timezone.utc)
+
+    byte_range = request.range
+    if byte_range is not None and len(byte_range.ranges) > 1 and _if_range_matches(request, etag, last_modified):
+        response = _multipart_byteranges(path, byte_range.ranges, st.st_size, mimetype)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    else:
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            last_modified=last_modified,
+            max_age=max_age
+        )
+    # Recordings are user data: allow browser caching but not shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+def _multipart_byteranges(path: str, ranges: list, size: int, mimetype: str) -> Response:
+    resolved = _resolve_ranges(ranges, size)
+    if not resolved:
+        raise RequestedRangeNotSatisfiable(length=size)
+
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        (f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n"
+         f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode()
+        for start, stop in resolved
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    content_length = sum(len(h) for h in part_headers) + sum(stop - start for start, stop in resolved) + len(closing)
+
+    def generate():
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for header, (start, stop) in zip(part_headers, resolved):
+                yield header
+                for offset in range(start, stop, STREAM_CHUNK_BYTES):
+                    yield mapped[offset:min(offset + STREAM_CHUNK_BYTES, stop)]
+        yield closing
+
+    response = Response(generate(), status=206, mimetype=f"multipart/byteranges; boundary={boundary}")
+    response.content_length = content_length
+    response.accept_ranges = "bytes"
+    return response
+
+def follow_file(path: str, readable_bytes, is_live, idle_timeout_s: float, poll_interval_s: float):
+    """
+    Yields a file's content while it is still being written (tail -f).
+
+    `readable_bytes(f)` returns how many bytes are safe to read (the writer may have
+    preallocated beyond that). `is_live()` returns whether the writer is still
+    active, or None if that isn't known (e.g. it runs in another process).
+    Streaming ends once the writer is known to have finished and everything has
+    been sent, or when the file hasn't grown for `idle_timeout_s`.
+    """
+    with open(path, "rb") as f:
+        position = 0
+        last_growth = time.monotonic()
+        while True:
+            available = readable_bytes(f)
+            if position < available:
+                data = os.pread(f.fileno(), min(STREAM_CHUNK_BYTES, available - position), position)
+                if data:
+                    position += len(data)
+                    last_growth = time.monotonic()
+                    yield data
+                    continue
+            if is_live() is False:
+                # The writer is done; send whatever it flushed last, then stop
+                if position >= readable_bytes(f):
+                    return
+                continue
+            if time.monotonic() - last_growth > idle_timeout_s:
+                return
+            time.sleep(poll_interval_s)
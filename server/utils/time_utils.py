@@ -1,6 +1,15 @@
 # server/utils/time_utils.py
+import datetime
 import time
 
 def get_current_timestamp_ms():
     """Returns the current time in milliseconds since the epoch."""
     return int(time.time() * 1000)
+
+def parse_datetime(value: str) -> datetime.datetime:
+    """
+    Parses an ISO 8601 time into the naive UTC datetime MongoDB stores.
+    Raises ValueError on bad input.
+    """
+    parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
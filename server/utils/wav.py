@@ -0,0 +1,33 @@
+# server/utils/wav.py
+import os
+import struct
+
+WAV_HEADER_BYTES = 44
+# Sizes written while a file is still growing; players read until end of file
+STREAMING_SIZE = 0xFFFFFFFF
+
+def wav_header(sample_rate: int, channels: int = 1, data_bytes: int = STREAMING_SIZE) -> bytes:
+    """
+    A canonical 44-byte RIFF/WAVE header for 16-bit PCM.
+    """
+    block_align = channels * 2
+    riff_size = STREAMING_SIZE if data_bytes == STREAMING_SIZE else 36 + data_bytes
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, 16,
+        b"data", data_bytes,
+    )
+
+def finalize_wav_header(path: str) -> int:
+    """
+    Writes the real sizes into the header of a WAV file that was written as a
+    stream. Returns the number of PCM data bytes.
+    """
+    with open(path, "r+b") as f:
+        data_bytes = max(0, os.fstat(f.fileno()).st_size - WAV_HEADER_BYTES)
+        f.seek(4)
+        f.write(struct.pack("<I", 36 + data_bytes))
+        f.seek(40)
+        f.write(struct.pack("<I", data_bytes))
+    return data_bytes
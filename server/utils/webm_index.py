@@ -0,0 +1,299 @@
+# server/utils/webm_index.py
+"""
+Cluster seek index for WebM files written by MediaRecorder.
+
+MediaRecorder output usually has no Cues element, so finding the bytes for a
+point in time means scanning the file. `WebmClusterIndexer` is an incremental
+EBML parser fed with the file's bytes as they are written; it records where the
+header ends and the timecode and byte offset of every Cluster, without
+buffering block payloads. The resulting index is stored next to the recording
+as `<file>.idx.json` and lets `iter_clip` cut a playable clip by copying the
+header plus the relevant clusters, without decoding any audio.
+"""
+import json
+import os
+from bisect import bisect_right
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+READ_CHUNK_BYTES = 256 * 1024
+
+# EBML element IDs (marker bits included)
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+CLUSTER = 0x1F43B675
+TIMECODE = 0xE7
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+VOID = 0xEC
+# Segment children that end an unknown-sized Cluster
+SEGMENT_LEVEL = {SEEK_HEAD, INFO, CLUSTER, 0x1654AE6B, 0x1C53BB6B, 0x1043A770, 0x1254C367, 0x1941A469}
+
+class WebmParseError(ValueError):
+    pass
+
+def _vint_length(first_byte: int, max_length: int) -> int:
+    for length in range(1, max_length + 1):
+        if first_byte & (0x80 >> (length - 1)):
+            return length
+    raise WebmParseError(f"Invalid EBML variable-size integer (first byte 0x{first_byte:02x})")
+
+def _encode_vint(value: int, length: int) -> bytes:
+    return (value | (1 << (7 * length))).to_bytes(length, "big")
+
+def _unknown_size(length: int) -> bytes:
+    """The reserved all-ones size value, meaning 'unknown size', in `length` bytes."""
+    return ((1 << (7 * length + 1)) - 1).to_bytes(length, "big")
+
+def _void_element(total_length: int) -> bytes:
+    """A Void element occupying exactly `total_length` (>= 2) bytes."""
+    size_length = 8 if total_length >= 9 else 1
+    content_length = total_length - 1 - size_length
+    return bytes([VOID]) + _encode_vint(content_length, size_length) + bytes(content_length)
+
+class WebmClusterIndexer:
+    """
+    Incremental parser building a cluster index from a WebM byte stream.
+    Call `feed()` with consecutive chunks of the file and `to_index()` at the end.
+    Malformed input stops indexing and sets `error` instead of raising.
+    """
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0  # absolute file offset of _buf[0]
+        self._skip = 0  # bytes still to skip (element payloads we don't need)
+        self.error = None
+        self.timecode_scale = 1_000_000  # ns per timecode tick (WebM default)
+        self.segment_size_field = None  # (offset, length) of the Segment's size vint
+        self.header_end = None  # offset of the first Cluster
+        self.void_ranges = []  # (offset, length) of header elements to blank out in clips
+        self.clusters = []  # [offset, timecode, timecode field offset relative to cluster, field length]
+        self.clusters_end = None  # offset of the first segment-level element after the clusters
+        self._last_block = None
+        self._previous_block = None
+
+    def feed(self, data):
+        if self.error:
+            return
+        if self._skip and not self._buf:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            self._pos += skipped
+            data = memoryview(data)[skipped:]
+        self._buf += data
+        try:
+            self._parse()
+        except WebmParseError as e:
+            self.error = str(e)
+            self._buf = bytearray()
+
+    def _consume(self, n: int):
+        del self._buf[:n]
+        self._pos += n
+
+    def _skip_bytes(self, n: int):
+        available = min(n, len(self._buf))
+        self._consume(available)
+        self._skip = n - available
+
+    def _read_header(self):
+        """Returns (id, size or None if unknown, header length), or None if more bytes are needed."""
+        buf = self._buf
+        if not buf:
+            return None
+        id_length = _vint_length(buf[0], 4)
+        if len(buf) < id_length + 1:
+            return None
+        size_length = _vint_length(buf[id_length], 8)
+        header_length = id_length + size_length
+        if len(buf) < header_length:
+            return None
+        element_id = int.from_bytes(buf[:id_length], "big")
+        raw_size = buf[id_length:header_length]
+        size = int.from_bytes(raw_size, "big") & ((1 << (7 * size_length)) - 1)
+        if raw_size == _unknown_size(size_length):
+            size = None
+        return element_id, size, header_length, id_length
+
+    def _parse(self):
+        while True:
+            if self._skip:
+                self._skip_bytes(self._skip)
+                if self._skip:
+                    return
+            header = self._read_header()
+            if header is None:
+                return
+            element_id, size, header_length, id_length = header
+            start = self._pos
+
+            if self.clusters and self.clusters_end is None and element_id in SEGMENT_LEVEL - {CLUSTER}:
+                self.clusters_end = start
+
+            if element_id in (SEGMENT, BLOCK_GROUP, INFO):
+                # Masters we descend into; their children are handled below
+                if element_id == SEGMENT:
+                    self.segment_size_field = (start + id_length, header_length - id_length)
+                self._consume(header_length)
+            elif element_id == CLUSTER:
+                if self.header_end is None:
+                    self.header_end = start
+                self.clusters.append([start, None, None, None])
+                self._consume(header_length)
+            elif element_id in (TIMECODE, TIMECODE_SCALE):
+                if size is None or size > 8:
+                    raise WebmParseError("Invalid timecode element")
+                if len(self._buf) < header_length + size:
+                    return
+                value = int.from_bytes(self._buf[header_length:header_length + size], "big")
+                if element_id == TIMECODE_SCALE:
+                    self.timecode_scale = value
+                elif self.clusters and self.clusters[-1][1] is None:
+                    cluster = self.clusters[-1]
+                    cluster[1:] = [value, start + header_length - cluster[0], size]
+                self._consume(header_length + size)
+            elif element_id in (SIMPLE_BLOCK, BLOCK):
+                if size is None:
+                    raise WebmParseError("Block with unknown size")
+                # Track number (vint) followed by a signed 16-bit relative timecode
+                if len(self._buf) < header_length + 1:
+                    return
+                track_length = _vint_length(self._buf[header_length], 8)
+                needed = header_length + track_length + 2
+                if len(self._buf) < needed:
+                    return
+                relative = int.from_bytes(self._buf[needed - 2:needed], "big", signed=True)
+                if self.clusters and self.clusters[-1][1] is not None:
+                    self._previous_block, self._last_block = self._last_block, self.clusters[-1][1] + relative
+                self._consume(header_length)
+                self._skip_bytes(size)
+            else:
+                if size is None:
+                    raise WebmParseError(f"Unknown-sized element 0x{element_id:x} cannot be skipped")
+                if element_id in (SEEK_HEAD, DURATION) and self.header_end is None:
+                    # Positions and total duration would be wrong for a clip
+                    self.void_ranges.append((start, header_length + size))
+                self._consume(header_length)
+                self._skip_bytes(size)
+
+    def duration_ms(self):
+        """
+        Media duration: the last block's timestamp plus one frame, estimated from
+        the spacing of the last two blocks. None if no block was seen.
+        """
+        if self._last_block is None:
+            return None
+        frame = self._last_block - self._previous_block if self._previous_block is not None else 0
+        return round((self._last_block + max(frame, 0)) * self.timecode_scale / 1_000_000)
+
+    def to_index(self, file_size: int) -> dict:
+        return {
+            "v": INDEX_VERSION,
+            "timecodeScale": self.timecode_scale,
+            "headerEnd": self.header_end,
+            "segmentSizeField": self.segment_size_field,
+            "voidRanges": self.void_ranges,
+            "clusters": [c for c in self.clusters if c[1] is not None],
+            "clustersEnd": self.clusters_end or file_size,
+            "durationMs": self.duration_ms(),
+            "error": self.error,
+        }
+
+def index_path(audio_path: str) -> str:
+    return audio_path + INDEX_SUFFIX
+
+def build_seek_index(audio_path: str) -> dict:
+    """
+    Builds a cluster index by streaming through an existing file.
+    """
+    indexer = WebmClusterIndexer()
+    with open(audio_path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            indexer.feed(chunk)
+        size = f.tell()
+    return indexer.to_index(size)
+
+def save_seek_index(audio_path: str, index: dict):
+    tmp_path = index_path(audio_path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path(audio_path))
+
+def load_seek_index(audio_path: str, build_if_missing: bool = True):
+    """
+    Loads the stored index of a finished file, building and saving it if missing
+    or older than the audio file.
+    """
+    try:
+        if os.path.getmtime(index_path(audio_path)) >= os.path.getmtime(audio_path):
+            with open(index_path(audio_path)) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not build_if_missing:
+        return None
+    index = build_seek_index(audio_path)
+    if not index["error"]:
+        save_seek_index(audio_path, index)
+    return index
+
+def clip_plan(index: dict, start_s: float, end_s: float):
+    """
+    Chooses the clusters covering [start_s, end_s]: from the last cluster starting
+    at or before start_s up to the last one starting before end_s.
+    Returns a list of (offset, end offset, cluster) or None if nothing matches.
+    """
+    clusters = index["clusters"]
+    if index["headerEnd"] is None or not clusters:
+        return None
+    ms_per_tick = index["timecodeScale"] / 1_000_000
+    times = [c[1] * ms_per_tick for c in clusters]
+    first = max(0, bisect_right(times, start_s * 1000) - 1)
+    last = max(first, bisect_right(times, end_s * 1000) - 1)
+    if times[first] > end_s * 1000 or (index["durationMs"] is not None and start_s * 1000 >= index["durationMs"]):
+        return None
+    plan = []
+    for i in range(first, last + 1):
+        stop = clusters[i + 1][0] if i + 1 < len(clusters) else index["clustersEnd"]
+        plan.append((clusters[i][0], stop, clusters[i]))
+    return plan
+
+def clip_size(index: dict, plan: list) -> int:
+    return index["headerEnd"] + sum(stop - offset for offset, stop, _ in plan)
+
+def iter_clip(audio_path: str, index: dict, plan: list):
+    """
+    Yields a playable WebM clip: the file header (with the Segment size set to
+    unknown and SeekHead/Duration blanked) followed by the planned clusters,
+    with cluster timecodes rebased so the clip starts at zero.
+    """
+    with open(audio_path, "rb") as f:
+        fd = f.fileno()
+        header = bytearray(os.pread(fd, index["headerEnd"], 0))
+        if index["segmentSizeField"]:
+            offset, length = index["segmentSizeField"]
+            header[offset:offset + length] = _unknown_size(length)
+        for offset, length in index["voidRanges"]:
+            if offset + length <= len(header):
+                header[offset:offset + length] = _void_element(length)
+        yield bytes(header)
+
+        base_timecode = plan[0][2][1]
+        for offset, stop, (_, timecode, field_offset, field_length) in plan:
+            first = bytearray(os.pread(fd, min(stop - offset, max(READ_CHUNK_BYTES, field_offset + field_length)), offset))
+            first[field_offset:field_offset + field_length] = (timecode - base_timecode).to_bytes(field_length, "big")
+            yield bytes(first)
+            position = offset + len(first)
+            while position < stop:
+                chunk = os.pread(fd, min(READ_CHUNK_BYTES, stop - position), position)
+                if not chunk:
+                    return
+                position += len(chunk)
+                yield chunk
@@ -0,0 +1,119 @@
+# server/utils/wsgi_bridge.py
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """
+    The WSGI environ for an ASGI HTTP request scope and its request body.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        # WSGI carries the raw path bytes as latin-1 text
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+class WsgiBridge:
+    """
+    Serves a WSGI application to ASGI HTTP requests.
+
+    Each request runs on a thread of a bounded pool, which also iterates the
+    response body, so streamed responses are sent chunk by chunk with the
+    thread waiting for each send (backpressure). A response whose client
+    disconnects is closed at its next chunk.
+    """
+    def __init__(self, wsgi_app, max_threads: int):
+        self._app = wsgi_app
+        self._executor = ThreadPoolExecutor(max_threads, thread_name_prefix="wsgi-bridge")
+
+    async def __call__(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        loop = asyncio.get_running_loop()
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await loop.run_in_executor(self._executor, self._run, build_environ(scope, bytes(body)),
+                                       loop, send, disconnected)
+        finally:
+            watcher.cancel()
+
+    def _run(self, environ: dict, loop, send, disconnected: threading.Event):
+        """
+        Runs the WSGI application and sends its response; on an executor thread.
+        """
+        response = {}
+
+        def send_sync(message: dict):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_body(data: bytes, more_body: bool = True):
+            if "started" not in response:
+                response["started"] = True
+                send_sync({"type": "http.response.start", "status": response["status"],
+                           "headers": response["headers"]})
+            send_sync({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        def start_response(status: str, headers: list, exc_info=None):
+            if exc_info and "started" in response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            return send_body
+
+        result = self._app(environ, start_response)
+        try:
+            for chunk in result:
+                if disconnected.is_set():
+                    return
+                if chunk:
+                    send_body(chunk)
+            if not disconnected.is_set():
+                send_body(b"", more_body=False)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
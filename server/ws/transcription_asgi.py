@@ -0,0 +1,215 @@
+# server/ws/transcription_asgi.py
+"""
+The `/ws/transcription` endpoint for the ASGI serving mode (see asgi.py).
+
+It speaks the same protocol as the threaded handler in transcription_ws.py,
+but every wait is a coroutine on the session runtime loop, which in this mode
+is the server's own event loop: a connection costs a few tasks instead of a
+thread blocked in `receive()`, and client sends need no executor hop.
+"""
+import asyncio
+import json
+import time
+from flask import current_app
+from ..services.session_runtime import get_runtime
+from ..services.session_registry import get_session_registry
+from ..services.transcript_protocol import PROTOCOL_FULL, negotiate
+from ..stt.pcm_ingest import negotiate_audio_format
+from .transcription_ws import RECEIVE_POLL_S, worker_buffered_bytes, create_live_session, parse_resume_seq
+
+class AsgiWebSocket:
+    """
+    An accepted ASGI WebSocket connection with the interface the transcription
+    handler and TranscriptionService expect: receive with a timeout, send and
+    close, plus `connected`. `request_stop()` asks the handler to end the
+    session as if the client had sent 'stop'.
+    """
+    def __init__(self, receive, send):
+        self._receive = receive
+        self._send = send
+        self._pending = None
+        self.connected = False
+        self.stop_requested = False
+
+    async def accept(self) -> bool:
+        message = await self._receive()
+        if message["type"] != "websocket.connect":
+            return False
+        await self._send({"type": "websocket.accept"})
+        self.connected = True
+        return True
+
+    async def receive(self, timeout: float = None):
+        """
+        Returns the next text (str) or binary (bytes) message, or None if
+        `timeout` expired or the connection is closed. A message that arrives
+        after a timeout is returned by the next call.
+        """
+        if not self.connected:
+            return None
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._receive())
+        done, _ = await asyncio.wait((self._pending,), timeout=timeout)
+        if not done or not self.connected:
+            return None
+        message, self._pending = self._pending.result(), None
+        if message["type"] == "websocket.disconnect":
+            self.connected = False
+            return None
+        return message["bytes"] if message.get("bytes") is not None else message.get("text")
+
+    async def send(self, message):
+        if not self.connected:
+            raise ConnectionError("WebSocket is closed")
+        if isinstance(message, bytes):
+            await self._send({"type": "websocket.send", "bytes": message})
+        else:
+            await self._send({"type": "websocket.send", "text": message})
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        if self.connected:
+            self.connected = False
+            try:
+                await self._send({"type": "websocket.close", "code": code, "reason": reason})
+            except Exception:
+                pass
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    def request_stop(self):
+        self.stop_requested = True
+
+async def transcription_session(ws: AsgiWebSocket, app, draining):
+    """
+    Serves one accepted /ws/transcription connection. `draining()` tells
+    whether the worker is shutting down: a session whose client goes away
+    is then finished instead of parked for a resume, and one told to stop
+    (`ws.request_stop()`) is finalized while the client is still connected,
+    which then gets close code 1001.
+    """
+    session = None
+    stopped = False
+    runtime = get_runtime()
+    registry = get_session_registry(app.config)
+    with app.app_context():
+        try:
+            # First message should be a configuration message
+            init_message = await ws.receive(timeout=5)
+            if init_message is None:
+                current_app.logger.warning("WebSocket connection timed out before init message.")
+                await ws.close(1008, "Initialization message not received.")
+                return
+
+            init_data = json.loads(init_message)
+            recording_id = init_data.get('recordingId')
+
+            if not recording_id:
+                current_app.logger.error("No recordingId provided in WebSocket init message.")
+                await ws.close(1008, "recordingId is required.")
+                return
+
+            if init_data.get('resume'):
+                # Checked before the takeover, which detaches the previous connection
+                try:
+                    seq = parse_resume_seq(init_data)
+                except ValueError as e:
+                    current_app.logger.error(f"Rejecting resume for {recording_id}: {e}")
+                    await ws.close(1008, str(e))
+                    return
+                # Waits for the previous connection's handler, which runs on this loop
+                session = await asyncio.to_thread(registry.resume, recording_id, ws)
+                if session is None:
+                    current_app.logger.warning(f"No resumable session to resume for recordingId: {recording_id}")
+                    await ws.close(1008, "No resumable session to resume.")
+                    return
+                # The client resends everything it has not seen acked, starting at `seq`
+                if seq is None:
+                    seq = session.next_seq
+                if seq > session.next_seq:
+                    current_app.logger.warning(f"Chunks {session.next_seq}-{seq - 1} of {recording_id} were lost")
+                    registry.count_chunks(missing=seq - session.next_seq)
+                    session.next_seq = seq
+                resumed = json.dumps({"type": "resumed", "recordingId": recording_id, "seq": session.next_seq})
+                await session.service.attach_client(ws, resumed)
+                current_app.logger.info(f"WebSocket connection resumed for recordingId: {recording_id} at chunk {session.next_seq}")
+            else:
+                existing = registry.get(recording_id)
+                if existing and not await registry.expire_now_async(existing):
+                    current_app.logger.error(f"recordingId {recording_id} already has a live session.")
+                    await ws.close(1008, "Recording already has a live session.")
+                    return
+
+                buffered = worker_buffered_bytes(runtime, app.config)
+                if buffered > app.config['WORKER_MAX_BUFFERED_BYTES']:
+                    current_app.logger.warning(f"Refusing session for {recording_id}: {buffered} bytes of audio buffered in this worker")
+                    registry.count_refused()
+                    await ws.close(1013, "Server is overloaded, try again later.")
+                    return
+
+                try:
+                    audio_encoding, sample_rate = negotiate_audio_format(init_data)
+                except ValueError as e:
+                    current_app.logger.error(f"Rejecting audio format for {recording_id}: {e}")
+                    await ws.close(1008, str(e))
+                    return
+
+                current_app.logger.info(f"WebSocket connection opened for recordingId: {recording_id}")
+
+                # Clients that don't ask for a protocol keep getting full JSON updates
+                protocol, encoding = negotiate(init_data)
+                if protocol != PROTOCOL_FULL:
+                    await ws.send(json.dumps({"type": "protocol", "version": protocol, "encoding": encoding}))
+
+                session = create_live_session(ws, recording_id, init_data, protocol, encoding,
+                                              audio_encoding, sample_rate, runtime, app, runtime.open_async_channel)
+                registry.add(session, ws)
+                seq = 0
+
+            # Main loop to receive audio chunks from the client
+            while session.ws is ws:
+                message = await ws.receive(timeout=RECEIVE_POLL_S)
+                if ws.stop_requested:
+                    current_app.logger.info(f"Ending session for {recording_id}: the server is shutting down.")
+                    stopped = True
+                    break
+                if message is None:
+                    if ws.connected:
+                        continue
+                    current_app.logger.info(f"WebSocket client for {recording_id} closed the connection.")
+                    break
+
+                # Binary messages are audio chunks
+                if isinstance(message, bytes):
+                    if seq < session.next_seq:
+                        # Resent after a resume, but already received
+                        registry.count_chunks(duplicate=1)
+                    else:
+                        # Dropped chunks (drop policy) still consume their seq
+                        await session.audio_channel.put((message, time.perf_counter(), seq), size=len(message))
+                        session.next_seq = seq + 1
+                    seq += 1
+                # Text messages are for control (e.g., 'stop')
+                elif isinstance(message, str):
+                    control_data = json.loads(message)
+                    if control_data.get('type') == 'stop':
+                        current_app.logger.info(f"Received 'stop' signal for {recording_id}.")
+                        stopped = True
+                        break
+
+        except Exception as e:
+            current_app.logger.error(f"Error in WebSocket handler: {e}")
+
+        finally:
+            if session:
+                if session.resumable and not stopped and not draining():
+                    # Keep the audio file and STT stream alive for a resume
+                    registry.park(session, ws)
+                else:
+                    await registry.finish_async(session, ws)
+
+            if ws.stop_requested:
+                await ws.close(1001, "Server is shutting down.")
+            else:
+                await ws.close()
+            current_app.logger.info("WebSocket connection closed and cleaned up.")
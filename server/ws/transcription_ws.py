@@ -1,15 +1,124 @@
 # server/ws/transcription_ws.py
+"""
+The `/ws/transcription` endpoint.
+
+A client opens a session with a JSON init message, then streams binary audio
+chunks. Clients that send `"resumable": true` can survive a dropped
+connection: the server numbers their chunks from 0 and periodically acks them,
+
+    {"type": "ack", "seq": <number of chunks received>}
+
+and when the connection drops the session is parked for SESSION_RESUME_GRACE_S
+instead of being finalized. The client reconnects with
+
+    {"recordingId": "...", "resume": true, "seq": <seq of the first chunk it sends next>}
+
+and resends every chunk it has not seen acked, starting at `seq`. The server
+replies `{"type": "resumed", "recordingId": "...", "seq": <next expected seq>}`,
+drops chunks it already has and delivers the transcript messages produced
+while the client was away. If the client starts past the next expected seq,
+the missing chunks are counted and skipped.
+
+With SESSION_OVERLOAD_POLICY=signal, a session whose queued audio reaches the
+high watermark sends `{"type": "flow", "action": "pause"}` and, once it has
+caught up, `{"type": "flow", "action": "resume"}`. The `drop` policy only
+applies to linear16 sessions: dropping part of a WebM stream would corrupt the
+stored file and the stream sent to STT, so WebM sessions block instead.
+Sessions are refused with
+close code 1013 while the worker holds more than WORKER_MAX_BUFFERED_BYTES of
+unprocessed audio.
+
+Clients may send raw 16-bit PCM instead of WebM by adding
+`"audio": {"encoding": "linear16", "sampleRate": <Hz>}` to the init message
+(see stt/pcm_ingest.py); unsupported formats are refused with close code 1008.
+"""
 import json
-import asyncio
+import time
 from flask import current_app
 from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 from . import ws_bp
+from ..services.audio_sink import get_audio_writer
 from ..services.transcription_service import TranscriptionService
+from ..services.session_runtime import OVERLOAD_BLOCK, OVERLOAD_DROP, OVERLOAD_SIGNAL, get_runtime
+from ..services.session_registry import LiveSession, get_session_registry
+from ..services.transcript_protocol import PROTOCOL_FULL, negotiate
+from ..stt.pcm_ingest import AUDIO_LINEAR16, negotiate_audio_format
+
+# How often the receive loop checks whether a resuming connection took the session over
+RECEIVE_POLL_S = 1.0
+
+def _audio_handler(service, ack_every: int):
+    async def handle(item):
+        chunk, received_at, seq = item
+        await service.handle_audio_chunk(chunk, received_at)
+        if ack_every and (seq + 1) % ack_every == 0:
+            await service.send_ack(seq + 1)
+    return handle
+
+def worker_buffered_bytes(runtime, config) -> int:
+    """
+    Audio held in memory by this worker: queued for sessions plus not yet written to disk.
+    """
+    return runtime.buffered_bytes() + get_audio_writer(config).get_metrics()["pending_bytes"]
+
+def overload_policy_for(policy: str, audio_encoding: str) -> str:
+    """
+    The overload policy a session with `audio_encoding` runs with. Raw PCM
+    survives dropped chunks as a gap in the audio, but a WebM stream does not:
+    the stored file and the stream sent to STT would be corrupt, and the
+    cluster index assumes a contiguous file. WebM sessions block instead.
+    """
+    if policy == OVERLOAD_DROP and audio_encoding != AUDIO_LINEAR16:
+        return OVERLOAD_BLOCK
+    return policy
 
-# Using a dictionary to keep track of active services per connection
-# In a real-world scenario with multiple server instances, you'd use a
-# distributed cache like Redis to map connections to services.
-active_services = {}
+def parse_resume_seq(init_data: dict):
+    """
+    The chunk a resuming client resends from, or None to continue where the
+    session left off. Raises ValueError for anything but a non-negative integer.
+    """
+    seq = init_data.get('seq')
+    if seq is None:
+        return None
+    if isinstance(seq, bool) or not isinstance(seq, int) or seq < 0:
+        raise ValueError("'seq' must be a non-negative integer.")
+    return seq
+
+def create_live_session(ws, recording_id: str, init_data: dict, protocol: str, encoding: str,
+                        audio_encoding: str, sample_rate: int, runtime, app, open_channel) -> LiveSession:
+    """
+    Creates the transcription service for a new connection, starts connecting
+    it to STT and opens its audio channel with `open_channel` (the runtime's
+    `open_channel` or `open_async_channel`). Must run in an app context.
+    """
+    policy = overload_policy_for(current_app.config['SESSION_OVERLOAD_POLICY'], audio_encoding)
+    if policy != current_app.config['SESSION_OVERLOAD_POLICY']:
+        current_app.logger.info(f"Session {recording_id} sends {audio_encoding} audio, which cannot lose "
+                                f"chunks; using the '{policy}' overload policy")
+    resumable = bool(init_data.get('resumable'))
+    service = TranscriptionService(recording_id, ws, protocol, encoding, resumable=resumable,
+                                   audio_encoding=audio_encoding, sample_rate=sample_rate)
+
+    # Connect to STT in the background; audio received meanwhile is
+    # buffered by the STT client and replayed once the connection is up
+    start_future = runtime.submit(service.start_transcription(), app)
+
+    # Audio chunks are handed to the runtime through a queue bounded in
+    # chunks and bytes; past the high watermark the overload policy
+    # holds the receive loop back (pushing back on the client), drops
+    # chunks or asks the client to pause.
+    audio_channel = open_channel(
+        _audio_handler(service, current_app.config['SESSION_ACK_EVERY'] if resumable else 0),
+        maxsize=current_app.config['SESSION_AUDIO_QUEUE_SIZE'],
+        app=app,
+        high_watermark_bytes=current_app.config['SESSION_AUDIO_HIGH_WATERMARK_BYTES'],
+        low_watermark_bytes=current_app.config['SESSION_AUDIO_LOW_WATERMARK_BYTES'],
+        policy=policy,
+        on_overload=(lambda paused: runtime.submit(service.send_flow_control(paused), app))
+        if policy == OVERLOAD_SIGNAL else None
+    )
+    return LiveSession(service, audio_channel, start_future, runtime, app, resumable)
 
 def init_ws(sock: Sock):
     """
@@ -17,7 +126,12 @@ def init_ws(sock: Sock):
     """
     @sock.route('/ws/transcription')
     def transcription_route(ws):
-        service = None
+        session = None
+        stopped = False
+        # All async work for the session runs on the shared runtime loop
+        runtime = get_runtime()
+        app = current_app._get_current_object()
+        registry = get_session_registry(current_app.config)
         try:
             # First message should be a configuration message
             init_message = ws.receive(timeout=5)
@@ -33,44 +147,104 @@ def init_ws(sock: Sock):
                 current_app.logger.error("No recordingId provided in WebSocket init message.")
                 ws.close(reason=1008, message="recordingId is required.")
                 return
-            
-            current_app.logger.info(f"WebSocket connection opened for recordingId: {recording_id}")
 
-            # Create and store the transcription service for this connection
-            service = TranscriptionService(recording_id, ws)
-            active_services[ws] = service
+            if init_data.get('resume'):
+                # Checked before the takeover, which detaches the previous connection
+                try:
+                    seq = parse_resume_seq(init_data)
+                except ValueError as e:
+                    current_app.logger.error(f"Rejecting resume for {recording_id}: {e}")
+                    ws.close(reason=1008, message=str(e))
+                    return
+                session = registry.resume(recording_id, ws)
+                if session is None:
+                    current_app.logger.warning(f"No resumable session to resume for recordingId: {recording_id}")
+                    ws.close(reason=1008, message="No resumable session to resume.")
+                    return
+                # The client resends everything it has not seen acked, starting at `seq`
+                if seq is None:
+                    seq = session.next_seq
+                if seq > session.next_seq:
+                    current_app.logger.warning(f"Chunks {session.next_seq}-{seq - 1} of {recording_id} were lost")
+                    registry.count_chunks(missing=seq - session.next_seq)
+                    session.next_seq = seq
+                resumed = json.dumps({"type": "resumed", "recordingId": recording_id, "seq": session.next_seq})
+                runtime.run(session.service.attach_client(ws, resumed), app)
+                current_app.logger.info(f"WebSocket connection resumed for recordingId: {recording_id} at chunk {session.next_seq}")
+            else:
+                existing = registry.get(recording_id)
+                if existing and not registry.expire_now(existing):
+                    current_app.logger.error(f"recordingId {recording_id} already has a live session.")
+                    ws.close(reason=1008, message="Recording already has a live session.")
+                    return
+
+                buffered = worker_buffered_bytes(runtime, current_app.config)
+                if buffered > current_app.config['WORKER_MAX_BUFFERED_BYTES']:
+                    current_app.logger.warning(f"Refusing session for {recording_id}: {buffered} bytes of audio buffered in this worker")
+                    registry.count_refused()
+                    ws.close(reason=1013, message="Server is overloaded, try again later.")
+                    return
 
-            # Start the transcription service (connects to STT, etc.)
-            asyncio.run(service.start_transcription())
+                try:
+                    audio_encoding, sample_rate = negotiate_audio_format(init_data)
+                except ValueError as e:
+                    current_app.logger.error(f"Rejecting audio format for {recording_id}: {e}")
+                    ws.close(reason=1008, message=str(e))
+                    return
+
+                current_app.logger.info(f"WebSocket connection opened for recordingId: {recording_id}")
+
+                # Clients that don't ask for a protocol keep getting full JSON updates
+                protocol, encoding = negotiate(init_data)
+                if protocol != PROTOCOL_FULL:
+                    ws.send(json.dumps({"type": "protocol", "version": protocol, "encoding": encoding}))
+
+                session = create_live_session(ws, recording_id, init_data, protocol, encoding,
+                                              audio_encoding, sample_rate, runtime, app, runtime.open_channel)
+                registry.add(session, ws)
+                seq = 0
 
             # Main loop to receive audio chunks from the client
-            while True:
-                message = ws.receive()
+            while session.ws is ws:
+                message = ws.receive(timeout=RECEIVE_POLL_S)
                 if message is None:
+                    if ws.connected:
+                        continue
                     # Connection closed by client
                     current_app.logger.info(f"WebSocket client for {recording_id} closed the connection.")
                     break
-                
+
                 # Binary messages are audio chunks
                 if isinstance(message, bytes):
-                    asyncio.run(service.handle_audio_chunk(message))
+                    if seq < session.next_seq:
+                        # Resent after a resume, but already received
+                        registry.count_chunks(duplicate=1)
+                    else:
+                        # Dropped chunks (drop policy) still consume their seq
+                        session.audio_channel.put((message, time.perf_counter(), seq), size=len(message))
+                        session.next_seq = seq + 1
+                    seq += 1
                 # Text messages are for control (e.g., 'stop')
                 elif isinstance(message, str):
                     control_data = json.loads(message)
                     if control_data.get('type') == 'stop':
                         current_app.logger.info(f"Received 'stop' signal for {recording_id}.")
+                        stopped = True
                         break # Exit the loop to trigger cleanup
-        
+
+        except ConnectionClosed:
+            current_app.logger.info("WebSocket connection dropped.")
         except Exception as e:
             current_app.logger.error(f"Error in WebSocket handler: {e}")
-        
+
         finally:
-            if service:
-                current_app.logger.info(f"Cleaning up resources for recordingId: {service.recording_id}")
-                asyncio.run(service.stop_transcription())
-                if ws in active_services:
-                    del active_services[ws]
-            
-            if not ws.closed:
+            if session:
+                if session.resumable and not stopped:
+                    # Keep the audio file and STT stream alive for a resume
+                    registry.park(session, ws)
+                else:
+                    registry.finish(session, ws)
+
+            if ws.connected:
                 ws.close()
             current_app.logger.info("WebSocket connection closed and cleaned up.")